@@ -8,6 +8,7 @@ from typing import Dict, List, Optional, Union, Any, Tuple
 
 import admin_panel
 from config import Config
+from callback_router import CallbackRouter
 import template_handler
 import smart_rules
 from models import db, User
@@ -1132,8 +1133,123 @@ def get_system_status_message():
                 temp_files_size += os.path.getsize(file_path)
     
     message += f"• عدد الملفات المؤقتة: {temp_files_count}\n"
-    message += f"• حجم الملفات المؤقتة: {temp_files_size / (1024 * 1024):.2f} ميجابايت\n\n"
+    message += f"• حجم الملفات المؤقتة: {temp_files_size / (1024 * 1024):.2f} ميجابايت\n"
+    try:
+        from workspace import get_workspace_stats
+        workspace_stats = get_workspace_stats()
+        message += f"• مساحات العمل: {workspace_stats['workspaces']} (النشطة: {workspace_stats['active']})، "
+        message += f"{workspace_stats['bytes'] / (1024 * 1024):.2f} من {workspace_stats['max_bytes'] / (1024 * 1024):.0f} ميجابايت، "
+        message += f"المحذوفة تلقائياً: {workspace_stats['reaped']}\n"
+    except Exception as e:
+        logger.error(f"خطأ في الحصول على إحصائيات مساحات العمل: {e}")
+    message += "\n"
+    
+    # ذاكرة الوسوم المؤقتة
+    try:
+        from tag_handler import get_tag_cache_stats
+        cache_stats = get_tag_cache_stats()
+        message += "*🗃 ذاكرة الوسوم:*\n"
+        message += f"• العناصر: {cache_stats['entries']} ({cache_stats['bytes'] / (1024 * 1024):.2f} ميجابايت)\n"
+        message += f"• الإصابات: {cache_stats['hits']} | الإخفاقات: {cache_stats['misses']}"
+        message += f" ({cache_stats['hit_rate'] * 100:.0f}%)\n"
+        from cover_art import get_cover_cache_stats
+        cover_stats = get_cover_cache_stats()
+        message += f"• صور الغلاف المجهزة: {cover_stats['entries']} (إعادة استخدام {cover_stats['hits']} مرة)\n"
+        from file_id_cache import get_file_id_cache_stats
+        file_id_stats = get_file_id_cache_stats()
+        message += f"• إرسال بمعرف محفوظ: {file_id_stats['hits']} من {file_id_stats['hits'] + file_id_stats['misses']}"
+        message += f" ({file_id_stats['hit_rate'] * 100:.0f}%)، تم توفير {file_id_stats['bytes_saved'] / (1024 * 1024):.1f} ميجابايت من الرفع\n"
+        from progress import get_progress_stats
+        progress_stats = get_progress_stats()
+        message += f"• رسائل التقدم: {progress_stats['messages']} رسالة، {progress_stats['edits']} تعديل"
+        message += f" (تحديثات مؤجلة: {progress_stats['throttled']})\n\n"
+    except Exception as e:
+        logger.error(f"خطأ في الحصول على إحصائيات ذاكرة الوسوم: {e}")
     
+    # طابور المعالجة
+    try:
+        from job_queue import get_queue_stats
+        queue_stats = get_queue_stats()
+        message += "*⏳ طابور المعالجة:*\n"
+        message += f"• المنتظرة: {queue_stats['depth']}/{queue_stats['max_size']} (الأعلى: {queue_stats['max_depth']})\n"
+        message += f"• العمال المشغولون: {queue_stats['busy']}/{queue_stats['workers']}\n"
+        message += f"• المنجزة: {queue_stats['processed']} | الفاشلة: {queue_stats['failed']} | المرفوضة: {queue_stats['rejected']}\n"
+        message += f"• زمن الانتظار: متوسط {queue_stats['avg_wait']:.1f} ث، p95 {queue_stats['p95_wait']:.1f} ث\n\n"
+    except Exception as e:
+        logger.error(f"خطأ في الحصول على إحصائيات طابور المعالجة: {e}")
+
+    # خط معالجة القناة
+    try:
+        from channel_pipeline import get_pipeline_stats
+        pipeline_stats = get_pipeline_stats()
+        if pipeline_stats:
+            message += "*📡 خط معالجة القناة:*\n"
+            message += f"• المستلمة: {pipeline_stats['received']} | المنشورة: {pipeline_stats['published']}"
+            message += f" | الفاشلة: {pipeline_stats['failed']} | المرفوضة: {pipeline_stats['rejected']}"
+            message += f" (متوسط {pipeline_stats['avg_seconds']:.1f} ث)، المستأنفة بعد إعادة التشغيل: {pipeline_stats['resumed']}\n"
+            from job_journal import get_job_journal
+            journal_stats = get_job_journal().stats()
+            message += "• سجل المهام: " + "، ".join(f"{state}: {count}" for state, count in sorted(journal_stats.items())) + "\n"
+            for name, stats in pipeline_stats['stages'].items():
+                message += f"• {name}: {stats['busy']}/{stats['workers']} عامل، المنتظرة: {stats['depth']}، "
+                message += f"متوسط {stats['avg_seconds']:.1f} ث (الأقصى {stats['max_seconds']:.1f} ث)، "
+                message += f"إعادة المحاولة: {stats['retries']}\n"
+            reorder_stats = pipeline_stats['reorder']
+            message += f"• إعادة الترتيب: المحجوزة {reorder_stats['held']} (الأعلى {reorder_stats['max_held']})، "
+            message += f"المتخطاة: {reorder_stats['skipped']} | المنشورة متأخرة: {reorder_stats['late']}\n"
+            from dedupe_index import get_dedupe_index
+            dedupe_stats = get_dedupe_index().stats()
+            message += f"• المكررات: المتخطاة {pipeline_stats['duplicates_skipped']} | المعاد إرسالها بالمعرف "
+            message += f"{pipeline_stats['duplicates_resent']} | الفهرس: {dedupe_stats['entries']} ملفاً\n"
+            message += f"• المنشورات المعدلة: المعاد معالجتها {pipeline_stats['edits_reprocessed']} | "
+            message += f"المتجاهلة {pipeline_stats['edits_ignored']}\n"
+            from processing_profile import get_processing_profile_stats
+            profile_stats = get_processing_profile_stats()
+            message += f"• ملف المعالجة: الإصدار {profile_stats['version']}، "
+            message += f"القوالب الذكية: {profile_stats['smart_templates']} | الاستبدالات: {profile_stats['replacements']}\n"
+            message += "\n"
+    except Exception as e:
+        logger.error(f"خطأ في الحصول على إحصائيات خط القناة: {e}")
+
+    # تحديد معدل الإرسال
+    try:
+        from rate_limiter import get_rate_limit_stats
+        rate_stats = get_rate_limit_stats()
+        message += "*🚦 تحديد معدل الإرسال:*\n"
+        for priority, label in (('interactive', 'التفاعلية'), ('bulk', 'الجماعية')):
+            stats = rate_stats[priority]
+            message += f"• {label}: {stats['requests']} طلب، المؤجلة: {stats['delayed']} ({stats['wait_seconds']:.1f} ث)\n"
+        message += f"• ردود 429: {rate_stats['flood_waits']} | إعادة المحاولة: {rate_stats['retries']} | المتروكة: {rate_stats['gave_up']}\n\n"
+    except Exception as e:
+        logger.error(f"خطأ في الحصول على إحصائيات تحديد المعدل: {e}")
+
+    # جلسات المستخدمين
+    try:
+        from session_store import get_session_stats
+        session_stats = get_session_stats()
+        if session_stats:
+            message += "*👤 الجلسات:*\n"
+            for namespace, stats in session_stats.items():
+                message += f"• {namespace}: {stats['entries']} في الذاكرة ({stats['bytes'] / (1024 * 1024):.2f} ميجابايت)، "
+                message += f"المنتهية: {stats['expired']} | المستعادة: {stats['loaded']} | الملفات المحذوفة: {stats['files_removed']}\n"
+            message += "\n"
+    except Exception as e:
+        logger.error(f"خطأ في الحصول على إحصائيات الجلسات: {e}")
+
+    # أبطأ الأزرار حسب متوسط زمن المعالجة
+    try:
+        from callback_router import get_callback_stats
+        routes = [(f"{name}:{route}", stats) for name, router_stats in get_callback_stats().items()
+                  for route, stats in router_stats.items()]
+        if routes:
+            routes.sort(key=lambda item: item[1]['avg_seconds'], reverse=True)
+            message += "*🔘 أبطأ الأزرار:*\n"
+            for route, stats in routes[:3]:
+                message += f"• `{route}`: {stats['avg_seconds'] * 1000:.0f} ms × {stats['calls']} (الأخطاء: {stats['errors']})\n"
+            message += "\n"
+    except Exception as e:
+        logger.error(f"خطأ في الحصول على إحصائيات الأزرار: {e}")
+
     # معلومات القواعد الذكية
     try:
         with app.app_context():
@@ -1148,6 +1264,9 @@ def get_system_status_message():
     
     return message
 
+# أزرار لوحة الإدارة حسب callback_data (قيمة كاملة أو بادئة)، تُسجل معالجاتها أدناه
+admin_callbacks = CallbackRouter('admin')
+
 # دالة للتعامل مع جميع أزرار لوحة الإدارة
 def handle_admin_callback(bot, call):
     """معالجة الأزرار الخاصة بلوحة الإدارة"""
@@ -1175,2644 +1294,2491 @@ def handle_admin_callback(bot, call):
         logger.info(f"معالجة زر لوحة الإدارة {call.data} للمستخدم {user_id}")
         
         # معالجة الأزرار المختلفة
-        if call.data == "admin_panel":
-            # عرض لوحة الإدارة الرئيسية
-            bot.edit_message_text(
-                "⚙️ *لوحة إدارة البوت*\n\nاختر إحدى الوظائف التالية:",
-                chat_id, message_id,
-                reply_markup=get_admin_panel_markup(),
-                parse_mode="Markdown"
+        if not admin_callbacks.dispatch(call.data, bot, call, user_id, chat_id, message_id):
+            logger.info(f"زر غير معالج بشكل خاص: {call.data}")
+        
+    except Exception as e:
+        logger.error(f"خطأ في معالجة زر لوحة الإدارة {call.data}: {e}")
+        try:
+            if 'chat_id' in locals():
+                bot.send_message(chat_id, f"⚠️ حدث خطأ في معالجة الطلب: {str(e)}")
+            else:
+                bot.send_message(call.message.chat.id, f"⚠️ حدث خطأ في معالجة الطلب: {str(e)}")
+        except Exception as inner_e:
+            logger.error(f"خطأ إضافي أثناء إرسال رسالة الخطأ: {inner_e}")
+
+@admin_callbacks.route("admin_panel")
+def on_admin_panel(bot, call, user_id, chat_id, message_id):
+    # عرض لوحة الإدارة الرئيسية
+    bot.edit_message_text(
+        "⚙️ *لوحة إدارة البوت*\n\nاختر إحدى الوظائف التالية:",
+        chat_id, message_id,
+        reply_markup=get_admin_panel_markup(),
+        parse_mode="Markdown"
+    )
+
+@admin_callbacks.route("admin_close")
+def on_admin_close(bot, call, user_id, chat_id, message_id):
+    # إغلاق لوحة الإدارة
+    bot.delete_message(chat_id, message_id)
+
+@admin_callbacks.route("admin_stats")
+def on_admin_stats(bot, call, user_id, chat_id, message_id):
+    # عرض إحصائيات البوت
+    bot.edit_message_text(
+        get_stats_message(),
+        chat_id, message_id,
+        reply_markup=get_admin_stats_markup(),
+        parse_mode="Markdown"
+    )
+
+@admin_callbacks.route("admin_reset_stats")
+def on_admin_reset_stats(bot, call, user_id, chat_id, message_id):
+    # إعادة تعيين الإحصائيات
+    admin_panel.reset_statistics()
+    bot.answer_callback_query(call.id, "تمت إعادة تعيين الإحصائيات.")
+    # تحديث الرسالة
+    bot.edit_message_text(
+        get_stats_message(),
+        chat_id, message_id,
+        reply_markup=get_admin_stats_markup(),
+        parse_mode="Markdown"
+    )
+
+@admin_callbacks.route("admin_back")
+def on_admin_back(bot, call, user_id, chat_id, message_id):
+    # عودة إلى اللوحة الرئيسية
+    bot.edit_message_text(
+        "⚙️ *لوحة إدارة البوت*\n\nاختر إحدى الوظائف التالية:",
+        chat_id, message_id,
+        reply_markup=get_admin_panel_markup(),
+        parse_mode="Markdown"
+    )
+
+@admin_callbacks.route("admin_users")
+def on_admin_users(bot, call, user_id, chat_id, message_id):
+    # عرض صفحة إدارة المستخدمين
+    active_users = admin_panel.get_active_users(7)
+    
+    text = "*👥 إدارة المستخدمين*\n\n"
+    text += f"🔹 *إجمالي المستخدمين:* {len(admin_panel.admin_data['users'])}\n"
+    text += f"🔹 *المستخدمين النشطين (7 أيام):* {len(active_users)}\n"
+    text += f"🔹 *المستخدمين المحظورين:* {len(admin_panel.admin_data['blocked_users'])}\n\n"
+    text += "*اختر إحدى الخيارات التالية:*"
+    
+    bot.edit_message_text(
+        text,
+        chat_id, message_id,
+        reply_markup=get_admin_users_markup(),
+        parse_mode="Markdown"
+    )
+
+@admin_callbacks.route("admin_tools")
+def on_admin_tools(bot, call, user_id, chat_id, message_id):
+    # عرض صفحة أدوات الصيانة
+    bot.edit_message_text(
+        "*🛠️ أدوات الصيانة*\n\nاختر أحد الأدوات التالية:",
+        chat_id, message_id,
+        reply_markup=get_admin_tools_markup(),
+        parse_mode="Markdown"
+    )
+
+# معالجة زر التعديل التلقائي للقنوات
+@admin_callbacks.route("admin_auto_processing")
+def on_admin_auto_processing(bot, call, user_id, chat_id, message_id):
+    bot.edit_message_text(
+        "🤖 *التعديل التلقائي للقنوات*\n\nاختر إحدى الوظائف التالية:",
+        chat_id, message_id,
+        reply_markup=get_admin_auto_processing_markup(),
+        parse_mode="Markdown"
+    )
+
+# معالجة زر إدارة البث الجماعي
+@admin_callbacks.route("admin_broadcast_menu")
+def on_admin_broadcast_menu(bot, call, user_id, chat_id, message_id):
+    bot.edit_message_text(
+        "📢 *إدارة البث الجماعي*\n\nاختر إحدى الوظائف التالية:",
+        chat_id, message_id,
+        reply_markup=get_admin_broadcast_menu_markup(),
+        parse_mode="Markdown"
+    )
+
+# معالجة زر إدارة النسخ الاحتياطي
+@admin_callbacks.route("admin_backup_menu")
+def on_admin_backup_menu(bot, call, user_id, chat_id, message_id):
+    bot.edit_message_text(
+        "💾 *النسخ الاحتياطي والاسترجاع*\n\nاختر إحدى الوظائف التالية:",
+        chat_id, message_id,
+        reply_markup=get_admin_backup_menu_markup(),
+        parse_mode="Markdown"
+    )
+
+# معالجة زر إدارة الإشعارات
+@admin_callbacks.route("admin_notifications")
+def on_admin_notifications(bot, call, user_id, chat_id, message_id):
+    bot.edit_message_text(
+        "🔔 *إدارة الإشعارات*\n\nاختر إحدى الوظائف التالية:",
+        chat_id, message_id,
+        reply_markup=get_admin_notifications_markup(),
+        parse_mode="Markdown"
+    )
+
+# معالجة زر إدارة القوالب
+@admin_callbacks.route("admin_templates")
+def on_admin_templates(bot, call, user_id, chat_id, message_id):
+    bot.edit_message_text(
+        "📂️ *إدارة القوالب*\n\nاختر إحدى الوظائف التالية:",
+        chat_id, message_id,
+        reply_markup=get_admin_templates_markup(),
+        parse_mode="Markdown"
+    )
+
+# معالجة زر إعدادات البوت
+@admin_callbacks.route("admin_settings")
+def on_admin_settings(bot, call, user_id, chat_id, message_id):
+    bot.edit_message_text(
+        "⚙️ *إعدادات البوت*\n\nاختر إحدى الوظائف التالية:",
+        chat_id, message_id,
+        reply_markup=get_admin_settings_markup(),
+        parse_mode="Markdown"
+    )
+
+# معالجة زر القواعد الذكية
+@admin_callbacks.route("admin_smart_rules")
+def on_admin_smart_rules(bot, call, user_id, chat_id, message_id):
+    # الحصول على عدد القواعد الذكية
+    smart_rules_count = 0
+    active_rules_count = 0
+    try:
+        with app.app_context():
+            smart_rules_count = SmartRule.query.count()
+            active_rules_count = SmartRule.query.filter_by(is_active=True).count()
+    except Exception as e:
+        logger.error(f"خطأ في الحصول على عدد القواعد الذكية: {e}")
+    
+    bot.edit_message_text(
+        f"🧠 *القواعد الذكية*\n\n"
+        f"باستخدام هذه الميزة يمكنك تعليم البوت معالجة الملفات الصوتية بذكاء بناءً على شروط مخصصة.\n\n"
+        f"• *إجمالي القواعد*: {smart_rules_count}\n"
+        f"• *القواعد النشطة*: {active_rules_count}\n\n"
+        f"اختر إحدى الوظائف التالية:",
+        chat_id, message_id,
+        reply_markup=get_admin_smart_rules_markup(),
+        parse_mode="Markdown"
+    )
+
+# معالجة زر تجربة القواعد الذكية على نص
+@admin_callbacks.route("admin_test_smart_rules")
+def on_admin_test_smart_rules(bot, call, user_id, chat_id, message_id):
+    # إنشاء قائمة بأنواع الحقول المتاحة للاختبار
+    tag_fields = smart_rules.get_available_fields()
+    
+    # تحضير أزرار اختيار نوع الحقل
+    markup = types.InlineKeyboardMarkup(row_width=2)
+    for field in tag_fields:
+        if field['id'] != '*':  # استبعاد خيار "جميع الحقول" للتجربة
+            markup.add(
+                types.InlineKeyboardButton(
+                    f"{field['name']} ({field['id']})",
+                    callback_data=f"admin_test_field_{field['id']}"
+                )
             )
+    
+    # إضافة زر العودة
+    markup.add(
+        types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_smart_rules")
+    )
+    
+    # عرض واجهة اختيار نوع الحقل
+    bot.edit_message_text(
+        "🧪 *تجربة القواعد الذكية*\n\n"
+        "اختر نوع الحقل الذي تريد تجربة القواعد عليه:\n\n"
+        "سيتم تطبيق جميع القواعد الذكية النشطة على النص الذي ستقوم بإدخاله.",
+        chat_id, message_id,
+        reply_markup=markup,
+        parse_mode="Markdown"
+    )
+
+# معالجة زر اختيار نوع الحقل للتجربة
+@admin_callbacks.prefix("admin_test_field_")
+def on_admin_test_field(bot, call, user_id, chat_id, message_id):
+    field_id = call.data.replace("admin_test_field_", "")
+    
+    # تخزين نوع الحقل المختار في حالة المستخدم
+    from bot import set_user_state
+    set_user_state(user_id, "admin_waiting_test_text", {
+        'message_id': message_id,
+        'field_id': field_id
+    })
+    
+    # توجيه المستخدم لإدخال النص
+    field_name = next((field['name'] for field in smart_rules.get_available_fields() if field['id'] == field_id), field_id)
+    
+    bot.edit_message_text(
+        f"🧪 *تجربة القواعد الذكية - {field_name}*\n\n"
+        f"قم بإرسال النص الذي تريد تجربة القواعد عليه كحقل *{field_name}*.\n\n"
+        f"سيتم تطبيق جميع القواعد الذكية النشطة على النص الذي سترسله ومن ثم عرض النتيجة.",
+        chat_id, message_id,
+        reply_markup=types.InlineKeyboardMarkup().add(
+            types.InlineKeyboardButton("🔙 إلغاء", callback_data="admin_test_smart_rules")
+        ),
+        parse_mode="Markdown"
+    )
+
+# معالجة زر سجل العمليات
+@admin_callbacks.route("admin_logs")
+def on_admin_logs(bot, call, user_id, chat_id, message_id):
+    bot.edit_message_text(
+        "📋 *سجل العمليات*\n\nاختر إحدى الوظائف التالية:",
+        chat_id, message_id,
+        reply_markup=get_admin_logs_markup(),
+        parse_mode="Markdown"
+    )
+
+# معالجة أزرار التعديل التلقائي للقنوات
+@admin_callbacks.route("admin_toggle_auto_processing")
+def on_admin_toggle_auto_processing(bot, call, user_id, chat_id, message_id):
+    # تبديل حالة تفعيل المعالجة التلقائية
+    current_state = admin_panel.get_setting("features_enabled.auto_processing", False)
+    admin_panel.update_setting("features_enabled.auto_processing", not current_state)
+    new_state = not current_state
+    state_text = "تفعيل" if new_state else "تعطيل"
+    
+    bot.answer_callback_query(call.id, f"تم {state_text} المعالجة التلقائية للقنوات.")
+    
+    # تحديث واجهة التعديل التلقائي
+    bot.edit_message_text(
+        "🤖 *التعديل التلقائي للقنوات*\n\nاختر إحدى الوظائف التالية:",
+        chat_id, message_id,
+        reply_markup=get_admin_auto_processing_markup(),
+        parse_mode="Markdown"
+    )
+    
+    # تسجيل العملية
+    admin_panel.log_action(
+        user_id, 
+        f"auto_processing_{state_text}", 
+        "success", 
+        f"تم {state_text} المعالجة التلقائية للقنوات"
+    )
+
+@admin_callbacks.route("admin_set_source_channel")
+def on_admin_set_source_channel(bot, call, user_id, chat_id, message_id):
+    # إرسال رسالة للمستخدم لطلب إدخال معرف القناة
+    msg = bot.send_message(
+        chat_id,
+        "📝 *تعيين قناة المصدر للمعالجة التلقائية*\n\n"
+        "أرسل معرف القناة بالتنسيق التالي:\n"
+        "- معرف القناة العامة: مثل `@channel_name`\n"
+        "- معرف القناة الخاصة: مثل `-1001234567890`\n\n"
+        "🔄 أو أرسل `الغاء` للإلغاء.",
+        parse_mode="Markdown"
+    )
+    
+    # تعيين حالة المستخدم للانتظار لإدخال معرف القناة
+    from bot import set_user_state
+    set_user_state(user_id, "admin_waiting_source_channel", {"message_id": msg.message_id})
+
+@admin_callbacks.route("admin_set_target_channel")
+def on_admin_set_target_channel(bot, call, user_id, chat_id, message_id):
+    # إرسال رسالة للمستخدم لطلب إدخال معرف قناة الهدف
+    msg = bot.send_message(
+        chat_id,
+        "📝 *تعيين قناة الهدف للنشر التلقائي*\n\n"
+        "أرسل معرف القناة بالتنسيق التالي:\n"
+        "- معرف القناة العامة: مثل `@channel_name`\n"
+        "- معرف القناة الخاصة: مثل `-1001234567890`\n\n"
+        "🔄 أو أرسل `الغاء` للإلغاء.",
+        parse_mode="Markdown"
+    )
+    
+    # تعيين حالة المستخدم للانتظار لإدخال معرف قناة الهدف
+    from bot import set_user_state
+    set_user_state(user_id, "admin_waiting_target_channel", {"message_id": msg.message_id})
+
+@admin_callbacks.route("admin_toggle_forward_to_target")
+def on_admin_toggle_forward_to_target(bot, call, user_id, chat_id, message_id):
+    # تبديل حالة النشر التلقائي للقناة الهدف
+    current_state = admin_panel.get_setting("auto_processing.forward_to_target", False)
+    new_state = not current_state
+    
+    # تحديث الحالة
+    admin_panel.set_forward_to_target(new_state)
+    
+    # إرسال رسالة تأكيد
+    status = "✅ تفعيل" if new_state else "❌ تعطيل"
+    bot.answer_callback_query(
+        call.id,
+        f"تم {status} ميزة النشر التلقائي للقناة الهدف",
+        show_alert=True
+    )
+    
+    # تحديث لوحة الإدارة
+    bot.edit_message_text(
+        "⚙️ *إدارة التعديل التلقائي للقنوات*\n\n"
+        "يمكنك تعديل إعدادات المعالجة التلقائية للملفات الصوتية في القنوات من هنا.",
+        chat_id, message_id,
+        reply_markup=get_admin_auto_processing_markup(),
+        parse_mode="Markdown"
+    )
+
+@admin_callbacks.route("admin_tag_replacements")
+def on_admin_tag_replacements(bot, call, user_id, chat_id, message_id):
+    # عرض صفحة استبدالات الوسوم
+    try:
+        # استخدام كيبورد بسيط 
+        markup = types.InlineKeyboardMarkup(row_width=2)
+        
+        # إضافة زر تفعيل/تعطيل الاستبدالات
+        replacements_enabled = admin_panel.get_setting("auto_processing.replacements_enabled", True)
+        status_text = "✅ مفعل" if replacements_enabled else "❌ معطل"
+        markup.add(
+            types.InlineKeyboardButton(f"حالة الاستبدالات: {status_text}", 
+                                     callback_data="admin_toggle_replacements")
+        )
+        
+        # زر إضافة استبدال جديد
+        markup.add(types.InlineKeyboardButton("➕ إضافة استبدال جديد", callback_data="admin_add_replacement"))
         
-        elif call.data == "admin_close":
-            # إغلاق لوحة الإدارة
-            bot.delete_message(chat_id, message_id)
+        # عرض الاستبدالات الحالية
+        replacements = admin_panel.get_setting("auto_processing.tag_replacements", {})
+        text = "🏷️ *استبدالات الوسوم للتعديل التلقائي*\n\n"
+        
+        if replacements:
+            text += f"الاستبدالات الحالية ({len(replacements)}):\n\n"
+            for i, (old_text, new_text) in enumerate(replacements.items()):
+                # تنظيف النصوص من أحرف السطر الجديد
+                old_clean = old_text.replace('\n', ' ').strip()
+                new_clean = new_text.replace('\n', ' ').strip()
+                
+                # اقتصار النصوص الطويلة
+                if len(old_clean) > 20:
+                    old_clean = old_clean[:20] + "..."
+                if len(new_clean) > 20:
+                    new_clean = new_clean[:20] + "..."
+                    
+                text += f"{i+1}. `{old_clean}` ➡️ `{new_clean}`\n"
             
-        elif call.data == "admin_stats":
-            # عرض إحصائيات البوت
-            bot.edit_message_text(
-                get_stats_message(),
-                chat_id, message_id,
-                reply_markup=get_admin_stats_markup(),
-                parse_mode="Markdown"
-            )
+            # إضافة زر حذف استبدال
+            markup.add(types.InlineKeyboardButton("🗑️ حذف استبدال", callback_data="admin_delete_replacement"))
             
-        elif call.data == "admin_reset_stats":
-            # إعادة تعيين الإحصائيات
-            admin_panel.reset_statistics()
-            bot.answer_callback_query(call.id, "تمت إعادة تعيين الإحصائيات.")
-            # تحديث الرسالة
-            bot.edit_message_text(
-                get_stats_message(),
-                chat_id, message_id,
-                reply_markup=get_admin_stats_markup(),
-                parse_mode="Markdown"
-            )
+            # إضافة زر حذف كل الاستبدالات
+            markup.add(types.InlineKeyboardButton("🗑️ حذف كل الاستبدالات", callback_data="admin_delete_all_replacements"))
+        else:
+            text += "لا توجد استبدالات مضافة حتى الآن."
         
-        elif call.data == "admin_back":
-            # عودة إلى اللوحة الرئيسية
-            bot.edit_message_text(
-                "⚙️ *لوحة إدارة البوت*\n\nاختر إحدى الوظائف التالية:",
-                chat_id, message_id,
-                reply_markup=get_admin_panel_markup(),
-                parse_mode="Markdown"
+        text += "\n\nهذه النصوص سيتم استبدالها تلقائياً في وسوم الملفات الصوتية التي تنشر في قنوات المصدر."
+        
+        # حالة التفعيل
+        if not replacements_enabled:
+            text += "\n\n⚠️ *ملاحظة: الاستبدالات معطلة حالياً. اضغط على زر التفعيل لتشغيلها.*"
+        
+        # إضافة زر الرجوع
+        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_auto_processing"))
+        
+        bot.edit_message_text(
+            text,
+            chat_id, message_id,
+            reply_markup=markup,
+            parse_mode="Markdown"
+        )
+    except Exception as e:
+        logger.error(f"خطأ في عرض صفحة استبدالات الوسوم: {e}")
+        bot.edit_message_text(
+            "❌ حدث خطأ أثناء عرض استبدالات الوسوم.",
+            chat_id, message_id,
+            reply_markup=types.InlineKeyboardMarkup().add(
+                types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_auto_processing")
             )
+        )
+
+@admin_callbacks.route("admin_smart_templates")
+def on_admin_smart_templates(bot, call, user_id, chat_id, message_id):
+    # عرض صفحة القوالب الذكية
+    try:
+        markup = types.InlineKeyboardMarkup(row_width=2)
+        
+        # إضافة زر تفعيل/تعطيل القوالب الذكية
+        templates_enabled = admin_panel.get_setting("auto_processing.smart_templates_enabled", True)
+        status_text = "✅ مفعل" if templates_enabled else "❌ معطل"
+        markup.add(
+            types.InlineKeyboardButton(f"حالة القوالب الذكية: {status_text}", 
+                                     callback_data="admin_toggle_smart_templates")
+        )
+        
+        # زر إضافة قالب ذكي جديد
+        markup.add(types.InlineKeyboardButton("➕ إضافة قالب ذكي", callback_data="admin_add_smart_template"))
+        
+        # عرض القوالب الذكية الحالية
+        smart_templates = admin_panel.get_setting("auto_processing.smart_templates", {})
+        text = "🎯 *القوالب الذكية للتعديل التلقائي*\n\n"
+        
+        if smart_templates:
+            text += f"القوالب الذكية الحالية ({len(smart_templates)}):\n\n"
+            for i, (artist, template_id) in enumerate(smart_templates.items()):
+                # اقتصار النصوص الطويلة
+                artist_name = artist
+                if len(artist_name) > 25:
+                    artist_name = artist_name[:25] + "..."
+                    
+                text += f"{i+1}. الفنان: `{artist_name}` \n   القالب: `{template_id}`\n\n"
             
-        elif call.data == "admin_users":
-            # عرض صفحة إدارة المستخدمين
-            active_users = admin_panel.get_active_users(7)
-            top_users = admin_panel.get_top_users(10)
-            
-            text = "*👥 إدارة المستخدمين*\n\n"
-            text += f"🔹 *إجمالي المستخدمين:* {len(admin_panel.admin_data['users'])}\n"
-            text += f"🔹 *المستخدمين النشطين (7 أيام):* {len(active_users)}\n"
-            text += f"🔹 *المستخدمين المحظورين:* {len(admin_panel.admin_data['blocked_users'])}\n\n"
-            text += "*اختر إحدى الخيارات التالية:*"
+            # إضافة زر حذف قالب ذكي
+            markup.add(types.InlineKeyboardButton("🗑️ حذف قالب ذكي", callback_data="admin_delete_smart_template"))
             
-            bot.edit_message_text(
-                text,
-                chat_id, message_id,
-                reply_markup=get_admin_users_markup(),
-                parse_mode="Markdown"
-            )
+            # إضافة زر حذف كل القوالب الذكية
+            markup.add(types.InlineKeyboardButton("🗑️ حذف كل القوالب الذكية", callback_data="admin_delete_all_smart_templates"))
+        else:
+            text += "لا توجد قوالب ذكية مضافة حتى الآن."
         
-        elif call.data == "admin_tools":
-            # عرض صفحة أدوات الصيانة
-            bot.edit_message_text(
-                "*🛠️ أدوات الصيانة*\n\nاختر أحد الأدوات التالية:",
-                chat_id, message_id,
-                reply_markup=get_admin_tools_markup(),
-                parse_mode="Markdown"
+        text += "\n\nسيتم تطبيق هذه القوالب تلقائياً على الملفات الصوتية حسب اسم الفنان."
+        
+        # حالة التفعيل
+        if not templates_enabled:
+            text += "\n\n⚠️ *ملاحظة: القوالب الذكية معطلة حالياً. اضغط على زر التفعيل لتشغيلها.*"
+        
+        # إضافة زر الرجوع
+        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_auto_processing"))
+        
+        bot.edit_message_text(
+            text,
+            chat_id, message_id,
+            reply_markup=markup,
+            parse_mode="Markdown"
+        )
+    except Exception as e:
+        logger.error(f"خطأ في عرض صفحة القوالب الذكية: {e}")
+        bot.edit_message_text(
+            "❌ حدث خطأ أثناء عرض القوالب الذكية.",
+            chat_id, message_id,
+            reply_markup=types.InlineKeyboardMarkup().add(
+                types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_auto_processing")
             )
+        )
+
+@admin_callbacks.route("admin_auto_proc_settings")
+def on_admin_auto_proc_settings(bot, call, user_id, chat_id, message_id):
+    # عرض صفحة الإعدادات المتقدمة للتعديل التلقائي
+    bot.edit_message_text(
+        "⚙️ *إعدادات التعديل التلقائي المتقدمة*\n\n"
+        "اضبط خيارات التعديل التلقائي للقنوات.",
+        chat_id, message_id,
+        reply_markup=get_admin_auto_proc_settings_markup(),
+        parse_mode="Markdown"
+    )
+
+# معالجة زر العلامة المائية للصور
+@admin_callbacks.route("admin_image_watermark")
+def on_admin_image_watermark(bot, call, user_id, chat_id, message_id):
+    # عرض صفحة العلامة المائية للصور
+    bot.edit_message_text(
+        "🖼️ *العلامة المائية للصور*\n\n"
+        "يمكنك إضافة علامة مائية على الصور تلقائياً (صورة الألبوم).\n\n"
+        "اختر إحدى الوظائف التالية:",
+        chat_id, message_id,
+        reply_markup=get_admin_image_watermark_markup(),
+        parse_mode="Markdown"
+    )
+
+# معالجة تفعيل/تعطيل العلامة المائية
+@admin_callbacks.route("admin_toggle_image_watermark")
+def on_admin_toggle_image_watermark(bot, call, user_id, chat_id, message_id):
+    watermark_enabled = admin_panel.get_setting("image_watermark.enabled", False)
+    if admin_panel.enable_image_watermark(not watermark_enabled):
+        bot.answer_callback_query(call.id, f"تم {'تعطيل' if watermark_enabled else 'تفعيل'} العلامة المائية للصور بنجاح")
+        
+        # إعادة تحميل صفحة العلامة المائية
+        handle_admin_callback(bot, types.CallbackQuery(
+            id=call.id, from_user=call.from_user, message=call.message, 
+            data="admin_image_watermark", chat_instance=call.chat_instance
+        ))
+    else:
+        bot.answer_callback_query(call.id, "حدث خطأ أثناء تغيير حالة العلامة المائية")
+
+# معالجة تغيير موضع العلامة المائية
+@admin_callbacks.route("admin_change_watermark_position")
+def on_admin_change_watermark_position(bot, call, user_id, chat_id, message_id):
+    current_position = admin_panel.get_setting("image_watermark.position", "bottom-right")
+    
+    # إنشاء قائمة المواضع
+    positions = [
+        ("top-left", "أعلى اليسار"),
+        ("top-right", "أعلى اليمين"),
+        ("bottom-left", "أسفل اليسار"),
+        ("bottom-right", "أسفل اليمين"),
+        ("center", "الوسط")
+    ]
+    
+    markup = types.InlineKeyboardMarkup(row_width=2)
+    for pos_id, pos_name in positions:
+        selected = "✅ " if pos_id == current_position else ""
+        markup.add(types.InlineKeyboardButton(f"{selected}{pos_name}", callback_data=f"admin_set_watermark_position_{pos_id}"))
+    
+    markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_image_watermark"))
+    
+    bot.edit_message_text(
+        "📍 *اختر موضع العلامة المائية*\n\n"
+        "حدد مكان ظهور العلامة المائية على الصور:",
+        chat_id, message_id,
+        reply_markup=markup,
+        parse_mode="Markdown"
+    )
+
+# معالجة تحديد موضع العلامة المائية
+@admin_callbacks.prefix("admin_set_watermark_position_")
+def on_admin_set_watermark_position(bot, call, user_id, chat_id, message_id):
+    position = call.data.replace("admin_set_watermark_position_", "")
+    
+    if admin_panel.set_image_watermark_position(position):
+        bot.answer_callback_query(call.id, f"تم تغيير موضع العلامة المائية بنجاح")
+        
+        # إعادة تحميل صفحة العلامة المائية
+        handle_admin_callback(bot, types.CallbackQuery(
+            id=call.id, from_user=call.from_user, message=call.message, 
+            data="admin_image_watermark", chat_instance=call.chat_instance
+        ))
+    else:
+        bot.answer_callback_query(call.id, "حدث خطأ أثناء تغيير موضع العلامة المائية")
+
+# معالجة تعيين حجم العلامة المائية
+@admin_callbacks.route("admin_change_watermark_size")
+def on_admin_change_watermark_size(bot, call, user_id, chat_id, message_id):
+    # حفظ حالة المستخدم وإرسال رسالة طلب حجم العلامة المائية
+    from bot import set_user_state
+    set_user_state(call.from_user.id, "admin_waiting_for_watermark_size")
+    bot.send_message(
+        chat_id,
+        "📏 *تعديل حجم العلامة المائية*\n\n"
+        "يرجى إدخال نسبة حجم العلامة المائية (1-100%):",
+        parse_mode="Markdown",
+        reply_markup=types.InlineKeyboardMarkup().add(
+            types.InlineKeyboardButton("🔙 إلغاء", callback_data="admin_image_watermark")
+        )
+    )
+
+# معالجة تعيين شفافية العلامة المائية
+@admin_callbacks.route("admin_change_watermark_opacity")
+def on_admin_change_watermark_opacity(bot, call, user_id, chat_id, message_id):
+    # حفظ حالة المستخدم وإرسال رسالة طلب شفافية العلامة المائية
+    from bot import set_user_state
+    set_user_state(call.from_user.id, "admin_waiting_for_watermark_opacity")
+    bot.send_message(
+        chat_id,
+        "🔍 *تعديل شفافية العلامة المائية*\n\n"
+        "يرجى إدخال نسبة شفافية العلامة المائية (1-100%):",
+        parse_mode="Markdown",
+        reply_markup=types.InlineKeyboardMarkup().add(
+            types.InlineKeyboardButton("🔙 إلغاء", callback_data="admin_image_watermark")
+        )
+    )
+
+# معالجة تعيين التباعد من الحافة
+@admin_callbacks.route("admin_change_watermark_padding")
+def on_admin_change_watermark_padding(bot, call, user_id, chat_id, message_id):
+    # حفظ حالة المستخدم وإرسال رسالة طلب التباعد
+    from bot import set_user_state
+    set_user_state(call.from_user.id, "admin_waiting_for_watermark_padding")
+    bot.send_message(
+        chat_id,
+        "↔️ *تعديل التباعد من الحافة*\n\n"
+        "يرجى إدخال قيمة التباعد من الحافة بالبكسل (1-100):",
+        parse_mode="Markdown",
+        reply_markup=types.InlineKeyboardMarkup().add(
+            types.InlineKeyboardButton("🔙 إلغاء", callback_data="admin_image_watermark")
+        )
+    )
+
+# معالجة تعيين صورة العلامة المائية
+@admin_callbacks.route("admin_set_image_watermark")
+def on_admin_set_image_watermark(bot, call, user_id, chat_id, message_id):
+    # حفظ حالة المستخدم وإرسال رسالة طلب صورة العلامة المائية
+    from bot import set_user_state
+    set_user_state(call.from_user.id, "admin_waiting_for_watermark_image")
+    bot.send_message(
+        chat_id,
+        "🖼️ *تعيين صورة العلامة المائية*\n\n"
+        "يرجى إرسال صورة PNG شفافة لاستخدامها كعلامة مائية.\n"
+        "ملاحظة: يفضل أن تكون الصورة شفافة للحصول على أفضل نتيجة.",
+        parse_mode="Markdown",
+        reply_markup=types.InlineKeyboardMarkup().add(
+            types.InlineKeyboardButton("🔙 إلغاء", callback_data="admin_image_watermark")
+        )
+    )
+
+@admin_callbacks.route("admin_enabled_tags")
+def on_admin_enabled_tags(bot, call, user_id, chat_id, message_id):
+    # عرض صفحة إدارة الوسوم المفعلة للاستبدال
+    bot.edit_message_text(
+        "🏷️ *إدارة الوسوم المفعلة للاستبدال*\n\n"
+        "هذه الوسوم هي التي سيتم تعديلها تلقائياً عند المعالجة.",
+        chat_id, message_id,
+        reply_markup=get_admin_enabled_tags_markup(),
+        parse_mode="Markdown"
+    )
+
+@admin_callbacks.route("admin_toggle_keep_caption")
+def on_admin_toggle_keep_caption(bot, call, user_id, chat_id, message_id):
+    # تبديل خيار الحفاظ على الكابشن الأصلي
+    current_state = admin_panel.get_setting("auto_processing.keep_caption", True)
+    admin_panel.update_setting("auto_processing.keep_caption", not current_state)
+    
+    new_state = not current_state
+    state_text = "تفعيل" if new_state else "تعطيل"
+    bot.answer_callback_query(call.id, f"تم {state_text} الحفاظ على الكابشن الأصلي.")
+    
+    # تحديث واجهة الإعدادات المتقدمة
+    bot.edit_message_text(
+        "⚙️ *إعدادات التعديل التلقائي المتقدمة*\n\n"
+        "اضبط خيارات التعديل التلقائي للقنوات.",
+        chat_id, message_id,
+        reply_markup=get_admin_auto_proc_settings_markup(),
+        parse_mode="Markdown"
+    )
+
+@admin_callbacks.route("admin_toggle_auto_publish")
+def on_admin_toggle_auto_publish(bot, call, user_id, chat_id, message_id):
+    # تبديل خيار النشر التلقائي
+    current_state = admin_panel.get_setting("auto_processing.auto_publish", True)
+    admin_panel.update_setting("auto_processing.auto_publish", not current_state)
+    
+    new_state = not current_state
+    state_text = "تفعيل" if new_state else "تعطيل"
+    bot.answer_callback_query(call.id, f"تم {state_text} النشر التلقائي بعد التعديل.")
+    
+    # تحديث واجهة الإعدادات المتقدمة
+    bot.edit_message_text(
+        "⚙️ *إعدادات التعديل التلقائي المتقدمة*\n\n"
+        "اضبط خيارات التعديل التلقائي للقنوات.",
+        chat_id, message_id,
+        reply_markup=get_admin_auto_proc_settings_markup(),
+        parse_mode="Markdown"
+    )
+
+@admin_callbacks.route("admin_toggle_remove_links")
+def on_admin_toggle_remove_links(bot, call, user_id, chat_id, message_id):
+    # تبديل خيار حذف الروابط تلقائياً
+    current_state = admin_panel.get_setting("auto_processing.remove_links", False)
+    admin_panel.update_setting("auto_processing.remove_links", not current_state)
+    
+    new_state = not current_state
+    state_text = "تفعيل" if new_state else "تعطيل"
+    bot.answer_callback_query(call.id, f"تم {state_text} حذف الروابط من الوسوم تلقائياً.")
+    
+    # تحديث واجهة الإعدادات المتقدمة
+    bot.edit_message_text(
+        "⚙️ *إعدادات التعديل التلقائي المتقدمة*\n\n"
+        "اضبط خيارات التعديل التلقائي للقنوات.",
+        chat_id, message_id,
+        reply_markup=get_admin_auto_proc_settings_markup(),
+        parse_mode="Markdown"
+    )
+
+@admin_callbacks.route("admin_toggle_replacements")
+def on_admin_toggle_replacements(bot, call, user_id, chat_id, message_id):
+    # تبديل حالة تفعيل الاستبدالات
+    current_state = admin_panel.get_setting("auto_processing.replacements_enabled", True)
+    admin_panel.update_setting("auto_processing.replacements_enabled", not current_state)
+    
+    new_state = not current_state
+    state_text = "تفعيل" if new_state else "تعطيل"
+    bot.answer_callback_query(call.id, f"تم {state_text} استبدالات الوسوم.")
+    
+    # تحديث واجهة استبدالات الوسوم
+    # إعادة تحميل الواجهة (من خلال استدعاء admin_tag_replacements)
+    call.data = "admin_tag_replacements"
+    return handle_admin_callback(bot, call)
+
+@admin_callbacks.route("admin_toggle_smart_templates")
+def on_admin_toggle_smart_templates(bot, call, user_id, chat_id, message_id):
+    # تبديل حالة تفعيل القوالب الذكية
+    current_state = admin_panel.get_setting("auto_processing.smart_templates_enabled", True)
+    admin_panel.update_setting("auto_processing.smart_templates_enabled", not current_state)
+    
+    new_state = not current_state
+    state_text = "تفعيل" if new_state else "تعطيل"
+    bot.answer_callback_query(call.id, f"تم {state_text} القوالب الذكية.")
+    
+    # تحديث واجهة القوالب الذكية
+    # إعادة تحميل الواجهة (من خلال استدعاء admin_smart_templates)
+    call.data = "admin_smart_templates"
+    return handle_admin_callback(bot, call)
+
+@admin_callbacks.route("admin_delete_replacement")
+def on_admin_delete_replacement(bot, call, user_id, chat_id, message_id):
+    # حذف استبدال
+    msg = bot.send_message(
+        chat_id,
+        "🗑️ *حذف استبدال*\n\n"
+        "أرسل رقم الاستبدال الذي تريد حذفه من القائمة.\n\n"
+        "🔄 أو أرسل `الغاء` للإلغاء.",
+        parse_mode="Markdown"
+    )
+    
+    # تعيين حالة المستخدم لانتظار رقم الاستبدال
+    from bot import set_user_state
+    set_user_state(user_id, "admin_waiting_replacement_number", {"message_id": msg.message_id})
+
+@admin_callbacks.route("admin_delete_all_replacements")
+def on_admin_delete_all_replacements(bot, call, user_id, chat_id, message_id):
+    # حذف كل الاستبدالات
+    markup = types.InlineKeyboardMarkup(row_width=2)
+    markup.add(
+        types.InlineKeyboardButton("✅ نعم، حذف الكل", callback_data="admin_confirm_delete_all_replacements"),
+        types.InlineKeyboardButton("❌ إلغاء", callback_data="admin_tag_replacements")
+    )
+    
+    bot.edit_message_text(
+        "⚠️ *تأكيد حذف كل الاستبدالات*\n\n"
+        "هل أنت متأكد من أنك تريد حذف جميع استبدالات الوسوم؟\n"
+        "هذا الإجراء لا يمكن التراجع عنه.",
+        chat_id, message_id,
+        reply_markup=markup,
+        parse_mode="Markdown"
+    )
+
+@admin_callbacks.route("admin_confirm_delete_all_replacements")
+def on_admin_confirm_delete_all_replacements(bot, call, user_id, chat_id, message_id):
+    # تأكيد حذف كل الاستبدالات
+    admin_panel.update_setting("auto_processing.tag_replacements", {})
+    bot.answer_callback_query(call.id, "تم حذف جميع استبدالات الوسوم بنجاح.")
+    
+    # العودة إلى صفحة الاستبدالات
+    call.data = "admin_tag_replacements"
+    return handle_admin_callback(bot, call)
+
+@admin_callbacks.route("admin_delete_smart_template")
+def on_admin_delete_smart_template(bot, call, user_id, chat_id, message_id):
+    # حذف قالب ذكي
+    msg = bot.send_message(
+        chat_id,
+        "🗑️ *حذف قالب ذكي*\n\n"
+        "أرسل رقم القالب الذي تريد حذفه من القائمة.\n\n"
+        "🔄 أو أرسل `الغاء` للإلغاء.",
+        parse_mode="Markdown"
+    )
+    
+    # تعيين حالة المستخدم لانتظار رقم القالب
+    from bot import set_user_state
+    set_user_state(user_id, "admin_waiting_template_number", {"message_id": msg.message_id})
+
+@admin_callbacks.route("admin_delete_all_smart_templates")
+def on_admin_delete_all_smart_templates(bot, call, user_id, chat_id, message_id):
+    # حذف كل القوالب الذكية
+    markup = types.InlineKeyboardMarkup(row_width=2)
+    markup.add(
+        types.InlineKeyboardButton("✅ نعم، حذف الكل", callback_data="admin_confirm_delete_all_smart_templates"),
+        types.InlineKeyboardButton("❌ إلغاء", callback_data="admin_smart_templates")
+    )
+    
+    bot.edit_message_text(
+        "⚠️ *تأكيد حذف كل القوالب الذكية*\n\n"
+        "هل أنت متأكد من أنك تريد حذف جميع القوالب الذكية؟\n"
+        "هذا الإجراء لا يمكن التراجع عنه.",
+        chat_id, message_id,
+        reply_markup=markup,
+        parse_mode="Markdown"
+    )
+
+@admin_callbacks.route("admin_confirm_delete_all_smart_templates")
+def on_admin_confirm_delete_all_smart_templates(bot, call, user_id, chat_id, message_id):
+    # تأكيد حذف كل القوالب الذكية
+    admin_panel.update_setting("auto_processing.smart_templates", {})
+    bot.answer_callback_query(call.id, "تم حذف جميع القوالب الذكية بنجاح.")
+    
+    # العودة إلى صفحة القوالب الذكية
+    call.data = "admin_smart_templates"
+    return handle_admin_callback(bot, call)
+
+@admin_callbacks.prefix("admin_toggle_tag_")
+def on_admin_toggle_tag(bot, call, user_id, chat_id, message_id):
+    # تبديل حالة تفعيل/تعطيل وسم معين
+    tag_name = call.data.replace("admin_toggle_tag_", "")
+    
+    # الحصول على الوسوم المفعلة الحالية
+    enabled_tags = admin_panel.get_setting("auto_processing.enabled_tags", {
+        'artist': True,
+        'album_artist': True,
+        'album': True,
+        'genre': True,
+        'year': True,
+        'composer': True,
+        'comment': True,
+        'title': True,
+        'lyrics': True
+    })
+    
+    # تبديل حالة الوسم
+    current_state = enabled_tags.get(tag_name, True)
+    enabled_tags[tag_name] = not current_state
+    
+    # حفظ التغييرات
+    admin_panel.update_setting("auto_processing.enabled_tags", enabled_tags)
+    
+    # عرض رسالة تأكيد
+    new_state = "تفعيل" if enabled_tags[tag_name] else "تعطيل"
+    arabic_tags = {
+        'artist': 'الفنان',
+        'album_artist': 'فنان الألبوم',
+        'album': 'الألبوم',
+        'genre': 'النوع',
+        'year': 'السنة',
+        'composer': 'الملحن',
+        'comment': 'تعليق',
+        'title': 'العنوان',
+        'lyrics': 'كلمات الأغنية'
+    }
+    arabic_name = arabic_tags.get(tag_name, tag_name)
+    bot.answer_callback_query(call.id, f"تم {new_state} وسم {arabic_name} بنجاح.")
+    
+    # تحديث واجهة الوسوم المفعلة
+    markup = get_admin_enabled_tags_markup()
+    bot.edit_message_text(
+        "🏷️ *إدارة الوسوم المفعلة للاستبدال*\n\n"
+        "حدد الوسوم التي تريد تفعيلها أو تعطيلها لعمليات الاستبدال التلقائي.\n"
+        "الوسوم المفعلة (✅) ستتم معالجتها واستبدال النصوص فيها، بينما الوسوم المعطلة (❌) لن يتم تغييرها.",
+        chat_id, message_id,
+        reply_markup=markup,
+        parse_mode="Markdown"
+    )
+
+@admin_callbacks.route("admin_add_tag_replacement")
+def on_admin_add_tag_replacement(bot, call, user_id, chat_id, message_id):
+    # إرسال رسالة للمستخدم لطلب إدخال النص الأصلي
+    msg = bot.send_message(
+        chat_id,
+        "📝 *إضافة استبدال نصي للوسوم*\n\n"
+        "أرسل النص الأصلي المراد استبداله.\n\n"
+        "🔄 أو أرسل `الغاء` للإلغاء.",
+        parse_mode="Markdown"
+    )
+    
+    # تعيين حالة المستخدم للانتظار لإدخال النص الأصلي
+    from bot import set_user_state
+    set_user_state(user_id, "admin_waiting_old_text", {"message_id": msg.message_id})
+
+@admin_callbacks.route("admin_add_smart_template")
+def on_admin_add_smart_template(bot, call, user_id, chat_id, message_id):
+    # إرسال رسالة للمستخدم لطلب إدخال اسم الفنان
+    msg = bot.send_message(
+        chat_id,
+        "📝 *إضافة قالب ذكي جديد*\n\n"
+        "أرسل اسم الفنان:\n\n"
+        "🔄 أو أرسل `الغاء` للإلغاء.",
+        parse_mode="Markdown"
+    )
+    
+    # تعيين حالة المستخدم للانتظار لإدخال اسم الفنان
+    from bot import set_user_state
+    set_user_state(user_id, "admin_waiting_artist_name", {"message_id": msg.message_id})
+
+# معالجة أزرار الإعدادات
+@admin_callbacks.route("admin_welcome_msg")
+def on_admin_welcome_msg(bot, call, user_id, chat_id, message_id):
+    # تعيين رسالة الترحيب
+    msg = bot.edit_message_text(
+        "📝 *تعديل رسالة الترحيب*\n\n"
+        "الرسالة الحالية:\n"
+        f"{admin_panel.get_setting('settings.welcome_message', 'غير محددة')}\n\n"
+        "أرسل الرسالة الجديدة:",
+        chat_id, message_id,
+        parse_mode="Markdown"
+    )
+    from bot import set_user_state
+    set_user_state(user_id, "admin_waiting_for_welcome_msg", {"message_id": msg.message_id})
+
+@admin_callbacks.route("admin_file_size")
+def on_admin_file_size(bot, call, user_id, chat_id, message_id):
+    # تعيين الحد الأقصى لحجم الملف
+    current_size = admin_panel.get_setting("settings.max_file_size_mb", 50)
+    msg = bot.edit_message_text(
+        "📊 *تعديل الحد الأقصى لحجم الملف*\n\n"
+        f"الحد الحالي: {current_size} ميجابايت\n\n"
+        "أرسل القيمة الجديدة بالميجابايت:",
+        chat_id, message_id,
+        parse_mode="Markdown"
+    )
+    from bot import set_user_state
+    set_user_state(user_id, "admin_waiting_for_file_size", {"message_id": msg.message_id})
+
+@admin_callbacks.route("admin_processing_delay")
+def on_admin_processing_delay(bot, call, user_id, chat_id, message_id):
+    # تعيين وقت التأخير بين معالجة الملفات
+    current_delay = admin_panel.get_setting("settings.processing_delay", 0)
+    msg = bot.edit_message_text(
+        "⏱️ *تعديل وقت التأخير بين المعالجة*\n\n"
+        f"الوقت الحالي: {current_delay} ثانية\n\n"
+        "أرسل القيمة الجديدة بالثواني:",
+        chat_id, message_id,
+        parse_mode="Markdown"
+    )
+    from bot import set_user_state
+    set_user_state(user_id, "admin_waiting_for_delay", {"message_id": msg.message_id})
+
+@admin_callbacks.route("admin_daily_limit")
+def on_admin_daily_limit(bot, call, user_id, chat_id, message_id):
+    # تعيين الحد اليومي للمستخدم
+    current_limit = admin_panel.get_setting("settings.daily_user_limit_mb", 0)
+    limit_str = f"{current_limit} ميجابايت" if current_limit > 0 else "غير محدود"
+    msg = bot.edit_message_text(
+        "📈 *تعديل الحد اليومي للمستخدم*\n\n"
+        f"الحد الحالي: {limit_str}\n\n"
+        "أرسل القيمة الجديدة بالميجابايت (0 = غير محدود):",
+        chat_id, message_id,
+        parse_mode="Markdown"
+    )
+    from bot import set_user_state
+    set_user_state(user_id, "admin_waiting_for_limit", {"message_id": msg.message_id})
+
+@admin_callbacks.route("admin_required_channels")
+def on_admin_required_channels(bot, call, user_id, chat_id, message_id):
+    # إدارة قنوات الاشتراك الإجباري
+    channels = admin_panel.get_setting("settings.required_channels", [])
+    channels_str = ""
+    for idx, channel in enumerate(channels):
+        channels_str += f"{idx+1}. {channel['title']} ({channel['channel_id']})\n"
+    
+    if not channels_str:
+        channels_str = "لا توجد قنوات مضافة حاليًا."
+    
+    markup = types.InlineKeyboardMarkup(row_width=1)
+    markup.add(
+        types.InlineKeyboardButton("➕ إضافة قناة", callback_data="admin_add_channel"),
+        types.InlineKeyboardButton("❌ إزالة قناة", callback_data="admin_remove_channel"),
+        types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_settings")
+    )
+    
+    bot.edit_message_text(
+        "📢 *إدارة قنوات الاشتراك الإجباري*\n\n"
+        "القنوات الحالية:\n"
+        f"{channels_str}",
+        chat_id, message_id,
+        reply_markup=markup,
+        parse_mode="Markdown"
+    )
+
+@admin_callbacks.route("admin_add_channel")
+def on_admin_add_channel(bot, call, user_id, chat_id, message_id):
+    # إضافة قناة اشتراك جديدة
+    msg = bot.edit_message_text(
+        "📢 *إضافة قناة اشتراك إجباري*\n\n"
+        "أرسل معرف القناة بالتنسيق التالي:\n"
+        "- معرف القناة العامة: مثل @channel_name\n"
+        "- معرف القناة الخاصة: مثل -1001234567890\n\n"
+        "🔄 أو أرسل الغاء للإلغاء.",
+        chat_id, message_id,
+        parse_mode="Markdown"
+    )
+    from bot import set_user_state
+    set_user_state(user_id, "admin_waiting_for_channel_id", {"message_id": msg.message_id})
+
+@admin_callbacks.route("admin_remove_channel")
+def on_admin_remove_channel(bot, call, user_id, chat_id, message_id):
+    # إزالة قناة اشتراك
+    channels = admin_panel.get_setting("settings.required_channels", [])
+    if not channels:
+        markup = types.InlineKeyboardMarkup()
+        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_required_channels"))
+        bot.edit_message_text(
+            "📢 *إزالة قناة اشتراك إجباري*\n\n"
+            "لا توجد قنوات مضافة حاليًا.",
+            chat_id, message_id,
+            reply_markup=markup,
+            parse_mode="Markdown"
+        )
+    else:
+        markup = types.InlineKeyboardMarkup(row_width=1)
+        for idx, channel in enumerate(channels):
+            markup.add(types.InlineKeyboardButton(
+                f"{channel['title']} ({channel['channel_id']})", 
+                callback_data=f"admin_del_channel_{idx}"
+            ))
+        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_required_channels"))
+        
+        bot.edit_message_text(
+            "📢 *إزالة قناة اشتراك إجباري*\n\n"
+            "اختر القناة التي تريد إزالتها:",
+            chat_id, message_id,
+            reply_markup=markup,
+            parse_mode="Markdown"
+        )
+
+@admin_callbacks.prefix("admin_del_channel_")
+def on_admin_del_channel(bot, call, user_id, chat_id, message_id):
+    # حذف قناة محددة
+    idx = int(call.data.split("_")[-1])
+    channels = admin_panel.get_setting("settings.required_channels", [])
+    if 0 <= idx < len(channels):
+        channel = channels[idx]
+        channels.pop(idx)
+        admin_panel.update_setting("settings.required_channels", channels)
+        markup = types.InlineKeyboardMarkup()
+        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_required_channels"))
+        bot.edit_message_text(
+            f"✅ تم حذف القناة {channel['title']} بنجاح!",
+            chat_id, message_id,
+            reply_markup=markup
+        )
+
+@admin_callbacks.route("admin_log_channel")
+def on_admin_log_channel(bot, call, user_id, chat_id, message_id):
+    # تعيين قناة السجل
+    current_channel = admin_panel.get_setting("settings.log_channel", "")
+    msg = bot.edit_message_text(
+        "📋 *تعيين قناة السجل*\n\n"
+        f"القناة الحالية: {current_channel or 'غير محددة'}\n\n"
+        "أرسل معرف القناة بالتنسيق التالي:\n"
+        "- معرف القناة العامة: مثل @channel_name\n"
+        "- معرف القناة الخاصة: مثل -1001234567890\n\n"
+        "أو أرسل `حذف` لإزالة قناة السجل الحالية.\n"
+        "🔄 أو أرسل الغاء للإلغاء.",
+        chat_id, message_id,
+        parse_mode="Markdown"
+    )
+    from bot import set_user_state
+    set_user_state(user_id, "admin_waiting_for_log_channel", {"message_id": msg.message_id})
+
+@admin_callbacks.route("admin_advanced_settings")
+def on_admin_advanced_settings(bot, call, user_id, chat_id, message_id):
+    # الإعدادات المتقدمة
+    markup = get_admin_advanced_settings_markup()
+    bot.edit_message_text(
+        "⚙️ *الإعدادات المتقدمة*\n\n"
+        "اختر الإعداد الذي تريد تعديله:",
+        chat_id, message_id,
+        reply_markup=markup,
+        parse_mode="Markdown"
+    )
+
+@admin_callbacks.route("admin_toggle_templates")
+def on_admin_toggle_templates(bot, call, user_id, chat_id, message_id):
+    # تفعيل/تعطيل ميزة القوالب
+    current = admin_panel.get_setting("settings.features_enabled.templates", True)
+    admin_panel.update_setting("settings.features_enabled.templates", not current)
+    markup = get_admin_advanced_settings_markup()
+    status = "✅ مفعلة" if not current else "❌ معطلة"
+    bot.edit_message_text(
+        f"✅ تم تغيير حالة ميزة القوالب إلى: {status}",
+        chat_id, message_id,
+        reply_markup=markup
+    )
+
+@admin_callbacks.route("admin_toggle_lyrics")
+def on_admin_toggle_lyrics(bot, call, user_id, chat_id, message_id):
+    # تفعيل/تعطيل ميزة كلمات الأغنية
+    current = admin_panel.get_setting("settings.features_enabled.lyrics", True)
+    admin_panel.update_setting("settings.features_enabled.lyrics", not current)
+    markup = get_admin_advanced_settings_markup()
+    status = "✅ مفعلة" if not current else "❌ معطلة"
+    bot.edit_message_text(
+        f"✅ تم تغيير حالة ميزة كلمات الأغنية إلى: {status}",
+        chat_id, message_id,
+        reply_markup=markup
+    )
+
+@admin_callbacks.route("admin_toggle_album_art")
+def on_admin_toggle_album_art(bot, call, user_id, chat_id, message_id):
+    # تفعيل/تعطيل ميزة صورة الغلاف
+    current = admin_panel.get_setting("settings.features_enabled.album_art", True)
+    admin_panel.update_setting("settings.features_enabled.album_art", not current)
+    markup = get_admin_advanced_settings_markup()
+    status = "✅ مفعلة" if not current else "❌ معطلة"
+    bot.edit_message_text(
+        f"✅ تم تغيير حالة ميزة صورة الغلاف إلى: {status}",
+        chat_id, message_id,
+        reply_markup=markup
+    )
+
+@admin_callbacks.route("admin_toggle_required_subscription")
+def on_admin_toggle_required_subscription(bot, call, user_id, chat_id, message_id):
+    # تفعيل/تعطيل الاشتراك الإجباري
+    current = admin_panel.get_setting("settings.features_enabled.required_subscription", False)
+    admin_panel.update_setting("settings.features_enabled.required_subscription", not current)
+    markup = get_admin_advanced_settings_markup()
+    status = "✅ مفعل" if not current else "❌ معطل"
+    bot.edit_message_text(
+        f"✅ تم تغيير حالة الاشتراك الإجباري إلى: {status}",
+        chat_id, message_id,
+        reply_markup=markup
+    )
+
+# معالجة أزرار صفحة الإحصائيات
+@admin_callbacks.route("admin_detailed_stats")
+def on_admin_detailed_stats(bot, call, user_id, chat_id, message_id):
+    # عرض إحصائيات مفصلة
+    stats = admin_panel.get_setting("statistics", {})
+    system_info = admin_panel.get_system_info()
+    
+    stats_text = "📊 *إحصائيات مفصلة للبوت*\n\n"
+    stats_text += "*◉ إحصائيات المستخدمين:*\n"
+    stats_text += f"• إجمالي المستخدمين: {len(admin_panel.get_setting('users', {}))}\n"
+    stats_text += f"• المستخدمين النشطين (7 أيام): {len(admin_panel.get_active_users(7))}\n"
+    stats_text += f"• المستخدمين المحظورين: {len(admin_panel.get_setting('blocked_users', []))}\n"
+    stats_text += f"• المشرفين: {len(admin_panel.get_setting('admins', []))}\n\n"
+    
+    stats_text += "*◉ إحصائيات الملفات:*\n"
+    stats_text += f"• إجمالي الملفات المعالجة: {stats.get('files_processed', 0)}\n"
+    stats_text += f"• حجم الملفات المعالجة: {stats.get('processed_size_mb', 0):.2f} ميجابايت\n"
+    stats_text += f"• متوسط حجم الملف: {stats.get('processed_size_mb', 0) / max(stats.get('files_processed', 1), 1):.2f} ميجابايت\n\n"
+    
+    stats_text += "*◉ إحصائيات الوسوم:*\n"
+    stats_text += f"• تعديلات العنوان: {stats.get('tag_edits_title', 0)}\n"
+    stats_text += f"• تعديلات الفنان: {stats.get('tag_edits_artist', 0)}\n"
+    stats_text += f"• تعديلات الألبوم: {stats.get('tag_edits_album', 0)}\n"
+    stats_text += f"• تعديلات كلمات الأغنية: {stats.get('tag_edits_lyrics', 0)}\n"
+    stats_text += f"• تعديلات صورة الغلاف: {stats.get('tag_edits_albumart', 0)}\n\n"
+    
+    stats_text += "*◉ إحصائيات القوالب:*\n"
+    stats_text += f"• عدد القوالب: {stats.get('templates_count', 0)}\n"
+    stats_text += f"• مرات تطبيق القوالب: {stats.get('templates_applied', 0)}\n\n"
+    
+    stats_text += "*◉ إحصائيات النظام:*\n"
+    stats_text += f"• استخدام المعالج: {system_info.get('cpu_percent', 0)}%\n"
+    stats_text += f"• استخدام الذاكرة: {system_info.get('memory_percent', 0)}%\n"
+    stats_text += f"• مساحة القرص المتاحة: {system_info.get('disk_free_gb', 0):.2f} جيجابايت\n"
+    stats_text += f"• وقت تشغيل البوت: {format_duration(system_info.get('uptime_seconds', 0))}\n"
+    
+    markup = get_admin_stats_markup()
+    bot.edit_message_text(
+        stats_text,
+        chat_id, message_id,
+        reply_markup=markup,
+        parse_mode="Markdown"
+    )
+
+# معالجة أزرار صفحة إدارة المستخدمين
+@admin_callbacks.route("admin_active_users")
+def on_admin_active_users(bot, call, user_id, chat_id, message_id):
+    # عرض المستخدمين النشطين
+    active_users = admin_panel.get_active_users(7)
+    users_text = get_user_list_message(active_users, "المستخدمين النشطين في آخر 7 أيام")
+    
+    markup = types.InlineKeyboardMarkup()
+    markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_users"))
+    
+    bot.edit_message_text(
+        users_text, 
+        chat_id, message_id,
+        reply_markup=markup, 
+        parse_mode="Markdown"
+    )
+
+@admin_callbacks.route("admin_top_users")
+def on_admin_top_users(bot, call, user_id, chat_id, message_id):
+    # عرض أكثر المستخدمين نشاطًا
+    top_users = admin_panel.get_top_users(10)
+    users_text = get_user_list_message(top_users, "أكثر المستخدمين نشاطًا")
+    
+    markup = types.InlineKeyboardMarkup()
+    markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_users"))
+    
+    bot.edit_message_text(
+        users_text, 
+        chat_id, message_id,
+        reply_markup=markup, 
+        parse_mode="Markdown"
+    )
+
+@admin_callbacks.route("admin_blocked_users")
+def on_admin_blocked_users(bot, call, user_id, chat_id, message_id):
+    # عرض المستخدمين المحظورين
+    blocked_ids = admin_panel.get_setting("blocked_users", [])
+    blocked_users = []
+    users_data = admin_panel.get_setting("users", {})
+    
+    for user_id in blocked_ids:
+        user_id = int(user_id)
+        user_data = users_data.get(str(user_id), {})
+        blocked_users.append({
+            "id": user_id,
+            "username": user_data.get("username", "غير معروف"),
+            "first_name": user_data.get("first_name", "غير معروف"),
+            "blocked_at": user_data.get("blocked_at", 0),
+            "files_processed": user_data.get("files_processed", 0)
+        })
+    
+    users_text = get_user_list_message(blocked_users, "المستخدمين المحظورين")
+    
+    markup = types.InlineKeyboardMarkup()
+    markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_users"))
+    
+    bot.edit_message_text(
+        users_text, 
+        chat_id, message_id,
+        reply_markup=markup, 
+        parse_mode="Markdown"
+    )
+
+@admin_callbacks.route("admin_admins")
+def on_admin_admins(bot, call, user_id, chat_id, message_id):
+    # عرض المشرفين
+    admin_ids = admin_panel.get_setting("admins", [])
+    admins = []
+    users_data = admin_panel.get_setting("users", {})
+    
+    for user_id in admin_ids:
+        user_id = int(user_id)
+        user_data = users_data.get(str(user_id), {})
+        admins.append({
+            "id": user_id,
+            "username": user_data.get("username", "غير معروف"),
+            "first_name": user_data.get("first_name", "غير معروف"),
+            "added_at": user_data.get("admin_added_at", 0)
+        })
+    
+    users_text = get_user_list_message(admins, "المشرفين")
+    
+    markup = types.InlineKeyboardMarkup()
+    markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_users"))
+    
+    bot.edit_message_text(
+        users_text, 
+        chat_id, message_id,
+        reply_markup=markup, 
+        parse_mode="Markdown"
+    )
+
+# معالجة أزرار صفحة إدارة القوالب
+@admin_callbacks.route("admin_view_templates")
+def on_admin_view_templates(bot, call, user_id, chat_id, message_id):
+    # عرض جميع القوالب
+    try:
+        from template_handler import get_all_templates
+        templates = get_all_templates()
+        
+        if not templates:
+            markup = types.InlineKeyboardMarkup()
+            markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_templates"))
+            bot.edit_message_text(
+                "📋 قائمة القوالب\n\n"
+                "لا توجد قوالب محفوظة حالياً.",
+                chat_id, message_id,
+                reply_markup=markup
+            )
+        else:
+            templates_text = "📋 قائمة القوالب\n\n"
+            for idx, template in enumerate(templates):
+                # استخدام نص عادي بدلاً من تنسيق Markdown
+                templates_text += f"{idx+1}. {template['name']} (الفنان: {template.get('artist', 'غير محدد')})\n"
             
-        else:
-            # معالجة زر التعديل التلقائي للقنوات
-            if call.data == "admin_auto_processing":
-                bot.edit_message_text(
-                    "🤖 *التعديل التلقائي للقنوات*\n\nاختر إحدى الوظائف التالية:",
-                    chat_id, message_id,
-                    reply_markup=get_admin_auto_processing_markup(),
-                    parse_mode="Markdown"
-                )
-            # معالجة زر إدارة البث الجماعي
-            elif call.data == "admin_broadcast_menu":
-                bot.edit_message_text(
-                    "📢 *إدارة البث الجماعي*\n\nاختر إحدى الوظائف التالية:",
-                    chat_id, message_id,
-                    reply_markup=get_admin_broadcast_menu_markup(),
-                    parse_mode="Markdown"
-                )
-            # معالجة زر إدارة النسخ الاحتياطي
-            elif call.data == "admin_backup_menu":
-                bot.edit_message_text(
-                    "💾 *النسخ الاحتياطي والاسترجاع*\n\nاختر إحدى الوظائف التالية:",
-                    chat_id, message_id,
-                    reply_markup=get_admin_backup_menu_markup(),
-                    parse_mode="Markdown"
-                )
-            # معالجة زر إدارة الإشعارات
-            elif call.data == "admin_notifications":
-                bot.edit_message_text(
-                    "🔔 *إدارة الإشعارات*\n\nاختر إحدى الوظائف التالية:",
-                    chat_id, message_id,
-                    reply_markup=get_admin_notifications_markup(),
-                    parse_mode="Markdown"
-                )
-            # معالجة زر إدارة المستخدمين
-            elif call.data == "admin_users":
-                bot.edit_message_text(
-                    "👥 *إدارة المستخدمين*\n\nاختر إحدى الوظائف التالية:",
-                    chat_id, message_id,
-                    reply_markup=get_admin_users_markup(),
-                    parse_mode="Markdown"
-                )
-            # معالجة زر إدارة القوالب
-            elif call.data == "admin_templates":
-                bot.edit_message_text(
-                    "📂️ *إدارة القوالب*\n\nاختر إحدى الوظائف التالية:",
-                    chat_id, message_id,
-                    reply_markup=get_admin_templates_markup(),
-                    parse_mode="Markdown"
-                )
-            # معالجة زر إعدادات البوت
-            elif call.data == "admin_settings":
-                bot.edit_message_text(
-                    "⚙️ *إعدادات البوت*\n\nاختر إحدى الوظائف التالية:",
-                    chat_id, message_id,
-                    reply_markup=get_admin_settings_markup(),
-                    parse_mode="Markdown"
-                )
-                
-            # معالجة زر القواعد الذكية
-            elif call.data == "admin_smart_rules":
-                # الحصول على عدد القواعد الذكية
-                smart_rules_count = 0
-                active_rules_count = 0
-                try:
-                    with app.app_context():
-                        smart_rules_count = SmartRule.query.count()
-                        active_rules_count = SmartRule.query.filter_by(is_active=True).count()
-                except Exception as e:
-                    logger.error(f"خطأ في الحصول على عدد القواعد الذكية: {e}")
-                
-                bot.edit_message_text(
-                    f"🧠 *القواعد الذكية*\n\n"
-                    f"باستخدام هذه الميزة يمكنك تعليم البوت معالجة الملفات الصوتية بذكاء بناءً على شروط مخصصة.\n\n"
-                    f"• *إجمالي القواعد*: {smart_rules_count}\n"
-                    f"• *القواعد النشطة*: {active_rules_count}\n\n"
-                    f"اختر إحدى الوظائف التالية:",
-                    chat_id, message_id,
-                    reply_markup=get_admin_smart_rules_markup(),
-                    parse_mode="Markdown"
-                )
-                
-            # معالجة زر تجربة القواعد الذكية على نص
-            elif call.data == "admin_test_smart_rules":
-                # إنشاء قائمة بأنواع الحقول المتاحة للاختبار
-                tag_fields = smart_rules.get_available_fields()
-                field_options = []
-                
-                # تحضير أزرار اختيار نوع الحقل
-                markup = types.InlineKeyboardMarkup(row_width=2)
-                for field in tag_fields:
-                    if field['id'] != '*':  # استبعاد خيار "جميع الحقول" للتجربة
-                        markup.add(
-                            types.InlineKeyboardButton(
-                                f"{field['name']} ({field['id']})",
-                                callback_data=f"admin_test_field_{field['id']}"
-                            )
-                        )
-                
-                # إضافة زر العودة
-                markup.add(
-                    types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_smart_rules")
-                )
-                
-                # عرض واجهة اختيار نوع الحقل
-                bot.edit_message_text(
-                    "🧪 *تجربة القواعد الذكية*\n\n"
-                    "اختر نوع الحقل الذي تريد تجربة القواعد عليه:\n\n"
-                    "سيتم تطبيق جميع القواعد الذكية النشطة على النص الذي ستقوم بإدخاله.",
-                    chat_id, message_id,
-                    reply_markup=markup,
-                    parse_mode="Markdown"
-                )
-            # معالجة زر اختيار نوع الحقل للتجربة
-            elif call.data.startswith("admin_test_field_"):
-                field_id = call.data.replace("admin_test_field_", "")
-                
-                # تخزين نوع الحقل المختار في حالة المستخدم
-                from bot import set_user_state
-                set_user_state(user_id, "admin_waiting_test_text", {
-                    'message_id': message_id,
-                    'field_id': field_id
-                })
-                
-                # توجيه المستخدم لإدخال النص
-                field_name = next((field['name'] for field in smart_rules.get_available_fields() if field['id'] == field_id), field_id)
-                
-                bot.edit_message_text(
-                    f"🧪 *تجربة القواعد الذكية - {field_name}*\n\n"
-                    f"قم بإرسال النص الذي تريد تجربة القواعد عليه كحقل *{field_name}*.\n\n"
-                    f"سيتم تطبيق جميع القواعد الذكية النشطة على النص الذي سترسله ومن ثم عرض النتيجة.",
-                    chat_id, message_id,
-                    reply_markup=types.InlineKeyboardMarkup().add(
-                        types.InlineKeyboardButton("🔙 إلغاء", callback_data="admin_test_smart_rules")
-                    ),
-                    parse_mode="Markdown"
-                )
-            
-            # معالجة زر سجل العمليات
-            elif call.data == "admin_logs":
-                bot.edit_message_text(
-                    "📋 *سجل العمليات*\n\nاختر إحدى الوظائف التالية:",
-                    chat_id, message_id,
-                    reply_markup=get_admin_logs_markup(),
-                    parse_mode="Markdown"
-                )
-            # معالجة زر أدوات الصيانة
-            elif call.data == "admin_tools":
-                bot.edit_message_text(
-                    "🛠️ *أدوات الصيانة*\n\nاختر إحدى الوظائف التالية:",
-                    chat_id, message_id,
-                    reply_markup=get_admin_tools_markup(),
-                    parse_mode="Markdown"
-                )
-            # معالجة أزرار التعديل التلقائي للقنوات
-            elif call.data == "admin_toggle_auto_processing":
-                # تبديل حالة تفعيل المعالجة التلقائية
-                current_state = admin_panel.get_setting("features_enabled.auto_processing", False)
-                admin_panel.update_setting("features_enabled.auto_processing", not current_state)
-                new_state = not current_state
-                state_text = "تفعيل" if new_state else "تعطيل"
-                
-                bot.answer_callback_query(call.id, f"تم {state_text} المعالجة التلقائية للقنوات.")
-                
-                # تحديث واجهة التعديل التلقائي
-                bot.edit_message_text(
-                    "🤖 *التعديل التلقائي للقنوات*\n\nاختر إحدى الوظائف التالية:",
-                    chat_id, message_id,
-                    reply_markup=get_admin_auto_processing_markup(),
-                    parse_mode="Markdown"
-                )
-                
-                # تسجيل العملية
-                admin_panel.log_action(
-                    user_id, 
-                    f"auto_processing_{state_text}", 
-                    "success", 
-                    f"تم {state_text} المعالجة التلقائية للقنوات"
-                )
-                
-            elif call.data == "admin_set_source_channel":
-                # إرسال رسالة للمستخدم لطلب إدخال معرف القناة
-                msg = bot.send_message(
-                    chat_id,
-                    "📝 *تعيين قناة المصدر للمعالجة التلقائية*\n\n"
-                    "أرسل معرف القناة بالتنسيق التالي:\n"
-                    "- معرف القناة العامة: مثل `@channel_name`\n"
-                    "- معرف القناة الخاصة: مثل `-1001234567890`\n\n"
-                    "🔄 أو أرسل `الغاء` للإلغاء.",
-                    parse_mode="Markdown"
-                )
-                
-                # تعيين حالة المستخدم للانتظار لإدخال معرف القناة
-                from bot import set_user_state
-                set_user_state(user_id, "admin_waiting_source_channel", {"message_id": msg.message_id})
-                
-            elif call.data == "admin_set_target_channel":
-                # إرسال رسالة للمستخدم لطلب إدخال معرف قناة الهدف
-                msg = bot.send_message(
-                    chat_id,
-                    "📝 *تعيين قناة الهدف للنشر التلقائي*\n\n"
-                    "أرسل معرف القناة بالتنسيق التالي:\n"
-                    "- معرف القناة العامة: مثل `@channel_name`\n"
-                    "- معرف القناة الخاصة: مثل `-1001234567890`\n\n"
-                    "🔄 أو أرسل `الغاء` للإلغاء.",
-                    parse_mode="Markdown"
-                )
-                
-                # تعيين حالة المستخدم للانتظار لإدخال معرف قناة الهدف
-                from bot import set_user_state
-                set_user_state(user_id, "admin_waiting_target_channel", {"message_id": msg.message_id})
-                
-            elif call.data == "admin_toggle_forward_to_target":
-                # تبديل حالة النشر التلقائي للقناة الهدف
-                current_state = admin_panel.get_setting("auto_processing.forward_to_target", False)
-                new_state = not current_state
-                
-                # تحديث الحالة
-                admin_panel.set_forward_to_target(new_state)
-                
-                # إرسال رسالة تأكيد
-                status = "✅ تفعيل" if new_state else "❌ تعطيل"
-                bot.answer_callback_query(
-                    call.id,
-                    f"تم {status} ميزة النشر التلقائي للقناة الهدف",
-                    show_alert=True
-                )
-                
-                # تحديث لوحة الإدارة
-                bot.edit_message_text(
-                    "⚙️ *إدارة التعديل التلقائي للقنوات*\n\n"
-                    "يمكنك تعديل إعدادات المعالجة التلقائية للملفات الصوتية في القنوات من هنا.",
-                    chat_id, message_id,
-                    reply_markup=get_admin_auto_processing_markup(),
-                    parse_mode="Markdown"
-                )
-                
-            elif call.data == "admin_tag_replacements":
-                # عرض صفحة استبدالات الوسوم
-                try:
-                    # استخدام كيبورد بسيط 
-                    markup = types.InlineKeyboardMarkup(row_width=2)
-                    
-                    # إضافة زر تفعيل/تعطيل الاستبدالات
-                    replacements_enabled = admin_panel.get_setting("auto_processing.replacements_enabled", True)
-                    status_text = "✅ مفعل" if replacements_enabled else "❌ معطل"
-                    markup.add(
-                        types.InlineKeyboardButton(f"حالة الاستبدالات: {status_text}", 
-                                                 callback_data="admin_toggle_replacements")
-                    )
-                    
-                    # زر إضافة استبدال جديد
-                    markup.add(types.InlineKeyboardButton("➕ إضافة استبدال جديد", callback_data="admin_add_replacement"))
-                    
-                    # عرض الاستبدالات الحالية
-                    replacements = admin_panel.get_setting("auto_processing.tag_replacements", {})
-                    text = "🏷️ *استبدالات الوسوم للتعديل التلقائي*\n\n"
-                    
-                    if replacements:
-                        text += f"الاستبدالات الحالية ({len(replacements)}):\n\n"
-                        for i, (old_text, new_text) in enumerate(replacements.items()):
-                            # تنظيف النصوص من أحرف السطر الجديد
-                            old_clean = old_text.replace('\n', ' ').strip()
-                            new_clean = new_text.replace('\n', ' ').strip()
-                            
-                            # اقتصار النصوص الطويلة
-                            if len(old_clean) > 20:
-                                old_clean = old_clean[:20] + "..."
-                            if len(new_clean) > 20:
-                                new_clean = new_clean[:20] + "..."
-                                
-                            text += f"{i+1}. `{old_clean}` ➡️ `{new_clean}`\n"
-                        
-                        # إضافة زر حذف استبدال
-                        markup.add(types.InlineKeyboardButton("🗑️ حذف استبدال", callback_data="admin_delete_replacement"))
-                        
-                        # إضافة زر حذف كل الاستبدالات
-                        markup.add(types.InlineKeyboardButton("🗑️ حذف كل الاستبدالات", callback_data="admin_delete_all_replacements"))
-                    else:
-                        text += "لا توجد استبدالات مضافة حتى الآن."
-                    
-                    text += "\n\nهذه النصوص سيتم استبدالها تلقائياً في وسوم الملفات الصوتية التي تنشر في قنوات المصدر."
-                    
-                    # حالة التفعيل
-                    if not replacements_enabled:
-                        text += "\n\n⚠️ *ملاحظة: الاستبدالات معطلة حالياً. اضغط على زر التفعيل لتشغيلها.*"
-                    
-                    # إضافة زر الرجوع
-                    markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_auto_processing"))
-                    
-                    bot.edit_message_text(
-                        text,
-                        chat_id, message_id,
-                        reply_markup=markup,
-                        parse_mode="Markdown"
-                    )
-                except Exception as e:
-                    logger.error(f"خطأ في عرض صفحة استبدالات الوسوم: {e}")
-                    bot.edit_message_text(
-                        "❌ حدث خطأ أثناء عرض استبدالات الوسوم.",
-                        chat_id, message_id,
-                        reply_markup=types.InlineKeyboardMarkup().add(
-                            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_auto_processing")
-                        )
-                    )
-                
-            elif call.data == "admin_smart_templates":
-                # عرض صفحة القوالب الذكية
-                try:
-                    markup = types.InlineKeyboardMarkup(row_width=2)
-                    
-                    # إضافة زر تفعيل/تعطيل القوالب الذكية
-                    templates_enabled = admin_panel.get_setting("auto_processing.smart_templates_enabled", True)
-                    status_text = "✅ مفعل" if templates_enabled else "❌ معطل"
-                    markup.add(
-                        types.InlineKeyboardButton(f"حالة القوالب الذكية: {status_text}", 
-                                                 callback_data="admin_toggle_smart_templates")
-                    )
-                    
-                    # زر إضافة قالب ذكي جديد
-                    markup.add(types.InlineKeyboardButton("➕ إضافة قالب ذكي", callback_data="admin_add_smart_template"))
-                    
-                    # عرض القوالب الذكية الحالية
-                    smart_templates = admin_panel.get_setting("auto_processing.smart_templates", {})
-                    text = "🎯 *القوالب الذكية للتعديل التلقائي*\n\n"
-                    
-                    if smart_templates:
-                        text += f"القوالب الذكية الحالية ({len(smart_templates)}):\n\n"
-                        for i, (artist, template_id) in enumerate(smart_templates.items()):
-                            # اقتصار النصوص الطويلة
-                            artist_name = artist
-                            if len(artist_name) > 25:
-                                artist_name = artist_name[:25] + "..."
-                                
-                            text += f"{i+1}. الفنان: `{artist_name}` \n   القالب: `{template_id}`\n\n"
-                        
-                        # إضافة زر حذف قالب ذكي
-                        markup.add(types.InlineKeyboardButton("🗑️ حذف قالب ذكي", callback_data="admin_delete_smart_template"))
-                        
-                        # إضافة زر حذف كل القوالب الذكية
-                        markup.add(types.InlineKeyboardButton("🗑️ حذف كل القوالب الذكية", callback_data="admin_delete_all_smart_templates"))
-                    else:
-                        text += "لا توجد قوالب ذكية مضافة حتى الآن."
-                    
-                    text += "\n\nسيتم تطبيق هذه القوالب تلقائياً على الملفات الصوتية حسب اسم الفنان."
-                    
-                    # حالة التفعيل
-                    if not templates_enabled:
-                        text += "\n\n⚠️ *ملاحظة: القوالب الذكية معطلة حالياً. اضغط على زر التفعيل لتشغيلها.*"
-                    
-                    # إضافة زر الرجوع
-                    markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_auto_processing"))
-                    
-                    bot.edit_message_text(
-                        text,
-                        chat_id, message_id,
-                        reply_markup=markup,
-                        parse_mode="Markdown"
-                    )
-                except Exception as e:
-                    logger.error(f"خطأ في عرض صفحة القوالب الذكية: {e}")
-                    bot.edit_message_text(
-                        "❌ حدث خطأ أثناء عرض القوالب الذكية.",
-                        chat_id, message_id,
-                        reply_markup=types.InlineKeyboardMarkup().add(
-                            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_auto_processing")
-                        )
-                    )
-                
-            elif call.data == "admin_auto_proc_settings":
-                # عرض صفحة الإعدادات المتقدمة للتعديل التلقائي
-                bot.edit_message_text(
-                    "⚙️ *إعدادات التعديل التلقائي المتقدمة*\n\n"
-                    "اضبط خيارات التعديل التلقائي للقنوات.",
-                    chat_id, message_id,
-                    reply_markup=get_admin_auto_proc_settings_markup(),
-                    parse_mode="Markdown"
-                )
-                
-            # معالجة زر العلامة المائية للصور
-            elif call.data == "admin_image_watermark":
-                # عرض صفحة العلامة المائية للصور
-                bot.edit_message_text(
-                    "🖼️ *العلامة المائية للصور*\n\n"
-                    "يمكنك إضافة علامة مائية على الصور تلقائياً (صورة الألبوم).\n\n"
-                    "اختر إحدى الوظائف التالية:",
-                    chat_id, message_id,
-                    reply_markup=get_admin_image_watermark_markup(),
-                    parse_mode="Markdown"
-                )
-            
-            # معالجة تفعيل/تعطيل العلامة المائية
-            elif call.data == "admin_toggle_image_watermark":
-                watermark_enabled = admin_panel.get_setting("image_watermark.enabled", False)
-                if admin_panel.enable_image_watermark(not watermark_enabled):
-                    bot.answer_callback_query(call.id, f"تم {'تعطيل' if watermark_enabled else 'تفعيل'} العلامة المائية للصور بنجاح")
-                    
-                    # إعادة تحميل صفحة العلامة المائية
-                    handle_admin_callback(bot, types.CallbackQuery(
-                        id=call.id, from_user=call.from_user, message=call.message, 
-                        data="admin_image_watermark", chat_instance=call.chat_instance
-                    ))
-                else:
-                    bot.answer_callback_query(call.id, "حدث خطأ أثناء تغيير حالة العلامة المائية")
-            
-            # معالجة تغيير موضع العلامة المائية
-            elif call.data == "admin_change_watermark_position":
-                current_position = admin_panel.get_setting("image_watermark.position", "bottom-right")
-                
-                # إنشاء قائمة المواضع
-                positions = [
-                    ("top-left", "أعلى اليسار"),
-                    ("top-right", "أعلى اليمين"),
-                    ("bottom-left", "أسفل اليسار"),
-                    ("bottom-right", "أسفل اليمين"),
-                    ("center", "الوسط")
-                ]
-                
-                markup = types.InlineKeyboardMarkup(row_width=2)
-                for pos_id, pos_name in positions:
-                    selected = "✅ " if pos_id == current_position else ""
-                    markup.add(types.InlineKeyboardButton(f"{selected}{pos_name}", callback_data=f"admin_set_watermark_position_{pos_id}"))
-                
-                markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_image_watermark"))
-                
-                bot.edit_message_text(
-                    "📍 *اختر موضع العلامة المائية*\n\n"
-                    "حدد مكان ظهور العلامة المائية على الصور:",
-                    chat_id, message_id,
-                    reply_markup=markup,
-                    parse_mode="Markdown"
-                )
-            
-            # معالجة تحديد موضع العلامة المائية
-            elif call.data.startswith("admin_set_watermark_position_"):
-                position = call.data.replace("admin_set_watermark_position_", "")
-                
-                if admin_panel.set_image_watermark_position(position):
-                    bot.answer_callback_query(call.id, f"تم تغيير موضع العلامة المائية بنجاح")
-                    
-                    # إعادة تحميل صفحة العلامة المائية
-                    handle_admin_callback(bot, types.CallbackQuery(
-                        id=call.id, from_user=call.from_user, message=call.message, 
-                        data="admin_image_watermark", chat_instance=call.chat_instance
-                    ))
-                else:
-                    bot.answer_callback_query(call.id, "حدث خطأ أثناء تغيير موضع العلامة المائية")
-            
-            # معالجة تعيين حجم العلامة المائية
-            elif call.data == "admin_change_watermark_size":
-                # حفظ حالة المستخدم وإرسال رسالة طلب حجم العلامة المائية
-                from bot import set_user_state
-                set_user_state(call.from_user.id, "admin_waiting_for_watermark_size")
-                bot.send_message(
-                    chat_id,
-                    "📏 *تعديل حجم العلامة المائية*\n\n"
-                    "يرجى إدخال نسبة حجم العلامة المائية (1-100%):",
-                    parse_mode="Markdown",
-                    reply_markup=types.InlineKeyboardMarkup().add(
-                        types.InlineKeyboardButton("🔙 إلغاء", callback_data="admin_image_watermark")
-                    )
-                )
-            
-            # معالجة تعيين شفافية العلامة المائية
-            elif call.data == "admin_change_watermark_opacity":
-                # حفظ حالة المستخدم وإرسال رسالة طلب شفافية العلامة المائية
-                from bot import set_user_state
-                set_user_state(call.from_user.id, "admin_waiting_for_watermark_opacity")
-                bot.send_message(
-                    chat_id,
-                    "🔍 *تعديل شفافية العلامة المائية*\n\n"
-                    "يرجى إدخال نسبة شفافية العلامة المائية (1-100%):",
-                    parse_mode="Markdown",
-                    reply_markup=types.InlineKeyboardMarkup().add(
-                        types.InlineKeyboardButton("🔙 إلغاء", callback_data="admin_image_watermark")
-                    )
-                )
-            
-            # معالجة تعيين التباعد من الحافة
-            elif call.data == "admin_change_watermark_padding":
-                # حفظ حالة المستخدم وإرسال رسالة طلب التباعد
-                from bot import set_user_state
-                set_user_state(call.from_user.id, "admin_waiting_for_watermark_padding")
-                bot.send_message(
-                    chat_id,
-                    "↔️ *تعديل التباعد من الحافة*\n\n"
-                    "يرجى إدخال قيمة التباعد من الحافة بالبكسل (1-100):",
-                    parse_mode="Markdown",
-                    reply_markup=types.InlineKeyboardMarkup().add(
-                        types.InlineKeyboardButton("🔙 إلغاء", callback_data="admin_image_watermark")
-                    )
-                )
-            
-            # معالجة تعيين صورة العلامة المائية
-            elif call.data == "admin_set_image_watermark":
-                # حفظ حالة المستخدم وإرسال رسالة طلب صورة العلامة المائية
-                from bot import set_user_state
-                set_user_state(call.from_user.id, "admin_waiting_for_watermark_image")
-                bot.send_message(
-                    chat_id,
-                    "🖼️ *تعيين صورة العلامة المائية*\n\n"
-                    "يرجى إرسال صورة PNG شفافة لاستخدامها كعلامة مائية.\n"
-                    "ملاحظة: يفضل أن تكون الصورة شفافة للحصول على أفضل نتيجة.",
-                    parse_mode="Markdown",
-                    reply_markup=types.InlineKeyboardMarkup().add(
-                        types.InlineKeyboardButton("🔙 إلغاء", callback_data="admin_image_watermark")
-                    )
-                )
-                
-            elif call.data == "admin_enabled_tags":
-                # عرض صفحة إدارة الوسوم المفعلة للاستبدال
-                bot.edit_message_text(
-                    "🏷️ *إدارة الوسوم المفعلة للاستبدال*\n\n"
-                    "هذه الوسوم هي التي سيتم تعديلها تلقائياً عند المعالجة.",
-                    chat_id, message_id,
-                    reply_markup=get_admin_enabled_tags_markup(),
-                    parse_mode="Markdown"
-                )
-                
-            elif call.data == "admin_toggle_keep_caption":
-                # تبديل خيار الحفاظ على الكابشن الأصلي
-                current_state = admin_panel.get_setting("auto_processing.keep_caption", True)
-                admin_panel.update_setting("auto_processing.keep_caption", not current_state)
-                
-                new_state = not current_state
-                state_text = "تفعيل" if new_state else "تعطيل"
-                bot.answer_callback_query(call.id, f"تم {state_text} الحفاظ على الكابشن الأصلي.")
-                
-                # تحديث واجهة الإعدادات المتقدمة
-                bot.edit_message_text(
-                    "⚙️ *إعدادات التعديل التلقائي المتقدمة*\n\n"
-                    "اضبط خيارات التعديل التلقائي للقنوات.",
-                    chat_id, message_id,
-                    reply_markup=get_admin_auto_proc_settings_markup(),
-                    parse_mode="Markdown"
-                )
-                
-            elif call.data == "admin_toggle_auto_publish":
-                # تبديل خيار النشر التلقائي
-                current_state = admin_panel.get_setting("auto_processing.auto_publish", True)
-                admin_panel.update_setting("auto_processing.auto_publish", not current_state)
-                
-                new_state = not current_state
-                state_text = "تفعيل" if new_state else "تعطيل"
-                bot.answer_callback_query(call.id, f"تم {state_text} النشر التلقائي بعد التعديل.")
-                
-                # تحديث واجهة الإعدادات المتقدمة
-                bot.edit_message_text(
-                    "⚙️ *إعدادات التعديل التلقائي المتقدمة*\n\n"
-                    "اضبط خيارات التعديل التلقائي للقنوات.",
-                    chat_id, message_id,
-                    reply_markup=get_admin_auto_proc_settings_markup(),
-                    parse_mode="Markdown"
-                )
-                
-            elif call.data == "admin_toggle_remove_links":
-                # تبديل خيار حذف الروابط تلقائياً
-                current_state = admin_panel.get_setting("auto_processing.remove_links", False)
-                admin_panel.update_setting("auto_processing.remove_links", not current_state)
-                
-                new_state = not current_state
-                state_text = "تفعيل" if new_state else "تعطيل"
-                bot.answer_callback_query(call.id, f"تم {state_text} حذف الروابط من الوسوم تلقائياً.")
-                
-                # تحديث واجهة الإعدادات المتقدمة
-                bot.edit_message_text(
-                    "⚙️ *إعدادات التعديل التلقائي المتقدمة*\n\n"
-                    "اضبط خيارات التعديل التلقائي للقنوات.",
-                    chat_id, message_id,
-                    reply_markup=get_admin_auto_proc_settings_markup(),
-                    parse_mode="Markdown"
-                )
-                
-            elif call.data == "admin_toggle_replacements":
-                # تبديل حالة تفعيل الاستبدالات
-                current_state = admin_panel.get_setting("auto_processing.replacements_enabled", True)
-                admin_panel.update_setting("auto_processing.replacements_enabled", not current_state)
-                
-                new_state = not current_state
-                state_text = "تفعيل" if new_state else "تعطيل"
-                bot.answer_callback_query(call.id, f"تم {state_text} استبدالات الوسوم.")
-                
-                # تحديث واجهة استبدالات الوسوم
-                # إعادة تحميل الواجهة (من خلال استدعاء admin_tag_replacements)
-                call.data = "admin_tag_replacements"
-                return handle_admin_callback(bot, call)
-                
-            elif call.data == "admin_toggle_smart_templates":
-                # تبديل حالة تفعيل القوالب الذكية
-                current_state = admin_panel.get_setting("auto_processing.smart_templates_enabled", True)
-                admin_panel.update_setting("auto_processing.smart_templates_enabled", not current_state)
-                
-                new_state = not current_state
-                state_text = "تفعيل" if new_state else "تعطيل"
-                bot.answer_callback_query(call.id, f"تم {state_text} القوالب الذكية.")
-                
-                # تحديث واجهة القوالب الذكية
-                # إعادة تحميل الواجهة (من خلال استدعاء admin_smart_templates)
-                call.data = "admin_smart_templates"
-                return handle_admin_callback(bot, call)
-                
-            elif call.data == "admin_delete_replacement":
-                # حذف استبدال
-                msg = bot.send_message(
-                    chat_id,
-                    "🗑️ *حذف استبدال*\n\n"
-                    "أرسل رقم الاستبدال الذي تريد حذفه من القائمة.\n\n"
-                    "🔄 أو أرسل `الغاء` للإلغاء.",
-                    parse_mode="Markdown"
-                )
-                
-                # تعيين حالة المستخدم لانتظار رقم الاستبدال
-                from bot import set_user_state
-                set_user_state(user_id, "admin_waiting_replacement_number", {"message_id": msg.message_id})
-                
-            elif call.data == "admin_delete_all_replacements":
-                # حذف كل الاستبدالات
-                markup = types.InlineKeyboardMarkup(row_width=2)
-                markup.add(
-                    types.InlineKeyboardButton("✅ نعم، حذف الكل", callback_data="admin_confirm_delete_all_replacements"),
-                    types.InlineKeyboardButton("❌ إلغاء", callback_data="admin_tag_replacements")
-                )
-                
-                bot.edit_message_text(
-                    "⚠️ *تأكيد حذف كل الاستبدالات*\n\n"
-                    "هل أنت متأكد من أنك تريد حذف جميع استبدالات الوسوم؟\n"
-                    "هذا الإجراء لا يمكن التراجع عنه.",
-                    chat_id, message_id,
-                    reply_markup=markup,
-                    parse_mode="Markdown"
-                )
-                
-            elif call.data == "admin_confirm_delete_all_replacements":
-                # تأكيد حذف كل الاستبدالات
-                admin_panel.update_setting("auto_processing.tag_replacements", {})
-                bot.answer_callback_query(call.id, "تم حذف جميع استبدالات الوسوم بنجاح.")
-                
-                # العودة إلى صفحة الاستبدالات
-                call.data = "admin_tag_replacements"
-                return handle_admin_callback(bot, call)
-                
-            elif call.data == "admin_delete_smart_template":
-                # حذف قالب ذكي
-                msg = bot.send_message(
-                    chat_id,
-                    "🗑️ *حذف قالب ذكي*\n\n"
-                    "أرسل رقم القالب الذي تريد حذفه من القائمة.\n\n"
-                    "🔄 أو أرسل `الغاء` للإلغاء.",
-                    parse_mode="Markdown"
-                )
-                
-                # تعيين حالة المستخدم لانتظار رقم القالب
-                from bot import set_user_state
-                set_user_state(user_id, "admin_waiting_template_number", {"message_id": msg.message_id})
-                
-            elif call.data == "admin_delete_all_smart_templates":
-                # حذف كل القوالب الذكية
-                markup = types.InlineKeyboardMarkup(row_width=2)
-                markup.add(
-                    types.InlineKeyboardButton("✅ نعم، حذف الكل", callback_data="admin_confirm_delete_all_smart_templates"),
-                    types.InlineKeyboardButton("❌ إلغاء", callback_data="admin_smart_templates")
-                )
-                
-                bot.edit_message_text(
-                    "⚠️ *تأكيد حذف كل القوالب الذكية*\n\n"
-                    "هل أنت متأكد من أنك تريد حذف جميع القوالب الذكية؟\n"
-                    "هذا الإجراء لا يمكن التراجع عنه.",
-                    chat_id, message_id,
-                    reply_markup=markup,
-                    parse_mode="Markdown"
-                )
-                
-            elif call.data == "admin_confirm_delete_all_smart_templates":
-                # تأكيد حذف كل القوالب الذكية
-                admin_panel.update_setting("auto_processing.smart_templates", {})
-                bot.answer_callback_query(call.id, "تم حذف جميع القوالب الذكية بنجاح.")
-                
-                # العودة إلى صفحة القوالب الذكية
-                call.data = "admin_smart_templates"
-                return handle_admin_callback(bot, call)
-                
-            elif call.data == "admin_enabled_tags":
-                # عرض صفحة الوسوم المفعلة للاستبدال
-                try:
-                    markup = get_admin_enabled_tags_markup()
-                    bot.edit_message_text(
-                        "🏷️ *إدارة الوسوم المفعلة للاستبدال*\n\n"
-                        "حدد الوسوم التي تريد تفعيلها أو تعطيلها لعمليات الاستبدال التلقائي.\n"
-                        "الوسوم المفعلة (✅) ستتم معالجتها واستبدال النصوص فيها، بينما الوسوم المعطلة (❌) لن يتم تغييرها.",
-                        chat_id, message_id,
-                        reply_markup=markup,
-                        parse_mode="Markdown"
-                    )
-                except Exception as e:
-                    logger.error(f"خطأ في عرض صفحة الوسوم المفعلة: {e}")
-                    bot.edit_message_text(
-                        "❌ حدث خطأ أثناء عرض صفحة الوسوم المفعلة.",
-                        chat_id, message_id,
-                        reply_markup=types.InlineKeyboardMarkup().add(
-                            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_auto_proc_settings")
-                        )
-                    )
-                    
-            elif call.data.startswith("admin_toggle_tag_"):
-                # تبديل حالة تفعيل/تعطيل وسم معين
-                tag_name = call.data.replace("admin_toggle_tag_", "")
-                
-                # الحصول على الوسوم المفعلة الحالية
-                enabled_tags = admin_panel.get_setting("auto_processing.enabled_tags", {
-                    'artist': True,
-                    'album_artist': True,
-                    'album': True,
-                    'genre': True,
-                    'year': True,
-                    'composer': True,
-                    'comment': True,
-                    'title': True,
-                    'lyrics': True
-                })
-                
-                # تبديل حالة الوسم
-                current_state = enabled_tags.get(tag_name, True)
-                enabled_tags[tag_name] = not current_state
-                
-                # حفظ التغييرات
-                admin_panel.update_setting("auto_processing.enabled_tags", enabled_tags)
-                
-                # عرض رسالة تأكيد
-                new_state = "تفعيل" if enabled_tags[tag_name] else "تعطيل"
-                arabic_tags = {
-                    'artist': 'الفنان',
-                    'album_artist': 'فنان الألبوم',
-                    'album': 'الألبوم',
-                    'genre': 'النوع',
-                    'year': 'السنة',
-                    'composer': 'الملحن',
-                    'comment': 'تعليق',
-                    'title': 'العنوان',
-                    'lyrics': 'كلمات الأغنية'
-                }
-                arabic_name = arabic_tags.get(tag_name, tag_name)
-                bot.answer_callback_query(call.id, f"تم {new_state} وسم {arabic_name} بنجاح.")
-                
-                # تحديث واجهة الوسوم المفعلة
-                markup = get_admin_enabled_tags_markup()
-                bot.edit_message_text(
-                    "🏷️ *إدارة الوسوم المفعلة للاستبدال*\n\n"
-                    "حدد الوسوم التي تريد تفعيلها أو تعطيلها لعمليات الاستبدال التلقائي.\n"
-                    "الوسوم المفعلة (✅) ستتم معالجتها واستبدال النصوص فيها، بينما الوسوم المعطلة (❌) لن يتم تغييرها.",
-                    chat_id, message_id,
-                    reply_markup=markup,
-                    parse_mode="Markdown"
-                )
-                
-            elif call.data == "admin_add_tag_replacement":
-                # إرسال رسالة للمستخدم لطلب إدخال النص الأصلي
-                msg = bot.send_message(
-                    chat_id,
-                    "📝 *إضافة استبدال نصي للوسوم*\n\n"
-                    "أرسل النص الأصلي المراد استبداله.\n\n"
-                    "🔄 أو أرسل `الغاء` للإلغاء.",
-                    parse_mode="Markdown"
-                )
-                
-                # تعيين حالة المستخدم للانتظار لإدخال النص الأصلي
-                from bot import set_user_state
-                set_user_state(user_id, "admin_waiting_old_text", {"message_id": msg.message_id})
-                
-            elif call.data == "admin_add_smart_template":
-                # إرسال رسالة للمستخدم لطلب إدخال اسم الفنان
-                msg = bot.send_message(
-                    chat_id,
-                    "📝 *إضافة قالب ذكي جديد*\n\n"
-                    "أرسل اسم الفنان:\n\n"
-                    "🔄 أو أرسل `الغاء` للإلغاء.",
-                    parse_mode="Markdown"
-                )
-                
-                # تعيين حالة المستخدم للانتظار لإدخال اسم الفنان
-                from bot import set_user_state
-                set_user_state(user_id, "admin_waiting_artist_name", {"message_id": msg.message_id})
-                
-            # معالجة أزرار الإعدادات
-            elif call.data == "admin_welcome_msg":
-                # تعيين رسالة الترحيب
-                msg = bot.edit_message_text(
-                    "📝 *تعديل رسالة الترحيب*\n\n"
-                    "الرسالة الحالية:\n"
-                    f"{admin_panel.get_setting('settings.welcome_message', 'غير محددة')}\n\n"
-                    "أرسل الرسالة الجديدة:",
-                    chat_id, message_id,
-                    parse_mode="Markdown"
-                )
-                from bot import set_user_state
-                set_user_state(user_id, "admin_waiting_for_welcome_msg", {"message_id": msg.message_id})
-                
-            elif call.data == "admin_file_size":
-                # تعيين الحد الأقصى لحجم الملف
-                current_size = admin_panel.get_setting("settings.max_file_size_mb", 50)
-                msg = bot.edit_message_text(
-                    "📊 *تعديل الحد الأقصى لحجم الملف*\n\n"
-                    f"الحد الحالي: {current_size} ميجابايت\n\n"
-                    "أرسل القيمة الجديدة بالميجابايت:",
-                    chat_id, message_id,
-                    parse_mode="Markdown"
-                )
-                from bot import set_user_state
-                set_user_state(user_id, "admin_waiting_for_file_size", {"message_id": msg.message_id})
-                
-            elif call.data == "admin_processing_delay":
-                # تعيين وقت التأخير بين معالجة الملفات
-                current_delay = admin_panel.get_setting("settings.processing_delay", 0)
-                msg = bot.edit_message_text(
-                    "⏱️ *تعديل وقت التأخير بين المعالجة*\n\n"
-                    f"الوقت الحالي: {current_delay} ثانية\n\n"
-                    "أرسل القيمة الجديدة بالثواني:",
-                    chat_id, message_id,
-                    parse_mode="Markdown"
-                )
-                from bot import set_user_state
-                set_user_state(user_id, "admin_waiting_for_delay", {"message_id": msg.message_id})
-                
-            elif call.data == "admin_daily_limit":
-                # تعيين الحد اليومي للمستخدم
-                current_limit = admin_panel.get_setting("settings.daily_user_limit_mb", 0)
-                limit_str = f"{current_limit} ميجابايت" if current_limit > 0 else "غير محدود"
-                msg = bot.edit_message_text(
-                    "📈 *تعديل الحد اليومي للمستخدم*\n\n"
-                    f"الحد الحالي: {limit_str}\n\n"
-                    "أرسل القيمة الجديدة بالميجابايت (0 = غير محدود):",
-                    chat_id, message_id,
-                    parse_mode="Markdown"
-                )
-                from bot import set_user_state
-                set_user_state(user_id, "admin_waiting_for_limit", {"message_id": msg.message_id})
-                
-            elif call.data == "admin_required_channels":
-                # إدارة قنوات الاشتراك الإجباري
-                channels = admin_panel.get_setting("settings.required_channels", [])
-                channels_str = ""
-                for idx, channel in enumerate(channels):
-                    channels_str += f"{idx+1}. {channel['title']} ({channel['channel_id']})\n"
-                
-                if not channels_str:
-                    channels_str = "لا توجد قنوات مضافة حاليًا."
-                
-                markup = types.InlineKeyboardMarkup(row_width=1)
-                markup.add(
-                    types.InlineKeyboardButton("➕ إضافة قناة", callback_data="admin_add_channel"),
-                    types.InlineKeyboardButton("❌ إزالة قناة", callback_data="admin_remove_channel"),
-                    types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_settings")
-                )
-                
-                bot.edit_message_text(
-                    "📢 *إدارة قنوات الاشتراك الإجباري*\n\n"
-                    "القنوات الحالية:\n"
-                    f"{channels_str}",
-                    chat_id, message_id,
-                    reply_markup=markup,
-                    parse_mode="Markdown"
-                )
-                
-            elif call.data == "admin_add_channel":
-                # إضافة قناة اشتراك جديدة
-                msg = bot.edit_message_text(
-                    "📢 *إضافة قناة اشتراك إجباري*\n\n"
-                    "أرسل معرف القناة بالتنسيق التالي:\n"
-                    "- معرف القناة العامة: مثل @channel_name\n"
-                    "- معرف القناة الخاصة: مثل -1001234567890\n\n"
-                    "🔄 أو أرسل الغاء للإلغاء.",
-                    chat_id, message_id,
-                    parse_mode="Markdown"
-                )
-                from bot import set_user_state
-                set_user_state(user_id, "admin_waiting_for_channel_id", {"message_id": msg.message_id})
-                
-            elif call.data == "admin_remove_channel":
-                # إزالة قناة اشتراك
-                channels = admin_panel.get_setting("settings.required_channels", [])
-                if not channels:
-                    markup = types.InlineKeyboardMarkup()
-                    markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_required_channels"))
-                    bot.edit_message_text(
-                        "📢 *إزالة قناة اشتراك إجباري*\n\n"
-                        "لا توجد قنوات مضافة حاليًا.",
-                        chat_id, message_id,
-                        reply_markup=markup,
-                        parse_mode="Markdown"
-                    )
-                else:
-                    markup = types.InlineKeyboardMarkup(row_width=1)
-                    for idx, channel in enumerate(channels):
-                        markup.add(types.InlineKeyboardButton(
-                            f"{channel['title']} ({channel['channel_id']})", 
-                            callback_data=f"admin_del_channel_{idx}"
-                        ))
-                    markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_required_channels"))
-                    
-                    bot.edit_message_text(
-                        "📢 *إزالة قناة اشتراك إجباري*\n\n"
-                        "اختر القناة التي تريد إزالتها:",
-                        chat_id, message_id,
-                        reply_markup=markup,
-                        parse_mode="Markdown"
-                    )
-                    
-            elif call.data.startswith("admin_del_channel_"):
-                # حذف قناة محددة
-                idx = int(call.data.split("_")[-1])
-                channels = admin_panel.get_setting("settings.required_channels", [])
-                if 0 <= idx < len(channels):
-                    channel = channels[idx]
-                    channels.pop(idx)
-                    admin_panel.update_setting("settings.required_channels", channels)
-                    markup = types.InlineKeyboardMarkup()
-                    markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_required_channels"))
-                    bot.edit_message_text(
-                        f"✅ تم حذف القناة {channel['title']} بنجاح!",
-                        chat_id, message_id,
-                        reply_markup=markup
-                    )
-                    
-            elif call.data == "admin_log_channel":
-                # تعيين قناة السجل
-                current_channel = admin_panel.get_setting("settings.log_channel", "")
-                msg = bot.edit_message_text(
-                    "📋 *تعيين قناة السجل*\n\n"
-                    f"القناة الحالية: {current_channel or 'غير محددة'}\n\n"
-                    "أرسل معرف القناة بالتنسيق التالي:\n"
-                    "- معرف القناة العامة: مثل @channel_name\n"
-                    "- معرف القناة الخاصة: مثل -1001234567890\n\n"
-                    "أو أرسل `حذف` لإزالة قناة السجل الحالية.\n"
-                    "🔄 أو أرسل الغاء للإلغاء.",
-                    chat_id, message_id,
-                    parse_mode="Markdown"
-                )
-                from bot import set_user_state
-                set_user_state(user_id, "admin_waiting_for_log_channel", {"message_id": msg.message_id})
-                
-            elif call.data == "admin_advanced_settings":
-                # الإعدادات المتقدمة
-                markup = get_admin_advanced_settings_markup()
-                bot.edit_message_text(
-                    "⚙️ *الإعدادات المتقدمة*\n\n"
-                    "اختر الإعداد الذي تريد تعديله:",
-                    chat_id, message_id,
-                    reply_markup=markup,
-                    parse_mode="Markdown"
-                )
-                
-            elif call.data == "admin_toggle_templates":
-                # تفعيل/تعطيل ميزة القوالب
-                current = admin_panel.get_setting("settings.features_enabled.templates", True)
-                admin_panel.update_setting("settings.features_enabled.templates", not current)
-                markup = get_admin_advanced_settings_markup()
-                status = "✅ مفعلة" if not current else "❌ معطلة"
-                bot.edit_message_text(
-                    f"✅ تم تغيير حالة ميزة القوالب إلى: {status}",
-                    chat_id, message_id,
-                    reply_markup=markup
-                )
-                
-            elif call.data == "admin_toggle_lyrics":
-                # تفعيل/تعطيل ميزة كلمات الأغنية
-                current = admin_panel.get_setting("settings.features_enabled.lyrics", True)
-                admin_panel.update_setting("settings.features_enabled.lyrics", not current)
-                markup = get_admin_advanced_settings_markup()
-                status = "✅ مفعلة" if not current else "❌ معطلة"
-                bot.edit_message_text(
-                    f"✅ تم تغيير حالة ميزة كلمات الأغنية إلى: {status}",
-                    chat_id, message_id,
-                    reply_markup=markup
-                )
-                
-            elif call.data == "admin_toggle_album_art":
-                # تفعيل/تعطيل ميزة صورة الغلاف
-                current = admin_panel.get_setting("settings.features_enabled.album_art", True)
-                admin_panel.update_setting("settings.features_enabled.album_art", not current)
-                markup = get_admin_advanced_settings_markup()
-                status = "✅ مفعلة" if not current else "❌ معطلة"
-                bot.edit_message_text(
-                    f"✅ تم تغيير حالة ميزة صورة الغلاف إلى: {status}",
-                    chat_id, message_id,
-                    reply_markup=markup
-                )
-                
-            elif call.data == "admin_toggle_required_subscription":
-                # تفعيل/تعطيل الاشتراك الإجباري
-                current = admin_panel.get_setting("settings.features_enabled.required_subscription", False)
-                admin_panel.update_setting("settings.features_enabled.required_subscription", not current)
-                markup = get_admin_advanced_settings_markup()
-                status = "✅ مفعل" if not current else "❌ معطل"
-                bot.edit_message_text(
-                    f"✅ تم تغيير حالة الاشتراك الإجباري إلى: {status}",
-                    chat_id, message_id,
-                    reply_markup=markup
-                )
-                
-            # معالجة أزرار صفحة الإحصائيات
-            elif call.data == "admin_detailed_stats":
-                # عرض إحصائيات مفصلة
-                stats = admin_panel.get_setting("statistics", {})
-                system_info = admin_panel.get_system_info()
-                
-                stats_text = "📊 *إحصائيات مفصلة للبوت*\n\n"
-                stats_text += "*◉ إحصائيات المستخدمين:*\n"
-                stats_text += f"• إجمالي المستخدمين: {len(admin_panel.get_setting('users', {}))}\n"
-                stats_text += f"• المستخدمين النشطين (7 أيام): {len(admin_panel.get_active_users(7))}\n"
-                stats_text += f"• المستخدمين المحظورين: {len(admin_panel.get_setting('blocked_users', []))}\n"
-                stats_text += f"• المشرفين: {len(admin_panel.get_setting('admins', []))}\n\n"
-                
-                stats_text += "*◉ إحصائيات الملفات:*\n"
-                stats_text += f"• إجمالي الملفات المعالجة: {stats.get('files_processed', 0)}\n"
-                stats_text += f"• حجم الملفات المعالجة: {stats.get('processed_size_mb', 0):.2f} ميجابايت\n"
-                stats_text += f"• متوسط حجم الملف: {stats.get('processed_size_mb', 0) / max(stats.get('files_processed', 1), 1):.2f} ميجابايت\n\n"
-                
-                stats_text += "*◉ إحصائيات الوسوم:*\n"
-                stats_text += f"• تعديلات العنوان: {stats.get('tag_edits_title', 0)}\n"
-                stats_text += f"• تعديلات الفنان: {stats.get('tag_edits_artist', 0)}\n"
-                stats_text += f"• تعديلات الألبوم: {stats.get('tag_edits_album', 0)}\n"
-                stats_text += f"• تعديلات كلمات الأغنية: {stats.get('tag_edits_lyrics', 0)}\n"
-                stats_text += f"• تعديلات صورة الغلاف: {stats.get('tag_edits_albumart', 0)}\n\n"
-                
-                stats_text += "*◉ إحصائيات القوالب:*\n"
-                stats_text += f"• عدد القوالب: {stats.get('templates_count', 0)}\n"
-                stats_text += f"• مرات تطبيق القوالب: {stats.get('templates_applied', 0)}\n\n"
-                
-                stats_text += "*◉ إحصائيات النظام:*\n"
-                stats_text += f"• استخدام المعالج: {system_info.get('cpu_percent', 0)}%\n"
-                stats_text += f"• استخدام الذاكرة: {system_info.get('memory_percent', 0)}%\n"
-                stats_text += f"• مساحة القرص المتاحة: {system_info.get('disk_free_gb', 0):.2f} جيجابايت\n"
-                stats_text += f"• وقت تشغيل البوت: {format_duration(system_info.get('uptime_seconds', 0))}\n"
-                
-                markup = get_admin_stats_markup()
-                bot.edit_message_text(
-                    stats_text,
-                    chat_id, message_id,
-                    reply_markup=markup,
-                    parse_mode="Markdown"
-                )
-                
-            # معالجة أزرار صفحة إدارة المستخدمين
-            elif call.data == "admin_active_users":
-                # عرض المستخدمين النشطين
-                active_users = admin_panel.get_active_users(7)
-                users_text = get_user_list_message(active_users, "المستخدمين النشطين في آخر 7 أيام")
-                
-                markup = types.InlineKeyboardMarkup()
-                markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_users"))
-                
-                bot.edit_message_text(
-                    users_text, 
-                    chat_id, message_id,
-                    reply_markup=markup, 
-                    parse_mode="Markdown"
-                )
-                
-            elif call.data == "admin_top_users":
-                # عرض أكثر المستخدمين نشاطًا
-                top_users = admin_panel.get_top_users(10)
-                users_text = get_user_list_message(top_users, "أكثر المستخدمين نشاطًا")
-                
-                markup = types.InlineKeyboardMarkup()
-                markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_users"))
-                
-                bot.edit_message_text(
-                    users_text, 
-                    chat_id, message_id,
-                    reply_markup=markup, 
-                    parse_mode="Markdown"
-                )
-                
-            elif call.data == "admin_blocked_users":
-                # عرض المستخدمين المحظورين
-                blocked_ids = admin_panel.get_setting("blocked_users", [])
-                blocked_users = []
-                users_data = admin_panel.get_setting("users", {})
-                
-                for user_id in blocked_ids:
-                    user_id = int(user_id)
-                    user_data = users_data.get(str(user_id), {})
-                    blocked_users.append({
-                        "id": user_id,
-                        "username": user_data.get("username", "غير معروف"),
-                        "first_name": user_data.get("first_name", "غير معروف"),
-                        "blocked_at": user_data.get("blocked_at", 0),
-                        "files_processed": user_data.get("files_processed", 0)
-                    })
-                
-                users_text = get_user_list_message(blocked_users, "المستخدمين المحظورين")
-                
-                markup = types.InlineKeyboardMarkup()
-                markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_users"))
-                
-                bot.edit_message_text(
-                    users_text, 
-                    chat_id, message_id,
-                    reply_markup=markup, 
-                    parse_mode="Markdown"
-                )
-                
-            elif call.data == "admin_admins":
-                # عرض المشرفين
-                admin_ids = admin_panel.get_setting("admins", [])
-                admins = []
-                users_data = admin_panel.get_setting("users", {})
-                
-                for user_id in admin_ids:
-                    user_id = int(user_id)
-                    user_data = users_data.get(str(user_id), {})
-                    admins.append({
-                        "id": user_id,
-                        "username": user_data.get("username", "غير معروف"),
-                        "first_name": user_data.get("first_name", "غير معروف"),
-                        "added_at": user_data.get("admin_added_at", 0)
-                    })
-                
-                users_text = get_user_list_message(admins, "المشرفين")
-                
-                markup = types.InlineKeyboardMarkup()
-                markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_users"))
-                
-                bot.edit_message_text(
-                    users_text, 
-                    chat_id, message_id,
-                    reply_markup=markup, 
-                    parse_mode="Markdown"
-                )
-                
-            # معالجة أزرار صفحة إدارة القوالب
-            elif call.data == "admin_view_templates":
-                # عرض جميع القوالب
-                try:
-                    from template_handler import get_all_templates
-                    templates = get_all_templates()
-                    
-                    if not templates:
-                        markup = types.InlineKeyboardMarkup()
-                        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_templates"))
-                        bot.edit_message_text(
-                            "📋 قائمة القوالب\n\n"
-                            "لا توجد قوالب محفوظة حالياً.",
-                            chat_id, message_id,
-                            reply_markup=markup
-                        )
-                    else:
-                        templates_text = "📋 قائمة القوالب\n\n"
-                        for idx, template in enumerate(templates):
-                            # استخدام نص عادي بدلاً من تنسيق Markdown
-                            templates_text += f"{idx+1}. {template['name']} (الفنان: {template.get('artist', 'غير محدد')})\n"
-                        
-                        markup = types.InlineKeyboardMarkup()
-                        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_templates"))
-                        
-                        bot.edit_message_text(
-                            templates_text,
-                            chat_id, message_id,
-                            reply_markup=markup
-                        )
-                except Exception as e:
-                    logger.error(f"خطأ في عرض القوالب: {e}")
-                    bot.answer_callback_query(call.id, "حدث خطأ أثناء محاولة عرض القوالب")
-                    
-                    markup = types.InlineKeyboardMarkup()
-                    markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_templates"))
-                    bot.edit_message_text(
-                        "❌ حدث خطأ أثناء محاولة عرض القوالب، يرجى المحاولة مرة أخرى.",
-                        chat_id, message_id,
-                        reply_markup=markup
-                    )
-                    
-            elif call.data == "admin_create_template":
-                # إنشاء قالب عام
-                msg = bot.edit_message_text(
-                    "✏️ *إنشاء قالب عام*\n\n"
-                    "أرسل بيانات القالب بالتنسيق التالي:\n\n"
-                    "الفنان: اسم الفنان\n"
-                    "العنوان: عنوان الأغنية\n"
-                    "الألبوم: اسم الألبوم\n"
-                    "السنة: 2024\n"
-                    "النوع: نوع الموسيقى\n"
-                    "الملحن: اسم الملحن\n"
-                    "التعليق: أي تعليق إضافي\n"
-                    "الكلمات: كلمات الأغنية\n\n"
-                    "🔄 أرسل `الغاء` للإلغاء.",
-                    chat_id, message_id,
-                    parse_mode="Markdown"
-                )
-                
-                from bot import set_user_state
-                set_user_state(user_id, "admin_waiting_for_template_data", {"message_id": msg.message_id})
-                
-            elif call.data == "admin_delete_template":
-                # حذف قالب
-                from template_handler import get_all_templates
-                templates = get_all_templates()
-                
-                if not templates:
-                    markup = types.InlineKeyboardMarkup()
-                    markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_templates"))
-                    bot.edit_message_text(
-                        "🗑️ *حذف قالب*\n\n"
-                        "لا توجد قوالب محفوظة حالياً.",
-                        chat_id, message_id,
-                        reply_markup=markup,
-                        parse_mode="Markdown"
-                    )
-                else:
-                    markup = types.InlineKeyboardMarkup(row_width=1)
-                    for idx, template in enumerate(templates):
-                        markup.add(types.InlineKeyboardButton(
-                            f"{template['name']} ({template.get('artist', 'غير محدد')})",
-                            callback_data=f"admin_delete_template_{idx}"
-                        ))
-                    markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_templates"))
-                    
-                    bot.edit_message_text(
-                        "🗑️ *حذف قالب*\n\n"
-                        "اختر القالب الذي تريد حذفه:",
-                        chat_id, message_id,
-                        reply_markup=markup,
-                        parse_mode="Markdown"
-                    )
-                    
-            elif call.data.startswith("admin_delete_template_"):
-                # حذف قالب محدد
-                idx = int(call.data.split("_")[-1])
-                from template_handler import get_all_templates, delete_template
-                templates = get_all_templates()
-                
-                if 0 <= idx < len(templates):
-                    template = templates[idx]
-                    template_name = template['name']
-                    
-                    from template_handler import get_template_path
-                    template_path = get_template_path(template_name)
-                    delete_result = delete_template(template_path)
-                    
-                    if delete_result:
-                        markup = types.InlineKeyboardMarkup()
-                        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_templates"))
-                        bot.edit_message_text(
-                            f"✅ تم حذف القالب '{template_name}' بنجاح.",
-                            chat_id, message_id,
-                            reply_markup=markup
-                        )
-                    else:
-                        markup = types.InlineKeyboardMarkup()
-                        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_templates"))
-                        bot.edit_message_text(
-                            f"❌ فشل في حذف القالب '{template_name}'.",
-                            chat_id, message_id,
-                            reply_markup=markup
-                        )
-                
-            elif call.data == "admin_export_templates":
-                # تصدير القوالب
-                # تحديد مجلد للتصدير
-                export_dir = "templates_export"
-                os.makedirs(export_dir, exist_ok=True)
-                
-                from template_handler import export_all_templates
-                export_path, count = export_all_templates(export_dir)
-                
-                if count > 0 and export_path:
-                    # إرسال ملف التصدير
-                    with open(export_path, 'rb') as export_file:
-                        bot.send_document(
-                            chat_id=chat_id,
-                            document=export_file,
-                            caption=f"✅ تم تصدير {count} قالب بنجاح."
-                        )
-                    
-                    markup = types.InlineKeyboardMarkup()
-                    markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_templates"))
-                    bot.edit_message_text(
-                        f"✅ تم تصدير {count} قالب بنجاح. تم إرسال الملف.",
-                        chat_id, message_id,
-                        reply_markup=markup
-                    )
-                else:
-                    markup = types.InlineKeyboardMarkup()
-                    markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_templates"))
-                    bot.edit_message_text(
-                        "❌ فشل تصدير القوالب أو لا توجد قوالب للتصدير.",
-                        chat_id, message_id,
-                        reply_markup=markup
-                    )
-                
-            elif call.data == "admin_import_templates":
-                # استيراد القوالب
-                msg = bot.edit_message_text(
-                    "📥 *استيراد القوالب*\n\n"
-                    "أرسل ملف القوالب المضغوط (ZIP) لاستيراده.\n\n"
-                    "🔄 أرسل `الغاء` للإلغاء.",
-                    chat_id, message_id,
-                    parse_mode="Markdown"
-                )
-                
-                from bot import set_user_state
-                set_user_state(user_id, "admin_waiting_for_templates_file", {"message_id": msg.message_id})
-                
-            # معالجة أزرار صفحة السجلات
-            elif call.data == "admin_recent_logs":
-                # عرض آخر السجلات
-                recent_logs = admin_panel.get_recent_logs(20)
-                logs_text = get_logs_message(recent_logs, "آخر السجلات")
-                
-                markup = types.InlineKeyboardMarkup()
-                markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_logs"))
-                
-                bot.edit_message_text(
-                    logs_text, 
-                    chat_id, message_id,
-                    reply_markup=markup, 
-                    parse_mode="Markdown"
-                )
-                
-            elif call.data == "admin_error_logs":
-                # عرض سجلات الأخطاء
-                error_logs = admin_panel.get_error_logs(20)
-                logs_text = get_logs_message(error_logs, "سجلات الأخطاء")
-                
-                markup = types.InlineKeyboardMarkup()
-                markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_logs"))
-                
-                bot.edit_message_text(
-                    logs_text, 
-                    chat_id, message_id,
-                    reply_markup=markup, 
-                    parse_mode="Markdown"
-                )
-                
-            elif call.data == "admin_admin_logs":
-                # عرض سجلات المشرفين
-                admin_logs = [log for log in admin_panel.get_recent_logs(50) if log.get('user_id') in admin_panel.get_setting('admins', [])]
-                logs_text = get_logs_message(admin_logs, "سجلات المشرفين")
-                
-                markup = types.InlineKeyboardMarkup()
-                markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_logs"))
-                
-                bot.edit_message_text(
-                    logs_text, 
-                    chat_id, message_id,
-                    reply_markup=markup, 
-                    parse_mode="Markdown"
-                )
-                
-            # معالجة أزرار البث الجماعي
-            elif call.data == "admin_scheduled_broadcasts":
-                # عرض البث المجدول
-                scheduled = admin_panel.get_scheduled_broadcasts()
-                
-                if not scheduled:
-                    markup = types.InlineKeyboardMarkup()
-                    markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_broadcast_menu"))
-                    bot.edit_message_text(
-                        "📅 *البث المجدول*\n\n"
-                        "لا يوجد بث مجدول حالياً.",
-                        chat_id, message_id,
-                        reply_markup=markup,
-                        parse_mode="Markdown"
-                    )
-                else:
-                    broadcasts_text = "📅 *قائمة البث المجدول*\n\n"
-                    markup = types.InlineKeyboardMarkup(row_width=1)
-                    
-                    for idx, broadcast in enumerate(scheduled):
-                        broadcast_time = datetime.fromtimestamp(broadcast.get("timestamp", 0))
-                        time_str = broadcast_time.strftime("%Y-%m-%d %H:%M:%S")
-                        message_preview = broadcast.get("message_text", "")[:50] + "..." if len(broadcast.get("message_text", "")) > 50 else broadcast.get("message_text", "")
-                        
-                        broadcasts_text += f"{idx+1}. {time_str}\n{message_preview}\n\n"
-                        markup.add(types.InlineKeyboardButton(
-                            f"❌ إلغاء البث {idx+1}",
-                            callback_data=f"admin_cancel_broadcast_{broadcast.get('id')}"
-                        ))
-                    
-                    markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_broadcast_menu"))
-                    
-                    bot.edit_message_text(
-                        broadcasts_text,
-                        chat_id, message_id,
-                        reply_markup=markup,
-                        parse_mode="Markdown"
-                    )
-                    
-            elif call.data.startswith("admin_cancel_broadcast_"):
-                # إلغاء بث مجدول
-                broadcast_id = int(call.data.split("_")[-1])
-                result = admin_panel.remove_scheduled_broadcast(broadcast_id)
-                
-                markup = types.InlineKeyboardMarkup()
-                markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_scheduled_broadcasts"))
-                
-                status_text = "✅ تم إلغاء البث المجدول بنجاح." if result else "❌ فشل في إلغاء البث المجدول."
-                bot.edit_message_text(
-                    status_text,
-                    chat_id, message_id,
-                    reply_markup=markup
-                )
-                
-            # معالجة أزرار النسخ الاحتياطي
-            elif call.data == "admin_backup_data":
-                # إنشاء نسخة احتياطية
-                backup_data = admin_panel.export_data()
-                
-                if backup_data:
-                    with open(backup_data, 'rb') as backup_file:
-                        bot.send_document(
-                            chat_id=chat_id,
-                            document=backup_file,
-                            caption="✅ تم إنشاء نسخة احتياطية بنجاح."
-                        )
-                    
-                    # حذف الملف المؤقت بعد الإرسال
-                    try:
-                        os.remove(backup_data)
-                    except:
-                        pass
-                    
-                    markup = types.InlineKeyboardMarkup()
-                    markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_backup_menu"))
-                    bot.edit_message_text(
-                        "✅ تم إنشاء وإرسال النسخة الاحتياطية بنجاح.",
-                        chat_id, message_id,
-                        reply_markup=markup
-                    )
-                else:
-                    markup = types.InlineKeyboardMarkup()
-                    markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_backup_menu"))
-                    bot.edit_message_text(
-                        "❌ فشل في إنشاء النسخة الاحتياطية.",
-                        chat_id, message_id,
-                        reply_markup=markup
-                    )
-                
-            elif call.data == "admin_restore_data":
-                # استرجاع من نسخة احتياطية
-                msg = bot.edit_message_text(
-                    "📤 *استرجاع البيانات*\n\n"
-                    "أرسل ملف النسخة الاحتياطية للاسترجاع.\n\n"
-                    "⚠️ تحذير: سيتم استبدال جميع البيانات الحالية بالبيانات من النسخة الاحتياطية.\n\n"
-                    "🔄 أرسل `الغاء` للإلغاء.",
-                    chat_id, message_id,
-                    parse_mode="Markdown"
-                )
-                
-                from bot import set_user_state
-                set_user_state(user_id, "admin_waiting_for_backup_file", {"message_id": msg.message_id})
-                
-            elif call.data == "admin_clean_temp":
-                # تنظيف الملفات المؤقتة
-                result = admin_panel.clean_temp_files()
-                
-                markup = types.InlineKeyboardMarkup()
-                markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_backup_menu"))
-                
-                if isinstance(result, tuple):
-                    count, size_mb = result
-                    bot.edit_message_text(
-                        f"✅ تم تنظيف {count} ملف مؤقت ({size_mb:.2f} ميجابايت) بنجاح.",
-                        chat_id, message_id,
-                        reply_markup=markup
-                    )
-                else:
-                    bot.edit_message_text(
-                        "✅ تم تنظيف الملفات المؤقتة بنجاح.",
-                        chat_id, message_id,
-                        reply_markup=markup
-                    )
-                
-            # معالجة أزرار القواعد الذكية
-            elif call.data == "admin_smart_rules":
-                # صفحة القواعد الذكية
-                try:
-                    with app.app_context():
-                        smart_rules_count = SmartRule.query.count()
-                        active_rules_count = SmartRule.query.filter_by(is_active=True).count()
-                
-                    bot.edit_message_text(
-                        f"🧠 *القواعد الذكية*\n\nيمكنك إدارة القواعد الذكية للبوت من هنا. هذه القواعد تعمل على تطبيق تغييرات تلقائية على الوسوم بناءً على شروط محددة.\n\nعدد القواعد الحالية: {smart_rules_count}\nالقواعد النشطة: {active_rules_count}",
-                        chat_id, message_id,
-                        parse_mode="Markdown",
-                        reply_markup=get_admin_smart_rules_markup()
-                    )
-                except Exception as e:
-                    logger.error(f"خطأ في صفحة القواعد الذكية: {e}")
-                
-            elif call.data == "admin_add_smart_rule":
-                # إضافة قاعدة ذكية جديدة
-                try:
-                    # إنشاء رسالة الإضافة مع النموذج
-                    field_options = []
-                    operator_options = []
-                    action_options = []
-                    
-                    for field in smart_rules.get_available_fields():
-                        field_options.append(f"• {field['id']}: {field['name']}")
-                    
-                    for op in smart_rules.get_available_operators():
-                        operator_options.append(f"• {op['id']}: {op['name']}")
-                    
-                    for action in smart_rules.get_available_actions():
-                        action_options.append(f"• {action['id']}: {action['name']}")
-                    
-                    # إنشاء رسالة بسيطة للتعليمات بدون Markdown
-                    bot.edit_message_text(
-                        "🆕 إضافة قاعدة ذكية جديدة\n\n"
-                        "قم بإرسال بيانات القاعدة بالتنسيق التالي:\n\n"
-                        "الاسم: [اسم القاعدة]\n"
-                        "الوصف: [وصف القاعدة]\n"
-                        "حقل الشرط: [معرف الحقل]\n"
-                        "العملية: [معرف العملية]\n"
-                        "قيمة الشرط: [قيمة الشرط]\n"
-                        "نوع الإجراء: [معرف الإجراء]\n"
-                        "حقل الإجراء: [معرف الحقل]\n"
-                        "قيمة الإجراء: [قيمة الإجراء]",
-                        chat_id, message_id,
-                        reply_markup=types.InlineKeyboardMarkup().add(
-                            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_smart_rules")
-                        )
-                    )
-                    
-                    # إرسال رسالة منفصلة للحقول المتاحة
-                    fields_text = "الحقول المتاحة:\n"
-                    for field in field_options:
-                        fields_text += field + "\n"
-                    bot.send_message(chat_id, fields_text)
-                    
-                    # إرسال رسالة منفصلة للعمليات المتاحة
-                    operators_text = "العمليات المتاحة:\n"
-                    for op in operator_options:
-                        operators_text += op + "\n"
-                    bot.send_message(chat_id, operators_text)
-                    
-                    # إرسال رسالة منفصلة للإجراءات المتاحة
-                    actions_text = "الإجراءات المتاحة:\n"
-                    for action in action_options:
-                        actions_text += action + "\n"
-                    bot.send_message(chat_id, actions_text)
-                    
-                    # إرسال مثال
-                    example_text = "مثال:\n\n"
-                    example_text += "الاسم: تعديل عيسى الليث\n"
-                    example_text += "الوصف: إضافة السنة لأناشيد عيسى الليث\n"
-                    example_text += "حقل الشرط: artist\n"
-                    example_text += "العملية: contains\n"
-                    example_text += "قيمة الشرط: عيسى الليث\n"
-                    example_text += "نوع الإجراء: set\n"
-                    example_text += "حقل الإجراء: year\n"
-                    example_text += "قيمة الإجراء: 1446"
-                    bot.send_message(chat_id, example_text)
-                    
-                    # تعيين حالة المستخدم لانتظار بيانات القاعدة
-                    from bot import set_user_state
-                    set_user_state(user_id, "admin_waiting_rule_data", {"message_id": message_id})
-                    
-                except Exception as e:
-                    logger.error(f"خطأ في صفحة إضافة قاعدة ذكية: {e}")
-                    
-            elif call.data == "admin_view_smart_rules":
-                # عرض القواعد الذكية الحالية
-                try:
-                    with app.app_context():
-                        rules = SmartRule.query.order_by(SmartRule.priority).all()
-                        
-                    if not rules:
-                        bot.edit_message_text(
-                            "🧠 *القواعد الذكية*\n\nلا توجد قواعد ذكية مضافة بعد.",
-                            chat_id, message_id,
-                            parse_mode="Markdown",
-                            reply_markup=types.InlineKeyboardMarkup().add(
-                                types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_smart_rules")
-                            )
-                        )
-                        return
-                    
-                    rules_text = "🧠 *القواعد الذكية الحالية*\n\n"
-                    for i, rule in enumerate(rules):
-                        status = "✅" if rule.is_active else "❌"
-                        rules_text += f"{i+1}. {status} *{rule.name}*\n"
-                        rules_text += f"• الشرط: `{rule.condition_field} {rule.condition_operator} {rule.condition_value}`\n"
-                        rules_text += f"• الإجراء: `{rule.action_type} {rule.action_field} {rule.action_value[:20]}{'...' if len(rule.action_value) > 20 else ''}`\n"
-                        rules_text += f"• الأولوية: {rule.priority}\n\n"
-                    
-                    # إنشاء أزرار للقواعد
-                    markup = types.InlineKeyboardMarkup(row_width=2)
-                    for i, rule in enumerate(rules):
-                        markup.add(
-                            types.InlineKeyboardButton(
-                                f"{i+1}. {'✅' if rule.is_active else '❌'} {rule.name[:15]}...",
-                                callback_data=f"admin_rule_{rule.id}"
-                            )
-                        )
-                    markup.add(
-                        types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_smart_rules")
-                    )
-                    
-                    bot.edit_message_text(
-                        rules_text,
-                        chat_id, message_id,
-                        parse_mode="Markdown",
-                        reply_markup=markup
-                    )
-                except Exception as e:
-                    logger.error(f"خطأ في عرض القواعد الذكية: {e}")
-                    
-            elif call.data == "admin_smart_rules_stats":
-                # عرض إحصائيات القواعد الذكية
-                try:
-                    with app.app_context():
-                        total_rules = SmartRule.query.count()
-                        active_rules = SmartRule.query.filter_by(is_active=True).count()
-                        
-                        # الإحصائيات حسب نوع الإجراء
-                        rules_by_action = {}
-                        for action_type in ['add', 'set', 'replace']:
-                            count = SmartRule.query.filter_by(action_type=action_type).count()
-                            action_name = {"add": "إضافة", "set": "تعيين", "replace": "استبدال"}.get(action_type, action_type)
-                            rules_by_action[action_name] = count
-                        
-                        # الإحصائيات حسب الحقل
-                        field_counts = {}
-                        for rule in SmartRule.query.all():
-                            field = rule.condition_field
-                            field_name = {"artist": "الفنان", "title": "العنوان", "album": "الألبوم", 
-                                        "genre": "النوع", "year": "السنة"}.get(field, field)
-                            
-                            if field_name in field_counts:
-                                field_counts[field_name] += 1
-                            else:
-                                field_counts[field_name] = 1
-                    
-                    stats_text = "📊 *إحصائيات القواعد الذكية*\n\n"
-                    stats_text += f"• إجمالي القواعد: {total_rules}\n"
-                    stats_text += f"• القواعد النشطة: {active_rules}\n"
-                    stats_text += f"• القواعد المعطلة: {total_rules - active_rules}\n\n"
-                    
-                    if rules_by_action:
-                        stats_text += "*القواعد حسب نوع الإجراء:*\n"
-                        for action_name, count in rules_by_action.items():
-                            if count > 0:
-                                stats_text += f"• {action_name}: {count}\n"
-                        stats_text += "\n"
-                    
-                    if field_counts:
-                        stats_text += "*القواعد حسب حقل الشرط:*\n"
-                        for field_name, count in field_counts.items():
-                            stats_text += f"• {field_name}: {count}\n"
-                    
-                    bot.edit_message_text(
-                        stats_text,
-                        chat_id, message_id,
-                        parse_mode="Markdown",
-                        reply_markup=types.InlineKeyboardMarkup().add(
-                            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_smart_rules")
-                        )
-                    )
-                except Exception as e:
-                    logger.error(f"خطأ في عرض إحصائيات القواعد الذكية: {e}")
-                    
-            elif call.data.startswith("admin_rule_"):
-                # عرض تفاصيل قاعدة ذكية محددة
-                try:
-                    rule_id = int(call.data.split("_")[2])
-                    with app.app_context():
-                        rule = SmartRule.query.get(rule_id)
-                        
-                    if not rule:
-                        bot.answer_callback_query(call.id, "القاعدة غير موجودة")
-                        return
-                    
-                    # تحويل معرفات الحقول والعمليات إلى أسماء عربية
-                    field_names = {f["id"]: f["name"] for f in smart_rules.get_available_fields()}
-                    operator_names = {o["id"]: o["name"] for o in smart_rules.get_available_operators()}
-                    action_names = {a["id"]: a["name"] for a in smart_rules.get_available_actions()}
-                    
-                    rule_text = f"🧠 *تفاصيل القاعدة: {rule.name}*\n\n"
-                    rule_text += f"*الوصف:* {rule.description or 'لا يوجد وصف'}\n\n"
-                    rule_text += "*الشرط:*\n"
-                    rule_text += f"• الحقل: {field_names.get(rule.condition_field, rule.condition_field)}\n"
-                    rule_text += f"• العملية: {operator_names.get(rule.condition_operator, rule.condition_operator)}\n"
-                    rule_text += f"• القيمة: `{rule.condition_value}`\n\n"
-                    
-                    rule_text += "*الإجراء:*\n"
-                    rule_text += f"• النوع: {action_names.get(rule.action_type, rule.action_type)}\n"
-                    rule_text += f"• الحقل: {field_names.get(rule.action_field, rule.action_field)}\n"
-                    rule_text += f"• القيمة: `{rule.action_value}`\n\n"
-                    
-                    rule_text += f"*الأولوية:* {rule.priority}\n"
-                    rule_text += f"*الحالة:* {'نشطة ✅' if rule.is_active else 'معطلة ❌'}\n"
-                    rule_text += f"*تاريخ الإنشاء:* {rule.created_at.strftime('%Y-%m-%d')}\n"
-                    rule_text += f"*آخر تحديث:* {rule.updated_at.strftime('%Y-%m-%d')}\n"
-                    
-                    # إنشاء أزرار التحكم
-                    markup = types.InlineKeyboardMarkup(row_width=2)
-                    markup.add(
-                        types.InlineKeyboardButton(
-                            f"{'تعطيل ❌' if rule.is_active else 'تفعيل ✅'}",
-                            callback_data=f"admin_toggle_rule_{rule_id}"
-                        ),
-                        types.InlineKeyboardButton("حذف 🗑", callback_data=f"admin_delete_rule_{rule_id}")
-                    )
-                    markup.add(
-                        types.InlineKeyboardButton("تعديل الأولوية", callback_data=f"admin_edit_rule_priority_{rule_id}")
-                    )
-                    markup.add(
-                        types.InlineKeyboardButton("🔙 رجوع للقواعد", callback_data="admin_view_smart_rules")
-                    )
-                    
-                    bot.edit_message_text(
-                        rule_text,
-                        chat_id, message_id,
-                        parse_mode="Markdown",
-                        reply_markup=markup
-                    )
-                except Exception as e:
-                    logger.error(f"خطأ في عرض تفاصيل القاعدة: {e}")
-                    
-            elif call.data.startswith("admin_toggle_rule_"):
-                # تفعيل/تعطيل قاعدة ذكية
-                try:
-                    rule_id = int(call.data.split("_")[3])
-                    result = smart_rules.toggle_rule_status(rule_id)
-                    
-                    if result:
-                        with app.app_context():
-                            rule = SmartRule.query.get(rule_id)
-                            status = "تفعيل" if rule.is_active else "تعطيل"
-                        bot.answer_callback_query(call.id, f"تم {status} القاعدة بنجاح")
-                        # إعادة عرض تفاصيل القاعدة
-                        handle_admin_callback(bot, types.CallbackQuery(
-                            id=call.id, from_user=call.from_user, message=call.message, 
-                            data=f"admin_rule_{rule_id}", chat_instance=call.chat_instance
-                        ))
-                    else:
-                        bot.answer_callback_query(call.id, "فشل في تغيير حالة القاعدة")
-                except Exception as e:
-                    logger.error(f"خطأ في تغيير حالة القاعدة: {e}")
-                    
-            elif call.data.startswith("admin_delete_rule_"):
-                # حذف قاعدة ذكية
-                try:
-                    rule_id = int(call.data.split("_")[3])
-                    
-                    # عرض رسالة تأكيد الحذف
-                    with app.app_context():
-                        rule = SmartRule.query.get(rule_id)
-                        rule_name = rule.name if rule else "القاعدة"
-                    
-                    bot.edit_message_text(
-                        f"⚠️ *تأكيد حذف القاعدة*\n\nهل أنت متأكد من حذف القاعدة **{rule_name}**؟ هذا الإجراء لا يمكن التراجع عنه.",
-                        chat_id, message_id,
-                        parse_mode="Markdown",
-                        reply_markup=types.InlineKeyboardMarkup(row_width=2).add(
-                            types.InlineKeyboardButton("نعم، حذف ✅", callback_data=f"admin_confirm_delete_rule_{rule_id}"),
-                            types.InlineKeyboardButton("إلغاء ❌", callback_data=f"admin_rule_{rule_id}")
-                        )
-                    )
-                except Exception as e:
-                    logger.error(f"خطأ في صفحة حذف القاعدة: {e}")
-                    
-            elif call.data.startswith("admin_confirm_delete_rule_"):
-                # تأكيد حذف القاعدة
-                try:
-                    rule_id = int(call.data.split("_")[4])
-                    result = smart_rules.delete_rule(rule_id)
-                    
-                    if result:
-                        bot.answer_callback_query(call.id, "تم حذف القاعدة بنجاح")
-                        # العودة لقائمة القواعد
-                        handle_admin_callback(bot, types.CallbackQuery(
-                            id=call.id, from_user=call.from_user, message=call.message, 
-                            data="admin_view_smart_rules", chat_instance=call.chat_instance
-                        ))
-                    else:
-                        bot.answer_callback_query(call.id, "فشل في حذف القاعدة")
-                except Exception as e:
-                    logger.error(f"خطأ في حذف القاعدة: {e}")
-                    
-            elif call.data.startswith("admin_edit_rule_priority_"):
-                # تعديل أولوية القاعدة
-                try:
-                    rule_id = int(call.data.split("_")[4])
-                    
-                    with app.app_context():
-                        rule = SmartRule.query.get(rule_id)
-                        
-                    if not rule:
-                        bot.answer_callback_query(call.id, "القاعدة غير موجودة")
-                        return
-                    
-                    bot.edit_message_text(
-                        f"🔢 *تعديل أولوية القاعدة*\n\nالقاعدة: **{rule.name}**\nالأولوية الحالية: **{rule.priority}**\n\nأدخل قيمة الأولوية الجديدة (رقم بين 1 و100، الرقم الأقل يعني أولوية أعلى):",
-                        chat_id, message_id,
-                        parse_mode="Markdown",
-                        reply_markup=types.InlineKeyboardMarkup().add(
-                            types.InlineKeyboardButton("🔙 إلغاء", callback_data=f"admin_rule_{rule_id}")
-                        )
-                    )
-                    
-                    # تعيين حالة المستخدم لانتظار الأولوية الجديدة
-                    from bot import set_user_state
-                    set_user_state(user_id, f"admin_waiting_rule_priority_{rule_id}", {"message_id": message_id})
-                    
-                except Exception as e:
-                    logger.error(f"خطأ في صفحة تعديل الأولوية: {e}")
-            
-            # معالجة زر إضافة مشرف
-            elif call.data == "admin_add_admin":
-                bot.edit_message_text(
-                    "👤 *إضافة مشرف جديد*\n\n"
-                    "أرسل معرّف المستخدم (User ID) الذي تريد إضافته كمشرف جديد.",
-                    chat_id, message_id,
-                    reply_markup=types.InlineKeyboardMarkup().add(
-                        types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_users")
-                    ),
-                    parse_mode="Markdown"
-                )
-                # تغيير حالة المستخدم لانتظار معرف المستخدم الجديد
-                from bot import set_user_state
-                set_user_state(user_id, "admin_waiting_for_admin_id")
-            
-            # معالجة زر إلغاء حظر مستخدم
-            elif call.data == "admin_unblock_user":
-                bot.edit_message_text(
-                    "🔓 *إلغاء حظر مستخدم*\n\n"
-                    "أرسل معرّف المستخدم (User ID) الذي تريد إلغاء حظره.",
-                    chat_id, message_id,
-                    reply_markup=types.InlineKeyboardMarkup().add(
-                        types.InlineKeyboardButton("📋 قائمة المحظورين", callback_data="admin_blocked_users"),
-                        types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_users")
-                    ),
-                    parse_mode="Markdown"
-                )
-                # تغيير حالة المستخدم لانتظار معرف المستخدم
-                from bot import set_user_state
-                set_user_state(user_id, "admin_waiting_for_unblock_id")
-            
-            # معالجة زر حظر مستخدم
-            elif call.data == "admin_block_user":
-                bot.edit_message_text(
-                    "🚫 *حظر مستخدم*\n\n"
-                    "أرسل معرّف المستخدم (User ID) الذي تريد حظره من استخدام البوت.",
-                    chat_id, message_id,
-                    reply_markup=types.InlineKeyboardMarkup().add(
-                        types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_users")
-                    ),
-                    parse_mode="Markdown"
-                )
-                # تغيير حالة المستخدم لانتظار معرف المستخدم
-                from bot import set_user_state
-                set_user_state(user_id, "admin_waiting_for_block_id")
-            
-            # معالجة زر البث الجماعي
-            elif call.data == "admin_broadcast":
-                bot.edit_message_text(
-                    "📢 *البث الجماعي*\n\n"
-                    "اختر نوع البث الذي تريد إرساله:",
-                    chat_id, message_id,
-                    reply_markup=get_admin_broadcast_menu_markup(),
-                    parse_mode="Markdown"
-                )
-            
-            # معالجة زر إرسال رسالة نصية للجميع
-            elif call.data == "admin_broadcast_text":
-                bot.edit_message_text(
-                    "📝 *إرسال رسالة نصية لجميع المستخدمين*\n\n"
-                    "أرسل النص الذي تريد بثه لجميع مستخدمي البوت.\n"
-                    "يمكنك استخدام تنسيق Markdown.\n\n"
-                    "مثال: *نص غامق* _نص مائل_ `نص برمجي`",
-                    chat_id, message_id,
-                    reply_markup=types.InlineKeyboardMarkup().add(
-                        types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_broadcast")
-                    ),
-                    parse_mode="Markdown"
-                )
-                # تغيير حالة المستخدم لانتظار نص البث
-                from bot import set_user_state
-                set_user_state(user_id, "admin_waiting_for_broadcast_text")
-            
-            # معالجة زر ملاحظات الاستخدام
-            elif call.data == "admin_usage_notes":
-                current_notes = admin_panel.get_setting("bot_info.usage_notes", "لا توجد ملاحظات حالياً")
-                bot.edit_message_text(
-                    "📝 *تعديل ملاحظات الاستخدام*\n\n"
-                    f"الملاحظات الحالية:\n{current_notes}\n\n"
-                    "أرسل ملاحظات الاستخدام الجديدة التي ستظهر للمستخدمين.",
-                    chat_id, message_id,
-                    reply_markup=types.InlineKeyboardMarkup().add(
-                        types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_settings")
-                    ),
-                    parse_mode="Markdown"
-                )
-                # تغيير حالة المستخدم لانتظار ملاحظات الاستخدام
-                from bot import set_user_state
-                set_user_state(user_id, "admin_waiting_for_usage_notes")
-            
-            # معالجة زر وصف البوت
-            elif call.data == "admin_bot_description":
-                current_description = admin_panel.get_setting("bot_info.description", "لا يوجد وصف حالياً")
-                bot.edit_message_text(
-                    "📝 *تعديل وصف البوت*\n\n"
-                    f"الوصف الحالي:\n{current_description}\n\n"
-                    "أرسل وصف البوت الجديد الذي سيظهر في القائمة الرئيسية وعند استخدام أمر /start.",
-                    chat_id, message_id,
-                    reply_markup=types.InlineKeyboardMarkup().add(
-                        types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_settings")
-                    ),
-                    parse_mode="Markdown"
-                )
-                # تغيير حالة المستخدم لانتظار وصف البوت
-                from bot import set_user_state
-                set_user_state(user_id, "admin_waiting_for_bot_description")
-            
-            # معالجة زر إعادة تعيين حدود المستخدمين
-            elif call.data == "admin_reset_all_limits":
-                # إعادة تعيين حدود جميع المستخدمين
-                result = admin_panel.reset_user_limit()
-                if result:
-                    bot.edit_message_text(
-                        "✅ تم إعادة تعيين حدود جميع المستخدمين بنجاح!",
-                        chat_id, message_id,
-                        reply_markup=types.InlineKeyboardMarkup().add(
-                            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_settings")
-                        )
-                    )
-                else:
-                    bot.edit_message_text(
-                        "❌ حدث خطأ أثناء إعادة تعيين حدود المستخدمين.",
-                        chat_id, message_id,
-                        reply_markup=types.InlineKeyboardMarkup().add(
-                            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_settings")
-                        )
-                    )
-            
-            # معالجة زر العلامة المائية الصوتية
-            elif call.data == "admin_audio_watermark":
-                watermark_enabled = admin_panel.get_setting("audio_watermark.enabled", False)
-                watermark_file = admin_panel.get_setting("audio_watermark.file", "غير محدد")
-                watermark_position = admin_panel.get_setting("audio_watermark.position", "start")
-                watermark_volume = admin_panel.get_setting("audio_watermark.volume", 0.5)
-                
-                status = "✅ مفعلة" if watermark_enabled else "❌ معطلة"
-                position_text = "بداية الملف" if watermark_position == "start" else "نهاية الملف"
-                
-                bot.edit_message_text(
-                    f"🔊 *إعدادات العلامة المائية الصوتية*\n\n"
-                    f"• الحالة: {status}\n"
-                    f"• الملف الحالي: {watermark_file}\n"
-                    f"• الموضع: {position_text}\n"
-                    f"• مستوى الصوت: {int(watermark_volume * 100)}%\n\n"
-                    "اختر الإجراء الذي تريد تنفيذه:",
-                    chat_id, message_id,
-                    reply_markup=types.InlineKeyboardMarkup(row_width=1).add(
-                        types.InlineKeyboardButton(
-                            "✅ تفعيل العلامة المائية" if not watermark_enabled else "❌ تعطيل العلامة المائية", 
-                            callback_data="admin_toggle_watermark"
-                        ),
-                        types.InlineKeyboardButton("📁 تغيير ملف العلامة المائية", callback_data="admin_change_watermark_file"),
-                        types.InlineKeyboardButton(
-                            f"📍 تغيير الموضع ({position_text})", 
-                            callback_data="admin_toggle_watermark_position"
-                        ),
-                        types.InlineKeyboardButton(f"🔊 ضبط مستوى الصوت ({int(watermark_volume * 100)}%)", callback_data="admin_watermark_volume"),
-                        types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_settings")
-                    ),
-                    parse_mode="Markdown"
-                )
-            
-            # معالجة زر تبديل حالة العلامة المائية
-            elif call.data == "admin_toggle_watermark":
-                current_state = admin_panel.get_setting("audio_watermark.enabled", False)
-                new_state = not current_state
-                result = admin_panel.enable_audio_watermark(new_state)
-                
-                if result:
-                    bot.answer_callback_query(call.id, "تم تغيير حالة العلامة المائية بنجاح")
-                    # إعادة تحميل صفحة العلامة المائية
-                    handle_admin_callback(bot, types.CallbackQuery(
-                        id=call.id, from_user=call.from_user, message=call.message, 
-                        data="admin_audio_watermark", chat_instance=call.chat_instance
-                    ))
-                else:
-                    bot.answer_callback_query(call.id, "حدث خطأ أثناء تغيير حالة العلامة المائية")
-            
-            # معالجة زر تغيير موضع العلامة المائية
-            elif call.data == "admin_toggle_watermark_position":
-                current_position = admin_panel.get_setting("audio_watermark.position", "start")
-                new_position = "end" if current_position == "start" else "start"
-                
-                # تحديث الموضع
-                watermark_file = admin_panel.get_setting("audio_watermark.file", "")
-                volume = admin_panel.get_setting("audio_watermark.volume", 0.5)
-                
-                if watermark_file:
-                    result = admin_panel.set_audio_watermark(watermark_file, new_position, volume)
-                    if result:
-                        bot.answer_callback_query(call.id, "تم تغيير موضع العلامة المائية بنجاح")
-                    else:
-                        bot.answer_callback_query(call.id, "حدث خطأ أثناء تغيير موضع العلامة المائية")
-                else:
-                    bot.answer_callback_query(call.id, "يجب تحديد ملف العلامة المائية أولاً")
-                
-                # إعادة تحميل صفحة العلامة المائية
-                handle_admin_callback(bot, types.CallbackQuery(
-                    id=call.id, from_user=call.from_user, message=call.message, 
-                    data="admin_audio_watermark", chat_instance=call.chat_instance
-                ))
-            
-            # معالجة زر تذييل الوسوم
-            elif call.data == "admin_tag_footer":
-                bot.edit_message_text(
-                    "📝 *تذييل الوسوم*\n\n"
-                    "يمكنك إضافة نص تذييل موحد للوسوم المختلفة ليتم إضافته تلقائياً عند معالجة الملفات الصوتية.\n"
-                    "مثال: إضافة اسم قناتك أو موقعك في نهاية وسوم معينة.\n\n"
-                    "اختر إحدى الوظائف التالية:",
-                    chat_id, message_id,
-                    reply_markup=get_admin_tag_footer_markup(),
-                    parse_mode="Markdown"
-                )
-                
-            # معالجة زر إعدادات التذييل للوسوم المحددة
-            elif call.data == "admin_footer_tag_settings":
-                bot.edit_message_text(
-                    "⚙️ *إعدادات الوسوم المضاف إليها التذييل*\n\n"
-                    "اختر الوسوم التي ترغب في إضافة التذييل إليها:\n"
-                    "(اضغط على وسم لتغيير حالته)",
-                    chat_id, message_id,
-                    reply_markup=get_admin_footer_tag_settings_markup(),
-                    parse_mode="Markdown"
-                )
-            
-            # معالجة زر تفعيل/تعطيل تذييل الوسوم
-            elif call.data == "admin_toggle_tag_footer":
-                footer_enabled = admin_panel.get_setting("auto_processing.tag_footer_enabled", False)
-                if admin_panel.set_tag_footer_enabled(not footer_enabled):
-                    bot.answer_callback_query(call.id, f"تم {'تعطيل' if footer_enabled else 'تفعيل'} تذييل الوسوم بنجاح")
-                    
-                    # إعادة تحميل صفحة تذييل الوسوم
-                    handle_admin_callback(bot, types.CallbackQuery(
-                        id=call.id, from_user=call.from_user, message=call.message, 
-                        data="admin_tag_footer", chat_instance=call.chat_instance
-                    ))
-                else:
-                    bot.answer_callback_query(call.id, "حدث خطأ أثناء تغيير حالة تذييل الوسوم")
-            
-            # معالجة زر تعديل نص التذييل
-            elif call.data == "admin_edit_tag_footer":
-                # حفظ حالة المستخدم وإرسال رسالة طلب إدخال نص التذييل
-                from bot import set_user_state
-                set_user_state(call.from_user.id, "waiting_for_footer_text")
-                bot.send_message(
-                    chat_id,
-                    "📝 *تعديل نص التذييل*\n\n"
-                    "يرجى إدخال النص الذي ترغب في إضافته كتذييل للوسوم:\n"
-                    "(يمكنك استخدام النص العادي أو Markdown)",
-                    parse_mode="Markdown",
-                    reply_markup=types.InlineKeyboardMarkup().add(
-                        types.InlineKeyboardButton("🔙 إلغاء", callback_data="admin_tag_footer")
-                    )
-                )
+            markup = types.InlineKeyboardMarkup()
+            markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_templates"))
             
-            # معالجة أزرار تبديل حالة وسوم التذييل
-            elif call.data.startswith("admin_toggle_footer_tag_"):
-                tag_name = call.data.replace("admin_toggle_footer_tag_", "")
-                footer_tag_settings = admin_panel.get_setting("auto_processing.footer_tag_settings", {
-                    'artist': True,
-                    'album_artist': False,
-                    'album': False,
-                    'genre': False,
-                    'year': False,
-                    'composer': False,
-                    'comment': True,
-                    'title': False,
-                    'lyrics': True
-                })
-                
-                # تغيير حالة الوسم
-                if tag_name in footer_tag_settings:
-                    footer_tag_settings[tag_name] = not footer_tag_settings[tag_name]
-                    if admin_panel.update_footer_tag_settings(footer_tag_settings):
-                        arabic_name = get_tag_arabic_name(tag_name)
-                        bot.answer_callback_query(call.id, f"تم {'تفعيل' if footer_tag_settings[tag_name] else 'تعطيل'} التذييل لوسم {arabic_name}")
-                        
-                        # إعادة تحميل صفحة إعدادات التذييل
-                        handle_admin_callback(bot, types.CallbackQuery(
-                            id=call.id, from_user=call.from_user, message=call.message, 
-                            data="admin_footer_tag_settings", chat_instance=call.chat_instance
-                        ))
-                    else:
-                        bot.answer_callback_query(call.id, "حدث خطأ أثناء تحديث إعدادات الوسوم")
+            bot.edit_message_text(
+                templates_text,
+                chat_id, message_id,
+                reply_markup=markup
+            )
+    except Exception as e:
+        logger.error(f"خطأ في عرض القوالب: {e}")
+        bot.answer_callback_query(call.id, "حدث خطأ أثناء محاولة عرض القوالب")
+        
+        markup = types.InlineKeyboardMarkup()
+        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_templates"))
+        bot.edit_message_text(
+            "❌ حدث خطأ أثناء محاولة عرض القوالب، يرجى المحاولة مرة أخرى.",
+            chat_id, message_id,
+            reply_markup=markup
+        )
+
+@admin_callbacks.route("admin_create_template")
+def on_admin_create_template(bot, call, user_id, chat_id, message_id):
+    # إنشاء قالب عام
+    msg = bot.edit_message_text(
+        "✏️ *إنشاء قالب عام*\n\n"
+        "أرسل بيانات القالب بالتنسيق التالي:\n\n"
+        "الفنان: اسم الفنان\n"
+        "العنوان: عنوان الأغنية\n"
+        "الألبوم: اسم الألبوم\n"
+        "السنة: 2024\n"
+        "النوع: نوع الموسيقى\n"
+        "الملحن: اسم الملحن\n"
+        "التعليق: أي تعليق إضافي\n"
+        "الكلمات: كلمات الأغنية\n\n"
+        "🔄 أرسل `الغاء` للإلغاء.",
+        chat_id, message_id,
+        parse_mode="Markdown"
+    )
+    
+    from bot import set_user_state
+    set_user_state(user_id, "admin_waiting_for_template_data", {"message_id": msg.message_id})
+
+@admin_callbacks.route("admin_delete_template")
+def on_admin_delete_template(bot, call, user_id, chat_id, message_id):
+    # حذف قالب
+    from template_handler import get_all_templates
+    templates = get_all_templates()
+    
+    if not templates:
+        markup = types.InlineKeyboardMarkup()
+        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_templates"))
+        bot.edit_message_text(
+            "🗑️ *حذف قالب*\n\n"
+            "لا توجد قوالب محفوظة حالياً.",
+            chat_id, message_id,
+            reply_markup=markup,
+            parse_mode="Markdown"
+        )
+    else:
+        markup = types.InlineKeyboardMarkup(row_width=1)
+        for idx, template in enumerate(templates):
+            markup.add(types.InlineKeyboardButton(
+                f"{template['name']} ({template.get('artist', 'غير محدد')})",
+                callback_data=f"admin_delete_template_{idx}"
+            ))
+        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_templates"))
+        
+        bot.edit_message_text(
+            "🗑️ *حذف قالب*\n\n"
+            "اختر القالب الذي تريد حذفه:",
+            chat_id, message_id,
+            reply_markup=markup,
+            parse_mode="Markdown"
+        )
+
+@admin_callbacks.prefix("admin_delete_template_")
+def on_admin_delete_template_prefixed(bot, call, user_id, chat_id, message_id):
+    # حذف قالب محدد
+    idx = int(call.data.split("_")[-1])
+    from template_handler import get_all_templates, delete_template
+    templates = get_all_templates()
+    
+    if 0 <= idx < len(templates):
+        template = templates[idx]
+        template_name = template['name']
+        
+        from template_handler import get_template_path
+        template_path = get_template_path(template_name)
+        delete_result = delete_template(template_path)
+        
+        if delete_result:
+            markup = types.InlineKeyboardMarkup()
+            markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_templates"))
+            bot.edit_message_text(
+                f"✅ تم حذف القالب '{template_name}' بنجاح.",
+                chat_id, message_id,
+                reply_markup=markup
+            )
+        else:
+            markup = types.InlineKeyboardMarkup()
+            markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_templates"))
+            bot.edit_message_text(
+                f"❌ فشل في حذف القالب '{template_name}'.",
+                chat_id, message_id,
+                reply_markup=markup
+            )
+
+@admin_callbacks.route("admin_export_templates")
+def on_admin_export_templates(bot, call, user_id, chat_id, message_id):
+    # تصدير القوالب
+    # تحديد مجلد للتصدير
+    export_dir = "templates_export"
+    os.makedirs(export_dir, exist_ok=True)
+    
+    from template_handler import export_all_templates
+    export_path, count = export_all_templates(export_dir)
+    
+    if count > 0 and export_path:
+        # إرسال ملف التصدير
+        with open(export_path, 'rb') as export_file:
+            bot.send_document(
+                chat_id=chat_id,
+                document=export_file,
+                caption=f"✅ تم تصدير {count} قالب بنجاح."
+            )
+        
+        markup = types.InlineKeyboardMarkup()
+        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_templates"))
+        bot.edit_message_text(
+            f"✅ تم تصدير {count} قالب بنجاح. تم إرسال الملف.",
+            chat_id, message_id,
+            reply_markup=markup
+        )
+    else:
+        markup = types.InlineKeyboardMarkup()
+        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_templates"))
+        bot.edit_message_text(
+            "❌ فشل تصدير القوالب أو لا توجد قوالب للتصدير.",
+            chat_id, message_id,
+            reply_markup=markup
+        )
+
+@admin_callbacks.route("admin_import_templates")
+def on_admin_import_templates(bot, call, user_id, chat_id, message_id):
+    # استيراد القوالب
+    msg = bot.edit_message_text(
+        "📥 *استيراد القوالب*\n\n"
+        "أرسل ملف القوالب المضغوط (ZIP) لاستيراده.\n\n"
+        "🔄 أرسل `الغاء` للإلغاء.",
+        chat_id, message_id,
+        parse_mode="Markdown"
+    )
+    
+    from bot import set_user_state
+    set_user_state(user_id, "admin_waiting_for_templates_file", {"message_id": msg.message_id})
+
+# معالجة أزرار صفحة السجلات
+@admin_callbacks.route("admin_recent_logs")
+def on_admin_recent_logs(bot, call, user_id, chat_id, message_id):
+    # عرض آخر السجلات
+    recent_logs = admin_panel.get_recent_logs(20)
+    logs_text = get_logs_message(recent_logs, "آخر السجلات")
+    
+    markup = types.InlineKeyboardMarkup()
+    markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_logs"))
+    
+    bot.edit_message_text(
+        logs_text, 
+        chat_id, message_id,
+        reply_markup=markup, 
+        parse_mode="Markdown"
+    )
+
+@admin_callbacks.route("admin_error_logs")
+def on_admin_error_logs(bot, call, user_id, chat_id, message_id):
+    # عرض سجلات الأخطاء
+    error_logs = admin_panel.get_error_logs(20)
+    logs_text = get_logs_message(error_logs, "سجلات الأخطاء")
+    
+    markup = types.InlineKeyboardMarkup()
+    markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_logs"))
+    
+    bot.edit_message_text(
+        logs_text, 
+        chat_id, message_id,
+        reply_markup=markup, 
+        parse_mode="Markdown"
+    )
+
+@admin_callbacks.route("admin_admin_logs")
+def on_admin_admin_logs(bot, call, user_id, chat_id, message_id):
+    # عرض سجلات المشرفين
+    admin_logs = [log for log in admin_panel.get_recent_logs(50) if log.get('user_id') in admin_panel.get_setting('admins', [])]
+    logs_text = get_logs_message(admin_logs, "سجلات المشرفين")
+    
+    markup = types.InlineKeyboardMarkup()
+    markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_logs"))
+    
+    bot.edit_message_text(
+        logs_text, 
+        chat_id, message_id,
+        reply_markup=markup, 
+        parse_mode="Markdown"
+    )
+
+# معالجة أزرار البث الجماعي
+@admin_callbacks.route("admin_scheduled_broadcasts")
+def on_admin_scheduled_broadcasts(bot, call, user_id, chat_id, message_id):
+    # عرض البث المجدول
+    scheduled = admin_panel.get_scheduled_broadcasts()
+    
+    if not scheduled:
+        markup = types.InlineKeyboardMarkup()
+        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_broadcast_menu"))
+        bot.edit_message_text(
+            "📅 *البث المجدول*\n\n"
+            "لا يوجد بث مجدول حالياً.",
+            chat_id, message_id,
+            reply_markup=markup,
+            parse_mode="Markdown"
+        )
+    else:
+        broadcasts_text = "📅 *قائمة البث المجدول*\n\n"
+        markup = types.InlineKeyboardMarkup(row_width=1)
+        
+        for idx, broadcast in enumerate(scheduled):
+            broadcast_time = datetime.fromtimestamp(broadcast.get("timestamp", 0))
+            time_str = broadcast_time.strftime("%Y-%m-%d %H:%M:%S")
+            message_preview = broadcast.get("message_text", "")[:50] + "..." if len(broadcast.get("message_text", "")) > 50 else broadcast.get("message_text", "")
             
-            # معالجة زر الوسوم التلقائية
-            elif call.data == "admin_tag_replacements":
-                bot.edit_message_text(
-                    "🏷️ *إدارة استبدال الوسوم التلقائي*\n\n"
-                    "استبدال الوسوم يتيح لك تعديل قيم الوسوم تلقائياً أثناء المعالجة.\n"
-                    "مثال: استبدال كلمة 'Artist' بكلمة 'الفنان'.\n\n"
-                    "اختر إحدى الوظائف التالية:",
-                    chat_id, message_id,
-                    reply_markup=get_admin_tag_replacements_markup(),
-                    parse_mode="Markdown"
-                )
+            broadcasts_text += f"{idx+1}. {time_str}\n{message_preview}\n\n"
+            markup.add(types.InlineKeyboardButton(
+                f"❌ إلغاء البث {idx+1}",
+                callback_data=f"admin_cancel_broadcast_{broadcast.get('id')}"
+            ))
+        
+        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_broadcast_menu"))
+        
+        bot.edit_message_text(
+            broadcasts_text,
+            chat_id, message_id,
+            reply_markup=markup,
+            parse_mode="Markdown"
+        )
+
+@admin_callbacks.prefix("admin_cancel_broadcast_")
+def on_admin_cancel_broadcast(bot, call, user_id, chat_id, message_id):
+    # إلغاء بث مجدول
+    broadcast_id = int(call.data.split("_")[-1])
+    result = admin_panel.remove_scheduled_broadcast(broadcast_id)
+    
+    markup = types.InlineKeyboardMarkup()
+    markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_scheduled_broadcasts"))
+    
+    status_text = "✅ تم إلغاء البث المجدول بنجاح." if result else "❌ فشل في إلغاء البث المجدول."
+    bot.edit_message_text(
+        status_text,
+        chat_id, message_id,
+        reply_markup=markup
+    )
+
+# معالجة أزرار النسخ الاحتياطي
+@admin_callbacks.route("admin_backup_data")
+def on_admin_backup_data(bot, call, user_id, chat_id, message_id):
+    # إنشاء نسخة احتياطية
+    backup_data = admin_panel.export_data()
+    
+    if backup_data:
+        with open(backup_data, 'rb') as backup_file:
+            bot.send_document(
+                chat_id=chat_id,
+                document=backup_file,
+                caption="✅ تم إنشاء نسخة احتياطية بنجاح."
+            )
+        
+        # حذف الملف المؤقت بعد الإرسال
+        try:
+            os.remove(backup_data)
+        except:
+            pass
+        
+        markup = types.InlineKeyboardMarkup()
+        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_backup_menu"))
+        bot.edit_message_text(
+            "✅ تم إنشاء وإرسال النسخة الاحتياطية بنجاح.",
+            chat_id, message_id,
+            reply_markup=markup
+        )
+    else:
+        markup = types.InlineKeyboardMarkup()
+        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_backup_menu"))
+        bot.edit_message_text(
+            "❌ فشل في إنشاء النسخة الاحتياطية.",
+            chat_id, message_id,
+            reply_markup=markup
+        )
+
+@admin_callbacks.route("admin_restore_data")
+def on_admin_restore_data(bot, call, user_id, chat_id, message_id):
+    # استرجاع من نسخة احتياطية
+    msg = bot.edit_message_text(
+        "📤 *استرجاع البيانات*\n\n"
+        "أرسل ملف النسخة الاحتياطية للاسترجاع.\n\n"
+        "⚠️ تحذير: سيتم استبدال جميع البيانات الحالية بالبيانات من النسخة الاحتياطية.\n\n"
+        "🔄 أرسل `الغاء` للإلغاء.",
+        chat_id, message_id,
+        parse_mode="Markdown"
+    )
+    
+    from bot import set_user_state
+    set_user_state(user_id, "admin_waiting_for_backup_file", {"message_id": msg.message_id})
+
+@admin_callbacks.route("admin_clean_temp")
+def on_admin_clean_temp(bot, call, user_id, chat_id, message_id):
+    # تنظيف الملفات المؤقتة
+    result = admin_panel.clean_temp_files()
+    
+    markup = types.InlineKeyboardMarkup()
+    markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_backup_menu"))
+    
+    if isinstance(result, tuple):
+        count, size_mb = result
+        bot.edit_message_text(
+            f"✅ تم تنظيف {count} ملف مؤقت ({size_mb:.2f} ميجابايت) بنجاح.",
+            chat_id, message_id,
+            reply_markup=markup
+        )
+    else:
+        bot.edit_message_text(
+            "✅ تم تنظيف الملفات المؤقتة بنجاح.",
+            chat_id, message_id,
+            reply_markup=markup
+        )
+
+@admin_callbacks.route("admin_add_smart_rule")
+def on_admin_add_smart_rule(bot, call, user_id, chat_id, message_id):
+    # إضافة قاعدة ذكية جديدة
+    try:
+        # إنشاء رسالة الإضافة مع النموذج
+        field_options = []
+        operator_options = []
+        action_options = []
+        
+        for field in smart_rules.get_available_fields():
+            field_options.append(f"• {field['id']}: {field['name']}")
+        
+        for op in smart_rules.get_available_operators():
+            operator_options.append(f"• {op['id']}: {op['name']}")
+        
+        for action in smart_rules.get_available_actions():
+            action_options.append(f"• {action['id']}: {action['name']}")
+        
+        # إنشاء رسالة بسيطة للتعليمات بدون Markdown
+        bot.edit_message_text(
+            "🆕 إضافة قاعدة ذكية جديدة\n\n"
+            "قم بإرسال بيانات القاعدة بالتنسيق التالي:\n\n"
+            "الاسم: [اسم القاعدة]\n"
+            "الوصف: [وصف القاعدة]\n"
+            "حقل الشرط: [معرف الحقل]\n"
+            "العملية: [معرف العملية]\n"
+            "قيمة الشرط: [قيمة الشرط]\n"
+            "نوع الإجراء: [معرف الإجراء]\n"
+            "حقل الإجراء: [معرف الحقل]\n"
+            "قيمة الإجراء: [قيمة الإجراء]",
+            chat_id, message_id,
+            reply_markup=types.InlineKeyboardMarkup().add(
+                types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_smart_rules")
+            )
+        )
+        
+        # إرسال رسالة منفصلة للحقول المتاحة
+        fields_text = "الحقول المتاحة:\n"
+        for field in field_options:
+            fields_text += field + "\n"
+        bot.send_message(chat_id, fields_text)
+        
+        # إرسال رسالة منفصلة للعمليات المتاحة
+        operators_text = "العمليات المتاحة:\n"
+        for op in operator_options:
+            operators_text += op + "\n"
+        bot.send_message(chat_id, operators_text)
+        
+        # إرسال رسالة منفصلة للإجراءات المتاحة
+        actions_text = "الإجراءات المتاحة:\n"
+        for action in action_options:
+            actions_text += action + "\n"
+        bot.send_message(chat_id, actions_text)
+        
+        # إرسال مثال
+        example_text = "مثال:\n\n"
+        example_text += "الاسم: تعديل عيسى الليث\n"
+        example_text += "الوصف: إضافة السنة لأناشيد عيسى الليث\n"
+        example_text += "حقل الشرط: artist\n"
+        example_text += "العملية: contains\n"
+        example_text += "قيمة الشرط: عيسى الليث\n"
+        example_text += "نوع الإجراء: set\n"
+        example_text += "حقل الإجراء: year\n"
+        example_text += "قيمة الإجراء: 1446"
+        bot.send_message(chat_id, example_text)
+        
+        # تعيين حالة المستخدم لانتظار بيانات القاعدة
+        from bot import set_user_state
+        set_user_state(user_id, "admin_waiting_rule_data", {"message_id": message_id})
+        
+    except Exception as e:
+        logger.error(f"خطأ في صفحة إضافة قاعدة ذكية: {e}")
+
+@admin_callbacks.route("admin_view_smart_rules")
+def on_admin_view_smart_rules(bot, call, user_id, chat_id, message_id):
+    # عرض القواعد الذكية الحالية
+    try:
+        with app.app_context():
+            rules = SmartRule.query.order_by(SmartRule.priority).all()
             
-            # معالجة زر قناة السجل
-            elif call.data == "admin_log_channel":
-                current_channel = admin_panel.get_setting("settings.log_channel", "غير محددة")
-                bot.edit_message_text(
-                    f"📋 *إعداد قناة السجل*\n\n"
-                    f"قناة السجل الحالية: {current_channel}\n\n"
-                    "أرسل معرّف القناة الجديدة بالتنسيق التالي:\n"
-                    "- للقنوات العامة: @channel_name\n"
-                    "- للقنوات الخاصة: -100123456789\n\n"
-                    "أو أرسل كلمة 'حذف' لإزالة قناة السجل الحالية.",
-                    chat_id, message_id,
-                    reply_markup=types.InlineKeyboardMarkup().add(
-                        types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_advanced_settings")
-                    ),
-                    parse_mode="Markdown"
+        if not rules:
+            bot.edit_message_text(
+                "🧠 *القواعد الذكية*\n\nلا توجد قواعد ذكية مضافة بعد.",
+                chat_id, message_id,
+                parse_mode="Markdown",
+                reply_markup=types.InlineKeyboardMarkup().add(
+                    types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_smart_rules")
                 )
-                # تغيير حالة المستخدم لانتظار معرف القناة
-                from bot import set_user_state
-                set_user_state(user_id, "admin_waiting_for_log_channel")
-            
-            # معالجة زر الإحصائيات المفصلة
-            elif call.data == "admin_user_stats":
-                user_count = 0
-                active_users_today = 0
-                active_users_week = 0
-                files_processed_today = 0
-                files_processed_week = 0
-                total_files_processed = 0
-                
-                try:
-                    # عدد المستخدمين الإجمالي
-                    user_count = len(admin_panel.admin_data.get("users", {}))
-                    
-                    # المستخدمين النشطين اليوم
-                    active_today = admin_panel.get_active_users(1)
-                    active_users_today = len(active_today)
-                    
-                    # المستخدمين النشطين هذا الأسبوع
-                    active_week = admin_panel.get_active_users(7)
-                    active_users_week = len(active_week)
-                    
-                    # الملفات المعالجة
-                    for user_data in admin_panel.admin_data.get("users", {}).values():
-                        if "files_processed" in user_data:
-                            total_files_processed += user_data["files_processed"]
-                        
-                        # التحقق من آخر نشاط
-                        if "last_activity" in user_data:
-                            last_activity = user_data["last_activity"]
-                            now = time.time()
-                            # النشاط اليوم
-                            if now - last_activity < 24 * 60 * 60:
-                                files_processed_today += user_data.get("files_processed_today", 0)
-                            
-                            # النشاط هذا الأسبوع
-                            if now - last_activity < 7 * 24 * 60 * 60:
-                                files_processed_week += user_data.get("files_processed_week", 0)
-                except Exception as e:
-                    logger.error(f"خطأ في الحصول على إحصائيات المستخدمين: {e}")
-                
-                bot.edit_message_text(
-                    f"📊 *إحصائيات المستخدمين المفصلة*\n\n"
-                    f"• إجمالي المستخدمين: {user_count}\n"
-                    f"• المستخدمين النشطين اليوم: {active_users_today}\n"
-                    f"• المستخدمين النشطين هذا الأسبوع: {active_users_week}\n\n"
-                    f"• الملفات المعالجة اليوم: {files_processed_today}\n"
-                    f"• الملفات المعالجة هذا الأسبوع: {files_processed_week}\n"
-                    f"• إجمالي الملفات المعالجة: {total_files_processed}\n",
-                    chat_id, message_id,
-                    reply_markup=types.InlineKeyboardMarkup().add(
-                        types.InlineKeyboardButton("🔍 أكثر المستخدمين نشاطاً", callback_data="admin_top_users"),
-                        types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_stats")
-                    ),
-                    parse_mode="Markdown"
+            )
+            return
+        
+        rules_text = "🧠 *القواعد الذكية الحالية*\n\n"
+        for i, rule in enumerate(rules):
+            status = "✅" if rule.is_active else "❌"
+            rules_text += f"{i+1}. {status} *{rule.name}*\n"
+            rules_text += f"• الشرط: `{rule.condition_field} {rule.condition_operator} {rule.condition_value}`\n"
+            rules_text += f"• الإجراء: `{rule.action_type} {rule.action_field} {rule.action_value[:20]}{'...' if len(rule.action_value) > 20 else ''}`\n"
+            rules_text += f"• الأولوية: {rule.priority}\n\n"
+        
+        # إنشاء أزرار للقواعد
+        markup = types.InlineKeyboardMarkup(row_width=2)
+        for i, rule in enumerate(rules):
+            markup.add(
+                types.InlineKeyboardButton(
+                    f"{i+1}. {'✅' if rule.is_active else '❌'} {rule.name[:15]}...",
+                    callback_data=f"admin_rule_{rule.id}"
                 )
+            )
+        markup.add(
+            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_smart_rules")
+        )
+        
+        bot.edit_message_text(
+            rules_text,
+            chat_id, message_id,
+            parse_mode="Markdown",
+            reply_markup=markup
+        )
+    except Exception as e:
+        logger.error(f"خطأ في عرض القواعد الذكية: {e}")
+
+@admin_callbacks.route("admin_smart_rules_stats")
+def on_admin_smart_rules_stats(bot, call, user_id, chat_id, message_id):
+    # عرض إحصائيات القواعد الذكية
+    try:
+        with app.app_context():
+            total_rules = SmartRule.query.count()
+            active_rules = SmartRule.query.filter_by(is_active=True).count()
             
-            # معالجة زر إعادة تشغيل البوت
-            elif call.data == "admin_restart_bot":
-                try:
-                    bot.edit_message_text(
-                        "🔄 *إعادة تشغيل البوت*\n\n"
-                        "هل أنت متأكد أنك تريد إعادة تشغيل البوت؟ سيؤدي ذلك إلى قطع جميع الاتصالات الحالية.",
-                        chat_id, message_id,
-                        reply_markup=types.InlineKeyboardMarkup().add(
-                            types.InlineKeyboardButton("✅ نعم، إعادة التشغيل", callback_data="admin_confirm_restart"),
-                            types.InlineKeyboardButton("❌ لا، إلغاء", callback_data="admin_tools")
-                        ),
-                        parse_mode="Markdown"
-                    )
-                except Exception as e:
-                    logger.error(f"خطأ في صفحة إعادة تشغيل البوت: {e}")
-            
-            # معالجة زر تأكيد إعادة تشغيل البوت
-            elif call.data == "admin_confirm_restart":
-                try:
-                    bot.edit_message_text(
-                        "🔄 *جاري إعادة تشغيل البوت...*\n\n"
-                        "سيتم إعادة تشغيل البوت خلال لحظات. الرجاء الانتظار.",
-                        chat_id, message_id,
-                        parse_mode="Markdown"
-                    )
-                    
-                    # إرسال إشعار للمشرفين الآخرين
-                    admin_ids = admin_panel.admin_data.get("admins", [])
-                    admin_message = f"ℹ️ تم إعادة تشغيل البوت بواسطة المشرف {user_id}"
-                    
-                    for admin_id in admin_ids:
-                        if admin_id != user_id:
-                            try:
-                                bot.send_message(admin_id, admin_message)
-                            except Exception as e:
-                                logger.error(f"فشل في إرسال إشعار إعادة التشغيل للمشرف {admin_id}: {e}")
-                    
-                    # تسجيل العملية
-                    admin_panel.log_action(user_id, "restart_bot", "success")
-                    
-                    # إعادة تشغيل البوت
-                    import os, sys
-                    logger.info(f"إعادة تشغيل البوت بواسطة المشرف {user_id}")
-                    os.execl(sys.executable, sys.executable, *sys.argv)
-                    
-                except Exception as e:
-                    logger.error(f"خطأ في إعادة تشغيل البوت: {e}")
-                    bot.edit_message_text(
-                        f"❌ *فشل في إعادة تشغيل البوت*\n\n"
-                        f"حدث خطأ أثناء محاولة إعادة تشغيل البوت: {str(e)}",
-                        chat_id, message_id,
-                        reply_markup=types.InlineKeyboardMarkup().add(
-                            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_tools")
-                        ),
-                        parse_mode="Markdown"
-                    )
+            # الإحصائيات حسب نوع الإجراء
+            rules_by_action = {}
+            for action_type in ['add', 'set', 'replace']:
+                count = SmartRule.query.filter_by(action_type=action_type).count()
+                action_name = {"add": "إضافة", "set": "تعيين", "replace": "استبدال"}.get(action_type, action_type)
+                rules_by_action[action_name] = count
             
-            # معالجة زر تشخيص الأداء
-            elif call.data == "admin_performance":
-                try:
-                    # الحصول على معلومات النظام
-                    system_info = admin_panel.get_system_info()
-                    
-                    # عرض المعلومات
-                    bot.edit_message_text(
-                        f"📊 *تشخيص أداء النظام*\n\n"
-                        f"• وحدة المعالجة المركزية:\n"
-                        f"  - الاستخدام: {system_info['cpu_percent']}%\n"
-                        f"  - عدد النوى: {system_info['cpu_count']}\n\n"
-                        f"• الذاكرة:\n"
-                        f"  - المستخدمة: {system_info['memory_used']} MB\n"
-                        f"  - الإجمالية: {system_info['memory_total']} MB\n"
-                        f"  - نسبة الاستخدام: {system_info['memory_percent']}%\n\n"
-                        f"• القرص:\n"
-                        f"  - المستخدم: {system_info['disk_used']} GB\n"
-                        f"  - الإجمالي: {system_info['disk_total']} GB\n"
-                        f"  - نسبة الاستخدام: {system_info['disk_percent']}%\n\n"
-                        f"• النظام:\n"
-                        f"  - وقت التشغيل: {format_duration(system_info['uptime'])}\n"
-                        f"  - عدد العمليات: {system_info['process_count']}\n",
-                        chat_id, message_id,
-                        reply_markup=types.InlineKeyboardMarkup().add(
-                            types.InlineKeyboardButton("🔄 تحديث", callback_data="admin_performance"),
-                            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_tools")
-                        ),
-                        parse_mode="Markdown"
-                    )
-                except Exception as e:
-                    logger.error(f"خطأ في صفحة تشخيص الأداء: {e}")
-                    bot.edit_message_text(
-                        f"❌ *فشل في تحميل معلومات الأداء*\n\n"
-                        f"حدث خطأ أثناء محاولة تحميل معلومات النظام: {str(e)}",
-                        chat_id, message_id,
-                        reply_markup=types.InlineKeyboardMarkup().add(
-                            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_tools")
-                        ),
-                        parse_mode="Markdown"
-                    )
+            # الإحصائيات حسب الحقل
+            field_counts = {}
+            for rule in SmartRule.query.all():
+                field = rule.condition_field
+                field_name = {"artist": "الفنان", "title": "العنوان", "album": "الألبوم", 
+                            "genre": "النوع", "year": "السنة"}.get(field, field)
+                
+                if field_name in field_counts:
+                    field_counts[field_name] += 1
+                else:
+                    field_counts[field_name] = 1
+        
+        stats_text = "📊 *إحصائيات القواعد الذكية*\n\n"
+        stats_text += f"• إجمالي القواعد: {total_rules}\n"
+        stats_text += f"• القواعد النشطة: {active_rules}\n"
+        stats_text += f"• القواعد المعطلة: {total_rules - active_rules}\n\n"
+        
+        if rules_by_action:
+            stats_text += "*القواعد حسب نوع الإجراء:*\n"
+            for action_name, count in rules_by_action.items():
+                if count > 0:
+                    stats_text += f"• {action_name}: {count}\n"
+            stats_text += "\n"
+        
+        if field_counts:
+            stats_text += "*القواعد حسب حقل الشرط:*\n"
+            for field_name, count in field_counts.items():
+                stats_text += f"• {field_name}: {count}\n"
+        
+        bot.edit_message_text(
+            stats_text,
+            chat_id, message_id,
+            parse_mode="Markdown",
+            reply_markup=types.InlineKeyboardMarkup().add(
+                types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_smart_rules")
+            )
+        )
+    except Exception as e:
+        logger.error(f"خطأ في عرض إحصائيات القواعد الذكية: {e}")
+
+@admin_callbacks.prefix("admin_rule_")
+def on_admin_rule(bot, call, user_id, chat_id, message_id):
+    # عرض تفاصيل قاعدة ذكية محددة
+    try:
+        rule_id = int(call.data.split("_")[2])
+        with app.app_context():
+            rule = SmartRule.query.get(rule_id)
             
-            # معالجة زر تنظيف الملفات المؤقتة
-            elif call.data == "admin_clean_temp":
-                try:
-                    # قبل التنظيف
-                    before_count = len(os.listdir("temp_audio_files"))
-                    before_size = sum(os.path.getsize(os.path.join("temp_audio_files", f)) for f in os.listdir("temp_audio_files") if os.path.isfile(os.path.join("temp_audio_files", f)))
-                    before_size_mb = before_size / (1024 * 1024)
-                    
-                    # تنظيف الملفات المؤقتة
-                    admin_panel.clean_temp_files()
-                    
-                    # بعد التنظيف
-                    after_count = len(os.listdir("temp_audio_files"))
-                    after_size = sum(os.path.getsize(os.path.join("temp_audio_files", f)) for f in os.listdir("temp_audio_files") if os.path.isfile(os.path.join("temp_audio_files", f)))
-                    after_size_mb = after_size / (1024 * 1024)
-                    
-                    bot.edit_message_text(
-                        f"🧹 *تم تنظيف الملفات المؤقتة بنجاح*\n\n"
-                        f"• قبل التنظيف:\n"
-                        f"  - عدد الملفات: {before_count}\n"
-                        f"  - الحجم الإجمالي: {before_size_mb:.2f} MB\n\n"
-                        f"• بعد التنظيف:\n"
-                        f"  - عدد الملفات: {after_count}\n"
-                        f"  - الحجم الإجمالي: {after_size_mb:.2f} MB\n\n"
-                        f"• تم توفير: {before_size_mb - after_size_mb:.2f} MB",
-                        chat_id, message_id,
-                        reply_markup=types.InlineKeyboardMarkup().add(
-                            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_tools")
-                        ),
-                        parse_mode="Markdown"
-                    )
-                except Exception as e:
-                    logger.error(f"خطأ في تنظيف الملفات المؤقتة: {e}")
-                    bot.edit_message_text(
-                        f"❌ *فشل في تنظيف الملفات المؤقتة*\n\n"
-                        f"حدث خطأ أثناء محاولة تنظيف الملفات المؤقتة: {str(e)}",
-                        chat_id, message_id,
-                        reply_markup=types.InlineKeyboardMarkup().add(
-                            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_tools")
-                        ),
-                        parse_mode="Markdown"
-                    )
+        if not rule:
+            bot.answer_callback_query(call.id, "القاعدة غير موجودة")
+            return
+        
+        # تحويل معرفات الحقول والعمليات إلى أسماء عربية
+        field_names = {f["id"]: f["name"] for f in smart_rules.get_available_fields()}
+        operator_names = {o["id"]: o["name"] for o in smart_rules.get_available_operators()}
+        action_names = {a["id"]: a["name"] for a in smart_rules.get_available_actions()}
+        
+        rule_text = f"🧠 *تفاصيل القاعدة: {rule.name}*\n\n"
+        rule_text += f"*الوصف:* {rule.description or 'لا يوجد وصف'}\n\n"
+        rule_text += "*الشرط:*\n"
+        rule_text += f"• الحقل: {field_names.get(rule.condition_field, rule.condition_field)}\n"
+        rule_text += f"• العملية: {operator_names.get(rule.condition_operator, rule.condition_operator)}\n"
+        rule_text += f"• القيمة: `{rule.condition_value}`\n\n"
+        
+        rule_text += "*الإجراء:*\n"
+        rule_text += f"• النوع: {action_names.get(rule.action_type, rule.action_type)}\n"
+        rule_text += f"• الحقل: {field_names.get(rule.action_field, rule.action_field)}\n"
+        rule_text += f"• القيمة: `{rule.action_value}`\n\n"
+        
+        rule_text += f"*الأولوية:* {rule.priority}\n"
+        rule_text += f"*الحالة:* {'نشطة ✅' if rule.is_active else 'معطلة ❌'}\n"
+        rule_text += f"*تاريخ الإنشاء:* {rule.created_at.strftime('%Y-%m-%d')}\n"
+        rule_text += f"*آخر تحديث:* {rule.updated_at.strftime('%Y-%m-%d')}\n"
+        
+        # إنشاء أزرار التحكم
+        markup = types.InlineKeyboardMarkup(row_width=2)
+        markup.add(
+            types.InlineKeyboardButton(
+                f"{'تعطيل ❌' if rule.is_active else 'تفعيل ✅'}",
+                callback_data=f"admin_toggle_rule_{rule_id}"
+            ),
+            types.InlineKeyboardButton("حذف 🗑", callback_data=f"admin_delete_rule_{rule_id}")
+        )
+        markup.add(
+            types.InlineKeyboardButton("تعديل الأولوية", callback_data=f"admin_edit_rule_priority_{rule_id}")
+        )
+        markup.add(
+            types.InlineKeyboardButton("🔙 رجوع للقواعد", callback_data="admin_view_smart_rules")
+        )
+        
+        bot.edit_message_text(
+            rule_text,
+            chat_id, message_id,
+            parse_mode="Markdown",
+            reply_markup=markup
+        )
+    except Exception as e:
+        logger.error(f"خطأ في عرض تفاصيل القاعدة: {e}")
+
+@admin_callbacks.prefix("admin_toggle_rule_")
+def on_admin_toggle_rule(bot, call, user_id, chat_id, message_id):
+    # تفعيل/تعطيل قاعدة ذكية
+    try:
+        rule_id = int(call.data.split("_")[3])
+        result = smart_rules.toggle_rule_status(rule_id)
+        
+        if result:
+            with app.app_context():
+                rule = SmartRule.query.get(rule_id)
+                status = "تفعيل" if rule.is_active else "تعطيل"
+            bot.answer_callback_query(call.id, f"تم {status} القاعدة بنجاح")
+            # إعادة عرض تفاصيل القاعدة
+            handle_admin_callback(bot, types.CallbackQuery(
+                id=call.id, from_user=call.from_user, message=call.message, 
+                data=f"admin_rule_{rule_id}", chat_instance=call.chat_instance
+            ))
+        else:
+            bot.answer_callback_query(call.id, "فشل في تغيير حالة القاعدة")
+    except Exception as e:
+        logger.error(f"خطأ في تغيير حالة القاعدة: {e}")
+
+@admin_callbacks.prefix("admin_delete_rule_")
+def on_admin_delete_rule(bot, call, user_id, chat_id, message_id):
+    # حذف قاعدة ذكية
+    try:
+        rule_id = int(call.data.split("_")[3])
+        
+        # عرض رسالة تأكيد الحذف
+        with app.app_context():
+            rule = SmartRule.query.get(rule_id)
+            rule_name = rule.name if rule else "القاعدة"
+        
+        bot.edit_message_text(
+            f"⚠️ *تأكيد حذف القاعدة*\n\nهل أنت متأكد من حذف القاعدة **{rule_name}**؟ هذا الإجراء لا يمكن التراجع عنه.",
+            chat_id, message_id,
+            parse_mode="Markdown",
+            reply_markup=types.InlineKeyboardMarkup(row_width=2).add(
+                types.InlineKeyboardButton("نعم، حذف ✅", callback_data=f"admin_confirm_delete_rule_{rule_id}"),
+                types.InlineKeyboardButton("إلغاء ❌", callback_data=f"admin_rule_{rule_id}")
+            )
+        )
+    except Exception as e:
+        logger.error(f"خطأ في صفحة حذف القاعدة: {e}")
+
+@admin_callbacks.prefix("admin_confirm_delete_rule_")
+def on_admin_confirm_delete_rule(bot, call, user_id, chat_id, message_id):
+    # تأكيد حذف القاعدة
+    try:
+        rule_id = int(call.data.split("_")[4])
+        result = smart_rules.delete_rule(rule_id)
+        
+        if result:
+            bot.answer_callback_query(call.id, "تم حذف القاعدة بنجاح")
+            # العودة لقائمة القواعد
+            handle_admin_callback(bot, types.CallbackQuery(
+                id=call.id, from_user=call.from_user, message=call.message, 
+                data="admin_view_smart_rules", chat_instance=call.chat_instance
+            ))
+        else:
+            bot.answer_callback_query(call.id, "فشل في حذف القاعدة")
+    except Exception as e:
+        logger.error(f"خطأ في حذف القاعدة: {e}")
+
+@admin_callbacks.prefix("admin_edit_rule_priority_")
+def on_admin_edit_rule_priority(bot, call, user_id, chat_id, message_id):
+    # تعديل أولوية القاعدة
+    try:
+        rule_id = int(call.data.split("_")[4])
+        
+        with app.app_context():
+            rule = SmartRule.query.get(rule_id)
             
-            # معالجة زر حالة النظام
-            elif call.data == "admin_system_status":
-                try:
-                    bot.edit_message_text(
-                        get_system_status_message(),
-                        chat_id, message_id,
-                        reply_markup=types.InlineKeyboardMarkup().add(
-                            types.InlineKeyboardButton("🔄 تحديث", callback_data="admin_system_status"),
-                            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_tools")
-                        ),
-                        parse_mode="Markdown"
-                    )
-                except Exception as e:
-                    logger.error(f"خطأ في عرض حالة النظام: {e}")
-                    bot.edit_message_text(
-                        f"❌ *فشل في تحميل حالة النظام*\n\n"
-                        f"حدث خطأ أثناء محاولة تحميل حالة النظام: {str(e)}",
-                        chat_id, message_id,
-                        reply_markup=types.InlineKeyboardMarkup().add(
-                            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_tools")
-                        ),
-                        parse_mode="Markdown"
-                    )
+        if not rule:
+            bot.answer_callback_query(call.id, "القاعدة غير موجودة")
+            return
+        
+        bot.edit_message_text(
+            f"🔢 *تعديل أولوية القاعدة*\n\nالقاعدة: **{rule.name}**\nالأولوية الحالية: **{rule.priority}**\n\nأدخل قيمة الأولوية الجديدة (رقم بين 1 و100، الرقم الأقل يعني أولوية أعلى):",
+            chat_id, message_id,
+            parse_mode="Markdown",
+            reply_markup=types.InlineKeyboardMarkup().add(
+                types.InlineKeyboardButton("🔙 إلغاء", callback_data=f"admin_rule_{rule_id}")
+            )
+        )
+        
+        # تعيين حالة المستخدم لانتظار الأولوية الجديدة
+        from bot import set_user_state
+        set_user_state(user_id, f"admin_waiting_rule_priority_{rule_id}", {"message_id": message_id})
+        
+    except Exception as e:
+        logger.error(f"خطأ في صفحة تعديل الأولوية: {e}")
+
+# معالجة زر إضافة مشرف
+@admin_callbacks.route("admin_add_admin")
+def on_admin_add_admin(bot, call, user_id, chat_id, message_id):
+    bot.edit_message_text(
+        "👤 *إضافة مشرف جديد*\n\n"
+        "أرسل معرّف المستخدم (User ID) الذي تريد إضافته كمشرف جديد.",
+        chat_id, message_id,
+        reply_markup=types.InlineKeyboardMarkup().add(
+            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_users")
+        ),
+        parse_mode="Markdown"
+    )
+    # تغيير حالة المستخدم لانتظار معرف المستخدم الجديد
+    from bot import set_user_state
+    set_user_state(user_id, "admin_waiting_for_admin_id")
+
+# معالجة زر إلغاء حظر مستخدم
+@admin_callbacks.route("admin_unblock_user")
+def on_admin_unblock_user(bot, call, user_id, chat_id, message_id):
+    bot.edit_message_text(
+        "🔓 *إلغاء حظر مستخدم*\n\n"
+        "أرسل معرّف المستخدم (User ID) الذي تريد إلغاء حظره.",
+        chat_id, message_id,
+        reply_markup=types.InlineKeyboardMarkup().add(
+            types.InlineKeyboardButton("📋 قائمة المحظورين", callback_data="admin_blocked_users"),
+            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_users")
+        ),
+        parse_mode="Markdown"
+    )
+    # تغيير حالة المستخدم لانتظار معرف المستخدم
+    from bot import set_user_state
+    set_user_state(user_id, "admin_waiting_for_unblock_id")
+
+# معالجة زر حظر مستخدم
+@admin_callbacks.route("admin_block_user")
+def on_admin_block_user(bot, call, user_id, chat_id, message_id):
+    bot.edit_message_text(
+        "🚫 *حظر مستخدم*\n\n"
+        "أرسل معرّف المستخدم (User ID) الذي تريد حظره من استخدام البوت.",
+        chat_id, message_id,
+        reply_markup=types.InlineKeyboardMarkup().add(
+            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_users")
+        ),
+        parse_mode="Markdown"
+    )
+    # تغيير حالة المستخدم لانتظار معرف المستخدم
+    from bot import set_user_state
+    set_user_state(user_id, "admin_waiting_for_block_id")
+
+# معالجة زر البث الجماعي
+@admin_callbacks.route("admin_broadcast")
+def on_admin_broadcast(bot, call, user_id, chat_id, message_id):
+    bot.edit_message_text(
+        "📢 *البث الجماعي*\n\n"
+        "اختر نوع البث الذي تريد إرساله:",
+        chat_id, message_id,
+        reply_markup=get_admin_broadcast_menu_markup(),
+        parse_mode="Markdown"
+    )
+
+# معالجة زر إرسال رسالة نصية للجميع
+@admin_callbacks.route("admin_broadcast_text")
+def on_admin_broadcast_text(bot, call, user_id, chat_id, message_id):
+    bot.edit_message_text(
+        "📝 *إرسال رسالة نصية لجميع المستخدمين*\n\n"
+        "أرسل النص الذي تريد بثه لجميع مستخدمي البوت.\n"
+        "يمكنك استخدام تنسيق Markdown.\n\n"
+        "مثال: *نص غامق* _نص مائل_ `نص برمجي`",
+        chat_id, message_id,
+        reply_markup=types.InlineKeyboardMarkup().add(
+            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_broadcast")
+        ),
+        parse_mode="Markdown"
+    )
+    # تغيير حالة المستخدم لانتظار نص البث
+    from bot import set_user_state
+    set_user_state(user_id, "admin_waiting_for_broadcast_text")
+
+# معالجة زر ملاحظات الاستخدام
+@admin_callbacks.route("admin_usage_notes")
+def on_admin_usage_notes(bot, call, user_id, chat_id, message_id):
+    current_notes = admin_panel.get_setting("bot_info.usage_notes", "لا توجد ملاحظات حالياً")
+    bot.edit_message_text(
+        "📝 *تعديل ملاحظات الاستخدام*\n\n"
+        f"الملاحظات الحالية:\n{current_notes}\n\n"
+        "أرسل ملاحظات الاستخدام الجديدة التي ستظهر للمستخدمين.",
+        chat_id, message_id,
+        reply_markup=types.InlineKeyboardMarkup().add(
+            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_settings")
+        ),
+        parse_mode="Markdown"
+    )
+    # تغيير حالة المستخدم لانتظار ملاحظات الاستخدام
+    from bot import set_user_state
+    set_user_state(user_id, "admin_waiting_for_usage_notes")
+
+# معالجة زر وصف البوت
+@admin_callbacks.route("admin_bot_description")
+def on_admin_bot_description(bot, call, user_id, chat_id, message_id):
+    current_description = admin_panel.get_setting("bot_info.description", "لا يوجد وصف حالياً")
+    bot.edit_message_text(
+        "📝 *تعديل وصف البوت*\n\n"
+        f"الوصف الحالي:\n{current_description}\n\n"
+        "أرسل وصف البوت الجديد الذي سيظهر في القائمة الرئيسية وعند استخدام أمر /start.",
+        chat_id, message_id,
+        reply_markup=types.InlineKeyboardMarkup().add(
+            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_settings")
+        ),
+        parse_mode="Markdown"
+    )
+    # تغيير حالة المستخدم لانتظار وصف البوت
+    from bot import set_user_state
+    set_user_state(user_id, "admin_waiting_for_bot_description")
+
+# معالجة زر إعادة تعيين حدود المستخدمين
+@admin_callbacks.route("admin_reset_all_limits")
+def on_admin_reset_all_limits(bot, call, user_id, chat_id, message_id):
+    # إعادة تعيين حدود جميع المستخدمين
+    result = admin_panel.reset_user_limit()
+    if result:
+        bot.edit_message_text(
+            "✅ تم إعادة تعيين حدود جميع المستخدمين بنجاح!",
+            chat_id, message_id,
+            reply_markup=types.InlineKeyboardMarkup().add(
+                types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_settings")
+            )
+        )
+    else:
+        bot.edit_message_text(
+            "❌ حدث خطأ أثناء إعادة تعيين حدود المستخدمين.",
+            chat_id, message_id,
+            reply_markup=types.InlineKeyboardMarkup().add(
+                types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_settings")
+            )
+        )
+
+# معالجة زر العلامة المائية الصوتية
+@admin_callbacks.route("admin_audio_watermark")
+def on_admin_audio_watermark(bot, call, user_id, chat_id, message_id):
+    watermark_enabled = admin_panel.get_setting("audio_watermark.enabled", False)
+    watermark_file = admin_panel.get_setting("audio_watermark.file", "غير محدد")
+    watermark_position = admin_panel.get_setting("audio_watermark.position", "start")
+    watermark_volume = admin_panel.get_setting("audio_watermark.volume", 0.5)
+    
+    status = "✅ مفعلة" if watermark_enabled else "❌ معطلة"
+    position_text = "بداية الملف" if watermark_position == "start" else "نهاية الملف"
+    
+    bot.edit_message_text(
+        f"🔊 *إعدادات العلامة المائية الصوتية*\n\n"
+        f"• الحالة: {status}\n"
+        f"• الملف الحالي: {watermark_file}\n"
+        f"• الموضع: {position_text}\n"
+        f"• مستوى الصوت: {int(watermark_volume * 100)}%\n\n"
+        "اختر الإجراء الذي تريد تنفيذه:",
+        chat_id, message_id,
+        reply_markup=types.InlineKeyboardMarkup(row_width=1).add(
+            types.InlineKeyboardButton(
+                "✅ تفعيل العلامة المائية" if not watermark_enabled else "❌ تعطيل العلامة المائية", 
+                callback_data="admin_toggle_watermark"
+            ),
+            types.InlineKeyboardButton("📁 تغيير ملف العلامة المائية", callback_data="admin_change_watermark_file"),
+            types.InlineKeyboardButton(
+                f"📍 تغيير الموضع ({position_text})", 
+                callback_data="admin_toggle_watermark_position"
+            ),
+            types.InlineKeyboardButton(f"🔊 ضبط مستوى الصوت ({int(watermark_volume * 100)}%)", callback_data="admin_watermark_volume"),
+            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_settings")
+        ),
+        parse_mode="Markdown"
+    )
+
+# معالجة زر تبديل حالة العلامة المائية
+@admin_callbacks.route("admin_toggle_watermark")
+def on_admin_toggle_watermark(bot, call, user_id, chat_id, message_id):
+    current_state = admin_panel.get_setting("audio_watermark.enabled", False)
+    new_state = not current_state
+    result = admin_panel.enable_audio_watermark(new_state)
+    
+    if result:
+        bot.answer_callback_query(call.id, "تم تغيير حالة العلامة المائية بنجاح")
+        # إعادة تحميل صفحة العلامة المائية
+        handle_admin_callback(bot, types.CallbackQuery(
+            id=call.id, from_user=call.from_user, message=call.message, 
+            data="admin_audio_watermark", chat_instance=call.chat_instance
+        ))
+    else:
+        bot.answer_callback_query(call.id, "حدث خطأ أثناء تغيير حالة العلامة المائية")
+
+# معالجة زر تغيير موضع العلامة المائية
+@admin_callbacks.route("admin_toggle_watermark_position")
+def on_admin_toggle_watermark_position(bot, call, user_id, chat_id, message_id):
+    current_position = admin_panel.get_setting("audio_watermark.position", "start")
+    new_position = "end" if current_position == "start" else "start"
+    
+    # تحديث الموضع
+    watermark_file = admin_panel.get_setting("audio_watermark.file", "")
+    volume = admin_panel.get_setting("audio_watermark.volume", 0.5)
+    
+    if watermark_file:
+        result = admin_panel.set_audio_watermark(watermark_file, new_position, volume)
+        if result:
+            bot.answer_callback_query(call.id, "تم تغيير موضع العلامة المائية بنجاح")
+        else:
+            bot.answer_callback_query(call.id, "حدث خطأ أثناء تغيير موضع العلامة المائية")
+    else:
+        bot.answer_callback_query(call.id, "يجب تحديد ملف العلامة المائية أولاً")
+    
+    # إعادة تحميل صفحة العلامة المائية
+    handle_admin_callback(bot, types.CallbackQuery(
+        id=call.id, from_user=call.from_user, message=call.message, 
+        data="admin_audio_watermark", chat_instance=call.chat_instance
+    ))
+
+# معالجة زر تذييل الوسوم
+@admin_callbacks.route("admin_tag_footer")
+def on_admin_tag_footer(bot, call, user_id, chat_id, message_id):
+    bot.edit_message_text(
+        "📝 *تذييل الوسوم*\n\n"
+        "يمكنك إضافة نص تذييل موحد للوسوم المختلفة ليتم إضافته تلقائياً عند معالجة الملفات الصوتية.\n"
+        "مثال: إضافة اسم قناتك أو موقعك في نهاية وسوم معينة.\n\n"
+        "اختر إحدى الوظائف التالية:",
+        chat_id, message_id,
+        reply_markup=get_admin_tag_footer_markup(),
+        parse_mode="Markdown"
+    )
+
+# معالجة زر إعدادات التذييل للوسوم المحددة
+@admin_callbacks.route("admin_footer_tag_settings")
+def on_admin_footer_tag_settings(bot, call, user_id, chat_id, message_id):
+    bot.edit_message_text(
+        "⚙️ *إعدادات الوسوم المضاف إليها التذييل*\n\n"
+        "اختر الوسوم التي ترغب في إضافة التذييل إليها:\n"
+        "(اضغط على وسم لتغيير حالته)",
+        chat_id, message_id,
+        reply_markup=get_admin_footer_tag_settings_markup(),
+        parse_mode="Markdown"
+    )
+
+# معالجة زر تفعيل/تعطيل تذييل الوسوم
+@admin_callbacks.route("admin_toggle_tag_footer")
+def on_admin_toggle_tag_footer(bot, call, user_id, chat_id, message_id):
+    footer_enabled = admin_panel.get_setting("auto_processing.tag_footer_enabled", False)
+    if admin_panel.set_tag_footer_enabled(not footer_enabled):
+        bot.answer_callback_query(call.id, f"تم {'تعطيل' if footer_enabled else 'تفعيل'} تذييل الوسوم بنجاح")
+        
+        # إعادة تحميل صفحة تذييل الوسوم
+        handle_admin_callback(bot, types.CallbackQuery(
+            id=call.id, from_user=call.from_user, message=call.message, 
+            data="admin_tag_footer", chat_instance=call.chat_instance
+        ))
+    else:
+        bot.answer_callback_query(call.id, "حدث خطأ أثناء تغيير حالة تذييل الوسوم")
+
+# معالجة زر تعديل نص التذييل
+@admin_callbacks.route("admin_edit_tag_footer")
+def on_admin_edit_tag_footer(bot, call, user_id, chat_id, message_id):
+    # حفظ حالة المستخدم وإرسال رسالة طلب إدخال نص التذييل
+    from bot import set_user_state
+    set_user_state(call.from_user.id, "waiting_for_footer_text")
+    bot.send_message(
+        chat_id,
+        "📝 *تعديل نص التذييل*\n\n"
+        "يرجى إدخال النص الذي ترغب في إضافته كتذييل للوسوم:\n"
+        "(يمكنك استخدام النص العادي أو Markdown)",
+        parse_mode="Markdown",
+        reply_markup=types.InlineKeyboardMarkup().add(
+            types.InlineKeyboardButton("🔙 إلغاء", callback_data="admin_tag_footer")
+        )
+    )
+
+# معالجة أزرار تبديل حالة وسوم التذييل
+@admin_callbacks.prefix("admin_toggle_footer_tag_")
+def on_admin_toggle_footer_tag(bot, call, user_id, chat_id, message_id):
+    tag_name = call.data.replace("admin_toggle_footer_tag_", "")
+    footer_tag_settings = admin_panel.get_setting("auto_processing.footer_tag_settings", {
+        'artist': True,
+        'album_artist': False,
+        'album': False,
+        'genre': False,
+        'year': False,
+        'composer': False,
+        'comment': True,
+        'title': False,
+        'lyrics': True
+    })
+    
+    # تغيير حالة الوسم
+    if tag_name in footer_tag_settings:
+        footer_tag_settings[tag_name] = not footer_tag_settings[tag_name]
+        if admin_panel.update_footer_tag_settings(footer_tag_settings):
+            arabic_name = get_tag_arabic_name(tag_name)
+            bot.answer_callback_query(call.id, f"تم {'تفعيل' if footer_tag_settings[tag_name] else 'تعطيل'} التذييل لوسم {arabic_name}")
             
-            # معالجة زر إضافة قاعدة ذكية
-            elif call.data == "admin_add_smart_rule":
-                try:
-                    # إعداد نموذج لإدخال بيانات القاعدة
-                    rule_template = (
-                        "الاسم: قاعدة جديدة\n"
-                        "الوصف: وصف القاعدة\n"
-                        "حقل الشرط: artist\n"
-                        "العملية: contains\n"
-                        "قيمة الشرط: اسم الفنان\n"
-                        "نوع الإجراء: replace\n"
-                        "حقل الإجراء: title\n"
-                        "قيمة الإجراء: القيمة الجديدة"
-                    )
-                    
-                    bot.edit_message_text(
-                        "🆕 *إضافة قاعدة ذكية جديدة*\n\n"
-                        "أرسل بيانات القاعدة بالتنسيق التالي:\n\n"
-                        f"```\n{rule_template}\n```\n\n"
-                        "العمليات المتاحة: equals, contains, startswith, endswith\n"
-                        "أنواع الإجراءات المتاحة: replace, add, set\n"
-                        "حقول الشرط والإجراء المتاحة: artist, title, album, year, genre, composer, comment, track, length, lyrics, albumartist",
-                        chat_id, message_id,
-                        reply_markup=types.InlineKeyboardMarkup().add(
-                            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_smart_rules")
-                        ),
-                        parse_mode="Markdown"
-                    )
-                    
-                    # تعيين حالة المستخدم لانتظار بيانات القاعدة
-                    from bot import set_user_state
-                    set_user_state(user_id, "admin_waiting_rule_data", {"message_id": message_id})
-                    
-                except Exception as e:
-                    logger.error(f"خطأ في صفحة إضافة قاعدة ذكية: {e}")
-                    bot.edit_message_text(
-                        f"❌ *فشل في تحميل صفحة إضافة قاعدة ذكية*\n\n"
-                        f"حدث خطأ: {str(e)}",
-                        chat_id, message_id,
-                        reply_markup=types.InlineKeyboardMarkup().add(
-                            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_smart_rules")
-                        ),
-                        parse_mode="Markdown"
-                    )
+            # إعادة تحميل صفحة إعدادات التذييل
+            handle_admin_callback(bot, types.CallbackQuery(
+                id=call.id, from_user=call.from_user, message=call.message, 
+                data="admin_footer_tag_settings", chat_instance=call.chat_instance
+            ))
+        else:
+            bot.answer_callback_query(call.id, "حدث خطأ أثناء تحديث إعدادات الوسوم")
+
+# معالجة زر الإحصائيات المفصلة
+@admin_callbacks.route("admin_user_stats")
+def on_admin_user_stats(bot, call, user_id, chat_id, message_id):
+    user_count = 0
+    active_users_today = 0
+    active_users_week = 0
+    files_processed_today = 0
+    files_processed_week = 0
+    total_files_processed = 0
+    
+    try:
+        # عدد المستخدمين الإجمالي
+        user_count = len(admin_panel.admin_data.get("users", {}))
+        
+        # المستخدمين النشطين اليوم
+        active_today = admin_panel.get_active_users(1)
+        active_users_today = len(active_today)
+        
+        # المستخدمين النشطين هذا الأسبوع
+        active_week = admin_panel.get_active_users(7)
+        active_users_week = len(active_week)
+        
+        # الملفات المعالجة
+        for user_data in admin_panel.admin_data.get("users", {}).values():
+            if "files_processed" in user_data:
+                total_files_processed += user_data["files_processed"]
             
-            # معالجة أزرار التبديل (toggle) للإعدادات المختلفة
-            elif call.data.startswith("admin_toggle_"):
-                feature_name = call.data.replace("admin_toggle_", "")
-                
+            # التحقق من آخر نشاط
+            if "last_activity" in user_data:
+                last_activity = user_data["last_activity"]
+                now = time.time()
+                # النشاط اليوم
+                if now - last_activity < 24 * 60 * 60:
+                    files_processed_today += user_data.get("files_processed_today", 0)
+                
+                # النشاط هذا الأسبوع
+                if now - last_activity < 7 * 24 * 60 * 60:
+                    files_processed_week += user_data.get("files_processed_week", 0)
+    except Exception as e:
+        logger.error(f"خطأ في الحصول على إحصائيات المستخدمين: {e}")
+    
+    bot.edit_message_text(
+        f"📊 *إحصائيات المستخدمين المفصلة*\n\n"
+        f"• إجمالي المستخدمين: {user_count}\n"
+        f"• المستخدمين النشطين اليوم: {active_users_today}\n"
+        f"• المستخدمين النشطين هذا الأسبوع: {active_users_week}\n\n"
+        f"• الملفات المعالجة اليوم: {files_processed_today}\n"
+        f"• الملفات المعالجة هذا الأسبوع: {files_processed_week}\n"
+        f"• إجمالي الملفات المعالجة: {total_files_processed}\n",
+        chat_id, message_id,
+        reply_markup=types.InlineKeyboardMarkup().add(
+            types.InlineKeyboardButton("🔍 أكثر المستخدمين نشاطاً", callback_data="admin_top_users"),
+            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_stats")
+        ),
+        parse_mode="Markdown"
+    )
+
+# معالجة زر إعادة تشغيل البوت
+@admin_callbacks.route("admin_restart_bot")
+def on_admin_restart_bot(bot, call, user_id, chat_id, message_id):
+    try:
+        bot.edit_message_text(
+            "🔄 *إعادة تشغيل البوت*\n\n"
+            "هل أنت متأكد أنك تريد إعادة تشغيل البوت؟ سيؤدي ذلك إلى قطع جميع الاتصالات الحالية.",
+            chat_id, message_id,
+            reply_markup=types.InlineKeyboardMarkup().add(
+                types.InlineKeyboardButton("✅ نعم، إعادة التشغيل", callback_data="admin_confirm_restart"),
+                types.InlineKeyboardButton("❌ لا، إلغاء", callback_data="admin_tools")
+            ),
+            parse_mode="Markdown"
+        )
+    except Exception as e:
+        logger.error(f"خطأ في صفحة إعادة تشغيل البوت: {e}")
+
+# معالجة زر تأكيد إعادة تشغيل البوت
+@admin_callbacks.route("admin_confirm_restart")
+def on_admin_confirm_restart(bot, call, user_id, chat_id, message_id):
+    try:
+        bot.edit_message_text(
+            "🔄 *جاري إعادة تشغيل البوت...*\n\n"
+            "سيتم إعادة تشغيل البوت خلال لحظات. الرجاء الانتظار.",
+            chat_id, message_id,
+            parse_mode="Markdown"
+        )
+        
+        # إرسال إشعار للمشرفين الآخرين
+        admin_ids = admin_panel.admin_data.get("admins", [])
+        admin_message = f"ℹ️ تم إعادة تشغيل البوت بواسطة المشرف {user_id}"
+        
+        for admin_id in admin_ids:
+            if admin_id != user_id:
                 try:
-                    current_state = admin_panel.get_setting(f"features_enabled.{feature_name}", True)
-                    new_state = not current_state
-                    
-                    if admin_panel.update_setting(f"features_enabled.{feature_name}", new_state):
-                        state_text = "تفعيل" if new_state else "تعطيل"
-                        feature_text = {
-                            "lyrics": "كلمات الأغاني",
-                            "album_art": "صورة الألبوم",
-                            "templates": "القوالب",
-                            "required_subscription": "الاشتراك الإجباري",
-                            "auto_processing": "المعالجة التلقائية"
-                        }.get(feature_name, feature_name)
-                        
-                        bot.answer_callback_query(call.id, f"تم {state_text} {feature_text} بنجاح")
-                        
-                        # إعادة تحميل صفحة الإعدادات
-                        handle_admin_callback(bot, types.CallbackQuery(
-                            id=call.id, from_user=call.from_user, message=call.message, 
-                            data="admin_settings", chat_instance=call.chat_instance
-                        ))
-                    else:
-                        bot.answer_callback_query(call.id, "فشل في تحديث الإعداد")
+                    bot.send_message(admin_id, admin_message)
                 except Exception as e:
-                    logger.error(f"خطأ في تبديل حالة الميزة '{feature_name}': {e}")
-                    bot.answer_callback_query(call.id, f"حدث خطأ: {str(e)}")
+                    logger.error(f"فشل في إرسال إشعار إعادة التشغيل للمشرف {admin_id}: {e}")
+        
+        # تسجيل العملية
+        admin_panel.log_action(user_id, "restart_bot", "success")
+        
+        # إعادة تشغيل البوت
+        import os, sys
+        logger.info(f"إعادة تشغيل البوت بواسطة المشرف {user_id}")
+        os.execl(sys.executable, sys.executable, *sys.argv)
+        
+    except Exception as e:
+        logger.error(f"خطأ في إعادة تشغيل البوت: {e}")
+        bot.edit_message_text(
+            f"❌ *فشل في إعادة تشغيل البوت*\n\n"
+            f"حدث خطأ أثناء محاولة إعادة تشغيل البوت: {str(e)}",
+            chat_id, message_id,
+            reply_markup=types.InlineKeyboardMarkup().add(
+                types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_tools")
+            ),
+            parse_mode="Markdown"
+        )
+
+# معالجة زر تشخيص الأداء
+@admin_callbacks.route("admin_performance")
+def on_admin_performance(bot, call, user_id, chat_id, message_id):
+    try:
+        # الحصول على معلومات النظام
+        system_info = admin_panel.get_system_info()
+        
+        # عرض المعلومات
+        bot.edit_message_text(
+            f"📊 *تشخيص أداء النظام*\n\n"
+            f"• وحدة المعالجة المركزية:\n"
+            f"  - الاستخدام: {system_info['cpu_percent']}%\n"
+            f"  - عدد النوى: {system_info['cpu_count']}\n\n"
+            f"• الذاكرة:\n"
+            f"  - المستخدمة: {system_info['memory_used']} MB\n"
+            f"  - الإجمالية: {system_info['memory_total']} MB\n"
+            f"  - نسبة الاستخدام: {system_info['memory_percent']}%\n\n"
+            f"• القرص:\n"
+            f"  - المستخدم: {system_info['disk_used']} GB\n"
+            f"  - الإجمالي: {system_info['disk_total']} GB\n"
+            f"  - نسبة الاستخدام: {system_info['disk_percent']}%\n\n"
+            f"• النظام:\n"
+            f"  - وقت التشغيل: {format_duration(system_info['uptime'])}\n"
+            f"  - عدد العمليات: {system_info['process_count']}\n",
+            chat_id, message_id,
+            reply_markup=types.InlineKeyboardMarkup().add(
+                types.InlineKeyboardButton("🔄 تحديث", callback_data="admin_performance"),
+                types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_tools")
+            ),
+            parse_mode="Markdown"
+        )
+    except Exception as e:
+        logger.error(f"خطأ في صفحة تشخيص الأداء: {e}")
+        bot.edit_message_text(
+            f"❌ *فشل في تحميل معلومات الأداء*\n\n"
+            f"حدث خطأ أثناء محاولة تحميل معلومات النظام: {str(e)}",
+            chat_id, message_id,
+            reply_markup=types.InlineKeyboardMarkup().add(
+                types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_tools")
+            ),
+            parse_mode="Markdown"
+        )
+
+# معالجة زر حالة النظام
+@admin_callbacks.route("admin_system_status")
+def on_admin_system_status(bot, call, user_id, chat_id, message_id):
+    try:
+        bot.edit_message_text(
+            get_system_status_message(),
+            chat_id, message_id,
+            reply_markup=types.InlineKeyboardMarkup().add(
+                types.InlineKeyboardButton("🔄 تحديث", callback_data="admin_system_status"),
+                types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_tools")
+            ),
+            parse_mode="Markdown"
+        )
+    except Exception as e:
+        logger.error(f"خطأ في عرض حالة النظام: {e}")
+        bot.edit_message_text(
+            f"❌ *فشل في تحميل حالة النظام*\n\n"
+            f"حدث خطأ أثناء محاولة تحميل حالة النظام: {str(e)}",
+            chat_id, message_id,
+            reply_markup=types.InlineKeyboardMarkup().add(
+                types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_tools")
+            ),
+            parse_mode="Markdown"
+        )
+
+# معالجة أزرار التبديل (toggle) للإعدادات المختلفة
+@admin_callbacks.prefix("admin_toggle_")
+def on_admin_toggle(bot, call, user_id, chat_id, message_id):
+    feature_name = call.data.replace("admin_toggle_", "")
+    
+    try:
+        current_state = admin_panel.get_setting(f"features_enabled.{feature_name}", True)
+        new_state = not current_state
+        
+        if admin_panel.update_setting(f"features_enabled.{feature_name}", new_state):
+            state_text = "تفعيل" if new_state else "تعطيل"
+            feature_text = {
+                "lyrics": "كلمات الأغاني",
+                "album_art": "صورة الألبوم",
+                "templates": "القوالب",
+                "required_subscription": "الاشتراك الإجباري",
+                "auto_processing": "المعالجة التلقائية"
+            }.get(feature_name, feature_name)
             
-            # معالجة زر إضافة استبدال نصي
-            elif call.data == "admin_add_replacement":
-                try:
-                    # إنشاء نموذج رسالة للاستبدال النصي
-                    bot.edit_message_text(
-                        "🆕 *إضافة استبدال نصي جديد*\n\n"
-                        "أرسل النص المراد استبداله والنص البديل بالتنسيق التالي:\n\n"
-                        "```\n"
-                        "النص القديم\n"
-                        "النص الجديد\n"
-                        "```\n\n"
-                        "مثال:\n"
-                        "```\n"
-                        "حيدر غولي\n"
-                        "حيدر الغولي\n"
-                        "```\n\n"
-                        "ملاحظة: سيتم استبدال السطر الأول بالسطر الثاني في جميع وسوم الملفات الصوتية.",
-                        chat_id, message_id,
-                        reply_markup=types.InlineKeyboardMarkup().add(
-                            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_tag_replacements")
-                        ),
-                        parse_mode="Markdown"
-                    )
-                    
-                    # تعيين حالة المستخدم لانتظار بيانات الاستبدال
-                    from bot import set_user_state
-                    set_user_state(user_id, "admin_waiting_old_text", {"message_id": message_id})
-                    
-                except Exception as e:
-                    logger.error(f"خطأ في صفحة إضافة استبدال نصي: {e}")
-                    bot.edit_message_text(
-                        f"❌ *فشل في تحميل صفحة إضافة استبدال نصي*\n\n"
-                        f"حدث خطأ: {str(e)}",
-                        chat_id, message_id,
-                        reply_markup=types.InlineKeyboardMarkup().add(
-                            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_tag_replacements")
-                        ),
-                        parse_mode="Markdown"
-                    )
-                    
-            # معالجة زر تعيين قناة المصدر
-            elif call.data == "admin_set_source_channel":
-                try:
-                    current_channel = admin_panel.get_setting("auto_processing.source_channel", "غير محدد")
-                    
-                    bot.edit_message_text(
-                        "📡 *تعيين قناة المصدر للتعديل التلقائي*\n\n"
-                        f"القناة الحالية: `{current_channel}`\n\n"
-                        "أرسل معرّف القناة المراد تعيينها كمصدر للتعديل التلقائي.\n"
-                        "يمكن أن يكون على شكل @username أو -100xxxxxxxxxx.\n\n"
-                        "ملاحظة: تأكد من إضافة البوت كمشرف في القناة مع صلاحيات رفع الملفات والتعديل.",
-                        chat_id, message_id,
-                        reply_markup=types.InlineKeyboardMarkup().add(
-                            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_auto_processing")
-                        ),
-                        parse_mode="Markdown"
-                    )
-                    
-                    # تعيين حالة المستخدم لانتظار معرف القناة
-                    from bot import set_user_state
-                    set_user_state(user_id, "admin_waiting_source_channel", {"message_id": message_id})
-                    
-                except Exception as e:
-                    logger.error(f"خطأ في صفحة تعيين قناة المصدر: {e}")
-                    bot.edit_message_text(
-                        f"❌ *فشل في تحميل صفحة تعيين قناة المصدر*\n\n"
-                        f"حدث خطأ: {str(e)}",
-                        chat_id, message_id,
-                        reply_markup=types.InlineKeyboardMarkup().add(
-                            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_auto_processing")
-                        ),
-                        parse_mode="Markdown"
-                    )
-                    
-            # معالجة زر إضافة قالب ذكي
-            elif call.data == "admin_add_smart_template":
-                try:
-                    # الحصول على قائمة القوالب المتاحة
-                    from template_handler import get_templates_list
-                    templates = get_templates_list()
-                    templates_options = []
-                    
-                    # إنشاء قائمة بالقوالب المتاحة
-                    for template in templates:
-                        template_name = template.get('name', 'غير معروف')
-                        artist_name = template.get('artist', 'غير معروف')
-                        templates_options.append(f"{template_name} - {artist_name}")
-                    
-                    if not templates_options:
-                        templates_options = ["لا توجد قوالب متاحة بعد. قم بإنشاء قوالب أولاً."]
-                    
-                    templates_text = "\n".join([f"{i+1}. {t}" for i, t in enumerate(templates_options)])
-                    
-                    bot.edit_message_text(
-                        "🎯 *إضافة قالب ذكي جديد*\n\n"
-                        "القوالب الذكية تسمح بتطبيق قالب تلقائياً على الملفات الصوتية بناءً على اسم الفنان.\n\n"
-                        "أرسل اسم الفنان ومعرف القالب بالتنسيق التالي:\n\n"
-                        "```\n"
-                        "اسم الفنان\n"
-                        "معرف القالب\n"
-                        "```\n\n"
-                        "مثال:\n"
-                        "```\n"
-                        "عدي الغولي\n"
-                        "oday_template\n"
-                        "```\n\n"
-                        "القوالب المتاحة:\n"
-                        f"```\n{templates_text}\n```",
-                        chat_id, message_id,
-                        reply_markup=types.InlineKeyboardMarkup().add(
-                            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_smart_templates")
-                        ),
-                        parse_mode="Markdown"
-                    )
-                    
-                    # تعيين حالة المستخدم لانتظار بيانات القالب الذكي
-                    from bot import set_user_state
-                    set_user_state(user_id, "admin_waiting_smart_template", {"message_id": message_id})
-                    
-                except Exception as e:
-                    logger.error(f"خطأ في صفحة إضافة قالب ذكي: {e}")
-                    bot.edit_message_text(
-                        f"❌ *فشل في تحميل صفحة إضافة قالب ذكي*\n\n"
-                        f"حدث خطأ: {str(e)}",
-                        chat_id, message_id,
-                        reply_markup=types.InlineKeyboardMarkup().add(
-                            types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_smart_templates")
-                        ),
-                        parse_mode="Markdown"
-                    )
+            bot.answer_callback_query(call.id, f"تم {state_text} {feature_text} بنجاح")
             
-            # معالجة باقي الأزرار
-            else:
-                logger.info(f"زر غير معالج بشكل خاص: {call.data}")
-                # يمكن إضافة المزيد من الأزرار هنا حسب الحاجة
+            # إعادة تحميل صفحة الإعدادات
+            handle_admin_callback(bot, types.CallbackQuery(
+                id=call.id, from_user=call.from_user, message=call.message, 
+                data="admin_settings", chat_instance=call.chat_instance
+            ))
+        else:
+            bot.answer_callback_query(call.id, "فشل في تحديث الإعداد")
+    except Exception as e:
+        logger.error(f"خطأ في تبديل حالة الميزة '{feature_name}': {e}")
+        bot.answer_callback_query(call.id, f"حدث خطأ: {str(e)}")
+
+# معالجة زر إضافة استبدال نصي
+@admin_callbacks.route("admin_add_replacement")
+def on_admin_add_replacement(bot, call, user_id, chat_id, message_id):
+    try:
+        # إنشاء نموذج رسالة للاستبدال النصي
+        bot.edit_message_text(
+            "🆕 *إضافة استبدال نصي جديد*\n\n"
+            "أرسل النص المراد استبداله والنص البديل بالتنسيق التالي:\n\n"
+            "```\n"
+            "النص القديم\n"
+            "النص الجديد\n"
+            "```\n\n"
+            "مثال:\n"
+            "```\n"
+            "حيدر غولي\n"
+            "حيدر الغولي\n"
+            "```\n\n"
+            "ملاحظة: سيتم استبدال السطر الأول بالسطر الثاني في جميع وسوم الملفات الصوتية.",
+            chat_id, message_id,
+            reply_markup=types.InlineKeyboardMarkup().add(
+                types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_tag_replacements")
+            ),
+            parse_mode="Markdown"
+        )
+        
+        # تعيين حالة المستخدم لانتظار بيانات الاستبدال
+        from bot import set_user_state
+        set_user_state(user_id, "admin_waiting_old_text", {"message_id": message_id})
         
     except Exception as e:
-        logger.error(f"خطأ في معالجة زر لوحة الإدارة {call.data}: {e}")
-        try:
-            if 'chat_id' in locals():
-                bot.send_message(chat_id, f"⚠️ حدث خطأ في معالجة الطلب: {str(e)}")
-            else:
-                bot.send_message(call.message.chat.id, f"⚠️ حدث خطأ في معالجة الطلب: {str(e)}")
-        except Exception as inner_e:
-            logger.error(f"خطأ إضافي أثناء إرسال رسالة الخطأ: {inner_e}")
+        logger.error(f"خطأ في صفحة إضافة استبدال نصي: {e}")
+        bot.edit_message_text(
+            f"❌ *فشل في تحميل صفحة إضافة استبدال نصي*\n\n"
+            f"حدث خطأ: {str(e)}",
+            chat_id, message_id,
+            reply_markup=types.InlineKeyboardMarkup().add(
+                types.InlineKeyboardButton("🔙 رجوع", callback_data="admin_tag_replacements")
+            ),
+            parse_mode="Markdown"
+        )
 
 # Funciones de administración
 def open_admin_panel(bot, message):
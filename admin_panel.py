@@ -8,6 +8,8 @@ from collections import defaultdict
 from telebot import types
 from typing import Dict, List, Set, Optional, Union, Any, Tuple
 
+from rate_limiter import bulk
+
 # إعداد التسجيل
 logger = logging.getLogger('admin_panel')
 logger.setLevel(logging.INFO)
@@ -116,6 +118,11 @@ def load_admin_data():
     except Exception as e:
         logger.error(f"خطأ في تحميل بيانات المشرفين والإحصائيات: {e}")
 
+def _profile_settings_changed(setting_path: Optional[str] = None):
+    """إعادة بناء ملف المعالجة التلقائية إذا تغيرت إعداداته (None: كل الإعدادات)"""
+    from processing_profile import invalidate_processing_profile
+    invalidate_processing_profile(setting_path)
+
 def save_admin_data():
     """حفظ بيانات المشرفين والإحصائيات في الملف"""
     try:
@@ -338,6 +345,7 @@ def update_setting(setting_path: str, value: Any) -> bool:
         # تعيين القيمة
         current[path_parts[-1]] = value
         save_admin_data()
+        _profile_settings_changed(setting_path)
         return True
     except Exception as e:
         logger.error(f"خطأ في تحديث الإعداد {setting_path}: {e}")
@@ -377,11 +385,13 @@ def send_broadcast(bot, message: str, user_ids: List[int] = None):
     
     success_count = 0
     fail_count = 0
+    # الرسائل الجماعية بأولوية أقل من الردود التفاعلية في محدد المعدل
+    sender = bulk(bot)
     
     for user_id in user_ids:
         try:
             if not is_blocked(user_id):
-                bot.send_message(user_id, message)
+                sender.send_message(user_id, message)
                 success_count += 1
         except Exception as e:
             logger.error(f"خطأ في إرسال رسالة جماعية للمستخدم {user_id}: {e}")
@@ -400,6 +410,9 @@ def clean_temp_files():
                 if os.path.isfile(file_path):
                     os.remove(file_path)
                     files_removed += 1
+            # مساحات عمل المهام تُحذف بنفس قواعد عامل التنظيف (العمر والحجم الكلي)
+            from workspace import get_workspace_manager
+            get_workspace_manager().reap()
             logger.info(f"تم تنظيف {files_removed} ملف مؤقت")
             return files_removed
         return 0
@@ -486,6 +499,8 @@ def import_data(filename: str, data_type: str = 'all') -> bool:
                 import_templates(imported_data)
         
         save_admin_data()
+        if data_type in ('all', 'settings', 'templates'):
+            _profile_settings_changed()
         return True
     except Exception as e:
         logger.error(f"خطأ في استيراد البيانات: {e}")
@@ -694,6 +709,7 @@ def add_tag_replacement(old_text: str, new_text: str) -> bool:
         # إضافة الاستبدال
         admin_data['settings']['auto_processing']['tag_replacements'][old_text] = new_text
         save_admin_data()
+        _profile_settings_changed('auto_processing.tag_replacements')
         logger.info(f"تمت إضافة استبدال نصي: {old_text} -> {new_text}")
         return True
     except Exception as e:
@@ -716,6 +732,7 @@ def remove_tag_replacement(old_text: str) -> bool:
             
             del admin_data['settings']['auto_processing']['tag_replacements'][old_text]
             save_admin_data()
+            _profile_settings_changed('auto_processing.tag_replacements')
             logger.info(f"تمت إزالة استبدال نصي: {old_text}")
             return True
         return False
@@ -744,6 +761,7 @@ def add_smart_template(artist_name: str, template_id: str) -> bool:
         # إضافة القالب الذكي
         admin_data['settings']['auto_processing']['smart_templates'][artist_name] = template_id
         save_admin_data()
+        _profile_settings_changed('auto_processing.smart_templates')
         logger.info(f"تمت إضافة قالب ذكي للفنان: {artist_name} -> {template_id}")
         return True
     except Exception as e:
@@ -766,6 +784,7 @@ def remove_smart_template(artist_name: str) -> bool:
             
             del admin_data['settings']['auto_processing']['smart_templates'][artist_name]
             save_admin_data()
+            _profile_settings_changed('auto_processing.smart_templates')
             logger.info(f"تمت إزالة قالب ذكي للفنان: {artist_name}")
             return True
         return False
@@ -0,0 +1,128 @@
+"""
+وحدة تشغيل البوت على asyncio باستخدام AsyncTeleBot
+تسجل نفس المعالجات المكتوبة للواجهة المتزامنة عبر جسر (SyncBotBridge): كل معالج يعمل
+في مجموعة خيوط صغيرة، واستدعاءاته لواجهة Bot API تُنفذ على حلقة الأحداث بجلسة aiohttp
+واحدة ومجمع اتصالات مشترك، فلا تحجز المحادثات الخاملة أي خيط.
+"""
+
+import asyncio
+import logging
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Coroutine, List, Optional
+
+from config import Config
+from downloader import HTTP_POOL_SIZE
+
+logger = logging.getLogger('async_bot')
+
+# مزخرفات المعالجات في AsyncTeleBot التي يتم تمريرها عبر الجسر
+HANDLER_DECORATORS = (
+    'message_handler', 'edited_message_handler', 'channel_post_handler',
+    'edited_channel_post_handler', 'callback_query_handler', 'inline_handler',
+    'my_chat_member_handler', 'chat_member_handler',
+)
+
+
+class SyncBotBridge:
+    """
+    واجهة متزامنة فوق AsyncTeleBot للمعالجات المكتوبة لـ TeleBot
+
+    - دوال Bot API (send_message، edit_message_text، set_state...) تُنفذ على حلقة الأحداث
+      ويتم انتظار نتيجتها من خيط المعالج.
+    - مزخرفات المعالجات (message_handler، callback_query_handler...) تسجل المعالج
+      المتزامن كمعالج غير متزامن يعمل في مجموعة الخيوط.
+
+    Args:
+        async_bot: كائن AsyncTeleBot
+        loop: حلقة الأحداث التي يعمل عليها البوت
+        executor: مجموعة الخيوط التي تعمل فيها المعالجات
+    """
+
+    is_async_bridge = True
+
+    def __init__(self, async_bot, loop: asyncio.AbstractEventLoop, executor: ThreadPoolExecutor):
+        self.async_bot = async_bot
+        self.loop = loop
+        self.executor = executor
+
+    def run(self, coro: Coroutine) -> Any:
+        """تنفيذ coroutine على حلقة الأحداث وانتظار نتيجتها (من خيط غير خيط الحلقة فقط)"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def _wrap_handler(self, func: Callable) -> Callable:
+        loop = self.loop
+        executor = self.executor
+
+        async def handler(*args):
+            return await loop.run_in_executor(executor, func, *args)
+
+        handler.__name__ = getattr(func, '__name__', 'handler')
+        handler.__doc__ = func.__doc__
+        return handler
+
+    def _bridge_decorator(self, decorator_factory: Callable) -> Callable:
+        def factory(*args, **kwargs):
+            register = decorator_factory(*args, **kwargs)
+
+            def decorator(func):
+                register(self._wrap_handler(func))
+                return func
+            return decorator
+        return factory
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.async_bot, name)
+        if name in HANDLER_DECORATORS:
+            return self._bridge_decorator(attr)
+        if asyncio.iscoroutinefunction(attr):
+            # wraps يحفظ توقيع الدالة الأصلية (يستخدمه محدد المعدل لمعرفة chat_id)
+            @functools.wraps(attr)
+            def call(*args, **kwargs):
+                return self.run(attr(*args, **kwargs))
+            return call
+        return attr
+
+
+async def _serve(token: str, register: Callable[[SyncBotBridge], None],
+                 allowed_updates: Optional[List[str]]) -> None:
+    from telebot import asyncio_helper
+    from telebot.async_telebot import AsyncTeleBot
+
+    # جلسة aiohttp واحدة لكل الطلبات والتنزيلات، بحد أقصى لعدد الاتصالات
+    asyncio_helper.REQUEST_LIMIT = HTTP_POOL_SIZE
+
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=Config.ASYNC_HANDLER_THREADS, thread_name_prefix='handler')
+    async_bot = AsyncTeleBot(token)
+    bridge = SyncBotBridge(async_bot, loop, executor)
+
+    # التسجيل قد يستدعي Bot API، لذلك يتم خارج خيط الحلقة
+    await loop.run_in_executor(executor, register, bridge)
+    logger.info(f"تم تسجيل المعالجات على AsyncTeleBot ({Config.ASYNC_HANDLER_THREADS} خيط للمعالجات)")
+
+    try:
+        await async_bot.delete_webhook()
+        await async_bot.infinity_polling(timeout=30, allowed_updates=allowed_updates)
+    finally:
+        session = asyncio_helper.session_manager.session
+        if session is not None and not session.closed:
+            await session.close()
+        executor.shutdown(wait=False)
+
+
+def run_async_bot(token: str, register: Callable[[SyncBotBridge], None],
+                  allowed_updates: Optional[List[str]] = None) -> None:
+    """
+    تشغيل البوت على asyncio حتى الإيقاف
+
+    Args:
+        token: رمز البوت
+        register: دالة تسجل المعالجات على كائن البوت (مثل bot.register_handlers)
+        allowed_updates: أنواع التحديثات المطلوبة من تيليجرام
+    """
+    try:
+        asyncio.run(_serve(token, register, allowed_updates))
+    except ImportError as e:
+        logger.error(f"تشغيل البوت غير المتزامن يتطلب مكتبة aiohttp: {e}")
+        raise
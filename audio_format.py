@@ -0,0 +1,322 @@
+"""
+وحدة تحديد نوع الملف الصوتي من محتواه
+تقرأ أول بضعة كيلوبايت من الملف وتتعرف على التوقيع (magic bytes) بدلاً من الاعتماد على الامتداد
+"""
+
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger('audio_format')
+
+# عدد البايتات المقروءة من بداية الملف لتحديد نوعه
+SNIFF_BYTES = 4096
+
+# الحد الأقصى لعدد النتائج المخزنة مؤقتاً
+SNIFF_CACHE_SIZE = 1024
+
+# معرّف GUID لترويسة ملفات ASF/WMA
+ASF_HEADER_GUID = bytes.fromhex('3026b2758e66cf11a6d900aa0062ce6c')
+
+# الامتداد المناسب لكل نوع (يستخدم لتسمية الملفات المؤقتة)
+FILE_TYPE_EXTENSIONS = {
+    'mp3': '.mp3',
+    'flac': '.flac',
+    'wav': '.wav',
+    'mp4': '.m4a',
+    'ogg': '.ogg',
+    'opus': '.opus',
+    'asf': '.wma',
+    'aiff': '.aiff',
+    'ape': '.ape',
+    'mpc': '.mpc',
+}
+
+# الأنواع حسب الامتداد (تستخدم فقط عند فشل التعرف على المحتوى)
+EXTENSION_FILE_TYPES = {
+    '.mp3': 'mp3',
+    '.flac': 'flac',
+    '.wav': 'wav',
+    '.m4a': 'mp4',
+    '.mp4': 'mp4',
+    '.aac': 'mp4',
+    '.ogg': 'ogg',
+    '.opus': 'opus',
+    '.wma': 'asf',
+    '.asf': 'asf',
+    '.aiff': 'aiff',
+    '.aif': 'aiff',
+    '.ape': 'ape',
+    '.mpc': 'mpc',
+}
+
+_sniff_cache = OrderedDict()
+_sniff_cache_lock = threading.Lock()
+
+
+def _id3v2_size(head: bytes) -> int:
+    """حساب الحجم الكامل لوسم ID3v2 (مع الترويسة) من أول 10 بايت"""
+    size = 0
+    for byte in head[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    # وجود تذييل ID3v2.4 يضيف 10 بايت
+    if head[5] & 0x10:
+        size += 10
+    return size + 10
+
+
+def _is_mpeg_frame(head: bytes) -> bool:
+    """التحقق من أن البايتات تبدأ بترويسة إطار MPEG صوتي (MP3)"""
+    if len(head) < 4 or head[0] != 0xFF or (head[1] & 0xE0) != 0xE0:
+        return False
+    version = (head[1] >> 3) & 0x03
+    layer = (head[1] >> 1) & 0x03
+    bitrate_index = (head[2] >> 4) & 0x0F
+    sample_rate_index = (head[2] >> 2) & 0x03
+    return version != 1 and layer != 0 and bitrate_index != 0x0F and sample_rate_index != 0x03
+
+
+def sniff_bytes(head: bytes) -> Optional[str]:
+    """
+    تحديد نوع الملف الصوتي من بايتاته الأولى
+
+    Args:
+        head: البايتات الأولى من الملف (يفضل 4 كيلوبايت على الأقل)
+
+    Returns:
+        Optional[str]: نوع الملف بنفس تسميات tag_handler أو None إذا لم يتم التعرف عليه
+    """
+    if head.startswith(b'fLaC'):
+        return 'flac'
+    if head.startswith(b'OggS'):
+        # التمييز بين Vorbis و Opus من أول حزمة في الصفحة الأولى
+        if b'OpusHead' in head[:128]:
+            return 'opus'
+        return 'ogg'
+    if len(head) >= 12 and head[4:8] == b'ftyp':
+        return 'mp4'
+    if len(head) >= 12 and head.startswith(b'RIFF') and head[8:12] == b'WAVE':
+        return 'wav'
+    if len(head) >= 12 and head.startswith(b'FORM') and head[8:12] in (b'AIFF', b'AIFC'):
+        return 'aiff'
+    if head.startswith(b'MAC '):
+        return 'ape'
+    if head.startswith(b'MPCK') or head.startswith(b'MP+'):
+        return 'mpc'
+    if head.startswith(ASF_HEADER_GUID):
+        return 'asf'
+    if _is_mpeg_frame(head):
+        return 'mp3'
+    return None
+
+
+def sniff_file_type(file_path: str) -> Optional[str]:
+    """
+    تحديد نوع الملف من محتواه مع تخزين النتيجة مؤقتاً لكل ملف
+
+    يتم تخطي وسم ID3v2 في بداية الملف (إن وجد) لأن بعض ملفات FLAC وAAC تبدأ به أيضاً.
+    المفتاح المستخدم للتخزين هو (المسار، الحجم، وقت التعديل) حتى تُهمل النتيجة عند تغير الملف.
+
+    Args:
+        file_path: مسار الملف الصوتي
+
+    Returns:
+        Optional[str]: نوع الملف أو None إذا تعذر التعرف عليه
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+
+    cache_key = (file_path, stat.st_size, stat.st_mtime_ns)
+    with _sniff_cache_lock:
+        if cache_key in _sniff_cache:
+            _sniff_cache.move_to_end(cache_key)
+            return _sniff_cache[cache_key]
+
+    file_type = None
+    try:
+        with open(file_path, 'rb') as f:
+            head = f.read(SNIFF_BYTES)
+            if head.startswith(b'ID3') and len(head) >= 10:
+                # ما بعد وسم ID3 يحدد النوع الحقيقي، والافتراضي MP3
+                f.seek(_id3v2_size(head))
+                after_tag = f.read(SNIFF_BYTES)
+                file_type = sniff_bytes(after_tag) or 'mp3'
+            else:
+                file_type = sniff_bytes(head)
+    except OSError as e:
+        logger.error(f"خطأ في قراءة بداية الملف {file_path}: {e}")
+        return None
+
+    with _sniff_cache_lock:
+        _sniff_cache[cache_key] = file_type
+        if len(_sniff_cache) > SNIFF_CACHE_SIZE:
+            _sniff_cache.popitem(last=False)
+
+    return file_type
+
+
+def detect_file_type(file_path: str, default: Optional[str] = 'mp3') -> Optional[str]:
+    """
+    تحديد نوع الملف من المحتوى أولاً ثم من الامتداد عند الفشل
+
+    Args:
+        file_path: مسار الملف الصوتي
+        default: النوع المعاد إذا لم يتم التعرف على المحتوى ولا الامتداد
+
+    Returns:
+        Optional[str]: نوع الملف
+    """
+    file_type = sniff_file_type(file_path)
+    if file_type:
+        return file_type
+    extension = os.path.splitext(file_path)[1].lower()
+    return EXTENSION_FILE_TYPES.get(extension, default)
+
+
+def extension_for_type(file_type: Optional[str], default: str = '.mp3') -> str:
+    """الحصول على الامتداد المناسب لنوع ملف معين"""
+    return FILE_TYPE_EXTENSIONS.get(file_type, default)
+
+
+# الحد الأقصى لحجم منطقة الوسوم المقروءة في وضع قراءة الترويسة فقط
+METADATA_REGION_LIMIT = 16 * 1024 * 1024
+
+# ذرات MP4 في المستوى الأعلى اللازمة لقراءة الوسوم
+MP4_METADATA_ATOMS = (b'ftyp', b'moov')
+
+
+def _read_exact(f, size: int) -> Optional[bytes]:
+    """قراءة عدد محدد من البايتات أو إعادة None إذا كان الملف مقطوعاً"""
+    data = f.read(size)
+    if len(data) != size:
+        return None
+    return data
+
+
+def _read_id3_region(f, limit: int) -> Optional[bytes]:
+    """قراءة وسم ID3v2 كاملاً من بداية الملف"""
+    head = _read_exact(f, 10)
+    if head is None or not head.startswith(b'ID3'):
+        return None
+    size = _id3v2_size(head)
+    if size > limit:
+        return None
+    body = _read_exact(f, size - 10)
+    if body is None:
+        return None
+    return head + body
+
+
+def _read_flac_region(f, limit: int) -> Optional[bytes]:
+    """قراءة علامة fLaC وكتل البيانات الوصفية حتى الكتلة الأخيرة"""
+    marker = _read_exact(f, 4)
+    if marker != b'fLaC':
+        return None
+    chunks = [marker]
+    total = 4
+    while True:
+        header = _read_exact(f, 4)
+        if header is None:
+            return None
+        block_size = int.from_bytes(header[1:4], 'big')
+        total += 4 + block_size
+        if total > limit:
+            return None
+        block = _read_exact(f, block_size)
+        if block is None:
+            return None
+        chunks.append(header)
+        chunks.append(block)
+        # البت الأعلى يحدد آخر كتلة بيانات وصفية
+        if header[0] & 0x80:
+            return b''.join(chunks)
+
+
+def _read_mp4_region(f, limit: int) -> Optional[bytes]:
+    """
+    قراءة ذرتي ftyp وmoov فقط من ملف MP4 مع تخطي بيانات الصوت (mdat)
+
+    الذرات الأخرى يتم تجاوزها بالانتقال (seek) دون قراءتها، لذلك يعمل ذلك أيضاً
+    عندما تكون moov في نهاية الملف.
+    """
+    chunks = []
+    total = 0
+    file_size = os.fstat(f.fileno()).st_size
+    offset = 0
+    while offset < file_size:
+        f.seek(offset)
+        header = _read_exact(f, 8)
+        if header is None:
+            return None
+        atom_size = int.from_bytes(header[:4], 'big')
+        atom_name = header[4:8]
+        header_size = 8
+        if atom_size == 1:
+            # حجم 64 بت
+            extended = _read_exact(f, 8)
+            if extended is None:
+                return None
+            atom_size = int.from_bytes(extended, 'big')
+            header += extended
+            header_size = 16
+        elif atom_size == 0:
+            # الذرة تمتد حتى نهاية الملف
+            atom_size = file_size - offset
+        if atom_size < header_size:
+            return None
+
+        if atom_name in MP4_METADATA_ATOMS:
+            if atom_size > file_size - offset:
+                return None
+            total += atom_size
+            if total > limit:
+                return None
+            body = _read_exact(f, atom_size - header_size)
+            if body is None:
+                return None
+            chunks.append(header + body)
+            if atom_name == b'moov':
+                return b''.join(chunks)
+
+        offset += atom_size
+    return None
+
+
+def read_metadata_region(file_path: str, file_type: Optional[str] = None,
+                         limit: int = METADATA_REGION_LIMIT) -> Optional[bytes]:
+    """
+    قراءة منطقة الوسوم فقط من الملف الصوتي دون قراءة البيانات الصوتية
+
+    يقرأ وسم ID3v2 لملفات MP3، وكتل البيانات الوصفية لملفات FLAC، وذرتي ftyp وmoov
+    لملفات MP4. حجم القراءة محدود بحجم الوسوم وليس بحجم الملف، ويعمل أيضاً على ملف
+    غير مكتمل ما دامت منطقة الوسوم كاملة.
+
+    Args:
+        file_path: مسار الملف الصوتي
+        file_type: نوع الملف إن كان معروفاً
+        limit: الحد الأقصى لحجم المنطقة المقروءة
+
+    Returns:
+        Optional[bytes]: بايتات منطقة الوسوم أو None إذا كان النوع غير مدعوم أو المنطقة
+        ناقصة أو أكبر من الحد (يجب عندها الرجوع إلى القراءة الكاملة)
+    """
+    if file_type is None:
+        file_type = sniff_file_type(file_path)
+    readers = {
+        'mp3': _read_id3_region,
+        'flac': _read_flac_region,
+        'mp4': _read_mp4_region,
+    }
+    reader = readers.get(file_type)
+    if reader is None:
+        return None
+    try:
+        with open(file_path, 'rb') as f:
+            return reader(f, limit)
+    except OSError as e:
+        logger.error(f"خطأ في قراءة منطقة الوسوم من {file_path}: {e}")
+        return None
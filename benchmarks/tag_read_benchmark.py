@@ -0,0 +1,152 @@
+"""
+قياس زمن قراءة الوسوم مع تزايد حجم الملف الصوتي
+
+يقارن بين القراءة الكاملة عبر mutagen ووضع قراءة منطقة الوسوم فقط (header_only)
+لملفات MP3 وFLAC وMP4 بأحجام من 1 إلى 200 ميغابايت. الملفات تُنشأ كملفات متفرقة
+(sparse) في مجلد مؤقت، لذلك لا تستهلك مساحة حقيقية على القرص.
+
+الاستخدام:
+    python benchmarks/tag_read_benchmark.py [--sizes 1,10,50,100,200] [--repeat 20]
+"""
+
+import argparse
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# tag_handler يستورد تطبيق Flask، لذلك نستخدم قاعدة بيانات في الذاكرة
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from mutagen.flac import FLAC
+from mutagen.id3 import ID3, TIT2, TPE1, TALB, APIC
+from mutagen.mp4 import MP4, MP4Cover
+
+from audio_format import read_metadata_region
+from tag_handler import get_audio_tags, invalidate_tag_cache, open_audio
+
+MB = 1024 * 1024
+# حشو ثابت حتى لا يكبر الوسم مع حجم الملف (mutagen يضيف 1% افتراضياً)
+PADDING = lambda info: 1024
+MP3_FRAME = bytes([0xFF, 0xFB, 0x90, 0x64]) + b'\x00' * 413
+COVER = b'\xff\xd8\xff\xe0' + b'\x00' * (200 * 1024)
+
+
+def _mp4_atom(name, body):
+    return struct.pack('>I', 8 + len(body)) + name + body
+
+
+def make_mp3(path, size):
+    with open(path, 'wb') as f:
+        f.write(MP3_FRAME * 8)
+        f.truncate(size)
+    tags = ID3()
+    tags.add(TIT2(encoding=3, text='عنوان'))
+    tags.add(TPE1(encoding=3, text='فنان'))
+    tags.add(TALB(encoding=3, text='ألبوم'))
+    tags.add(APIC(encoding=3, mime='image/jpeg', type=3, desc='Cover', data=COVER))
+    tags.save(path, padding=PADDING)
+
+
+def make_flac(path, size):
+    streaminfo = bytearray(34)
+    struct.pack_into('>HH', streaminfo, 0, 4096, 4096)
+    value = (44100 << 44) | (1 << 41) | (15 << 36) | (44100 * 10)
+    streaminfo[10:18] = value.to_bytes(8, 'big')
+    with open(path, 'wb') as f:
+        f.write(b'fLaC' + bytes([0x80]) + (34).to_bytes(3, 'big') + streaminfo)
+        f.write(b'\xff\xf8')
+        f.truncate(size)
+    audio = FLAC(path)
+    audio['title'] = 'عنوان'
+    audio['artist'] = 'فنان'
+    audio['album'] = 'ألبوم'
+    audio.save(padding=PADDING)
+
+
+def make_mp4(path, size):
+    # moov في نهاية الملف بعد mdat (أسوأ حالة لقراءة الترويسة)
+    ftyp = _mp4_atom(b'ftyp', b'M4A \x00\x00\x00\x00M4A isom')
+    mdat_size = max(size - len(ftyp) - 256, 16)
+    with open(path, 'wb') as f:
+        f.write(ftyp)
+        f.write(struct.pack('>I', mdat_size) + b'mdat')
+        f.seek(len(ftyp) + mdat_size)
+        f.write(_mp4_atom(b'moov', _mp4_atom(b'mvhd', b'\x00' * 100)))
+    audio = MP4(path)
+    audio.add_tags()
+    audio['\xa9nam'] = ['عنوان']
+    audio['\xa9ART'] = ['فنان']
+    audio['\xa9alb'] = ['ألبوم']
+    audio['covr'] = [MP4Cover(COVER, imageformat=MP4Cover.FORMAT_JPEG)]
+    audio.save(padding=PADDING)
+
+
+def _bytes_read():
+    """عدد البايتات المقروءة من العملية حتى الآن (لينكس فقط)"""
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('rchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def measure(func, repeat):
+    before = _bytes_read()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - start) / repeat
+    after = _bytes_read()
+    read = (after - before) // repeat if before is not None else None
+    return elapsed, read
+
+
+def _format_bytes(value):
+    if value is None:
+        return 'n/a'
+    if value >= MB:
+        return f'{value / MB:.1f}MB'
+    return f'{value / 1024:.1f}KB'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='قياس زمن قراءة الوسوم حسب حجم الملف')
+    parser.add_argument('--sizes', default='1,10,50,100,200', help='أحجام الملفات بالميغابايت')
+    parser.add_argument('--repeat', type=int, default=20, help='عدد مرات التكرار لكل قياس')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    makers = {'mp3': make_mp3, 'flac': make_flac, 'mp4': make_mp4}
+    work_dir = tempfile.mkdtemp(prefix='tag_read_bench_')
+
+    print(f"{'type':<6}{'size':>8}{'region':>10}"
+          f"{'full ms':>10}{'full read':>11}{'header ms':>11}{'header read':>13}")
+    try:
+        for file_type, maker in makers.items():
+            for size_mb in sizes:
+                path = os.path.join(work_dir, f'{size_mb}mb.{file_type}')
+                maker(path, size_mb * MB)
+                region = read_metadata_region(path, file_type)
+                full_time, full_read = measure(
+                    lambda: open_audio(path, file_type), args.repeat)
+                # إبطال ذاكرة الوسوم في كل تكرار حتى يُقاس زمن القراءة الفعلي
+                header_time, header_read = measure(
+                    lambda: (invalidate_tag_cache(path), get_audio_tags(path, header_only=True)),
+                    args.repeat)
+                print(f"{file_type:<6}{size_mb:>6}MB{_format_bytes(len(region) if region else None):>10}"
+                      f"{full_time * 1000:>10.2f}{_format_bytes(full_read):>11}"
+                      f"{header_time * 1000:>11.2f}{_format_bytes(header_read):>13}")
+                os.remove(path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+قياس تكلفة حفظ الوسوم: عدد النسخ الكاملة للملف وذروة الذاكرة لكل عملية حفظ
+
+السيناريوهات:
+    in-place   الوسوم الجديدة تتسع في الحشو الموجود، يُعاد كتابة منطقة الوسوم فقط
+    rewrite    الوسوم أكبر من الحشو (كلمات طويلة)، تُزاح بيانات الصوت على دفعات
+    output     الحفظ إلى مسار آخر (كما في save_tags): نسخ متدفق ثم كتابة في المكان
+    legacy     الطريقة السابقة للمقارنة: قراءة الملف كاملاً في الذاكرة إلى نسخة مؤقتة
+
+"النسخ" = البايتات المكتوبة على القرص مقسومة على حجم الملف (من /proc/self/io).
+
+الاستخدام:
+    python benchmarks/tag_write_benchmark.py [--sizes 10,50] [--repeat 3]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from mutagen.id3 import ID3
+
+from tag_read_benchmark import MB, make_flac, make_mp3
+from tag_handler import get_tag_write_stats, set_audio_tags
+
+
+def _io_counters():
+    """البايتات المقروءة والمكتوبة من العملية حتى الآن (لينكس فقط)"""
+    counters = {}
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                name, value = line.split(':')
+                counters[name] = int(value)
+    except OSError:
+        return None, None
+    return counters.get('rchar'), counters.get('wchar')
+
+
+def legacy_save(path, tags):
+    """الطريقة القديمة: نسخة مؤقتة كاملة عبر الذاكرة ثم os.replace"""
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as temp_file:
+        with open(path, 'rb') as src_file:
+            temp_file.write(src_file.read())
+    audio = ID3(temp_file.name)
+    audio.setall('TIT2', [])
+    audio.save(v2_version=3)
+    os.replace(temp_file.name, path)
+
+
+def measure(func, file_size):
+    _, written_before = _io_counters()
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    _, written_after = _io_counters()
+    copies = None
+    if written_before is not None:
+        copies = (written_after - written_before) / file_size
+    return elapsed, copies, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='قياس تكلفة حفظ الوسوم')
+    parser.add_argument('--sizes', default='10,50', help='أحجام الملفات بالميغابايت')
+    parser.add_argument('--repeat', type=int, default=3, help='عدد مرات التكرار لكل قياس')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    work_dir = tempfile.mkdtemp(prefix='tag_write_bench_')
+    long_lyrics = 'كلمات الأغنية\n' * 4000
+
+    scenarios = {
+        'in-place': lambda path, out: set_audio_tags(path, {'title': 'عنوان جديد'}),
+        'rewrite': lambda path, out: set_audio_tags(path, {'lyrics': long_lyrics}),
+        'output': lambda path, out: set_audio_tags(path, {'title': 'عنوان جديد'}, output_path=out),
+        'legacy': lambda path, out: legacy_save(path, {'title': 'عنوان جديد'}),
+    }
+
+    print(f"{'type':<6}{'size':>7}  {'scenario':<10}{'ms':>9}{'copies':>9}{'peak RAM':>12}")
+    try:
+        for file_type, maker in (('mp3', make_mp3), ('flac', make_flac)):
+            for size_mb in sizes:
+                for name, scenario in scenarios.items():
+                    if name == 'legacy' and file_type != 'mp3':
+                        continue
+                    results = []
+                    for _ in range(args.repeat):
+                        path = os.path.join(work_dir, f'{size_mb}mb.{file_type}')
+                        out = os.path.join(work_dir, f'{size_mb}mb_out.{file_type}')
+                        maker(path, size_mb * MB)
+                        results.append(measure(lambda: scenario(path, out), os.path.getsize(path)))
+                        for leftover in (path, out):
+                            if os.path.exists(leftover):
+                                os.remove(leftover)
+                    elapsed = sum(r[0] for r in results) / len(results)
+                    copies = results[-1][1]
+                    peak = max(r[2] for r in results)
+                    copies_text = f'{copies:.2f}' if copies is not None else 'n/a'
+                    print(f"{file_type:<6}{size_mb:>5}MB  {name:<10}{elapsed * 1000:>9.1f}"
+                          f"{copies_text:>9}{peak / MB:>10.2f}MB")
+        print(f"\nwrite stats: {get_tag_write_stats()}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
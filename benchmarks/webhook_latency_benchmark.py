@@ -0,0 +1,170 @@
+"""
+قياس زمن وصول التحديثات إلى المعالج: Webhook مقابل polling
+
+Webhook  التحديثات تُرسل POST عبر HTTP حقيقي إلى خادم محلي يعمل بنفس مسار
+         mount_webhook المستخدم على تطبيق Flask (مع إزالة التكرار والطابور)
+polling  محاكاة لحلقة infinity_polling في telebot: انتظار interval ثم getUpdates
+         طويل يعود فور توفر تحديثات (خادم Bot API وهمي في الذاكرة)
+
+الزمن المقاس = من لحظة وصول التحديث إلى تيليجرام (وقت الإرسال) حتى بدء المعالج.
+يمكن تمرير تحديثات مسجلة من ملف JSON (قائمة كائنات Update)، وإلا تُنشأ رسائل نصية.
+
+الاستخدام:
+    python benchmarks/webhook_latency_benchmark.py [--updates recorded.json] [--count 40]
+                                                  [--rate 5] [--interval 2]
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+import flask
+import requests
+import telebot
+from telebot import types
+from werkzeug.serving import make_server
+
+from webhook import mount_webhook, get_webhook_stats
+
+
+def synthetic_updates(count):
+    """رسائل نصية بسيطة بمعرفات متتالية"""
+    return [{
+        'update_id': 1000 + i,
+        'message': {
+            'message_id': i + 1,
+            'date': int(time.time()),
+            'chat': {'id': 42, 'type': 'private'},
+            'from': {'id': 42, 'is_bot': False, 'first_name': 'bench'},
+            'text': f'رسالة {i + 1}',
+        },
+    } for i in range(count)]
+
+
+def make_bot(latencies, arrivals):
+    """بوت بمعالج واحد يسجل زمن الوصول لكل رسالة"""
+    bot = telebot.TeleBot('123456:BENCHMARK', threaded=False, validate_token=False)
+
+    @bot.message_handler(func=lambda message: True)
+    def record(message):
+        started = time.perf_counter()
+        sent = arrivals.get(message.message_id)
+        if sent is not None:
+            latencies.append(started - sent)
+
+    return bot
+
+
+def run_webhook(updates, rate):
+    latencies, arrivals = [], {}
+    bot = make_bot(latencies, arrivals)
+    app = flask.Flask('webhook_benchmark')
+    mount_webhook(app, bot, path='/hook', secret='')
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/hook"
+
+    session = requests.Session()
+    for update in updates:
+        arrivals[update['message']['message_id']] = time.perf_counter()
+        session.post(url, json=update)
+        # إعادة إرسال عشوائية كما يفعل تيليجرام عند التأخر، يجب أن تُتجاهل
+        if random.random() < 0.1:
+            session.post(url, json=update)
+        time.sleep(random.expovariate(rate))
+
+    deadline = time.time() + 5
+    while len(latencies) < len(updates) and time.time() < deadline:
+        time.sleep(0.01)
+    server.shutdown()
+    return latencies
+
+
+class FakeBotApi:
+    """خادم getUpdates وهمي: يعيد كل التحديثات المتاحة أو ينتظر حتى timeout"""
+
+    def __init__(self):
+        self._updates = []
+        self._cond = threading.Condition()
+
+    def push(self, update):
+        with self._cond:
+            self._updates.append(update)
+            self._cond.notify_all()
+
+    def get_updates(self, timeout):
+        with self._cond:
+            self._cond.wait_for(lambda: self._updates, timeout=timeout)
+            updates, self._updates = self._updates, []
+        return updates
+
+
+def run_polling(updates, rate, interval, poll_timeout):
+    latencies, arrivals = [], {}
+    bot = make_bot(latencies, arrivals)
+    api = FakeBotApi()
+    stop = threading.Event()
+
+    def poll():
+        # نفس ترتيب __threaded_polling: انتظار interval ثم طلب التحديثات
+        while not stop.wait(interval):
+            batch = api.get_updates(poll_timeout)
+            if batch:
+                bot.process_new_updates([types.Update.de_json(u) for u in batch])
+
+    threading.Thread(target=poll, daemon=True).start()
+    for update in updates:
+        arrivals[update['message']['message_id']] = time.perf_counter()
+        api.push(update)
+        time.sleep(random.expovariate(rate))
+
+    deadline = time.time() + interval + poll_timeout + 1
+    while len(latencies) < len(updates) and time.time() < deadline:
+        time.sleep(0.01)
+    stop.set()
+    return latencies
+
+
+def report(name, latencies, expected):
+    if not latencies:
+        print(f"{name:<8} لم تصل أي تحديثات")
+        return
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"{name:<8} {len(latencies):>4}/{expected:<4} "
+          f"{statistics.median(ordered) * 1000:>10.1f} {p95 * 1000:>10.1f} {ordered[-1] * 1000:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='قياس زمن وصول التحديثات: Webhook مقابل polling')
+    parser.add_argument('--updates', help='ملف JSON بقائمة تحديثات مسجلة')
+    parser.add_argument('--count', type=int, default=40, help='عدد التحديثات المولدة')
+    parser.add_argument('--rate', type=float, default=5.0, help='متوسط التحديثات في الثانية')
+    parser.add_argument('--interval', type=float, default=2.0, help='interval في polling (كما في start_bot)')
+    parser.add_argument('--poll-timeout', type=float, default=30.0, help='مهلة getUpdates الطويلة')
+    args = parser.parse_args()
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    if args.updates:
+        with open(args.updates, encoding='utf-8') as f:
+            updates = [u for u in json.load(f) if 'message' in u]
+    else:
+        updates = synthetic_updates(args.count)
+
+    print(f"{'الوضع':<8} {'الوصول':>9} {'الوسيط ms':>10} {'p95 ms':>10} {'الأقصى ms':>10}")
+    report('webhook', run_webhook(updates, args.rate), len(updates))
+    report('polling', run_polling(updates, args.rate, args.interval, args.poll_timeout), len(updates))
+    print(f"إحصائيات webhook: {get_webhook_stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,14 +2,13 @@ import os
 import logging
 import telebot
 import tempfile
-import shutil
 import base64
 from types import SimpleNamespace
 from telebot import types
 from telebot.handler_backends import State, StatesGroup
 from tag_handler import (
     get_audio_tags, set_audio_tags, get_valid_tag_fields, extract_album_art,
-    extract_lyrics
+    extract_lyrics, get_file_type
 )
 from template_handler import (
     save_template, get_template, list_templates, delete_template,
@@ -17,7 +16,16 @@ from template_handler import (
 )
 
 from utils import sanitize_filename, ensure_temp_dir
-import auto_processor  # استيراد وحدة المعالجة التلقائية
+from downloader import download_to_file, get_session
+from job_queue import get_processing_queue, QueueFullError
+from file_id_cache import send_audio_cached
+from cover_art import load_picture, make_thumbnail
+from callback_router import CallbackRouter
+from session_store import get_session_store
+from workspace import get_workspace_manager
+from progress import ProgressReporter
+from rate_limiter import rate_limited
+from channel_pipeline import setup_channel_pipeline  # المعالجة التلقائية لقناة المصدر
 
 # استيراد النماذج من ملف models.py
 from models import db, User, UserLog
@@ -61,8 +69,8 @@ def get_tag_field_names_arabic():
         'website': 'الموقع الإلكتروني'
     }
 
-# Global user data storage
-user_data = {}
+# Global user data storage (bounded, expiring and optionally persisted, see session_store)
+user_data = get_session_store('user_data')
 TEMP_DIR = "temp_audio_files"
 
 # Helper function to access user data
@@ -111,8 +119,8 @@ logger = logging.getLogger('bot')
 TEMP_DIR = Config.TEMP_DIR
 TEMPLATES_DIR = Config.TEMPLATES_DIR
 
-# قاموس لتخزين حالات المستخدمين
-user_states = {}
+# حالات المستخدمين (نفس مخزن الجلسات بمفاتيح منفصلة)
+user_states = get_session_store('user_states')
 
 # دالة لتعيين حالة المستخدم (يستخدمها ملف admin_handlers.py)
 def set_user_state(user_id, state_name, data=None):
@@ -176,6 +184,9 @@ class BotStates(StatesGroup):
     admin_waiting_for_watermark_padding = State()  # حالة انتظار تباعد العلامة المائية
     admin_waiting_for_watermark_image = State()  # حالة انتظار صورة العلامة المائية
 
+# Update types requested from Telegram when polling
+ALLOWED_UPDATES = ['message', 'channel_post', 'edited_channel_post']
+
 def start_bot():
     """Start the bot."""
     # Get the telegram token from environment variable or config
@@ -192,123 +203,122 @@ def start_bot():
     
     logger.info(f"Starting the Telegram bot '{Config.BOT_NAME}'...")
     
+    register_handlers(bot)
+    run_polling(bot)
+
+
+def start_bot_async():
+    """Start the bot on asyncio with AsyncTeleBot instead of threaded polling.
+    
+    The same handlers are registered through a synchronous bridge and run on
+    a small thread pool, while all Bot API calls and file transfers share one
+    aiohttp connection pool on the event loop.
+    """
+    token = Config.BOT_TOKEN
+    if not token:
+        logger.error("No Telegram token found in environment variables or config!")
+        return
+    
+    # Ensure temp directory exists
+    ensure_temp_dir(Config.TEMP_DIR)
+    
+    logger.info(f"Starting the Telegram bot '{Config.BOT_NAME}' (asyncio)...")
+    
+    from async_bot import run_async_bot
+    run_async_bot(token, register_handlers, allowed_updates=ALLOWED_UPDATES)
+
+
+def start_bot_webhook(app):
+    """Receive updates through a webhook endpoint on the Flask app.
+    
+    Updates are deduplicated by update_id and handled on a job queue; the
+    bot is created with threaded=False so handlers run on those workers.
+    
+    Args:
+        app: Flask application that serves the endpoint (e.g. under gunicorn)
+    """
+    token = Config.BOT_TOKEN
+    if not token:
+        logger.error("No Telegram token found in environment variables or config!")
+        return
+    if not Config.WEBHOOK_URL:
+        logger.error("WEBHOOK_MODE is enabled but WEBHOOK_URL is not set!")
+        return
+    
+    # Ensure temp directory exists
+    ensure_temp_dir(Config.TEMP_DIR)
+    
+    bot = telebot.TeleBot(token, threaded=False)
+    logger.info(f"Starting the Telegram bot '{Config.BOT_NAME}' (webhook)...")
+    
+    register_handlers(bot)
+    get_session()
+    
+    from webhook import mount_webhook
+    mount_webhook(app, bot)
+    
+    webhook_url = Config.WEBHOOK_URL.rstrip('/') + Config.WEBHOOK_PATH
+    bot.set_webhook(
+        url=webhook_url,
+        allowed_updates=ALLOWED_UPDATES,
+        secret_token=Config.WEBHOOK_SECRET or None
+    )
+    logger.info(f"Webhook set to {webhook_url}")
+    return bot
+
+
+def register_handlers(bot):
+    """Register all message, callback and channel handlers on bot.
+    
+    Args:
+        bot: telebot.TeleBot, or the SyncBotBridge used by start_bot_async
+    """
+    # Every send/edit from the handlers goes through the shared rate limiter
+    # (global and per-chat token buckets, retry on 429)
+    bot = rate_limited(bot)
+    
+    # Downloads, tag work and uploads run on the processing workers so that
+    # handler threads stay free for callbacks and commands
+    processing_queue = get_processing_queue()
+    
+    def enqueue_job(chat_id, func, *args, notify=True, progress=None, **kwargs):
+        """Queue func on the processing workers and return immediately.
+        
+        When all workers are busy the user is told their place in the queue;
+        when the queue is full the job is rejected.
+        
+        Args:
+            chat_id: Chat to notify about the queue position
+            func: Function to run on a worker
+            notify: Whether to send queue messages to chat_id
+            progress: ProgressReporter passed on to func as progress=; the
+                queue position is shown in its status message
+            
+        Returns:
+            Job or None if the queue is full
+        """
+        if progress is not None:
+            kwargs['progress'] = progress
+        try:
+            job = processing_queue.submit(func, *args, **kwargs)
+        except QueueFullError as e:
+            logger.warning(f"Rejected {getattr(func, '__name__', 'job')} for chat {chat_id}: {e}")
+            if notify:
+                bot.send_message(chat_id, "⚠️ الخادم مشغول حالياً بمعالجة ملفات أخرى، الرجاء إعادة المحاولة بعد قليل.")
+            return None
+        if notify and job.position:
+            text = f"⏳ أنت رقم {job.position} في قائمة الانتظار، ستبدأ معالجة طلبك قريباً."
+            if progress is not None:
+                progress.waiting(text)
+            else:
+                bot.send_message(chat_id, text)
+        return job
+    
     # تسجيل حدث بدء التشغيل
     logger.info(f"Bot started in {Config.ENVIRONMENT} environment")
     
-    # إعداد المعالجة التلقائية للقنوات - مباشرة في الملف الرئيسي
-    if Config.AUTO_PROCESSING_ENABLED and Config.SOURCE_CHANNEL:
-        logger.info(f"إعداد المعالجة التلقائية للقناة: {Config.SOURCE_CHANNEL}")
-        
-        # معالج شامل لكل منشورات القنوات مع تسجيل مفصل
-        @bot.channel_post_handler(func=lambda message: True)
-        def debug_all_channel_posts(message):
-            """معالج تشخيصي لكل منشورات القنوات"""
-            logger.info(f"📢 [CHANNEL] منشور جديد - قناة: {message.chat.id}, نوع: {message.content_type}")
-            print(f"📢 [CHANNEL] منشور جديد - قناة: {message.chat.id}, نوع: {message.content_type}")
-            
-            if str(message.chat.id) == str(Config.SOURCE_CHANNEL):
-                logger.info(f"🎯 [SOURCE] منشور من قناة المصدر المستهدفة!")
-                print(f"🎯 [SOURCE] منشور من قناة المصدر المستهدفة!")
-                
-                if message.content_type in ['audio', 'document']:
-                    logger.info(f"🎵 [AUDIO] ملف صوتي اكتُشف! بدء المعالجة...")
-                    print(f"🎵 [AUDIO] ملف صوتي اكتُشف! بدء المعالجة...")
-                    handle_channel_audio_direct(message)
-                else:
-                    logger.info(f"📝 [TEXT] منشور نصي تم تجاهله: {message.content_type}")
-                    print(f"📝 [TEXT] منشور نصي تم تجاهله: {message.content_type}")
-            else:
-                logger.info(f"⏭️ [OTHER] منشور من قناة أخرى: {message.chat.id}")
-                print(f"⏭️ [OTHER] منشور من قناة أخرى: {message.chat.id}")
-        
-        # إضافة معالج تجريبي إضافي
-        @bot.message_handler(func=lambda message: message.forward_from_chat and str(message.forward_from_chat.id) == str(Config.SOURCE_CHANNEL))
-        def handle_forwarded_audio(message):
-            """معالج للرسائل المحولة من قناة المصدر"""
-            logger.info(f"📤 [FORWARD] رسالة محولة من قناة المصدر: {message.content_type}")
-            print(f"📤 [FORWARD] رسالة محولة من قناة المصدر: {message.content_type}")
-        
-        def handle_channel_audio_direct(message):
-            """معالج مباشر للملفات الصوتية في القنوات"""
-            try:
-                logger.info(f"🎵 تم استلام ملف في القناة: {message.chat.id} - نوع: {message.content_type}")
-                
-                # التحقق من معرف القناة
-                if str(message.chat.id) == str(Config.SOURCE_CHANNEL):
-                    logger.info("✅ ملف من قناة المصدر - بدء المعالجة")
-                    
-                    # استيراد وتشغيل المعالج
-                    from auto_processor import process_audio_file
-                    
-                    # الحصول على معلومات الملف
-                    if message.content_type == 'audio':
-                        file_id = message.audio.file_id
-                        file_name = message.audio.file_name or f"audio_{file_id}.mp3"
-                    elif message.content_type == 'document' and message.document.mime_type and message.document.mime_type.startswith('audio/'):
-                        file_id = message.document.file_id  
-                        file_name = message.document.file_name or f"audio_{file_id}"
-                    else:
-                        logger.info("ملف غير صوتي تم تجاهله")
-                        return
-                    
-                    logger.info(f"📥 بدء تنزيل الملف: {file_name}")
-                    
-                    # تنزيل الملف
-                    file_info = bot.get_file(file_id)
-                    if not file_info.file_path:
-                        logger.error("لم يتم العثور على مسار الملف")
-                        return
-                    
-                    downloaded_file = bot.download_file(file_info.file_path)
-                    
-                    # حفظ الملف مؤقتاً
-                    import tempfile
-                    import os
-                    temp_dir = os.path.join(Config.TEMP_DIR, "auto_channel")
-                    os.makedirs(temp_dir, exist_ok=True)
-                    
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file_name)[1], dir=temp_dir) as temp_file:
-                        temp_file.write(downloaded_file)
-                        temp_file_path = temp_file.name
-                    
-                    logger.info(f"📂 تم حفظ الملف مؤقتاً: {temp_file_path}")
-                    
-                    # معالجة الملف
-                    processed_file_path = process_audio_file(temp_file_path, message.caption)
-                    
-                    if processed_file_path:
-                        logger.info("✅ تم معالجة الملف بنجاح")
-                        
-                        # إرسال الملف المعالج للقناة الهدف
-                        target_chat = Config.TARGET_CHANNEL or message.chat.id
-                        
-                        with open(processed_file_path, 'rb') as audio_file:
-                            sent_message = bot.send_audio(
-                                target_chat,
-                                audio_file,
-                                caption=f"تم معالجة الملف تلقائياً ✅\n{message.caption if message.caption else ''}",
-                                disable_notification=True
-                            )
-                        
-                        logger.info(f"📤 تم إرسال الملف المعالج إلى: {target_chat}")
-                        
-                        # تنظيف الملفات المؤقتة
-                        try:
-                            os.remove(temp_file_path)
-                            os.remove(processed_file_path)
-                            logger.info("🗑️ تم تنظيف الملفات المؤقتة")
-                        except Exception as cleanup_err:
-                            logger.error(f"خطأ في تنظيف الملفات: {cleanup_err}")
-                    else:
-                        logger.error("❌ فشل في معالجة الملف")
-                        
-                else:
-                    logger.info(f"⏭️ ملف من قناة أخرى تم تجاهله: {message.chat.id}")
-                    
-            except Exception as e:
-                logger.error(f"❌ خطأ في معالجة الملف التلقائية: {str(e)}")
-        
-        logger.info("تم تفعيل المعالجة التلقائية للقنوات")
+    # المعالجة التلقائية لقناة المصدر: خط تنزيل ← وسوم ← رفع بطوابير وعمال لكل مرحلة
+    setup_channel_pipeline(bot)
     
     # Define handlers
     # Command for getting bot status
@@ -521,7 +531,20 @@ def start_bot():
     # Handler for receiving audio files
     @bot.message_handler(content_types=['audio', 'document'])
     def receive_audio(message):
-        """Handle receiving an audio file and display the current tags."""
+        """Queue an incoming audio file for processing."""
+        enqueue_job(message.chat.id, process_received_audio, message,
+                    progress=ProgressReporter(bot, message.chat.id))
+    
+    def process_received_audio(message, progress=None):
+        """Handle receiving an audio file and display the current tags.
+        
+        Args:
+            message: Message with the audio file or audio document
+            progress: ProgressReporter for the download status message
+        """
+        if progress is None:
+            progress = ProgressReporter(bot, message.chat.id)
+        
         logger.info(f"Received potential audio file from user {message.from_user.id}")
         logger.info(f"Message type: {message.content_type}")
         
@@ -556,15 +579,15 @@ def start_bot():
                 file_id = document.file_id
                 file_name = document.file_name or f"audio_{file_id}"
             else:
-                bot.send_message(message.chat.id, "هذا لا يبدو ملفًا صوتيًا. الرجاء إرسال ملف صوتي.")
+                progress.fail("هذا لا يبدو ملفًا صوتيًا. الرجاء إرسال ملف صوتي.")
                 return
         
         if not audio_file or not file_id:
-            bot.send_message(message.chat.id, "لم أتمكن من اكتشاف ملف صوتي. الرجاء إرسال ملف صوتي.")
+            progress.fail("لم أتمكن من اكتشاف ملف صوتي. الرجاء إرسال ملف صوتي.")
             return
         
         # Download the file
-        bot.send_message(message.chat.id, "جاري تنزيل الملف الصوتي...")
+        progress.stage("📥 جاري تنزيل الملف الصوتي...", 0)
         
         try:
             logger.info(f"Attempting to download file with ID: {file_id}")
@@ -573,22 +596,28 @@ def start_bot():
             
             if not file_info.file_path:
                 logger.error("file_info.file_path is None or empty")
-                bot.send_message(message.chat.id, "تعذر الحصول على مسار الملف. الرجاء المحاولة مرة أخرى.")
+                progress.fail("تعذر الحصول على مسار الملف. الرجاء المحاولة مرة أخرى.")
                 return
                 
-            logger.info(f"Downloading file from path: {file_info.file_path}")
-            downloaded_file = bot.download_file(file_info.file_path)
-            logger.info(f"Downloaded file of size: {len(downloaded_file)} bytes")
+            safe_file_name = sanitize_filename(file_name)
+            
+            # Each upload gets its own workspace; it is removed here if the
+            # download fails, otherwise it stays with the user's session
+            with get_workspace_manager().create(f"user{user_id}") as workspace:
+                file_path = workspace.file(safe_file_name)
+                
+                # Stream straight to disk so large files never sit in memory
+                logger.info(f"Downloading file from path: {file_info.file_path}")
+                download = download_to_file(bot, file_info.file_path, file_path,
+                                            progress=progress.callback)
+                logger.info(f"Downloaded file of size: {download.size} bytes")
+                workspace.keep()
         except Exception as e:
             logger.error(f"Error downloading file: {e}")
-            bot.send_message(message.chat.id, f"حدث خطأ في تنزيل الملف: {e}. الرجاء المحاولة مرة أخرى.")
+            progress.fail(f"حدث خطأ في تنزيل الملف: {e}. الرجاء المحاولة مرة أخرى.")
             return
         
-        safe_file_name = sanitize_filename(file_name)
-        file_path = os.path.join(TEMP_DIR, f"{user_id}_{safe_file_name}")
-        
-        with open(file_path, 'wb') as new_file:
-            new_file.write(downloaded_file)
+        progress.done(f"✅ تم تنزيل الملف الصوتي ({download.size / (1024 * 1024):.1f} ميجابايت).")
         
         # Store the file path
         user_data[user_id]['file_path'] = file_path
@@ -597,7 +626,7 @@ def start_bot():
         # Get the current tags
         try:
             logger.info(f"Reading tags from file: {file_path}")
-            tags = get_audio_tags(file_path)
+            tags = get_audio_tags(file_path, header_only=True)
             logger.info(f"Retrieved tags: {tags}")
             
             # Store the complete tags from the file for future reference
@@ -649,8 +678,8 @@ def start_bot():
                 
                 # إضافة العلامات الأخرى إذا كان هناك مساحة كافية
                 if current_length < max_caption_length - 50:  # ترك مساحة للمزيد
-                    for key, value in tags.items():
-                        if key != 'lyrics' and key not in priority_tags and key != 'has_album_art' and key != 'file_type':
+                    for key, value in tags.scalar_items():
+                        if key not in priority_tags:
                             arabic_name = arabic_names.get(key, key)
                             
                             # تقصير القيم الطويلة
@@ -667,7 +696,7 @@ def start_bot():
                                 break
                 
                 # إضافة ملاحظة عن كلمات الأغنية إذا كانت موجودة
-                if 'lyrics' in tags and tags.get('lyrics') and current_length + 60 < max_caption_length:
+                if tags.may_have_lyrics and current_length + 60 < max_caption_length:
                     tag_text += "\n(كلمات الأغنية متاحة عند النقر على زر 'تعديل الوسوم')\n"
                 
                 logger.info(f"Formatted tag text: {tag_text}")
@@ -702,7 +731,7 @@ def start_bot():
                 
                 if image_data:
                     # Save album art to a temporary file
-                    art_file_path = os.path.join(TEMP_DIR, f"{user_id}_albumart.jpg")
+                    art_file_path = os.path.join(os.path.dirname(file_path), "albumart.jpg")
                     logger.info(f"Saving album art to: {art_file_path}")
                     with open(art_file_path, 'wb') as art_file:
                         art_file.write(image_data)
@@ -744,6 +773,8 @@ def start_bot():
             )
     
     # Callback query handler for inline buttons
+    callbacks = CallbackRouter('callbacks')
+    
     @bot.callback_query_handler(func=lambda call: not call.data.startswith("admin_"))
     def handle_callback_query(call):
         """Handle callback queries from inline keyboard buttons."""
@@ -754,919 +785,955 @@ def start_bot():
             # Always answer callback query first to prevent timeout errors
             bot.answer_callback_query(call.id)
             
-            if call.data == 'open_admin_panel':
-                # فتح لوحة الإدارة للمشرف أو المطور
-                # التحقق من أن المستخدم مطور أو مشرف
-                developer_ids = [1174919068, 6556918772, 6602517122]
-                is_dev = user_id in developer_ids
+            if not callbacks.dispatch(call.data, call, user_id):
+                logger.info(f"No handler registered for callback: {call.data}")
                 
-                if admin_panel.is_admin(user_id) or is_dev:
-                    # إذا كان مطوراً ولكن ليس مشرفاً، أضفه كمشرف
-                    if is_dev and not admin_panel.is_admin(user_id):
-                        admin_panel.add_admin(user_id)
-                        logger.info(f"تمت إضافة مطور البوت {user_id} كمشرف تلقائياً")
-                    
-                    # فتح لوحة الإدارة للمشرف أو المطور
-                    admin_handlers.open_admin_panel(bot, call.message)
-                else:
-                    bot.send_message(call.message.chat.id, "⛔ غير مصرح لك بالوصول إلى لوحة الإدارة.")
+        except Exception as e:
+            # Log detailed error information
+            error_data = log_error(
+                "CALLBACK_QUERY_ERROR", 
+                str(e), 
+                user_id=user_id, 
+                function_name="handle_callback_query",
+                extra_details={"callback_data": call.data}
+            )
             
-            elif call.data == "confirm_template":
-                # تأكيد حفظ القالب
-                logger.info(f"User {user_id} confirmed template saving")
-                
-                # التحقق من وجود حالة المستخدم وبياناته
-                user_state = get_user_state(user_id)
-                
-                if user_state and user_state.get("state") == "admin_waiting_for_template_confirmation":
-                    # التحقق من وجود بيانات القالب
-                    if user_id in user_data and 'manual_template_tags' in user_data[user_id]:
-                        template_tags = user_data[user_id]['manual_template_tags']
-                        
-                        # تحديث رسالة العرض
-                        bot.edit_message_text(
-                            "✅ *جاري حفظ القالب...*",
-                            call.message.chat.id, call.message.message_id,
-                            parse_mode="Markdown"
-                        )
-                        
-                        # طلب اسم القالب
-                        msg = bot.edit_message_text(
-                            "✏️ *إدخال اسم القالب*\n\n"
-                            "أدخل اسمًا للقالب العام (يفضل أن يتضمن اسم الفنان). هذا الاسم سيظهر في قائمة القوالب العامة.\n\n"
-                            "❔ *مثال:* قالب أغاني عيسى الليث\n\n"
-                            "🔄 أرسل `الغاء` للإلغاء.",
-                            call.message.chat.id, call.message.message_id,
-                            parse_mode="Markdown"
-                        )
-                        
-                        # تحديث حالة المستخدم
-                        set_user_state(user_id, "admin_waiting_for_template_name", {
-                            "message_id": msg.message_id,
-                            "template_tags": template_tags
-                        })
-                    else:
-                        # عدم وجود بيانات للقالب
-                        bot.answer_callback_query(
-                            call.id,
-                            "❌ لم يتم العثور على بيانات القالب.",
-                            show_alert=True
-                        )
-                        # العودة للوحة التحكم
-                        admin_handlers.open_admin_panel(bot, call.message)
-                else:
-                    # حالة المستخدم غير صحيحة
-                    bot.answer_callback_query(
-                        call.id,
-                        "❌ حدث خطأ في حالة المستخدم أثناء حفظ القالب.",
-                        show_alert=True
-                    )
-                    # العودة للوحة التحكم
-                    admin_handlers.open_admin_panel(bot, call.message)
-                    
-            elif call.data == "cancel_template":
-                # إلغاء حفظ القالب
-                logger.info(f"User {user_id} cancelled template saving")
+            # Add error to bot status
+            if len(bot_status["errors"]) >= 10:  # Keep only the last 10 errors
+                bot_status["errors"].pop(0)
+            bot_status["errors"].append(error_data)
+            bot_status["failed_operations"] += 1
+            
+            # Send user friendly error message
+            bot.send_message(
+                call.message.chat.id, 
+                response_messages["invalid_input"] + f"\nنوع الخطأ: {type(e).__name__}"
+            )
+    
+    # Button handlers, looked up by exact callback data or by prefix
+    @callbacks.route("open_admin_panel")
+    def on_open_admin_panel(call, user_id):
+        # فتح لوحة الإدارة للمشرف أو المطور
+        # التحقق من أن المستخدم مطور أو مشرف
+        developer_ids = [1174919068, 6556918772, 6602517122]
+        is_dev = user_id in developer_ids
+        
+        if admin_panel.is_admin(user_id) or is_dev:
+            # إذا كان مطوراً ولكن ليس مشرفاً، أضفه كمشرف
+            if is_dev and not admin_panel.is_admin(user_id):
+                admin_panel.add_admin(user_id)
+                logger.info(f"تمت إضافة مطور البوت {user_id} كمشرف تلقائياً")
+            
+            # فتح لوحة الإدارة للمشرف أو المطور
+            admin_handlers.open_admin_panel(bot, call.message)
+        else:
+            bot.send_message(call.message.chat.id, "⛔ غير مصرح لك بالوصول إلى لوحة الإدارة.")
+
+    @callbacks.route("confirm_template")
+    def on_confirm_template(call, user_id):
+        # تأكيد حفظ القالب
+        logger.info(f"User {user_id} confirmed template saving")
+        
+        # التحقق من وجود حالة المستخدم وبياناته
+        user_state = get_user_state(user_id)
+        
+        if user_state and user_state.get("state") == "admin_waiting_for_template_confirmation":
+            # التحقق من وجود بيانات القالب
+            if user_id in user_data and 'manual_template_tags' in user_data[user_id]:
+                template_tags = user_data[user_id]['manual_template_tags']
+                
+                # تحديث رسالة العرض
+                bot.edit_message_text(
+                    "✅ *جاري حفظ القالب...*",
+                    call.message.chat.id, call.message.message_id,
+                    parse_mode="Markdown"
+                )
                 
-                # تنظيف حالة المستخدم
-                bot.delete_state(user_id, call.message.chat.id)
+                # طلب اسم القالب
+                msg = bot.edit_message_text(
+                    "✏️ *إدخال اسم القالب*\n\n"
+                    "أدخل اسمًا للقالب العام (يفضل أن يتضمن اسم الفنان). هذا الاسم سيظهر في قائمة القوالب العامة.\n\n"
+                    "❔ *مثال:* قالب أغاني عيسى الليث\n\n"
+                    "🔄 أرسل `الغاء` للإلغاء.",
+                    call.message.chat.id, call.message.message_id,
+                    parse_mode="Markdown"
+                )
                 
-                # إظهار رسالة
+                # تحديث حالة المستخدم
+                set_user_state(user_id, "admin_waiting_for_template_name", {
+                    "message_id": msg.message_id,
+                    "template_tags": template_tags
+                })
+            else:
+                # عدم وجود بيانات للقالب
                 bot.answer_callback_query(
                     call.id,
-                    "تم إلغاء حفظ القالب.",
+                    "❌ لم يتم العثور على بيانات القالب.",
                     show_alert=True
                 )
-                
                 # العودة للوحة التحكم
                 admin_handlers.open_admin_panel(bot, call.message)
+        else:
+            # حالة المستخدم غير صحيحة
+            bot.answer_callback_query(
+                call.id,
+                "❌ حدث خطأ في حالة المستخدم أثناء حفظ القالب.",
+                show_alert=True
+            )
+            # العودة للوحة التحكم
+            admin_handlers.open_admin_panel(bot, call.message)
+
+    @callbacks.route("cancel_template")
+    def on_cancel_template(call, user_id):
+        # إلغاء حفظ القالب
+        logger.info(f"User {user_id} cancelled template saving")
+        
+        # تنظيف حالة المستخدم
+        bot.delete_state(user_id, call.message.chat.id)
+        
+        # إظهار رسالة
+        bot.answer_callback_query(
+            call.id,
+            "تم إلغاء حفظ القالب.",
+            show_alert=True
+        )
+        
+        # العودة للوحة التحكم
+        admin_handlers.open_admin_panel(bot, call.message)
+
+    @callbacks.route("about_bot")
+    def on_about_bot(call, user_id):
+        # عرض معلومات حول البوت
+        about_text = (
+            "ℹ️ *حول البوت*\n\n"
+            "*بوت تعديل الوسوم الصوتية 🎵*\n\n"
+            "هذا البوت متخصص في إدارة وتعديل وسوم الملفات الصوتية بطريقة سهلة ومتكاملة باللغة العربية.\n\n"
+            "*🔹 المميزات الرئيسية:*\n"
+            "• دعم جميع أنواع الملفات الصوتية: MP3، FLAC، OGG، WAV، M4A، AAC\n"
+            "• تعديل كامل لوسوم ID3v2 مع واجهة تفاعلية سهلة الاستخدام\n"
+            "• حفظ قوالب مخصصة لكل فنان لتطبيقها بسهولة على الملفات\n"
+            "• إمكانية إضافة وتعديل صور الألبوم عالية الدقة\n"
+            "• استخراج وتعديل كلمات الأغاني\n"
+            "• إنشاء قوالب يدوية بدون الحاجة لملف صوتي\n"
+            "• معالجة متقدمة للوسوم مع دعم كامل للغة العربية\n\n"
             
-            elif call.data == 'about_bot':
-                # عرض معلومات حول البوت
-                about_text = (
-                    "ℹ️ *حول البوت*\n\n"
-                    "*بوت تعديل الوسوم الصوتية 🎵*\n\n"
-                    "هذا البوت متخصص في إدارة وتعديل وسوم الملفات الصوتية بطريقة سهلة ومتكاملة باللغة العربية.\n\n"
-                    "*🔹 المميزات الرئيسية:*\n"
-                    "• دعم جميع أنواع الملفات الصوتية: MP3، FLAC، OGG، WAV، M4A، AAC\n"
-                    "• تعديل كامل لوسوم ID3v2 مع واجهة تفاعلية سهلة الاستخدام\n"
-                    "• حفظ قوالب مخصصة لكل فنان لتطبيقها بسهولة على الملفات\n"
-                    "• إمكانية إضافة وتعديل صور الألبوم عالية الدقة\n"
-                    "• استخراج وتعديل كلمات الأغاني\n"
-                    "• إنشاء قوالب يدوية بدون الحاجة لملف صوتي\n"
-                    "• معالجة متقدمة للوسوم مع دعم كامل للغة العربية\n\n"
-                    
-                    "*🔹 ميزات متقدمة:*\n"
-                    "• نظام معالجة تلقائية للملفات الصوتية من القنوات\n"
-                    "• استبدال نصوص تلقائي في الوسوم\n"
-                    "• تطبيق قوالب ذكية حسب اسم الفنان\n"
-                    "• حفظ الملفات مع الحفاظ على جودة الصوت الأصلية\n"
-                    "• تحسين تلقائي لصور الألبوم في تيليجرام\n"
-                    "• دعم الضغط بضغطة واحدة على وسم معين لتعديله\n"
-                    "• حماية من حالات الخطأ مع تقارير تشخيصية متقدمة\n\n"
-                    
-                    "*🔹 للاستخدام:*\n"
-                    "• أرسل ملفًا صوتيًا للبوت ليعرض لك الوسوم الحالية وخيارات التعديل\n"
-                    "• استخدم قائمة 'إدارة القوالب' لإنشاء وتطبيق القوالب\n"
-                    "• اضغط على وسم معين لتعديل قيمته\n"
-                    "• احفظ التغييرات بعد الانتهاء من التعديل\n\n"
+            "*🔹 ميزات متقدمة:*\n"
+            "• نظام معالجة تلقائية للملفات الصوتية من القنوات\n"
+            "• استبدال نصوص تلقائي في الوسوم\n"
+            "• تطبيق قوالب ذكية حسب اسم الفنان\n"
+            "• حفظ الملفات مع الحفاظ على جودة الصوت الأصلية\n"
+            "• تحسين تلقائي لصور الألبوم في تيليجرام\n"
+            "• دعم الضغط بضغطة واحدة على وسم معين لتعديله\n"
+            "• حماية من حالات الخطأ مع تقارير تشخيصية متقدمة\n\n"
+            
+            "*🔹 للاستخدام:*\n"
+            "• أرسل ملفًا صوتيًا للبوت ليعرض لك الوسوم الحالية وخيارات التعديل\n"
+            "• استخدم قائمة 'إدارة القوالب' لإنشاء وتطبيق القوالب\n"
+            "• اضغط على وسم معين لتعديل قيمته\n"
+            "• احفظ التغييرات بعد الانتهاء من التعديل\n\n"
+            
+            "*🔹 قناة البوت:*\n"
+            "• [@zawamlAnsarAlllah](https://t.me/zawamlAnsarAlllah)\n\n"
+            
+            "*🔹 تطوير:*\n"
+            "• المطور: [عدي الغولي](https://t.me/odaygholy)\n\n"
+            
+            "*📚 للمساعدة:* استخدم الأمر /help"
+        )
+        
+        # إنشاء لوحة مفاتيح مع زر العودة
+        markup = types.InlineKeyboardMarkup()
+        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="back_to_start"))
+        
+        try:
+            bot.edit_message_text(
+                chat_id=call.message.chat.id,
+                message_id=call.message.message_id,
+                text=about_text,
+                reply_markup=markup,
+                parse_mode="Markdown"
+            )
+        except Exception as e:
+            logger.error(f"Error editing message for about_bot: {e}")
+            bot.send_message(
+                call.message.chat.id,
+                about_text,
+                reply_markup=markup,
+                parse_mode="Markdown"
+            )
+
+    @callbacks.route("edit_tags")
+    def on_edit_tags(call, user_id):
+        # Handle edit tags button
+        handle_edit_tags(call.message, user_id)
+
+    # تم حذف وظيفة تنزيل بدون تعديل بناءً على طلب المستخدم
+    @callbacks.route("show_templates")
+    def on_show_templates(call, user_id):
+        # Show templates menu
+        handle_show_templates(call.message, user_id)
+
+    @callbacks.route("save_template")
+    def on_save_template(call, user_id):
+        # Save current tags as template
+        handle_save_template(call.message, user_id)
+
+    @callbacks.prefix("artist_templates_")
+    def on_artist_templates(call, user_id):
+        # Show templates for specific artist
+        artist_name = call.data.replace('artist_templates_', '')
+        handle_show_artist_templates(call.message, user_id, artist_name)
+
+    @callbacks.route("apply_template_menu")
+    def on_apply_template_menu(call, user_id):
+        # عرض قائمة القوالب المتاحة للتطبيق على الملف الصوتي الحالي
+        logger.info(f"User {user_id} wants to apply a template from the audio view")
+        
+        # التأكد من وجود ملف صوتي
+        if user_id not in user_data or 'file_path' not in user_data[user_id]:
+            bot.send_message(
+                call.message.chat.id,
+                "لم يتم العثور على ملف صوتي. الرجاء إرسال ملف صوتي أولاً."
+            )
+            return
+        
+        # جلب قائمة الفنانين الذين لديهم قوالب
+        artists = get_artists_with_templates()
+        
+        if not artists:
+            bot.send_message(
+                call.message.chat.id,
+                "لا توجد قوالب محفوظة بعد. قم بإنشاء قالب أولاً من خلال قائمة إدارة القوالب."
+            )
+            return
+        
+        # إنشاء لوحة مفاتيح مع أسماء الفنانين
+        markup = types.InlineKeyboardMarkup(row_width=1)
+        for artist in artists:
+            markup.add(types.InlineKeyboardButton(
+                text=f"🎵 {artist}",
+                callback_data=f"apply_artist_templates_{artist}"
+            ))
+        markup.add(types.InlineKeyboardButton("🔙 رجوع للوسوم", callback_data="back_to_tags"))
+        
+        # حفظ رسالة القائمة في بيانات المستخدم لتنظيفها لاحقاً
+        message = bot.send_message(
+            call.message.chat.id,
+            "🗂️ اختر الفنان الذي تريد تطبيق أحد قوالبه:",
+            reply_markup=markup
+        )
+        
+        # حفظ معرف الرسالة للتنظيف
+        user_data[user_id] = user_data.get(user_id, {})
+        user_data[user_id]['ui_messages'] = user_data[user_id].get('ui_messages', [])
+        user_data[user_id]['ui_messages'].append(message.message_id)
+
+    @callbacks.prefix("apply_artist_templates_")
+    def on_apply_artist_templates(call, user_id):
+        # عرض قوالب فنان محدد للتطبيق
+        artist_name = call.data.replace('apply_artist_templates_', '')
+        logger.info(f"User {user_id} wants to apply template from artist: {artist_name}")
+        
+        # التأكد من وجود ملف صوتي
+        if user_id not in user_data or 'file_path' not in user_data[user_id]:
+            bot.send_message(
+                call.message.chat.id,
+                "لم يتم العثور على ملف صوتي. الرجاء إرسال ملف صوتي أولاً."
+            )
+            return
+        
+        # جلب قوالب الفنان
+        templates = list_templates(artist_name)
+        
+        if not templates:
+            bot.send_message(
+                call.message.chat.id,
+                f"لا توجد قوالب محفوظة للفنان '{artist_name}'."
+            )
+            return
+        
+        # إنشاء لوحة مفاتيح مع أسماء القوالب
+        markup = types.InlineKeyboardMarkup(row_width=1)
+        for template in templates:
+            # إضافة أيقونة للقوالب التي لديها صورة
+            icon = "🖼️" if template.get("has_image") else "📋"
+            markup.add(types.InlineKeyboardButton(
+                text=f"{icon} {template['name']}",
+                callback_data=f"direct_apply_template_{template['id']}"
+            ))
+        markup.add(types.InlineKeyboardButton("🔙 رجوع لاختيار الفنان", callback_data="apply_template_menu"))
+        
+        # حفظ رسالة القائمة في بيانات المستخدم لتنظيفها لاحقاً
+        message = bot.send_message(
+            call.message.chat.id,
+            f"اختر القالب الذي تريد تطبيقه من قوالب الفنان '{artist_name}':",
+            reply_markup=markup
+        )
+        
+        # حفظ معرف الرسالة للتنظيف
+        user_data[user_id] = user_data.get(user_id, {})
+        user_data[user_id]['ui_messages'] = user_data[user_id].get('ui_messages', [])
+        user_data[user_id]['ui_messages'].append(message.message_id)
+
+    @callbacks.prefix("direct_apply_template_")
+    def on_direct_apply_template(call, user_id):
+        # تطبيق قالب على الملف الصوتي مباشرة من قائمة الوسوم
+        template_id = call.data.replace('direct_apply_template_', '')
+        logger.info(f"User {user_id} wants to directly apply template: {template_id} to current audio file")
+        
+        # التأكد من وجود ملف صوتي
+        if user_id not in user_data or 'file_path' not in user_data[user_id]:
+            bot.send_message(
+                call.message.chat.id,
+                "لم يتم العثور على ملف صوتي. الرجاء إرسال ملف صوتي أولاً."
+            )
+            return
+        
+        # تنظيف رسائل واجهة المستخدم المؤقتة
+        cleanup_ui_messages(user_id, call.message.chat.id, bot)
+        
+        # جلب القالب
+        template = get_template(template_id)
+        if not template:
+            bot.send_message(
+                call.message.chat.id,
+                f"لم يتم العثور على القالب المحدد."
+            )
+            return
+        
+        # الحصول على مسار الملف الصوتي
+        file_path = user_data[user_id]['file_path']
+        
+        # حفظ الوسوم الأصلية قبل التطبيق
+        original_tags = get_audio_tags(file_path)
+        user_data[user_id]['original_tags'] = original_tags
+        
+        # دمج وسوم القالب مع الوسوم الحالية (مع الحفاظ على الوسوم غير الموجودة في القالب)
+        merged_tags = original_tags.copy()  # بدء من الوسوم الأصلية
+        
+        # التحقق من بنية القالب
+        template_tags = {}
+        
+        # القوالب القديمة تخزن الوسوم في مفتاح 'tags'
+        if 'tags' in template:
+            template_tags = template['tags']
+        # القوالب الجديدة تخزن الوسوم مباشرة في القالب
+        else:
+            # استنساخ القالب ولكن استبعاد 'album_art' إذا كان موجودًا
+            template_tags = {k: v for k, v in template.items() if k != 'album_art'}
+        
+        # تسجيل بنية القالب للتصحيح
+        logger.debug(f"هيكل القالب: {template.keys()}")
+        logger.debug(f"الوسوم المستخرجة: {template_tags.keys()}")
+        
+        # تحديث الوسوم من القالب فقط إذا كان الوسم موجود في القالب وله قيمة
+        for tag_name, tag_value in template_tags.items():
+            if tag_value:  # فقط إذا كانت قيمة الوسم في القالب غير فارغة
+                # إذا كان الوسم هو صورة الألبوم وكانت الصورة موجودة في القالب
+                if tag_name == 'picture' and 'album_art' in template and template['album_art']:
+                    # استخدام صورة الألبوم من القالب
+                    merged_tags[tag_name] = base64.b64decode(template['album_art'])
+                # معالجة خاصة لكلمات الأغنية للتأكد من الحفاظ على تنسيق الأسطر المتعددة
+                elif tag_name == 'lyrics':
+                    # الحفاظ على تنسيق الأسطر المتعددة ومعالجتها بشكل صحيح
+                    lyrics_text = tag_value
                     
-                    "*🔹 قناة البوت:*\n"
-                    "• [@zawamlAnsarAlllah](https://t.me/zawamlAnsarAlllah)\n\n"
+                    # التحقق مما إذا كانت القيمة تبدأ بعلامة $ (متغير)
+                    if isinstance(lyrics_text, str) and lyrics_text.startswith('$'):
+                        # استخراج اسم الوسم والنص الإضافي (إن وجد)
+                        
+                        # البحث عن الكلمات الشائعة التي قد تكون وسوما
+                        common_tags = ['title', 'artist', 'album', 'album_artist', 'year', 'genre', 'composer', 'comment', 'track', 'length', 'lyrics']
+                        
+                        # البحث عن أول تطابق مع أسماء الوسوم المعروفة
+                        var_name = None
+                        additional_text = ''
+                        
+                        # التحقق من حالة خاصة: الوسم بدون مسافة والنص ملتصق به
+                        # مثل: $lyricst.me/ZawamlAnsarallah
+                        for tag in common_tags:
+                            if lyrics_text[1:].startswith(tag):
+                                var_name = tag
+                                additional_text = lyrics_text[len(tag) + 1:]  # +1 للعلامة $
+                                break
+                        
+                        # إذا لم نجد تطابقا مع الحالة الخاصة، نستخدم التقسيم العادي
+                        if var_name is None:
+                            parts = lyrics_text.split(' ', 1)
+                            var_name = parts[0][1:]  # استخراج اسم الوسم بدون علامة $
+                            additional_text = parts[1] if len(parts) > 1 else ''
+                        
+                        # تحويل \n إلى أسطر جديدة حقيقية
+                        if additional_text:
+                            additional_text = additional_text.replace('\\n', '\n')
+                        
+                        # التحقق مما إذا كان الوسم المطلوب موجودًا في الوسوم الأصلية
+                        if var_name in original_tags and original_tags[var_name]:
+                            # دمج القيمة الأصلية مع النص الإضافي
+                            merged_value = original_tags[var_name]
+                            if additional_text:
+                                # إضافة النص الإضافي مع الأخذ بعين الاعتبار أن المتغير قد يكون كلمات الأغنية
+                                if isinstance(merged_value, str):
+                                    # نحتاج للتأكد من إضافة سطر جديد إذا لم يكن هناك
+                                    if additional_text.startswith('\n'):
+                                        merged_value = f"{merged_value}{additional_text}"
+                                    else:
+                                        merged_value = f"{merged_value}\n{additional_text}"
+                            
+                            # تعيين القيمة المدمجة للوسم
+                            lyrics_text = merged_value
+                            logger.info(f"استخدام متغير ${var_name} وإضافة النص الإضافي '{additional_text}' للوسم {tag_name}")
+                        else:
+                            # إذا لم يكن الوسم المطلوب موجودًا، استخدم النص الإضافي فقط (إن وجد)
+                            if additional_text:
+                                lyrics_text = additional_text
+                            # وإلا نضع النص كما هو بدون المتغير
+                            else:
+                                lyrics_text = lyrics_text.replace('$' + var_name, '')
+                    else:
+                        # تحويل \n إلى أسطر جديدة حقيقية إذا كان النص عاديًا
+                        lyrics_text = lyrics_text.replace('\\n', '\n')
                     
-                    "*🔹 تطوير:*\n"
-                    "• المطور: [عدي الغولي](https://t.me/odaygholy)\n\n"
+                    # تنظيف أي تنسيق خاص قد يتسبب في مشاكل
+                    lyrics_text = lyrics_text.replace('\r\n', '\n').replace('\r', '\n')
                     
-                    "*📚 للمساعدة:* استخدم الأمر /help"
-                )
-                
-                # إنشاء لوحة مفاتيح مع زر العودة
-                markup = types.InlineKeyboardMarkup()
-                markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="back_to_start"))
-                
-                try:
-                    bot.edit_message_text(
-                        chat_id=call.message.chat.id,
-                        message_id=call.message.message_id,
-                        text=about_text,
-                        reply_markup=markup,
-                        parse_mode="Markdown"
-                    )
-                except Exception as e:
-                    logger.error(f"Error editing message for about_bot: {e}")
-                    bot.send_message(
-                        call.message.chat.id,
-                        about_text,
-                        reply_markup=markup,
-                        parse_mode="Markdown"
-                    )
-                    
-            elif call.data == 'edit_tags':
-                # Handle edit tags button
-                handle_edit_tags(call.message, user_id)
-                
-            # تم حذف وظيفة تنزيل بدون تعديل بناءً على طلب المستخدم
-                
-            elif call.data == 'show_templates':
-                # Show templates menu
-                handle_show_templates(call.message, user_id)
-                
-            elif call.data == 'save_template':
-                # Save current tags as template
-                handle_save_template(call.message, user_id)
-                
-            elif call.data.startswith('artist_templates_'):
-                # Show templates for specific artist
-                artist_name = call.data.replace('artist_templates_', '')
-                handle_show_artist_templates(call.message, user_id, artist_name)
-                
-            elif call.data == 'apply_template_menu':
-                # عرض قائمة القوالب المتاحة للتطبيق على الملف الصوتي الحالي
-                logger.info(f"User {user_id} wants to apply a template from the audio view")
-                
-                # التأكد من وجود ملف صوتي
-                if user_id not in user_data or 'file_path' not in user_data[user_id]:
-                    bot.send_message(
-                        call.message.chat.id,
-                        "لم يتم العثور على ملف صوتي. الرجاء إرسال ملف صوتي أولاً."
-                    )
-                    return
-                
-                # جلب قائمة الفنانين الذين لديهم قوالب
-                artists = get_artists_with_templates()
-                
-                if not artists:
-                    bot.send_message(
-                        call.message.chat.id,
-                        "لا توجد قوالب محفوظة بعد. قم بإنشاء قالب أولاً من خلال قائمة إدارة القوالب."
-                    )
-                    return
-                
-                # إنشاء لوحة مفاتيح مع أسماء الفنانين
-                markup = types.InlineKeyboardMarkup(row_width=1)
-                for artist in artists:
-                    markup.add(types.InlineKeyboardButton(
-                        text=f"🎵 {artist}",
-                        callback_data=f"apply_artist_templates_{artist}"
-                    ))
-                markup.add(types.InlineKeyboardButton("🔙 رجوع للوسوم", callback_data="back_to_tags"))
-                
-                # حفظ رسالة القائمة في بيانات المستخدم لتنظيفها لاحقاً
-                message = bot.send_message(
-                    call.message.chat.id,
-                    "🗂️ اختر الفنان الذي تريد تطبيق أحد قوالبه:",
-                    reply_markup=markup
-                )
-                
-                # حفظ معرف الرسالة للتنظيف
-                user_data[user_id] = user_data.get(user_id, {})
-                user_data[user_id]['ui_messages'] = user_data[user_id].get('ui_messages', [])
-                user_data[user_id]['ui_messages'].append(message.message_id)
-            
-            elif call.data.startswith('apply_artist_templates_'):
-                # عرض قوالب فنان محدد للتطبيق
-                artist_name = call.data.replace('apply_artist_templates_', '')
-                logger.info(f"User {user_id} wants to apply template from artist: {artist_name}")
-                
-                # التأكد من وجود ملف صوتي
-                if user_id not in user_data or 'file_path' not in user_data[user_id]:
-                    bot.send_message(
-                        call.message.chat.id,
-                        "لم يتم العثور على ملف صوتي. الرجاء إرسال ملف صوتي أولاً."
-                    )
-                    return
-                
-                # جلب قوالب الفنان
-                templates = list_templates(artist_name)
-                
-                if not templates:
-                    bot.send_message(
-                        call.message.chat.id,
-                        f"لا توجد قوالب محفوظة للفنان '{artist_name}'."
-                    )
-                    return
-                
-                # إنشاء لوحة مفاتيح مع أسماء القوالب
-                markup = types.InlineKeyboardMarkup(row_width=1)
-                for template in templates:
-                    # إضافة أيقونة للقوالب التي لديها صورة
-                    icon = "🖼️" if template.get("has_image") else "📋"
-                    markup.add(types.InlineKeyboardButton(
-                        text=f"{icon} {template['name']}",
-                        callback_data=f"direct_apply_template_{template['id']}"
-                    ))
-                markup.add(types.InlineKeyboardButton("🔙 رجوع لاختيار الفنان", callback_data="apply_template_menu"))
-                
-                # حفظ رسالة القائمة في بيانات المستخدم لتنظيفها لاحقاً
-                message = bot.send_message(
-                    call.message.chat.id,
-                    f"اختر القالب الذي تريد تطبيقه من قوالب الفنان '{artist_name}':",
-                    reply_markup=markup
-                )
-                
-                # حفظ معرف الرسالة للتنظيف
-                user_data[user_id] = user_data.get(user_id, {})
-                user_data[user_id]['ui_messages'] = user_data[user_id].get('ui_messages', [])
-                user_data[user_id]['ui_messages'].append(message.message_id)
-            
-            elif call.data.startswith('direct_apply_template_'):
-                # تطبيق قالب على الملف الصوتي مباشرة من قائمة الوسوم
-                template_id = call.data.replace('direct_apply_template_', '')
-                logger.info(f"User {user_id} wants to directly apply template: {template_id} to current audio file")
-                
-                # التأكد من وجود ملف صوتي
-                if user_id not in user_data or 'file_path' not in user_data[user_id]:
-                    bot.send_message(
-                        call.message.chat.id,
-                        "لم يتم العثور على ملف صوتي. الرجاء إرسال ملف صوتي أولاً."
-                    )
-                    return
-                
-                # تنظيف رسائل واجهة المستخدم المؤقتة
-                cleanup_ui_messages(user_id, call.message.chat.id, bot)
-                
-                # جلب القالب
-                template = get_template(template_id)
-                if not template:
-                    bot.send_message(
-                        call.message.chat.id,
-                        f"لم يتم العثور على القالب المحدد."
-                    )
-                    return
-                
-                # الحصول على مسار الملف الصوتي
-                file_path = user_data[user_id]['file_path']
-                
-                # حفظ الوسوم الأصلية قبل التطبيق
-                original_tags = get_audio_tags(file_path)
-                user_data[user_id]['original_tags'] = original_tags
-                
-                # دمج وسوم القالب مع الوسوم الحالية (مع الحفاظ على الوسوم غير الموجودة في القالب)
-                merged_tags = original_tags.copy()  # بدء من الوسوم الأصلية
-                
-                # التحقق من بنية القالب
-                template_tags = {}
-                
-                # القوالب القديمة تخزن الوسوم في مفتاح 'tags'
-                if 'tags' in template:
-                    template_tags = template['tags']
-                # القوالب الجديدة تخزن الوسوم مباشرة في القالب
-                else:
-                    # استنساخ القالب ولكن استبعاد 'album_art' إذا كان موجودًا
-                    template_tags = {k: v for k, v in template.items() if k != 'album_art'}
-                
-                # تسجيل بنية القالب للتصحيح
-                logger.debug(f"هيكل القالب: {template.keys()}")
-                logger.debug(f"الوسوم المستخرجة: {template_tags.keys()}")
-                
-                # تحديث الوسوم من القالب فقط إذا كان الوسم موجود في القالب وله قيمة
-                for tag_name, tag_value in template_tags.items():
-                    if tag_value:  # فقط إذا كانت قيمة الوسم في القالب غير فارغة
-                        # إذا كان الوسم هو صورة الألبوم وكانت الصورة موجودة في القالب
-                        if tag_name == 'picture' and 'album_art' in template and template['album_art']:
-                            # استخدام صورة الألبوم من القالب
-                            merged_tags[tag_name] = base64.b64decode(template['album_art'])
-                        # معالجة خاصة لكلمات الأغنية للتأكد من الحفاظ على تنسيق الأسطر المتعددة
-                        elif tag_name == 'lyrics':
-                            # الحفاظ على تنسيق الأسطر المتعددة ومعالجتها بشكل صحيح
-                            lyrics_text = tag_value
-                            
-                            # التحقق مما إذا كانت القيمة تبدأ بعلامة $ (متغير)
-                            if isinstance(lyrics_text, str) and lyrics_text.startswith('$'):
-                                # استخراج اسم الوسم والنص الإضافي (إن وجد)
-                                
-                                # البحث عن الكلمات الشائعة التي قد تكون وسوما
-                                common_tags = ['title', 'artist', 'album', 'album_artist', 'year', 'genre', 'composer', 'comment', 'track', 'length', 'lyrics']
-                                
-                                # البحث عن أول تطابق مع أسماء الوسوم المعروفة
-                                var_name = None
-                                additional_text = ''
-                                
-                                # التحقق من حالة خاصة: الوسم بدون مسافة والنص ملتصق به
-                                # مثل: $lyricst.me/ZawamlAnsarallah
-                                for tag in common_tags:
-                                    if lyrics_text[1:].startswith(tag):
-                                        var_name = tag
-                                        additional_text = lyrics_text[len(tag) + 1:]  # +1 للعلامة $
-                                        break
-                                
-                                # إذا لم نجد تطابقا مع الحالة الخاصة، نستخدم التقسيم العادي
-                                if var_name is None:
-                                    parts = lyrics_text.split(' ', 1)
-                                    var_name = parts[0][1:]  # استخراج اسم الوسم بدون علامة $
-                                    additional_text = parts[1] if len(parts) > 1 else ''
-                                
-                                # تحويل \n إلى أسطر جديدة حقيقية
-                                if additional_text:
-                                    additional_text = additional_text.replace('\\n', '\n')
-                                
-                                # التحقق مما إذا كان الوسم المطلوب موجودًا في الوسوم الأصلية
-                                if var_name in original_tags and original_tags[var_name]:
-                                    # دمج القيمة الأصلية مع النص الإضافي
-                                    merged_value = original_tags[var_name]
-                                    if additional_text:
-                                        # إضافة النص الإضافي مع الأخذ بعين الاعتبار أن المتغير قد يكون كلمات الأغنية
-                                        if isinstance(merged_value, str):
-                                            # نحتاج للتأكد من إضافة سطر جديد إذا لم يكن هناك
-                                            if additional_text.startswith('\n'):
-                                                merged_value = f"{merged_value}{additional_text}"
-                                            else:
-                                                merged_value = f"{merged_value}\n{additional_text}"
-                                    
-                                    # تعيين القيمة المدمجة للوسم
-                                    lyrics_text = merged_value
-                                    logger.info(f"استخدام متغير ${var_name} وإضافة النص الإضافي '{additional_text}' للوسم {tag_name}")
-                                else:
-                                    # إذا لم يكن الوسم المطلوب موجودًا، استخدم النص الإضافي فقط (إن وجد)
-                                    if additional_text:
-                                        lyrics_text = additional_text
-                                    # وإلا نضع النص كما هو بدون المتغير
-                                    else:
-                                        lyrics_text = lyrics_text.replace('$' + var_name, '')
-                            else:
-                                # تحويل \n إلى أسطر جديدة حقيقية إذا كان النص عاديًا
-                                lyrics_text = lyrics_text.replace('\\n', '\n')
-                            
-                            # تنظيف أي تنسيق خاص قد يتسبب في مشاكل
-                            lyrics_text = lyrics_text.replace('\r\n', '\n').replace('\r', '\n')
-                            
-                            # تأكد أن الأسطر المتعددة في كلمات الأغنية تظل محفوظة
-                            merged_tags[tag_name] = lyrics_text
-                            first_line = lyrics_text.split("\n")[0] if "\n" in lyrics_text else lyrics_text
-                            logger.info(f"Applied lyrics from template, length: {len(lyrics_text)}, first line: {first_line}")
-                        else:
-                            # التحقق مما إذا كانت القيمة تبدأ بعلامة $ متبوعة باسم وسم (وربما نص إضافي)
-                            if isinstance(tag_value, str) and tag_value.startswith('$'):
-                                # استخراج اسم الوسم والنص الإضافي (إن وجد)
-                                
-                                # البحث عن الكلمات الشائعة التي قد تكون وسوما
-                                common_tags = ['title', 'artist', 'album', 'album_artist', 'year', 'genre', 'composer', 'comment', 'track', 'length', 'lyrics']
-                                
-                                # البحث عن أول تطابق مع أسماء الوسوم المعروفة
-                                var_name = None
-                                additional_text = ''
-                                
-                                # التحقق من حالة خاصة: الوسم بدون مسافة والنص ملتصق به
-                                # مثل: $composert.me/ZawamlAnsarallah
-                                for tag in common_tags:
-                                    if tag_value[1:].startswith(tag):
-                                        var_name = tag
-                                        additional_text = tag_value[len(tag) + 1:]  # +1 للعلامة $
-                                        break
-                                
-                                # إذا لم نجد تطابقا مع الحالة الخاصة، نستخدم التقسيم العادي
-                                if var_name is None:
-                                    parts = tag_value.split(' ', 1)
-                                    var_name = parts[0][1:]  # استخراج اسم الوسم بدون علامة $
-                                    additional_text = parts[1] if len(parts) > 1 else ''
-                                
-                                # تحويل \n إلى أسطر جديدة حقيقية في النص الإضافي
-                                if additional_text:
-                                    additional_text = additional_text.replace('\\n', '\n')
-                                
-                                # التحقق مما إذا كان الوسم المطلوب موجودًا في الوسوم الأصلية
-                                if var_name in original_tags and original_tags[var_name]:
-                                    # دمج القيمة الأصلية مع النص الإضافي
-                                    merged_value = original_tags[var_name]
-                                    if additional_text:
-                                        # إضافة مسافة بين القيمة الأصلية والنص الإضافي إذا كانت القيمة الأصلية نصية
-                                        if isinstance(merged_value, str):
-                                            merged_value = f"{merged_value} {additional_text}"
-                                        else:
-                                            # إذا لم تكن القيمة الأصلية نصية (مثل الصورة)، نستخدمها كما هي
-                                            pass
-                                    
-                                    # تعيين القيمة المدمجة للوسم
-                                    merged_tags[tag_name] = merged_value
-                                    logger.info(f"استخدام متغير ${var_name} وإضافة النص الإضافي '{additional_text}' للوسم {tag_name}")
-                                else:
-                                    # إذا لم يكن الوسم المطلوب موجودًا، استخدم النص الإضافي فقط (إن وجد)
-                                    if additional_text:
-                                        merged_tags[tag_name] = additional_text
-                                    # وإلا نضع قيمة الوسم كما هي (ربما لدينا قيمة تبدأ بـ $ عن طريق الخطأ)
-                                    else:
-                                        merged_tags[tag_name] = tag_value
-                            else:
-                                # استخدام قيمة الوسم من القالب
-                                merged_tags[tag_name] = tag_value
-                    
-                # إذا كان القالب لا يحتوي على صورة ألبوم ولكن الملف الأصلي يحتوي عليها، نحتفظ بها
-                if 'picture' in original_tags and ('picture' not in template_tags or not template_tags['picture']):
-                    merged_tags['picture'] = original_tags['picture']
-                
-                # حفظ الوسوم المدمجة كوسوم مؤقتة
-                user_data[user_id]['temp_tags'] = merged_tags
-                
-                # استخراج اسم القالب من معرف الاستدعاء
-                template_name = call.data.replace('direct_apply_template_', '')
-                
-                # رسالة تأكيد
-                bot.send_message(
-                    call.message.chat.id,
-                    f"✅ تم تطبيق القالب '{template_name}' بنجاح. اضغط على زر 'حفظ التغييرات' لحفظ التعديلات."
-                )
-                
-                # عرض الوسوم المحدثة للمستخدم
-                display_current_tags(call.message, user_id, file_path, show_edited=True)
-                
-            elif call.data.startswith('apply_template_'):
-                # Apply selected template (للاستخدام في واجهة إدارة القوالب)
-                template_id = call.data.replace('apply_template_', '')
-                handle_apply_template(call.message, user_id, template_id)
-                
-            elif call.data == 'back_from_edit':
-                # Return to the main file view without saving changes
-                logger.info(f"User {user_id} wants to go back from edit tags without saving")
-                
-                # Check if we have the file
-                if user_id not in user_data or 'file_path' not in user_data[user_id]:
-                    bot.send_message(call.message.chat.id, "لم يتم العثور على ملف صوتي. الرجاء إرسال ملف صوتي أولاً.")
-                    return
-                
-                # تنظيف رسائل واجهة المستخدم الحالية
-                try:
-                    bot.delete_message(call.message.chat.id, call.message.message_id)
-                    logger.debug(f"Deleted edit panel message: {call.message.message_id}")
-                except Exception as e:
-                    logger.error(f"Error deleting message: {e}")
-                
-                # عرض الوسوم الأصلية من جديد (بدون الوسوم المعدلة)
-                file_path = user_data[user_id]['file_path']
-                # تأكد من استخدام الوسوم الأصلية وليس المعدلة
-                if 'temp_tags' in user_data[user_id]:
-                    del user_data[user_id]['temp_tags']
-                
-                display_current_tags(call.message, user_id, file_path, show_edited=False)
-                
-            elif call.data == 'back_to_template_menu':
-                # Return to templates menu
-                handle_show_templates(call.message, user_id)
-                
-            elif call.data == 'cancel':
-                # Handle cancel button
-                handle_cancel_operation(call.message, user_id)
-                
-            elif call.data == 'save_tags':
-                # حفظ التغييرات بعد تطبيق القالب أو تعديل الوسوم
-                logger.info(f"User {user_id} wants to save tags after template application")
-                
-                # التحقق من وجود ملف صوتي
-                if user_id not in user_data or 'file_path' not in user_data[user_id]:
-                    bot.send_message(call.message.chat.id, "لم يتم العثور على ملف صوتي. الرجاء إرسال ملف صوتي أولاً.")
-                    return
-                
-                # التحقق من وجود تغييرات على الوسوم (إما من القالب أو من التعديلات اليدوية)
-                has_changes = False
-                if 'temp_tags' in user_data[user_id] and user_data[user_id]['temp_tags']:
-                    logger.info(f"Found temp_tags for user {user_id}, proceeding with save.")
-                    has_changes = True
-                elif 'new_tags' in user_data[user_id] and user_data[user_id]['new_tags']:
-                    logger.info(f"Found new_tags for user {user_id}, proceeding with save.")
-                    has_changes = True
-                    
-                if not has_changes:
-                    bot.send_message(call.message.chat.id, "لم يتم العثور على تغييرات للحفظ. الرجاء تعديل الوسوم أو تطبيق قالب أولاً.")
-                    return
-                
-                # إنشاء كائن رسالة افتراضي للاستخدام في وظيفة save_tags
-                message_wrapper = SimpleNamespace()
-                message_wrapper.chat = SimpleNamespace()
-                message_wrapper.chat.id = call.message.chat.id
-                message_wrapper._direct_user_id = user_id  # إضافة معرف المستخدم مباشرة في الكائن
-                
-                # استدعاء وظيفة save_tags لحفظ التعديلات
-                bot.send_message(call.message.chat.id, "جاري حفظ التغييرات، يرجى الانتظار...")
-                
-                # استدعاء وظيفة save_tags لحفظ التعديلات
-                save_tags(message_wrapper, bot)
-                
-            elif call.data == 'done_editing':
-                # Handle done editing button
-                logger.info(f"Done editing button pressed by user {user_id}")
-                
-                if user_id in user_data and 'new_tags' in user_data[user_id] and user_data[user_id]['new_tags']:
-                    logger.info(f"User {user_id} finished editing with tags: {user_data[user_id]['new_tags']}")
-                    
-                    # Create a wrapper message object that has the chat.id
-                    # We know user_id is the chat.id in this case
-                    # Create a direct reference to call.message for better reliability
-                    message_wrapper = call.message
-                    # Add a custom property to message for identifying user ID in save_tags
-                    message_wrapper._direct_user_id = user_id
-                    
-                    # Pass the message wrapper to save_tags
-                    save_tags(message_wrapper, bot)
+                    # تأكد أن الأسطر المتعددة في كلمات الأغنية تظل محفوظة
+                    merged_tags[tag_name] = lyrics_text
+                    first_line = lyrics_text.split("\n")[0] if "\n" in lyrics_text else lyrics_text
+                    logger.info(f"Applied lyrics from template, length: {len(lyrics_text)}, first line: {first_line}")
                 else:
-                    bot.send_message(call.message.chat.id, "لم تقم بتعديل أي وسوم. الرجاء تعديل وسم واحد على الأقل أو إلغاء العملية.")
-                    
-            elif call.data == 'upload_picture':
-                # Handle picture upload request
-                logger.info(f"User {user_id} wants to upload album art")
-                
-                # Add a waiting_for_album_art flag to user data
-                if user_id not in user_data:
-                    user_data[user_id] = {}
-                user_data[user_id]['waiting_for_album_art'] = True
-                
-                # Send message to user
-                bot.send_message(
-                    call.message.chat.id,
-                    "الرجاء إرسال صورة لاستخدامها كصورة غلاف للملف الصوتي. 🖼️"
-                )
-                
-            elif call.data.startswith('edit_tag_'):
-                # Handle edit specific tag button
-                tag_name = call.data.replace('edit_tag_', '')
-                logger.info(f"User {user_id} wants to edit tag: {tag_name}")
-                
-                # Special handling for lyrics
-                if tag_name == 'lyrics':
-                    try:
-                        bot.answer_callback_query(
-                            call.id,
-                            "جاري تحضير واجهة تعديل الكلمات..."
-                        )
+                    # التحقق مما إذا كانت القيمة تبدأ بعلامة $ متبوعة باسم وسم (وربما نص إضافي)
+                    if isinstance(tag_value, str) and tag_value.startswith('$'):
+                        # استخراج اسم الوسم والنص الإضافي (إن وجد)
                         
-                        # Store the tag being edited
-                        if user_id not in user_data:
-                            user_data[user_id] = {'new_tags': {}}
-                        if 'new_tags' not in user_data[user_id]:
-                            user_data[user_id]['new_tags'] = {}
-                            
-                        # Check if file path exists in user data
-                        if 'file_path' not in user_data[user_id]:
-                            # No file path means user hasn't sent a file yet
-                            bot.send_message(
-                                call.message.chat.id,
-                                "لم يتم العثور على ملف صوتي. الرجاء إرسال ملف صوتي أولاً."
-                            )
-                            return
-                            
-                        # Store the tag we're editing
-                        user_data[user_id]['editing_tag'] = tag_name
-                        
-                        # Get file path
-                        file_path = user_data[user_id]['file_path']
+                        # البحث عن الكلمات الشائعة التي قد تكون وسوما
+                        common_tags = ['title', 'artist', 'album', 'album_artist', 'year', 'genre', 'composer', 'comment', 'track', 'length', 'lyrics']
                         
-                        # Get current lyrics value
-                        try:
-                            current_tags = get_audio_tags(file_path)
-                            current_value = current_tags.get('lyrics', '')
-                            
-                            # Try extended lyrics extraction if not found in normal tags
-                            if not current_value:
-                                current_value = extract_lyrics(file_path)
-                                logger.info(f"Used extended lyrics extraction: {bool(current_value)}")
-                        except Exception as e:
-                            logger.error(f"Error re-extracting lyrics: {e}")
-                            current_value = ""
+                        # البحث عن أول تطابق مع أسماء الوسوم المعروفة
+                        var_name = None
+                        additional_text = ''
                         
-                        # Check if we have new tags already
-                        if 'lyrics' in user_data[user_id]['new_tags']:
-                            current_value = user_data[user_id]['new_tags']['lyrics']
+                        # التحقق من حالة خاصة: الوسم بدون مسافة والنص ملتصق به
+                        # مثل: $composert.me/ZawamlAnsarallah
+                        for tag in common_tags:
+                            if tag_value[1:].startswith(tag):
+                                var_name = tag
+                                additional_text = tag_value[len(tag) + 1:]  # +1 للعلامة $
+                                break
                         
-                        # Create back button
-                        markup = types.InlineKeyboardMarkup()
-                        markup.add(types.InlineKeyboardButton(text="رجوع", callback_data="back_to_tags"))
+                        # إذا لم نجد تطابقا مع الحالة الخاصة، نستخدم التقسيم العادي
+                        if var_name is None:
+                            parts = tag_value.split(' ', 1)
+                            var_name = parts[0][1:]  # استخراج اسم الوسم بدون علامة $
+                            additional_text = parts[1] if len(parts) > 1 else ''
                         
-                        # عرض كلمات الأغنية فقط - بدون أي عناوين أو نصوص إضافية
-                        message_text = ""
+                        # تحويل \n إلى أسطر جديدة حقيقية في النص الإضافي
+                        if additional_text:
+                            additional_text = additional_text.replace('\\n', '\n')
                         
-                        if current_value:
-                            # عرض النص كاملاً بناءً على طلب المستخدم
-                            # لكن مع مراعاة حد تيليجرام الأقصى (4096 حرف)
+                        # التحقق مما إذا كان الوسم المطلوب موجودًا في الوسوم الأصلية
+                        if var_name in original_tags and original_tags[var_name]:
+                            # دمج القيمة الأصلية مع النص الإضافي
+                            merged_value = original_tags[var_name]
+                            if additional_text:
+                                # إضافة مسافة بين القيمة الأصلية والنص الإضافي إذا كانت القيمة الأصلية نصية
+                                if isinstance(merged_value, str):
+                                    merged_value = f"{merged_value} {additional_text}"
+                                else:
+                                    # إذا لم تكن القيمة الأصلية نصية (مثل الصورة)، نستخدمها كما هي
+                                    pass
                             
-                            max_chars = 4000  # حد قريب من الحد الأقصى لتيليجرام مع ترك هامش
-                            if len(current_value) > max_chars:
-                                # تقصير النص فقط إذا تجاوز حد تيليجرام 
-                                message_text = current_value[:max_chars] + "...\n\n(النص طويل جدًا وتم اقتصاصه لأن تيليجرام لا يسمح بأكثر من 4096 حرف في الرسالة)"
-                            else:
-                                # عرض النص كاملاً إذا كان ضمن الحدود المسموح بها
-                                message_text = current_value
+                            # تعيين القيمة المدمجة للوسم
+                            merged_tags[tag_name] = merged_value
+                            logger.info(f"استخدام متغير ${var_name} وإضافة النص الإضافي '{additional_text}' للوسم {tag_name}")
                         else:
-                            message_text = "لا توجد كلمات أغنية مخزنة في الملف"
-                        
-                        # Send a new message instead of editing to avoid Markdown issues
-                        try:
-                            # Delete previous message
-                            bot.delete_message(call.message.chat.id, call.message.message_id)
-                            
-                            # Send completely new message
-                            sent_msg = bot.send_message(
-                                call.message.chat.id,
-                                message_text,
-                                reply_markup=markup
-                            )
-                            
-                            # Keep track of message ID
-                            user_data[user_id]['current_edit_message_id'] = sent_msg.message_id
-                            
-                            # Set state
-                            bot.set_state(user_id, BotStates.waiting_for_specific_tag, call.message.chat.id)
-                            logger.info(f"Special lyrics handler: Set state to {BotStates.waiting_for_specific_tag.name}")
-                            
-                            # Exit early, we've handled lyrics specially
-                            return
-                            
-                        except Exception as e:
-                            logger.error(f"Error in special lyrics handler: {e}")
-                            error_data = log_error(
-                                "LYRICS_HANDLER_ERROR",
-                                str(e),
-                                user_id,
-                                "edit_tag_lyrics_special",
-                                {'callback_data': call.data}
-                            )
-                            bot_status["errors"].append(error_data)
-                            
-                            # If we fail, let the regular handler take over
-                            pass
-                    except Exception as outer_e:
-                        logger.error(f"Outer error in lyrics special handler: {outer_e}")
-                        # Continue with normal flow if special handling fails
+                            # إذا لم يكن الوسم المطلوب موجودًا، استخدم النص الإضافي فقط (إن وجد)
+                            if additional_text:
+                                merged_tags[tag_name] = additional_text
+                            # وإلا نضع قيمة الوسم كما هي (ربما لدينا قيمة تبدأ بـ $ عن طريق الخطأ)
+                            else:
+                                merged_tags[tag_name] = tag_value
+                    else:
+                        # استخدام قيمة الوسم من القالب
+                        merged_tags[tag_name] = tag_value
+            
+        # إذا كان القالب لا يحتوي على صورة ألبوم ولكن الملف الأصلي يحتوي عليها، نحتفظ بها
+        if 'picture' in original_tags and ('picture' not in template_tags or not template_tags['picture']):
+            merged_tags['picture'] = original_tags['picture']
+        
+        # حفظ الوسوم المدمجة كوسوم مؤقتة
+        user_data[user_id]['temp_tags'] = merged_tags
+        
+        # استخراج اسم القالب من معرف الاستدعاء
+        template_name = call.data.replace('direct_apply_template_', '')
+        
+        # رسالة تأكيد
+        bot.send_message(
+            call.message.chat.id,
+            f"✅ تم تطبيق القالب '{template_name}' بنجاح. اضغط على زر 'حفظ التغييرات' لحفظ التعديلات."
+        )
+        
+        # عرض الوسوم المحدثة للمستخدم
+        display_current_tags(call.message, user_id, file_path, show_edited=True)
+
+    @callbacks.prefix("apply_template_")
+    def on_apply_template(call, user_id):
+        # Apply selected template (للاستخدام في واجهة إدارة القوالب)
+        template_id = call.data.replace('apply_template_', '')
+        handle_apply_template(call.message, user_id, template_id)
+
+    @callbacks.route("back_from_edit")
+    def on_back_from_edit(call, user_id):
+        # Return to the main file view without saving changes
+        logger.info(f"User {user_id} wants to go back from edit tags without saving")
+        
+        # Check if we have the file
+        if user_id not in user_data or 'file_path' not in user_data[user_id]:
+            bot.send_message(call.message.chat.id, "لم يتم العثور على ملف صوتي. الرجاء إرسال ملف صوتي أولاً.")
+            return
+        
+        # تنظيف رسائل واجهة المستخدم الحالية
+        try:
+            bot.delete_message(call.message.chat.id, call.message.message_id)
+            logger.debug(f"Deleted edit panel message: {call.message.message_id}")
+        except Exception as e:
+            logger.error(f"Error deleting message: {e}")
+        
+        # عرض الوسوم الأصلية من جديد (بدون الوسوم المعدلة)
+        file_path = user_data[user_id]['file_path']
+        # تأكد من استخدام الوسوم الأصلية وليس المعدلة
+        if 'temp_tags' in user_data[user_id]:
+            del user_data[user_id]['temp_tags']
+        
+        display_current_tags(call.message, user_id, file_path, show_edited=False)
+
+    @callbacks.route("back_to_template_menu")
+    def on_back_to_template_menu(call, user_id):
+        # Return to templates menu
+        handle_show_templates(call.message, user_id)
+
+    @callbacks.route("cancel")
+    def on_cancel(call, user_id):
+        # Handle cancel button
+        handle_cancel_operation(call.message, user_id)
+
+    @callbacks.route("save_tags")
+    def on_save_tags(call, user_id):
+        # حفظ التغييرات بعد تطبيق القالب أو تعديل الوسوم
+        logger.info(f"User {user_id} wants to save tags after template application")
+        
+        # التحقق من وجود ملف صوتي
+        if user_id not in user_data or 'file_path' not in user_data[user_id]:
+            bot.send_message(call.message.chat.id, "لم يتم العثور على ملف صوتي. الرجاء إرسال ملف صوتي أولاً.")
+            return
+        
+        # التحقق من وجود تغييرات على الوسوم (إما من القالب أو من التعديلات اليدوية)
+        has_changes = False
+        if 'temp_tags' in user_data[user_id] and user_data[user_id]['temp_tags']:
+            logger.info(f"Found temp_tags for user {user_id}, proceeding with save.")
+            has_changes = True
+        elif 'new_tags' in user_data[user_id] and user_data[user_id]['new_tags']:
+            logger.info(f"Found new_tags for user {user_id}, proceeding with save.")
+            has_changes = True
+            
+        if not has_changes:
+            bot.send_message(call.message.chat.id, "لم يتم العثور على تغييرات للحفظ. الرجاء تعديل الوسوم أو تطبيق قالب أولاً.")
+            return
+        
+        # إنشاء كائن رسالة افتراضي للاستخدام في وظيفة save_tags
+        message_wrapper = SimpleNamespace()
+        message_wrapper.chat = SimpleNamespace()
+        message_wrapper.chat.id = call.message.chat.id
+        message_wrapper._direct_user_id = user_id  # إضافة معرف المستخدم مباشرة في الكائن
+        
+        # استدعاء وظيفة save_tags لحفظ التعديلات (تعرض مراحل الحفظ في رسالة حالة واحدة)
+        save_tags(message_wrapper, bot)
+
+    @callbacks.route("done_editing")
+    def on_done_editing(call, user_id):
+        # Handle done editing button
+        logger.info(f"Done editing button pressed by user {user_id}")
+        
+        if user_id in user_data and 'new_tags' in user_data[user_id] and user_data[user_id]['new_tags']:
+            logger.info(f"User {user_id} finished editing with tags: {user_data[user_id]['new_tags']}")
+            
+            # Create a wrapper message object that has the chat.id
+            # We know user_id is the chat.id in this case
+            # Create a direct reference to call.message for better reliability
+            message_wrapper = call.message
+            # Add a custom property to message for identifying user ID in save_tags
+            message_wrapper._direct_user_id = user_id
+            
+            # Pass the message wrapper to save_tags
+            save_tags(message_wrapper, bot)
+        else:
+            bot.send_message(call.message.chat.id, "لم تقم بتعديل أي وسوم. الرجاء تعديل وسم واحد على الأقل أو إلغاء العملية.")
+
+    @callbacks.route("upload_picture")
+    def on_upload_picture(call, user_id):
+        # Handle picture upload request
+        logger.info(f"User {user_id} wants to upload album art")
+        
+        # Add a waiting_for_album_art flag to user data
+        if user_id not in user_data:
+            user_data[user_id] = {}
+        user_data[user_id]['waiting_for_album_art'] = True
+        
+        # Send message to user
+        bot.send_message(
+            call.message.chat.id,
+            "الرجاء إرسال صورة لاستخدامها كصورة غلاف للملف الصوتي. 🖼️"
+        )
+
+    @callbacks.prefix("edit_tag_")
+    def on_edit_tag(call, user_id):
+        # Handle edit specific tag button
+        tag_name = call.data.replace('edit_tag_', '')
+        logger.info(f"User {user_id} wants to edit tag: {tag_name}")
+        
+        # Special handling for lyrics
+        if tag_name == 'lyrics':
+            try:
+                bot.answer_callback_query(
+                    call.id,
+                    "جاري تحضير واجهة تعديل الكلمات..."
+                )
                 
-                # Regular handling for other tags
                 # Store the tag being edited
                 if user_id not in user_data:
                     user_data[user_id] = {'new_tags': {}}
-                
-                # Make sure all required keys exist
                 if 'new_tags' not in user_data[user_id]:
                     user_data[user_id]['new_tags'] = {}
-                if 'current_tags' not in user_data[user_id]:
-                    user_data[user_id]['current_tags'] = {}
                     
-                # Store the tag being edited
+                # Check if file path exists in user data
+                if 'file_path' not in user_data[user_id]:
+                    # No file path means user hasn't sent a file yet
+                    bot.send_message(
+                        call.message.chat.id,
+                        "لم يتم العثور على ملف صوتي. الرجاء إرسال ملف صوتي أولاً."
+                    )
+                    return
+                    
+                # Store the tag we're editing
                 user_data[user_id]['editing_tag'] = tag_name
                 
-                # Get current value from the complete tags (always use original file data)
-                current_value = ''
-                
-                # قراءة الوسوم من الملف
+                # Get file path
                 file_path = user_data[user_id]['file_path']
-                file_tags = get_audio_tags(file_path)
-                
-                # دمج الوسوم من الملف مع التعديلات
-                if 'new_tags' in user_data[user_id]:
-                    # نسخ الوسوم من الملف
-                    merged_tags = {**file_tags}
-                    # تطبيق التعديلات
-                    for tag, value in user_data[user_id]['new_tags'].items():
-                        merged_tags[tag] = value
-                else:
-                    merged_tags = file_tags
-                
-                # الحصول على القيمة الحالية من الوسوم المدمجة
-                if tag_name in merged_tags:
-                    current_value = merged_tags[tag_name]
-                # استخدام القيم المخزنة كبديل إذا لزم الأمر
-                elif 'complete_tags' in user_data[user_id] and tag_name in user_data[user_id]['complete_tags']:
-                    current_value = user_data[user_id]['complete_tags'][tag_name]
-                # استخدام القيم الحالية كبديل آخر
-                elif 'current_tags' in user_data[user_id] and tag_name in user_data[user_id]['current_tags']:
-                    current_value = user_data[user_id]['current_tags'][tag_name]
                 
-                # If we still don't have a value and it's lyrics, try to extract it directly from the file
-                if (not current_value or current_value == 'غير محدد') and tag_name == 'lyrics':
-                    try:
-                        # Re-read the file to get the most up-to-date tags
-                        file_path = user_data[user_id]['file_path']
-                        logger.info(f"Trying to extract lyrics directly from file: {file_path}")
-                        
-                        # For MP3 files, try to extract USLT frame specifically
-                        if file_path.lower().endswith('.mp3'):
-                            try:
-                                from mutagen.id3 import ID3
-                                audio = ID3(file_path)
-                                
-                                # Look for any USLT frame
-                                for key in audio.keys():
-                                    if key.startswith('USLT'):
-                                        uslt_frame = audio[key]
-                                        if hasattr(uslt_frame, 'text'):
-                                            current_value = uslt_frame.text
-                                            logger.info(f"Found USLT lyrics: {current_value[:50]}...")
-                                            break
-                            except Exception as e:
-                                logger.error(f"Error extracting USLT frame: {e}")
-                        
-                        # If we still don't have lyrics, try the general approach
-                        if not current_value:
-                            fresh_tags = get_audio_tags(file_path)
-                            if 'lyrics' in fresh_tags:
-                                current_value = fresh_tags['lyrics']
-                                # Update stored tags
-                                user_data[user_id]['complete_tags'] = fresh_tags
-                                logger.info(f"Re-extracted lyrics for user {user_id}: {current_value[:50]}...")
-                    except Exception as e:
-                        logger.error(f"Error re-extracting lyrics: {e}")
-                        
-                # For lyrics specifically, if still no value found, set appropriate message
-                if (not current_value or current_value == 'غير محدد') and tag_name == 'lyrics':
+                # Get current lyrics value
+                try:
+                    current_tags = get_audio_tags(file_path)
+                    current_value = current_tags.get('lyrics', '')
+                    
+                    # Try extended lyrics extraction if not found in normal tags
+                    if not current_value:
+                        current_value = extract_lyrics(file_path)
+                        logger.info(f"Used extended lyrics extraction: {bool(current_value)}")
+                except Exception as e:
+                    logger.error(f"Error re-extracting lyrics: {e}")
                     current_value = ""
-                    logger.info(f"No lyrics found for file")
-                
-                # Get Arabic name
-                arabic_names = get_tag_field_names_arabic()
-                arabic_name = arabic_names.get(tag_name, tag_name)
                 
-                # Format the current value for display
-                display_value = current_value
+                # Check if we have new tags already
+                if 'lyrics' in user_data[user_id]['new_tags']:
+                    current_value = user_data[user_id]['new_tags']['lyrics']
                 
-                # For lyrics, show all of the text (as telegram allows up to 4096 characters per message)
-                if tag_name == 'lyrics' and current_value:
-                    # Show as much of the lyrics as possible
-                    # Telegram message limit is 4096 chars, we'll leave some space for other text
-                    # and formatting in the message
-                    max_chars = 3800
-                    if len(current_value) > max_chars:
-                        display_value = current_value[:max_chars] + "...\n\n(الكلمات طويلة جدًا وتم اقتصاصها. ستتمكن من تعديل النص الكامل)"
-                    else:
-                        display_value = current_value
-                    
                 # Create back button
                 markup = types.InlineKeyboardMarkup()
                 markup.add(types.InlineKeyboardButton(text="رجوع", callback_data="back_to_tags"))
                 
-                # Prepare message text
-                message_text = f"📝 تعديل وسم: *{arabic_name}*\n\n"
+                # عرض كلمات الأغنية فقط - بدون أي عناوين أو نصوص إضافية
+                message_text = ""
                 
-                if display_value:
-                    # For lyrics (usually longer text), maintain original formatting, but NO special characters to avoid API errors
-                    if tag_name == 'lyrics':
-                        message_text += "القيمة الحالية:\n"
-                        # Don't use any markdown or special formatting
-                        if len(display_value) > 0:
-                            message_text += display_value + "\n\n"
-                        message_text += "يمكنك نسخ النص عن طريق الضغط أدناه\n\n"
-                    # For other tags, wrap in code ticks for easy copying
+                if current_value:
+                    # عرض النص كاملاً بناءً على طلب المستخدم
+                    # لكن مع مراعاة حد تيليجرام الأقصى (4096 حرف)
+                    
+                    max_chars = 4000  # حد قريب من الحد الأقصى لتيليجرام مع ترك هامش
+                    if len(current_value) > max_chars:
+                        # تقصير النص فقط إذا تجاوز حد تيليجرام 
+                        message_text = current_value[:max_chars] + "...\n\n(النص طويل جدًا وتم اقتصاصه لأن تيليجرام لا يسمح بأكثر من 4096 حرف في الرسالة)"
                     else:
-                        message_text += f"*القيمة الحالية:*\n`{display_value}`\n\n"
+                        # عرض النص كاملاً إذا كان ضمن الحدود المسموح بها
+                        message_text = current_value
                 else:
-                    # Special handling for lyrics
-                    if tag_name == 'lyrics':
-                        message_text += "*القيمة الحالية:* لا توجد كلمات أغنية مخزنة في الملف\n\n"
-                    else:
-                        message_text += "*القيمة الحالية:* غير موجودة\n\n"
-                
-                message_text += "الرجاء إدخال القيمة الجديدة:"
+                    message_text = "لا توجد كلمات أغنية مخزنة في الملف"
                 
-                # Edit the current message instead of sending a new one
+                # Send a new message instead of editing to avoid Markdown issues
                 try:
-                    # Store the original message ID if we haven't already (for going back later)
-                    if 'edit_panel_message_id' not in user_data[user_id]:
-                        user_data[user_id]['edit_panel_message_id'] = call.message.message_id
-                    
-                    # Special handling for lyrics to avoid Markdown parsing issues
-                    parse_mode = "Markdown"
-                    if tag_name == 'lyrics':
-                        # For lyrics, completely disable Markdown which can cause parsing issues with special characters
-                        parse_mode = None
-                        # Create a completely clean message without any Markdown or special characters
-                        arabic_name_clean = arabic_names.get(tag_name, tag_name)
-                        message_text = f"📝 تعديل وسم: {arabic_name_clean}\n\n"
-                        message_text += "القيمة الحالية:\n"
-                        
-                        if display_value and len(display_value) > 0:
-                            message_text += display_value + "\n\n"
-                        else:
-                            message_text += "لا توجد كلمات أغنية مخزنة في الملف\n\n"
-                            
-                        message_text += "الرجاء إدخال القيمة الجديدة:"
+                    # Delete previous message
+                    bot.delete_message(call.message.chat.id, call.message.message_id)
                     
-                    # Check if message has text content before trying to edit
-                    if hasattr(call.message, 'text') and call.message.text is not None:
-                        # Edit the current message
-                        bot.edit_message_text(
-                            text=message_text,
-                            chat_id=call.message.chat.id,
-                            message_id=call.message.message_id,
-                            reply_markup=markup,
-                            parse_mode=parse_mode
-                        )
-                        
-                        # Keep track of this message being the currently active one
-                        user_data[user_id]['current_edit_message_id'] = call.message.message_id
-                    else:
-                        # Message doesn't have text content (e.g., it's a photo), send new message
-                        raise Exception("Message doesn't have text content to edit")
-                    
-                except Exception as e:
-                    logger.error(f"Error editing message: {e}")
-                    # Fall back to sending a new message if editing fails
+                    # Send completely new message
                     sent_msg = bot.send_message(
                         call.message.chat.id,
                         message_text,
-                        reply_markup=markup,
-                        parse_mode="Markdown"
+                        reply_markup=markup
                     )
                     
-                    # Store the new message ID for future reference
+                    # Keep track of message ID
                     user_data[user_id]['current_edit_message_id'] = sent_msg.message_id
                     
-                    # Store the message ID for deletion later
-                    if 'messages_to_delete' not in user_data[user_id]:
-                        user_data[user_id]['messages_to_delete'] = []
-                    user_data[user_id]['messages_to_delete'].append(sent_msg.message_id)
-                
-                # Set state to waiting for specific tag value
-                try:
-                    logger.info(f"Setting state to waiting_for_specific_tag for user {user_id}")
-                    # Make sure we have all necessary user data
-                    if 'editing_tag' not in user_data[user_id]:
-                        logger.error(f"editing_tag not in user_data for user {user_id}")
-                        bot.send_message(call.message.chat.id, "حدث خطأ في تحديد الوسم المراد تعديله. يرجى المحاولة مرة أخرى.")
-                        return
-                    
-                    # Set state to waiting for specific tag
+                    # Set state
                     bot.set_state(user_id, BotStates.waiting_for_specific_tag, call.message.chat.id)
+                    logger.info(f"Special lyrics handler: Set state to {BotStates.waiting_for_specific_tag.name}")
+                    
+                    # Exit early, we've handled lyrics specially
+                    return
                     
-                    # Add a helpful message
-                    bot.send_message(
-                        call.message.chat.id, 
-                        f"أنا أنتظر قيمة جديدة للوسم '{arabic_name}'. الرجاء إدخال القيمة الآن.",
-                        reply_to_message_id=call.message.message_id
-                    )
                 except Exception as e:
-                    logger.error(f"Failed to set state: {e}")
-                    bot.send_message(call.message.chat.id, "حدث خطأ في تعيين الحالة. يرجى المحاولة مرة أخرى.")
-                
-            elif call.data == 'manage_templates':
-                # Handle manage templates button
-                logger.info(f"User {user_id} wants to manage templates")
+                    logger.error(f"Error in special lyrics handler: {e}")
+                    error_data = log_error(
+                        "LYRICS_HANDLER_ERROR",
+                        str(e),
+                        user_id,
+                        "edit_tag_lyrics_special",
+                        {'callback_data': call.data}
+                    )
+                    bot_status["errors"].append(error_data)
+                    
+                    # If we fail, let the regular handler take over
+                    pass
+            except Exception as outer_e:
+                logger.error(f"Outer error in lyrics special handler: {outer_e}")
+                # Continue with normal flow if special handling fails
+        
+        # Regular handling for other tags
+        # Store the tag being edited
+        if user_id not in user_data:
+            user_data[user_id] = {'new_tags': {}}
+        
+        # Make sure all required keys exist
+        if 'new_tags' not in user_data[user_id]:
+            user_data[user_id]['new_tags'] = {}
+        if 'current_tags' not in user_data[user_id]:
+            user_data[user_id]['current_tags'] = {}
+            
+        # Store the tag being edited
+        user_data[user_id]['editing_tag'] = tag_name
+        
+        # Get current value from the complete tags (always use original file data)
+        current_value = ''
+        
+        # قراءة الوسوم من الملف
+        file_path = user_data[user_id]['file_path']
+        file_tags = get_audio_tags(file_path)
+        
+        # دمج الوسوم من الملف مع التعديلات
+        merged_tags = file_tags.overlay(user_data[user_id].get('new_tags'))
+        
+        # الحصول على القيمة الحالية من الوسوم المدمجة
+        if tag_name in merged_tags:
+            current_value = merged_tags[tag_name]
+        # استخدام القيم المخزنة كبديل إذا لزم الأمر
+        elif 'complete_tags' in user_data[user_id] and tag_name in user_data[user_id]['complete_tags']:
+            current_value = user_data[user_id]['complete_tags'][tag_name]
+        # استخدام القيم الحالية كبديل آخر
+        elif 'current_tags' in user_data[user_id] and tag_name in user_data[user_id]['current_tags']:
+            current_value = user_data[user_id]['current_tags'][tag_name]
+        
+        # If we still don't have a value and it's lyrics, try to extract it directly from the file
+        if (not current_value or current_value == 'غير محدد') and tag_name == 'lyrics':
+            try:
+                # Re-read the file to get the most up-to-date tags
+                file_path = user_data[user_id]['file_path']
+                logger.info(f"Trying to extract lyrics directly from file: {file_path}")
                 
-                # إنشاء لوحة مفاتيح للإدارة
-                markup = types.InlineKeyboardMarkup(row_width=2)
-                markup.add(
-                    types.InlineKeyboardButton("📝 إنشاء قالب يدوي", callback_data="create_manual_template"),
-                    types.InlineKeyboardButton("📋 عرض القوالب", callback_data="show_templates")
-                )
-                markup.add(
-                    types.InlineKeyboardButton("❌ حذف قالب", callback_data="delete_template"),
-                    types.InlineKeyboardButton("✏️ تعديل قالب", callback_data="edit_template")
-                )
-                markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="back_to_start"))
+                # For MP3 files, try to extract USLT frame specifically
+                if get_file_type(file_path) == 'mp3':
+                    try:
+                        from mutagen.id3 import ID3
+                        audio = ID3(file_path)
+                        
+                        # Look for any USLT frame
+                        for key in audio.keys():
+                            if key.startswith('USLT'):
+                                uslt_frame = audio[key]
+                                if hasattr(uslt_frame, 'text'):
+                                    current_value = uslt_frame.text
+                                    logger.info(f"Found USLT lyrics: {current_value[:50]}...")
+                                    break
+                    except Exception as e:
+                        logger.error(f"Error extracting USLT frame: {e}")
+                
+                # If we still don't have lyrics, try the general approach
+                if not current_value:
+                    fresh_tags = get_audio_tags(file_path)
+                    if 'lyrics' in fresh_tags:
+                        current_value = fresh_tags['lyrics']
+                        # Update stored tags
+                        user_data[user_id]['complete_tags'] = fresh_tags
+                        logger.info(f"Re-extracted lyrics for user {user_id}: {current_value[:50]}...")
+            except Exception as e:
+                logger.error(f"Error re-extracting lyrics: {e}")
                 
-                bot.send_message(
-                    call.message.chat.id,
-                    "🗂️ *إدارة القوالب*\n\n"
-                    "• استخدم *إنشاء قالب يدوي* لإضافة قالب جديد عن طريق إدخال الوسوم يدوياً\n"
-                    "• استخدم *عرض القوالب* لاستعراض القوالب المحفوظة وتطبيقها\n"
-                    "• استخدم *حذف قالب* لإزالة قالب موجود\n"
-                    "• استخدم *تعديل قالب* لتغيير محتوى قالب موجود",
+        # For lyrics specifically, if still no value found, set appropriate message
+        if (not current_value or current_value == 'غير محدد') and tag_name == 'lyrics':
+            current_value = ""
+            logger.info(f"No lyrics found for file")
+        
+        # Get Arabic name
+        arabic_names = get_tag_field_names_arabic()
+        arabic_name = arabic_names.get(tag_name, tag_name)
+        
+        # Format the current value for display
+        display_value = current_value
+        
+        # For lyrics, show all of the text (as telegram allows up to 4096 characters per message)
+        if tag_name == 'lyrics' and current_value:
+            # Show as much of the lyrics as possible
+            # Telegram message limit is 4096 chars, we'll leave some space for other text
+            # and formatting in the message
+            max_chars = 3800
+            if len(current_value) > max_chars:
+                display_value = current_value[:max_chars] + "...\n\n(الكلمات طويلة جدًا وتم اقتصاصها. ستتمكن من تعديل النص الكامل)"
+            else:
+                display_value = current_value
+            
+        # Create back button
+        markup = types.InlineKeyboardMarkup()
+        markup.add(types.InlineKeyboardButton(text="رجوع", callback_data="back_to_tags"))
+        
+        # Prepare message text
+        message_text = f"📝 تعديل وسم: *{arabic_name}*\n\n"
+        
+        if display_value:
+            # For lyrics (usually longer text), maintain original formatting, but NO special characters to avoid API errors
+            if tag_name == 'lyrics':
+                message_text += "القيمة الحالية:\n"
+                # Don't use any markdown or special formatting
+                if len(display_value) > 0:
+                    message_text += display_value + "\n\n"
+                message_text += "يمكنك نسخ النص عن طريق الضغط أدناه\n\n"
+            # For other tags, wrap in code ticks for easy copying
+            else:
+                message_text += f"*القيمة الحالية:*\n`{display_value}`\n\n"
+        else:
+            # Special handling for lyrics
+            if tag_name == 'lyrics':
+                message_text += "*القيمة الحالية:* لا توجد كلمات أغنية مخزنة في الملف\n\n"
+            else:
+                message_text += "*القيمة الحالية:* غير موجودة\n\n"
+        
+        message_text += "الرجاء إدخال القيمة الجديدة:"
+        
+        # Edit the current message instead of sending a new one
+        try:
+            # Store the original message ID if we haven't already (for going back later)
+            if 'edit_panel_message_id' not in user_data[user_id]:
+                user_data[user_id]['edit_panel_message_id'] = call.message.message_id
+            
+            # Special handling for lyrics to avoid Markdown parsing issues
+            parse_mode = "Markdown"
+            if tag_name == 'lyrics':
+                # For lyrics, completely disable Markdown which can cause parsing issues with special characters
+                parse_mode = None
+                # Create a completely clean message without any Markdown or special characters
+                arabic_name_clean = arabic_names.get(tag_name, tag_name)
+                message_text = f"📝 تعديل وسم: {arabic_name_clean}\n\n"
+                message_text += "القيمة الحالية:\n"
+                
+                if display_value and len(display_value) > 0:
+                    message_text += display_value + "\n\n"
+                else:
+                    message_text += "لا توجد كلمات أغنية مخزنة في الملف\n\n"
+                    
+                message_text += "الرجاء إدخال القيمة الجديدة:"
+            
+            # Check if message has text content before trying to edit
+            if hasattr(call.message, 'text') and call.message.text is not None:
+                # Edit the current message
+                bot.edit_message_text(
+                    text=message_text,
+                    chat_id=call.message.chat.id,
+                    message_id=call.message.message_id,
                     reply_markup=markup,
-                    parse_mode="Markdown"
+                    parse_mode=parse_mode
                 )
                 
-            elif call.data == 'create_manual_template':
-                # Handle create manual template button
-                logger.info(f"User {user_id} wants to create a manual template")
-                
-                # تعيين الحالة لانتظار إدخال البيانات اليدوية
-                bot.set_state(user_id, BotStates.waiting_for_manual_template, call.message.chat.id)
-                
-                # إعداد نموذج للمستخدم
-                template_format = """لإنشاء قالب يدوي، قم بملء الوسوم التالية:
+                # Keep track of this message being the currently active one
+                user_data[user_id]['current_edit_message_id'] = call.message.message_id
+            else:
+                # Message doesn't have text content (e.g., it's a photo), send new message
+                raise Exception("Message doesn't have text content to edit")
+            
+        except Exception as e:
+            logger.error(f"Error editing message: {e}")
+            # Fall back to sending a new message if editing fails
+            sent_msg = bot.send_message(
+                call.message.chat.id,
+                message_text,
+                reply_markup=markup,
+                parse_mode="Markdown"
+            )
+            
+            # Store the new message ID for future reference
+            user_data[user_id]['current_edit_message_id'] = sent_msg.message_id
+            
+            # Store the message ID for deletion later
+            if 'messages_to_delete' not in user_data[user_id]:
+                user_data[user_id]['messages_to_delete'] = []
+            user_data[user_id]['messages_to_delete'].append(sent_msg.message_id)
+        
+        # Set state to waiting for specific tag value
+        try:
+            logger.info(f"Setting state to waiting_for_specific_tag for user {user_id}")
+            # Make sure we have all necessary user data
+            if 'editing_tag' not in user_data[user_id]:
+                logger.error(f"editing_tag not in user_data for user {user_id}")
+                bot.send_message(call.message.chat.id, "حدث خطأ في تحديد الوسم المراد تعديله. يرجى المحاولة مرة أخرى.")
+                return
+            
+            # Set state to waiting for specific tag
+            bot.set_state(user_id, BotStates.waiting_for_specific_tag, call.message.chat.id)
+            
+            # Add a helpful message
+            bot.send_message(
+                call.message.chat.id, 
+                f"أنا أنتظر قيمة جديدة للوسم '{arabic_name}'. الرجاء إدخال القيمة الآن.",
+                reply_to_message_id=call.message.message_id
+            )
+        except Exception as e:
+            logger.error(f"Failed to set state: {e}")
+            bot.send_message(call.message.chat.id, "حدث خطأ في تعيين الحالة. يرجى المحاولة مرة أخرى.")
+
+    @callbacks.route("manage_templates")
+    def on_manage_templates(call, user_id):
+        # Handle manage templates button
+        logger.info(f"User {user_id} wants to manage templates")
+        
+        # إنشاء لوحة مفاتيح للإدارة
+        markup = types.InlineKeyboardMarkup(row_width=2)
+        markup.add(
+            types.InlineKeyboardButton("📝 إنشاء قالب يدوي", callback_data="create_manual_template"),
+            types.InlineKeyboardButton("📋 عرض القوالب", callback_data="show_templates")
+        )
+        markup.add(
+            types.InlineKeyboardButton("❌ حذف قالب", callback_data="delete_template"),
+            types.InlineKeyboardButton("✏️ تعديل قالب", callback_data="edit_template")
+        )
+        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="back_to_start"))
+        
+        bot.send_message(
+            call.message.chat.id,
+            "🗂️ *إدارة القوالب*\n\n"
+            "• استخدم *إنشاء قالب يدوي* لإضافة قالب جديد عن طريق إدخال الوسوم يدوياً\n"
+            "• استخدم *عرض القوالب* لاستعراض القوالب المحفوظة وتطبيقها\n"
+            "• استخدم *حذف قالب* لإزالة قالب موجود\n"
+            "• استخدم *تعديل قالب* لتغيير محتوى قالب موجود",
+            reply_markup=markup,
+            parse_mode="Markdown"
+        )
+
+    @callbacks.route("create_manual_template")
+    def on_create_manual_template(call, user_id):
+        # Handle create manual template button
+        logger.info(f"User {user_id} wants to create a manual template")
+        
+        # تعيين الحالة لانتظار إدخال البيانات اليدوية
+        bot.set_state(user_id, BotStates.waiting_for_manual_template, call.message.chat.id)
+        
+        # إعداد نموذج للمستخدم
+        template_format = """لإنشاء قالب يدوي، قم بملء الوسوم التالية:
 
 title: 
 artist: 
@@ -1683,563 +1750,496 @@ lyrics:
 أرسل هذه البيانات مع قيمك الخاصة.
 يمكنك ترك بعض الحقول فارغة إذا لم ترغب بتضمينها.
 """
-                
-                # إنشاء لوحة مفاتيح مع زر إلغاء
-                markup = types.InlineKeyboardMarkup()
-                markup.add(types.InlineKeyboardButton("إلغاء ❌", callback_data="cancel_template_creation"))
-                
-                # إرسال النموذج للمستخدم
-                bot.send_message(
-                    call.message.chat.id,
-                    template_format,
-                    reply_markup=markup
-                )
-                
-            elif call.data == 'cancel_template_creation':
-                # إلغاء عملية إنشاء القالب
-                logger.info(f"User {user_id} canceled template creation")
-                bot.delete_state(user_id, call.message.chat.id)
-                bot.send_message(call.message.chat.id, "تم إلغاء إنشاء القالب.")
-                
-                # العودة إلى قائمة إدارة القوالب عن طريق معالج manage_templates
-                # سنستخدم الحل البديل حيث أن الدالة return_to_template_management لم يتم تعريفها بعد
-                # في هذا السياق، نحاكي السلوك عن طريق استدعاء معالج زر إدارة القوالب
-                markup = types.InlineKeyboardMarkup(row_width=2)
-                markup.add(
-                    types.InlineKeyboardButton("📝 إنشاء قالب يدوي", callback_data="create_manual_template"),
-                    types.InlineKeyboardButton("📋 عرض القوالب", callback_data="show_templates")
-                )
-                markup.add(
-                    types.InlineKeyboardButton("❌ حذف قالب", callback_data="delete_template"),
-                    types.InlineKeyboardButton("✏️ تعديل قالب", callback_data="edit_template")
-                )
-                markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="back_to_start"))
-                
-                bot.send_message(
-                    call.message.chat.id,
-                    "🗂️ *إدارة القوالب*\n\n"
-                    "• استخدم *إنشاء قالب يدوي* لإضافة قالب جديد عن طريق إدخال الوسوم يدوياً\n"
-                    "• استخدم *عرض القوالب* لاستعراض القوالب المحفوظة وتطبيقها\n"
-                    "• استخدم *حذف قالب* لإزالة قالب موجود\n"
-                    "• استخدم *تعديل قالب* لتغيير محتوى قالب موجود",
-                    reply_markup=markup,
-                    parse_mode="Markdown"
-                )
+        
+        # إنشاء لوحة مفاتيح مع زر إلغاء
+        markup = types.InlineKeyboardMarkup()
+        markup.add(types.InlineKeyboardButton("إلغاء ❌", callback_data="cancel_template_creation"))
+        
+        # إرسال النموذج للمستخدم
+        bot.send_message(
+            call.message.chat.id,
+            template_format,
+            reply_markup=markup
+        )
 
-            elif call.data == 'delete_template':
-                # Handle delete template button
-                logger.info(f"User {user_id} wants to delete a template")
-                
-                # جلب قائمة الفنانين الذين لديهم قوالب
-                artists = get_artists_with_templates()
-                
-                if not artists:
-                    bot.send_message(
-                        call.message.chat.id,
-                        "لا توجد قوالب محفوظة للحذف."
-                    )
-                    return
-                
-                # إنشاء لوحة مفاتيح مع أسماء الفنانين
-                markup = types.InlineKeyboardMarkup(row_width=1)
-                for artist in artists:
-                    markup.add(types.InlineKeyboardButton(
-                        text=f"🎵 {artist}",
-                        callback_data=f"delete_artist_templates_{artist}"
-                    ))
-                markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="manage_templates"))
-                
-                bot.send_message(
-                    call.message.chat.id,
-                    "اختر الفنان الذي تريد حذف قوالبه:",
-                    reply_markup=markup
-                )
-            
-            elif call.data.startswith('delete_artist_templates_'):
-                # Handle selecting artist for template deletion
-                artist_name = call.data.replace('delete_artist_templates_', '')
-                logger.info(f"User {user_id} is viewing templates to delete for artist: {artist_name}")
-                
-                # جلب قوالب الفنان
-                templates = list_templates(artist_name)
-                
-                if not templates:
-                    bot.send_message(
-                        call.message.chat.id,
-                        f"لا توجد قوالب محفوظة للفنان '{artist_name}'."
-                    )
-                    return
-                
-                # إنشاء لوحة مفاتيح مع أسماء القوالب
-                markup = types.InlineKeyboardMarkup(row_width=1)
-                for template in templates:
-                    # إضافة أيقونة للقوالب التي لديها صورة
-                    icon = "🖼️" if template.get("has_image") else "📋"
-                    markup.add(types.InlineKeyboardButton(
-                        text=f"{icon} {template['name']}",
-                        callback_data=f"confirm_delete_template_{template['id']}"
-                    ))
-                markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="delete_template"))
-                
-                bot.send_message(
-                    call.message.chat.id,
-                    f"اختر القالب الذي تريد حذفه من قوالب الفنان '{artist_name}':",
-                    reply_markup=markup
-                )
-            
-            elif call.data.startswith('confirm_delete_template_'):
-                # Handle confirming template deletion
-                template_id = call.data.replace('confirm_delete_template_', '')
-                logger.info(f"User {user_id} wants to delete template: {template_id}")
-                
-                # الحصول على بيانات القالب
-                template_data = get_template(template_id)
-                
-                if not template_data:
-                    bot.send_message(
-                        call.message.chat.id,
-                        "هذا القالب غير موجود أو تم حذفه بالفعل."
-                    )
-                    return
-                
-                # إنشاء لوحة مفاتيح للتأكيد
-                markup = types.InlineKeyboardMarkup(row_width=2)
-                markup.add(
-                    types.InlineKeyboardButton("نعم، احذف القالب ❌", callback_data=f"do_delete_template_{template_id}"),
-                    types.InlineKeyboardButton("لا، إلغاء ↩️", callback_data="delete_template")
-                )
-                
-                bot.send_message(
-                    call.message.chat.id,
-                    f"هل أنت متأكد من أنك تريد حذف القالب '{template_data.get('name')}'؟\n"
-                    "لا يمكن التراجع عن هذا الإجراء.",
-                    reply_markup=markup
-                )
-            
-            elif call.data.startswith('do_delete_template_'):
-                # Handle actual template deletion
-                template_id = call.data.replace('do_delete_template_', '')
-                logger.info(f"User {user_id} is deleting template: {template_id}")
-                
-                # حذف القالب
-                success = delete_template(template_id)
-                
-                if success:
-                    bot.send_message(
-                        call.message.chat.id,
-                        "✅ تم حذف القالب بنجاح."
-                    )
-                else:
-                    bot.send_message(
-                        call.message.chat.id,
-                        "❌ حدث خطأ أثناء حذف القالب. الرجاء المحاولة مرة أخرى."
-                    )
-                
-                # العودة إلى قائمة إدارة القوالب
-                markup = types.InlineKeyboardMarkup(row_width=2)
-                markup.add(
-                    types.InlineKeyboardButton("📝 إنشاء قالب يدوي", callback_data="create_manual_template"),
-                    types.InlineKeyboardButton("📋 عرض القوالب", callback_data="show_templates")
-                )
-                markup.add(
-                    types.InlineKeyboardButton("❌ حذف قالب", callback_data="delete_template"),
-                    types.InlineKeyboardButton("✏️ تعديل قالب", callback_data="edit_template")
-                )
-                markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="back_to_start"))
-                
-                bot.send_message(
-                    call.message.chat.id,
-                    "🗂️ *إدارة القوالب*\n\n"
-                    "• استخدم *إنشاء قالب يدوي* لإضافة قالب جديد عن طريق إدخال الوسوم يدوياً\n"
-                    "• استخدم *عرض القوالب* لاستعراض القوالب المحفوظة وتطبيقها\n"
-                    "• استخدم *حذف قالب* لإزالة قالب موجود\n"
-                    "• استخدم *تعديل قالب* لتغيير محتوى قالب موجود",
-                    reply_markup=markup,
-                    parse_mode="Markdown"
-                )
-            
-            elif call.data == 'show_templates':
-                # Handle show templates button
-                logger.info(f"User {user_id} wants to view templates")
-                
-                # جلب قائمة الفنانين الذين لديهم قوالب
-                artists = get_artists_with_templates()
-                
-                if not artists:
-                    bot.send_message(
-                        call.message.chat.id,
-                        "لا توجد قوالب محفوظة بعد. قم بإنشاء قالب جديد أولاً."
-                    )
-                    return
-                
-                # إنشاء لوحة مفاتيح مع أسماء الفنانين
-                markup = types.InlineKeyboardMarkup(row_width=1)
-                for artist in artists:
-                    markup.add(types.InlineKeyboardButton(
-                        text=f"🎵 {artist}",
-                        callback_data=f"show_artist_templates_{artist}"
-                    ))
-                markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="manage_templates"))
-                
-                # حفظ رسالة القائمة في بيانات المستخدم لتنظيفها لاحقاً
-                sent_msg = bot.send_message(
-                    call.message.chat.id,
-                    "اختر الفنان لعرض قوالبه:",
-                    reply_markup=markup
-                )
-                
-                # حفظ معرف الرسالة للتنظيف
-                user_data[user_id] = user_data.get(user_id, {})
-                user_data[user_id]['ui_messages'] = user_data[user_id].get('ui_messages', [])
-                user_data[user_id]['ui_messages'].append(sent_msg.message_id)
-            
-            elif call.data.startswith('show_artist_templates_'):
-                # Handle selecting artist for template view
-                artist_name = call.data.replace('show_artist_templates_', '')
-                logger.info(f"User {user_id} is viewing templates for artist: {artist_name}")
-                
-                # جلب قوالب الفنان
-                templates = list_templates(artist_name)
-                
-                if not templates:
-                    bot.send_message(
-                        call.message.chat.id,
-                        f"لا توجد قوالب محفوظة للفنان '{artist_name}'."
-                    )
-                    return
-                
-                # إنشاء لوحة مفاتيح مع أسماء القوالب
-                markup = types.InlineKeyboardMarkup(row_width=1)
-                for template in templates:
-                    # إضافة أيقونة للقوالب التي لديها صورة
-                    icon = "🖼️" if template.get("has_image") else "📋"
-                    markup.add(types.InlineKeyboardButton(
-                        text=f"{icon} {template['name']}",
-                        callback_data=f"view_template_{template['id']}"
-                    ))
-                markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="show_templates"))
-                
-                # حفظ رسالة القائمة في بيانات المستخدم لتنظيفها لاحقاً
-                sent_msg = bot.send_message(
-                    call.message.chat.id,
-                    f"قوالب الفنان '{artist_name}':",
-                    reply_markup=markup
-                )
-                
-                # حفظ معرف الرسالة للتنظيف
-                user_data[user_id] = user_data.get(user_id, {})
-                user_data[user_id]['ui_messages'] = user_data[user_id].get('ui_messages', [])
-                user_data[user_id]['ui_messages'].append(sent_msg.message_id)
-            
-            elif call.data.startswith('view_template_'):
-                # Handle viewing template details
-                template_id = call.data.replace('view_template_', '')
-                logger.info(f"User {user_id} is viewing template: {template_id}")
-                
-                # الحصول على بيانات القالب
-                template_data = get_template(template_id)
-                
-                if not template_data:
-                    bot.send_message(
-                        call.message.chat.id,
-                        "هذا القالب غير موجود."
-                    )
-                    return
-                
-                # إعداد نص عرض القالب
-                template_details = f"🗂️ *{template_data.get('name', 'قالب')}*\n\n"
-                
-                if 'artist' in template_data.get('tags', {}):
-                    template_details += f"الفنان: {template_data['tags']['artist']}\n\n"
-                
-                # إضافة تفاصيل الوسوم
-                arabic_names = get_tag_field_names_arabic()
-                for tag, value in template_data.get('tags', {}).items():
-                    if value and tag != 'lyrics':  # عدم عرض كلمات الأغنية لتجنب رسائل طويلة
-                        arabic_name = arabic_names.get(tag, tag)
-                        template_details += f"• {arabic_name}: {value}\n"
-                
-                # إنشاء أزرار التحكم
-                markup = types.InlineKeyboardMarkup(row_width=2)
-                
-                # إضافة زر تطبيق القالب إذا كان هناك ملف صوتي مفتوح حالياً
-                if user_id in user_data and 'file_path' in user_data[user_id]:
-                    markup.add(types.InlineKeyboardButton(
-                        "✅ تطبيق القالب",
-                        callback_data=f"apply_template_{template_id}"
-                    ))
-                
-                markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data=f"show_artist_templates_{template_data.get('artist_name', 'عام')}"))
-                
-                # إرسال تفاصيل القالب
-                bot.send_message(
-                    call.message.chat.id,
-                    template_details,
-                    reply_markup=markup,
-                    parse_mode="Markdown"
-                )
-                
-                # إرسال صورة الغلاف إذا كانت موجودة
-                if template_data.get('album_art'):
-                    try:
-                        # إرسال صورة الغلاف كصورة منفصلة
-                        bot.send_photo(
-                            call.message.chat.id,
-                            photo=template_data['album_art'],
-                            caption="صورة الغلاف المرفقة مع القالب"
-                        )
-                    except Exception as e:
-                        logger.error(f"Failed to send album art: {e}")
-                        bot.send_message(
-                            call.message.chat.id,
-                            "فشل في عرض صورة الغلاف."
-                        )
-            
-            elif call.data.startswith('apply_template_'):
-                # Handle applying template to current audio file
-                template_id = call.data.replace('apply_template_', '')
-                logger.info(f"User {user_id} is applying template: {template_id}")
-                
-                # التحقق من وجود ملف صوتي
-                if user_id not in user_data or 'file_path' not in user_data[user_id]:
-                    bot.send_message(
-                        call.message.chat.id,
-                        "لا يوجد ملف صوتي مفتوح حالياً. قم بإرسال ملف صوتي أولاً."
-                    )
-                    return
-                
-                # الحصول على مسار الملف
-                file_path = user_data[user_id]['file_path']
-                
-                # الحصول على بيانات القالب
-                template_data = get_template(template_id)
-                
-                if not template_data:
-                    bot.send_message(
-                        call.message.chat.id,
-                        "هذا القالب غير موجود."
-                    )
-                    return
-                
-                # تحديث الوسوم المؤقتة باستخدام وسوم القالب
-                if 'temp_tags' not in user_data[user_id]:
-                    # إذا لم تكن هناك وسوم مؤقتة، نبدأ بالوسوم الأصلية
-                    original_tags = get_audio_tags(file_path)
-                    user_data[user_id]['temp_tags'] = original_tags.copy()
-                    
-                    # حفظ الوسوم الأصلية للمقارنة
-                    if 'original_tags' not in user_data[user_id]:
-                        user_data[user_id]['original_tags'] = original_tags.copy()
-                
-                # دمج وسوم القالب مع الوسوم المؤقتة
-                template_tags = template_data.get('tags', {})
-                for tag, value in template_tags.items():
-                    user_data[user_id]['temp_tags'][tag] = value
-                
-                # إذا كان القالب يحتوي على صورة، حفظها مؤقتاً
-                if template_data.get('album_art'):
-                    user_data[user_id]['temp_album_art'] = template_data['album_art']
-                    user_data[user_id]['temp_album_art_mime'] = template_data.get('album_art_mime', 'image/jpeg')
-                
-                bot.send_message(
-                    call.message.chat.id,
-                    f"✅ تم تطبيق القالب '{template_data.get('name')}' على الملف.\n"
-                    "لم يتم حفظ التغييرات بعد. استخدم زر 'حفظ التغييرات' لتأكيد حفظ الوسوم."
-                )
-                
-                # عرض الوسوم المحدثة بإعادة عرض قائمة الوسوم
-                handle_edit_tags(call.message, user_id)
-                
-            elif call.data == 'edit_template':
-                # Handle edit template button
-                logger.info(f"User {user_id} wants to edit a template")
-                
-                bot.send_message(
+    @callbacks.route("cancel_template_creation")
+    def on_cancel_template_creation(call, user_id):
+        # إلغاء عملية إنشاء القالب
+        logger.info(f"User {user_id} canceled template creation")
+        bot.delete_state(user_id, call.message.chat.id)
+        bot.send_message(call.message.chat.id, "تم إلغاء إنشاء القالب.")
+        
+        # العودة إلى قائمة إدارة القوالب عن طريق معالج manage_templates
+        # سنستخدم الحل البديل حيث أن الدالة return_to_template_management لم يتم تعريفها بعد
+        # في هذا السياق، نحاكي السلوك عن طريق استدعاء معالج زر إدارة القوالب
+        markup = types.InlineKeyboardMarkup(row_width=2)
+        markup.add(
+            types.InlineKeyboardButton("📝 إنشاء قالب يدوي", callback_data="create_manual_template"),
+            types.InlineKeyboardButton("📋 عرض القوالب", callback_data="show_templates")
+        )
+        markup.add(
+            types.InlineKeyboardButton("❌ حذف قالب", callback_data="delete_template"),
+            types.InlineKeyboardButton("✏️ تعديل قالب", callback_data="edit_template")
+        )
+        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="back_to_start"))
+        
+        bot.send_message(
+            call.message.chat.id,
+            "🗂️ *إدارة القوالب*\n\n"
+            "• استخدم *إنشاء قالب يدوي* لإضافة قالب جديد عن طريق إدخال الوسوم يدوياً\n"
+            "• استخدم *عرض القوالب* لاستعراض القوالب المحفوظة وتطبيقها\n"
+            "• استخدم *حذف قالب* لإزالة قالب موجود\n"
+            "• استخدم *تعديل قالب* لتغيير محتوى قالب موجود",
+            reply_markup=markup,
+            parse_mode="Markdown"
+        )
+
+    @callbacks.route("delete_template")
+    def on_delete_template(call, user_id):
+        # Handle delete template button
+        logger.info(f"User {user_id} wants to delete a template")
+        
+        # جلب قائمة الفنانين الذين لديهم قوالب
+        artists = get_artists_with_templates()
+        
+        if not artists:
+            bot.send_message(
+                call.message.chat.id,
+                "لا توجد قوالب محفوظة للحذف."
+            )
+            return
+        
+        # إنشاء لوحة مفاتيح مع أسماء الفنانين
+        markup = types.InlineKeyboardMarkup(row_width=1)
+        for artist in artists:
+            markup.add(types.InlineKeyboardButton(
+                text=f"🎵 {artist}",
+                callback_data=f"delete_artist_templates_{artist}"
+            ))
+        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="manage_templates"))
+        
+        bot.send_message(
+            call.message.chat.id,
+            "اختر الفنان الذي تريد حذف قوالبه:",
+            reply_markup=markup
+        )
+
+    @callbacks.prefix("delete_artist_templates_")
+    def on_delete_artist_templates(call, user_id):
+        # Handle selecting artist for template deletion
+        artist_name = call.data.replace('delete_artist_templates_', '')
+        logger.info(f"User {user_id} is viewing templates to delete for artist: {artist_name}")
+        
+        # جلب قوالب الفنان
+        templates = list_templates(artist_name)
+        
+        if not templates:
+            bot.send_message(
+                call.message.chat.id,
+                f"لا توجد قوالب محفوظة للفنان '{artist_name}'."
+            )
+            return
+        
+        # إنشاء لوحة مفاتيح مع أسماء القوالب
+        markup = types.InlineKeyboardMarkup(row_width=1)
+        for template in templates:
+            # إضافة أيقونة للقوالب التي لديها صورة
+            icon = "🖼️" if template.get("has_image") else "📋"
+            markup.add(types.InlineKeyboardButton(
+                text=f"{icon} {template['name']}",
+                callback_data=f"confirm_delete_template_{template['id']}"
+            ))
+        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="delete_template"))
+        
+        bot.send_message(
+            call.message.chat.id,
+            f"اختر القالب الذي تريد حذفه من قوالب الفنان '{artist_name}':",
+            reply_markup=markup
+        )
+
+    @callbacks.prefix("confirm_delete_template_")
+    def on_confirm_delete_template(call, user_id):
+        # Handle confirming template deletion
+        template_id = call.data.replace('confirm_delete_template_', '')
+        logger.info(f"User {user_id} wants to delete template: {template_id}")
+        
+        # الحصول على بيانات القالب
+        template_data = get_template(template_id)
+        
+        if not template_data:
+            bot.send_message(
+                call.message.chat.id,
+                "هذا القالب غير موجود أو تم حذفه بالفعل."
+            )
+            return
+        
+        # إنشاء لوحة مفاتيح للتأكيد
+        markup = types.InlineKeyboardMarkup(row_width=2)
+        markup.add(
+            types.InlineKeyboardButton("نعم، احذف القالب ❌", callback_data=f"do_delete_template_{template_id}"),
+            types.InlineKeyboardButton("لا، إلغاء ↩️", callback_data="delete_template")
+        )
+        
+        bot.send_message(
+            call.message.chat.id,
+            f"هل أنت متأكد من أنك تريد حذف القالب '{template_data.get('name')}'؟\n"
+            "لا يمكن التراجع عن هذا الإجراء.",
+            reply_markup=markup
+        )
+
+    @callbacks.prefix("do_delete_template_")
+    def on_do_delete_template(call, user_id):
+        # Handle actual template deletion
+        template_id = call.data.replace('do_delete_template_', '')
+        logger.info(f"User {user_id} is deleting template: {template_id}")
+        
+        # حذف القالب
+        success = delete_template(template_id)
+        
+        if success:
+            bot.send_message(
+                call.message.chat.id,
+                "✅ تم حذف القالب بنجاح."
+            )
+        else:
+            bot.send_message(
+                call.message.chat.id,
+                "❌ حدث خطأ أثناء حذف القالب. الرجاء المحاولة مرة أخرى."
+            )
+        
+        # العودة إلى قائمة إدارة القوالب
+        markup = types.InlineKeyboardMarkup(row_width=2)
+        markup.add(
+            types.InlineKeyboardButton("📝 إنشاء قالب يدوي", callback_data="create_manual_template"),
+            types.InlineKeyboardButton("📋 عرض القوالب", callback_data="show_templates")
+        )
+        markup.add(
+            types.InlineKeyboardButton("❌ حذف قالب", callback_data="delete_template"),
+            types.InlineKeyboardButton("✏️ تعديل قالب", callback_data="edit_template")
+        )
+        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="back_to_start"))
+        
+        bot.send_message(
+            call.message.chat.id,
+            "🗂️ *إدارة القوالب*\n\n"
+            "• استخدم *إنشاء قالب يدوي* لإضافة قالب جديد عن طريق إدخال الوسوم يدوياً\n"
+            "• استخدم *عرض القوالب* لاستعراض القوالب المحفوظة وتطبيقها\n"
+            "• استخدم *حذف قالب* لإزالة قالب موجود\n"
+            "• استخدم *تعديل قالب* لتغيير محتوى قالب موجود",
+            reply_markup=markup,
+            parse_mode="Markdown"
+        )
+
+    @callbacks.prefix("show_artist_templates_")
+    def on_show_artist_templates(call, user_id):
+        # Handle selecting artist for template view
+        artist_name = call.data.replace('show_artist_templates_', '')
+        logger.info(f"User {user_id} is viewing templates for artist: {artist_name}")
+        
+        # جلب قوالب الفنان
+        templates = list_templates(artist_name)
+        
+        if not templates:
+            bot.send_message(
+                call.message.chat.id,
+                f"لا توجد قوالب محفوظة للفنان '{artist_name}'."
+            )
+            return
+        
+        # إنشاء لوحة مفاتيح مع أسماء القوالب
+        markup = types.InlineKeyboardMarkup(row_width=1)
+        for template in templates:
+            # إضافة أيقونة للقوالب التي لديها صورة
+            icon = "🖼️" if template.get("has_image") else "📋"
+            markup.add(types.InlineKeyboardButton(
+                text=f"{icon} {template['name']}",
+                callback_data=f"view_template_{template['id']}"
+            ))
+        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="show_templates"))
+        
+        # حفظ رسالة القائمة في بيانات المستخدم لتنظيفها لاحقاً
+        sent_msg = bot.send_message(
+            call.message.chat.id,
+            f"قوالب الفنان '{artist_name}':",
+            reply_markup=markup
+        )
+        
+        # حفظ معرف الرسالة للتنظيف
+        user_data[user_id] = user_data.get(user_id, {})
+        user_data[user_id]['ui_messages'] = user_data[user_id].get('ui_messages', [])
+        user_data[user_id]['ui_messages'].append(sent_msg.message_id)
+
+    @callbacks.prefix("view_template_")
+    def on_view_template(call, user_id):
+        # Handle viewing template details
+        template_id = call.data.replace('view_template_', '')
+        logger.info(f"User {user_id} is viewing template: {template_id}")
+        
+        # الحصول على بيانات القالب
+        template_data = get_template(template_id)
+        
+        if not template_data:
+            bot.send_message(
+                call.message.chat.id,
+                "هذا القالب غير موجود."
+            )
+            return
+        
+        # إعداد نص عرض القالب
+        template_details = f"🗂️ *{template_data.get('name', 'قالب')}*\n\n"
+        
+        if 'artist' in template_data.get('tags', {}):
+            template_details += f"الفنان: {template_data['tags']['artist']}\n\n"
+        
+        # إضافة تفاصيل الوسوم
+        arabic_names = get_tag_field_names_arabic()
+        for tag, value in template_data.get('tags', {}).items():
+            if value and tag != 'lyrics':  # عدم عرض كلمات الأغنية لتجنب رسائل طويلة
+                arabic_name = arabic_names.get(tag, tag)
+                template_details += f"• {arabic_name}: {value}\n"
+        
+        # إنشاء أزرار التحكم
+        markup = types.InlineKeyboardMarkup(row_width=2)
+        
+        # إضافة زر تطبيق القالب إذا كان هناك ملف صوتي مفتوح حالياً
+        if user_id in user_data and 'file_path' in user_data[user_id]:
+            markup.add(types.InlineKeyboardButton(
+                "✅ تطبيق القالب",
+                callback_data=f"apply_template_{template_id}"
+            ))
+        
+        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data=f"show_artist_templates_{template_data.get('artist_name', 'عام')}"))
+        
+        # إرسال تفاصيل القالب
+        bot.send_message(
+            call.message.chat.id,
+            template_details,
+            reply_markup=markup,
+            parse_mode="Markdown"
+        )
+        
+        # إرسال صورة الغلاف إذا كانت موجودة
+        if template_data.get('album_art'):
+            try:
+                # إرسال صورة الغلاف كصورة منفصلة
+                bot.send_photo(
                     call.message.chat.id,
-                    "⚠️ لتعديل قالب، يرجى إنشاء قالب جديد ثم حذف القالب القديم."
-                )
-                
-                # العودة إلى قائمة إدارة القوالب
-                markup = types.InlineKeyboardMarkup(row_width=2)
-                markup.add(
-                    types.InlineKeyboardButton("📝 إنشاء قالب يدوي", callback_data="create_manual_template"),
-                    types.InlineKeyboardButton("📋 عرض القوالب", callback_data="show_templates")
+                    photo=template_data['album_art'],
+                    caption="صورة الغلاف المرفقة مع القالب"
                 )
-                markup.add(
-                    types.InlineKeyboardButton("❌ حذف قالب", callback_data="delete_template"),
-                    types.InlineKeyboardButton("✏️ تعديل قالب", callback_data="edit_template")
-                )
-                markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="back_to_start"))
-                
+            except Exception as e:
+                logger.error(f"Failed to send album art: {e}")
                 bot.send_message(
                     call.message.chat.id,
-                    "🗂️ *إدارة القوالب*\n\n"
-                    "• استخدم *إنشاء قالب يدوي* لإضافة قالب جديد عن طريق إدخال الوسوم يدوياً\n"
-                    "• استخدم *عرض القوالب* لاستعراض القوالب المحفوظة وتطبيقها\n"
-                    "• استخدم *حذف قالب* لإزالة قالب موجود\n"
-                    "• استخدم *تعديل قالب* لتغيير محتوى قالب موجود",
-                    reply_markup=markup,
-                    parse_mode="Markdown"
-                )
-                
-            elif call.data == 'back_to_start':
-                # العودة إلى رسالة الترحيب
-                start_command(call.message)
-                
-            elif call.data == 'manage_templates':
-                # عرض قائمة إدارة القوالب
-                logger.info(f"User {user_id} is accessing template management menu")
-                
-                markup = types.InlineKeyboardMarkup(row_width=2)
-                markup.add(
-                    types.InlineKeyboardButton("📝 إنشاء قالب يدوي", callback_data="create_manual_template"),
-                    types.InlineKeyboardButton("📋 عرض القوالب", callback_data="show_templates")
-                )
-                markup.add(
-                    types.InlineKeyboardButton("❌ حذف قالب", callback_data="delete_template"),
-                    types.InlineKeyboardButton("✏️ تعديل قالب", callback_data="edit_template")
+                    "فشل في عرض صورة الغلاف."
                 )
-                markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="back_to_start"))
-                
-                bot.send_message(
+
+    @callbacks.route("edit_template")
+    def on_edit_template(call, user_id):
+        # Handle edit template button
+        logger.info(f"User {user_id} wants to edit a template")
+        
+        bot.send_message(
+            call.message.chat.id,
+            "⚠️ لتعديل قالب، يرجى إنشاء قالب جديد ثم حذف القالب القديم."
+        )
+        
+        # العودة إلى قائمة إدارة القوالب
+        markup = types.InlineKeyboardMarkup(row_width=2)
+        markup.add(
+            types.InlineKeyboardButton("📝 إنشاء قالب يدوي", callback_data="create_manual_template"),
+            types.InlineKeyboardButton("📋 عرض القوالب", callback_data="show_templates")
+        )
+        markup.add(
+            types.InlineKeyboardButton("❌ حذف قالب", callback_data="delete_template"),
+            types.InlineKeyboardButton("✏️ تعديل قالب", callback_data="edit_template")
+        )
+        markup.add(types.InlineKeyboardButton("🔙 رجوع", callback_data="back_to_start"))
+        
+        bot.send_message(
+            call.message.chat.id,
+            "🗂️ *إدارة القوالب*\n\n"
+            "• استخدم *إنشاء قالب يدوي* لإضافة قالب جديد عن طريق إدخال الوسوم يدوياً\n"
+            "• استخدم *عرض القوالب* لاستعراض القوالب المحفوظة وتطبيقها\n"
+            "• استخدم *حذف قالب* لإزالة قالب موجود\n"
+            "• استخدم *تعديل قالب* لتغيير محتوى قالب موجود",
+            reply_markup=markup,
+            parse_mode="Markdown"
+        )
+
+    @callbacks.route("back_to_start")
+    def on_back_to_start(call, user_id):
+        # العودة إلى رسالة الترحيب
+        start_command(call.message)
+
+    @callbacks.route("back_to_tags")
+    def on_back_to_tags(call, user_id):
+        # Handle back to tags list button
+        logger.info(f"User {user_id} wants to go back to tag list")
+        
+        # تنظيف رسائل القوالب المؤقتة
+        cleanup_ui_messages(user_id, call.message.chat.id, bot)
+        
+        # Check if we have the file
+        if user_id not in user_data or 'file_path' not in user_data[user_id]:
+            bot.send_message(call.message.chat.id, "لم يتم العثور على ملف صوتي. الرجاء إرسال ملف صوتي أولاً.")
+            return
+        
+        file_path = user_data[user_id]['file_path']
+        
+        # Get updated tags, applying any temporary changes
+        if 'new_tags' in user_data[user_id] and user_data[user_id]['new_tags']:
+            # Combine current file tags with any new edits
+            # (picture is handled differently and stays out of the overlay)
+            current_tags = get_audio_tags(file_path).overlay(
+                {tag: value for tag, value in user_data[user_id]['new_tags'].items() if tag != 'picture'}
+            )
+            
+            if 'picture' in user_data[user_id]['new_tags']:
+                # Mark that we have updated album art
+                current_tags['has_album_art'] = True
+                current_tags['updated_album_art'] = True
+        else:
+            # No changes, just use current file tags
+            current_tags = get_audio_tags(file_path)
+            
+            # Initialize empty tag values dictionary if not exists
+            if 'new_tags' not in user_data[user_id]:
+                user_data[user_id]['new_tags'] = {}
+        
+        # Mark user as editing
+        user_data[user_id]['is_editing'] = True
+        logger.info(f"User {user_id} marked as editing. Current data: {user_data[user_id]}")
+        
+        # Store current tags for reference
+        user_data[user_id]['current_tags'] = current_tags
+        
+        # Create keyboard with tag buttons
+        markup = types.InlineKeyboardMarkup(row_width=2)
+        tag_fields = get_valid_tag_fields()
+        arabic_names = get_tag_field_names_arabic()
+        
+        # Add a button for each tag
+        tag_buttons = []
+        for tag in tag_fields:
+            # Skip picture tag as it's handled differently
+            if tag != 'picture':
+                button_text = f"{arabic_names.get(tag, tag)}"
+                tag_buttons.append(types.InlineKeyboardButton(
+                    text=button_text,
+                    callback_data=f"edit_tag_{tag}"
+                ))
+        
+        # Add buttons in pairs
+        for i in range(0, len(tag_buttons), 2):
+            if i + 1 < len(tag_buttons):
+                markup.row(tag_buttons[i], tag_buttons[i+1])
+            else:
+                markup.row(tag_buttons[i])
+        
+        # Add picture upload button
+        markup.row(types.InlineKeyboardButton(
+            text="إضافة/تغيير صورة الغلاف",
+            callback_data="upload_picture"
+        ))
+        
+        # Add Done, Back and Cancel buttons
+        markup.row(
+            types.InlineKeyboardButton(text="تم الانتهاء", callback_data="done_editing"),
+            types.InlineKeyboardButton(text="🔙 رجوع", callback_data="back_from_edit"),
+            types.InlineKeyboardButton(text="إلغاء", callback_data="cancel")
+        )
+        
+        # Format tags for display
+        tags_text = "**الوسوم الحالية:**\n"
+        
+        # Define the order of tags we want to display
+        priority_tags = ['title', 'artist', 'album', 'album_artist', 'year', 'genre', 
+                         'composer', 'comment', 'track', 'length']
+        
+        # Add priority tags
+        for tag in priority_tags:
+            if tag != 'picture':
+                arabic_name = arabic_names.get(tag, tag)
+                current_value = current_tags.get(tag, '')
+                if current_value:  # Only add non-empty tags to the text
+                    # Truncate long values (like lyrics)
+                    if tag == 'lyrics' and len(current_value) > 50:
+                        current_value = current_value[:50] + "..."
+                    tags_text += f"• {arabic_name}: {current_value}\n"
+                else:
+                    # For the specifically requested tags, show them even if empty
+                    if tag in ['genre', 'comment', 'track', 'length']:
+                        tags_text += f"• {arabic_name}: غير محدد\n"
+                        
+        # Then add any remaining tags
+        for tag in tag_fields:
+            if tag not in priority_tags and tag != 'picture':
+                arabic_name = arabic_names.get(tag, tag)
+                current_value = current_tags.get(tag, '')
+                if current_value:  # Only add non-empty tags to the text
+                    # Truncate long values (like lyrics)
+                    if tag == 'lyrics' and len(current_value) > 50:
+                        current_value = current_value[:50] + "..."
+                    tags_text += f"• {arabic_name}: {current_value}\n"
+        
+        # Check if we have updated album art that needs to be displayed
+        has_updated_album_art = current_tags.get('updated_album_art', False)
+        has_album_art = current_tags.get('has_album_art', False)
+        
+        # Set state to waiting for tag selection
+        bot.set_state(user_id, BotStates.editing_tags, call.message.chat.id)
+        logger.info(f"Set state for user {user_id} to {BotStates.editing_tags.name}")
+        
+        if has_updated_album_art and 'picture' in user_data[user_id]['new_tags']:
+            # We have a new album art image to display
+            logger.info(f"Displaying updated album art for user {user_id}")
+            
+            # Create temp file for the updated album art
+            with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_img:
+                temp_img.write(user_data[user_id]['new_tags']['picture'])
+                temp_img_path = temp_img.name
+            
+            # Try to delete the existing message
+            try:
+                bot.delete_message(call.message.chat.id, call.message.message_id)
+            except Exception as e:
+                logger.error(f"Error deleting old message: {e}")
+            
+            # Send updated album art with tags
+            with open(temp_img_path, 'rb') as img_file:
+                sent_msg = bot.send_photo(
                     call.message.chat.id,
-                    "🗂️ *إدارة القوالب*\n\n"
-                    "• استخدم *إنشاء قالب يدوي* لإضافة قالب جديد عن طريق إدخال الوسوم يدوياً\n"
-                    "• استخدم *عرض القوالب* لاستعراض القوالب المحفوظة وتطبيقها\n"
-                    "• استخدم *حذف قالب* لإزالة قالب موجود\n"
-                    "• استخدم *تعديل قالب* لتغيير محتوى قالب موجود",
+                    img_file,
+                    caption=f"📝 *تعديل الوسوم*\n\n{tags_text}\n\nاختر الوسم الذي تريد تعديله:",
                     reply_markup=markup,
                     parse_mode="Markdown"
                 )
+            
+            # Clean up temporary file
+            try:
+                os.remove(temp_img_path)
+            except Exception as e:
+                logger.error(f"Error removing temporary image: {e}")
                 
-            elif call.data == 'back_to_tags':
-                # Handle back to tags list button
-                logger.info(f"User {user_id} wants to go back to tag list")
-                
-                # تنظيف رسائل القوالب المؤقتة
-                cleanup_ui_messages(user_id, call.message.chat.id, bot)
-                
-                # Check if we have the file
-                if user_id not in user_data or 'file_path' not in user_data[user_id]:
-                    bot.send_message(call.message.chat.id, "لم يتم العثور على ملف صوتي. الرجاء إرسال ملف صوتي أولاً.")
-                    return
-                
+            # Keep track of message ID
+            if 'messages_to_delete' not in user_data[user_id]:
+                user_data[user_id]['messages_to_delete'] = []
+            user_data[user_id]['messages_to_delete'].append(sent_msg.message_id)
+            
+        elif has_album_art:
+            # Existing album art from the file
+            try:
+                # Extract album art from the file
                 file_path = user_data[user_id]['file_path']
+                image_data, mime_type = extract_album_art(file_path)
                 
-                # Get updated tags, applying any temporary changes
-                if 'new_tags' in user_data[user_id] and user_data[user_id]['new_tags']:
-                    # Combine current file tags with any new edits
-                    current_tags = get_audio_tags(file_path)
-                    
-                    # Apply any new tag edits to the current tags for display
-                    for tag, value in user_data[user_id]['new_tags'].items():
-                        if tag != 'picture':  # Skip picture tag as it's handled differently
-                            current_tags[tag] = value
-                    
-                    if 'picture' in user_data[user_id]['new_tags']:
-                        # Mark that we have updated album art
-                        current_tags['has_album_art'] = True
-                        current_tags['updated_album_art'] = True
-                else:
-                    # No changes, just use current file tags
-                    current_tags = get_audio_tags(file_path)
-                    
-                    # Initialize empty tag values dictionary if not exists
-                    if 'new_tags' not in user_data[user_id]:
-                        user_data[user_id]['new_tags'] = {}
-                
-                # Mark user as editing
-                user_data[user_id]['is_editing'] = True
-                logger.info(f"User {user_id} marked as editing. Current data: {user_data[user_id]}")
-                
-                # Store current tags for reference
-                user_data[user_id]['current_tags'] = current_tags
-                
-                # Create keyboard with tag buttons
-                markup = types.InlineKeyboardMarkup(row_width=2)
-                tag_fields = get_valid_tag_fields()
-                arabic_names = get_tag_field_names_arabic()
-                
-                # Add a button for each tag
-                tag_buttons = []
-                for tag in tag_fields:
-                    # Skip picture tag as it's handled differently
-                    if tag != 'picture':
-                        button_text = f"{arabic_names.get(tag, tag)}"
-                        tag_buttons.append(types.InlineKeyboardButton(
-                            text=button_text,
-                            callback_data=f"edit_tag_{tag}"
-                        ))
-                
-                # Add buttons in pairs
-                for i in range(0, len(tag_buttons), 2):
-                    if i + 1 < len(tag_buttons):
-                        markup.row(tag_buttons[i], tag_buttons[i+1])
-                    else:
-                        markup.row(tag_buttons[i])
-                
-                # Add picture upload button
-                markup.row(types.InlineKeyboardButton(
-                    text="إضافة/تغيير صورة الغلاف",
-                    callback_data="upload_picture"
-                ))
-                
-                # Add Done, Back and Cancel buttons
-                markup.row(
-                    types.InlineKeyboardButton(text="تم الانتهاء", callback_data="done_editing"),
-                    types.InlineKeyboardButton(text="🔙 رجوع", callback_data="back_from_edit"),
-                    types.InlineKeyboardButton(text="إلغاء", callback_data="cancel")
-                )
-                
-                # Format tags for display
-                tags_text = "**الوسوم الحالية:**\n"
-                
-                # Define the order of tags we want to display
-                priority_tags = ['title', 'artist', 'album', 'album_artist', 'year', 'genre', 
-                                 'composer', 'comment', 'track', 'length']
-                
-                # Add priority tags
-                for tag in priority_tags:
-                    if tag != 'picture':
-                        arabic_name = arabic_names.get(tag, tag)
-                        current_value = current_tags.get(tag, '')
-                        if current_value:  # Only add non-empty tags to the text
-                            # Truncate long values (like lyrics)
-                            if tag == 'lyrics' and len(current_value) > 50:
-                                current_value = current_value[:50] + "..."
-                            tags_text += f"• {arabic_name}: {current_value}\n"
-                        else:
-                            # For the specifically requested tags, show them even if empty
-                            if tag in ['genre', 'comment', 'track', 'length']:
-                                tags_text += f"• {arabic_name}: غير محدد\n"
-                                
-                # Then add any remaining tags
-                for tag in tag_fields:
-                    if tag not in priority_tags and tag != 'picture':
-                        arabic_name = arabic_names.get(tag, tag)
-                        current_value = current_tags.get(tag, '')
-                        if current_value:  # Only add non-empty tags to the text
-                            # Truncate long values (like lyrics)
-                            if tag == 'lyrics' and len(current_value) > 50:
-                                current_value = current_value[:50] + "..."
-                            tags_text += f"• {arabic_name}: {current_value}\n"
-                
-                # Check if we have updated album art that needs to be displayed
-                has_updated_album_art = current_tags.get('updated_album_art', False)
-                has_album_art = current_tags.get('has_album_art', False)
-                
-                # Set state to waiting for tag selection
-                bot.set_state(user_id, BotStates.editing_tags, call.message.chat.id)
-                logger.info(f"Set state for user {user_id} to {BotStates.editing_tags.name}")
-                
-                if has_updated_album_art and 'picture' in user_data[user_id]['new_tags']:
-                    # We have a new album art image to display
-                    logger.info(f"Displaying updated album art for user {user_id}")
-                    
-                    # Create temp file for the updated album art
-                    with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_img:
-                        temp_img.write(user_data[user_id]['new_tags']['picture'])
-                        temp_img_path = temp_img.name
+                if image_data:
+                    # Save album art to temporary file
+                    art_file_path = os.path.join(os.path.dirname(file_path), "albumart.jpg")
+                    logger.info(f"Saving album art to: {art_file_path}")
+                    with open(art_file_path, 'wb') as art_file:
+                        art_file.write(image_data)
                     
                     # Try to delete the existing message
                     try:
@@ -2247,8 +2247,8 @@ lyrics:
                     except Exception as e:
                         logger.error(f"Error deleting old message: {e}")
                     
-                    # Send updated album art with tags
-                    with open(temp_img_path, 'rb') as img_file:
+                    # Send with album art
+                    with open(art_file_path, 'rb') as img_file:
                         sent_msg = bot.send_photo(
                             call.message.chat.id,
                             img_file,
@@ -2257,187 +2257,126 @@ lyrics:
                             parse_mode="Markdown"
                         )
                     
-                    # Clean up temporary file
+                    # Cleanup
                     try:
-                        os.remove(temp_img_path)
+                        os.remove(art_file_path)
+                        logger.info(f"Cleaning up temporary album art file: {art_file_path}")
                     except Exception as e:
-                        logger.error(f"Error removing temporary image: {e}")
-                        
+                        logger.error(f"Error cleaning up album art: {e}")
+                    
                     # Keep track of message ID
                     if 'messages_to_delete' not in user_data[user_id]:
                         user_data[user_id]['messages_to_delete'] = []
                     user_data[user_id]['messages_to_delete'].append(sent_msg.message_id)
-                    
-                elif has_album_art:
-                    # Existing album art from the file
-                    try:
-                        # Extract album art from the file
-                        file_path = user_data[user_id]['file_path']
-                        image_data, mime_type = extract_album_art(file_path)
-                        
-                        if image_data:
-                            # Save album art to temporary file
-                            art_file_path = os.path.join(TEMP_DIR, f"{user_id}_albumart.jpg")
-                            logger.info(f"Saving album art to: {art_file_path}")
-                            with open(art_file_path, 'wb') as art_file:
-                                art_file.write(image_data)
-                            
-                            # Try to delete the existing message
-                            try:
-                                bot.delete_message(call.message.chat.id, call.message.message_id)
-                            except Exception as e:
-                                logger.error(f"Error deleting old message: {e}")
-                            
-                            # Send with album art
-                            with open(art_file_path, 'rb') as img_file:
-                                sent_msg = bot.send_photo(
-                                    call.message.chat.id,
-                                    img_file,
-                                    caption=f"📝 *تعديل الوسوم*\n\n{tags_text}\n\nاختر الوسم الذي تريد تعديله:",
-                                    reply_markup=markup,
-                                    parse_mode="Markdown"
-                                )
-                            
-                            # Cleanup
-                            try:
-                                os.remove(art_file_path)
-                                logger.info(f"Cleaning up temporary album art file: {art_file_path}")
-                            except Exception as e:
-                                logger.error(f"Error cleaning up album art: {e}")
-                            
-                            # Keep track of message ID
-                            if 'messages_to_delete' not in user_data[user_id]:
-                                user_data[user_id]['messages_to_delete'] = []
-                            user_data[user_id]['messages_to_delete'].append(sent_msg.message_id)
-                        else:
-                            # Can't extract album art, fall back to text mode
-                            raise Exception("Failed to extract album art")
-                    except Exception as e:
-                        # Fall back to text mode
-                        logger.error(f"Error displaying album art: {e}, falling back to text mode")
-                        
-                        # Try to edit the current message instead of creating a new one
-                        try:
-                            # Check if message has text content before trying to edit
-                            if hasattr(call.message, 'text') and call.message.text is not None:
-                                bot.edit_message_text(
-                                    text=f"📝 *تعديل الوسوم*\n\n{tags_text}\n\nاختر الوسم الذي تريد تعديله:",
-                                    chat_id=call.message.chat.id,
-                                    message_id=call.message.message_id,
-                                    reply_markup=markup,
-                                    parse_mode="Markdown"
-                                )
-                            else:
-                                # Message doesn't have text content, send new message
-                                raise Exception("Message doesn't have text content to edit")
-                        except Exception as inner_e:
-                            logger.error(f"Error editing message in fallback: {inner_e}")
-                            # Send new message as last resort
-                            sent_msg = bot.send_message(
-                                call.message.chat.id,
-                                f"📝 *تعديل الوسوم*\n\n{tags_text}\n\nاختر الوسم الذي تريد تعديله:",
-                                reply_markup=markup,
-                                parse_mode="Markdown"
-                            )
-                            
-                            # Keep track of the message ID for deletion later
-                            if 'messages_to_delete' not in user_data[user_id]:
-                                user_data[user_id]['messages_to_delete'] = []
-                            user_data[user_id]['messages_to_delete'].append(sent_msg.message_id)
                 else:
-                    # No album art, just use text mode
-                    try:
-                        # Check if message has text content before trying to edit
-                        if hasattr(call.message, 'text') and call.message.text is not None:
-                            bot.edit_message_text(
-                                text=f"📝 *تعديل الوسوم*\n\n{tags_text}\n\nاختر الوسم الذي تريد تعديله:",
-                                chat_id=call.message.chat.id,
-                                message_id=call.message.message_id,
-                                reply_markup=markup,
-                                parse_mode="Markdown"
-                            )
-                        else:
-                            # Message doesn't have text content, send new message
-                            raise Exception("Message doesn't have text content to edit")
-                    except Exception as e:
-                        logger.error(f"Error editing message for back_to_tags: {e}")
-                        # If editing fails, send a new message
-                        sent_msg = bot.send_message(
-                            call.message.chat.id,
-                            f"📝 *تعديل الوسوم*\n\n{tags_text}\n\nاختر الوسم الذي تريد تعديله:",
+                    # Can't extract album art, fall back to text mode
+                    raise Exception("Failed to extract album art")
+            except Exception as e:
+                # Fall back to text mode
+                logger.error(f"Error displaying album art: {e}, falling back to text mode")
+                
+                # Try to edit the current message instead of creating a new one
+                try:
+                    # Check if message has text content before trying to edit
+                    if hasattr(call.message, 'text') and call.message.text is not None:
+                        bot.edit_message_text(
+                            text=f"📝 *تعديل الوسوم*\n\n{tags_text}\n\nاختر الوسم الذي تريد تعديله:",
+                            chat_id=call.message.chat.id,
+                            message_id=call.message.message_id,
                             reply_markup=markup,
                             parse_mode="Markdown"
                         )
-                        
-                        # Keep track of the message ID for deletion later
-                        if 'messages_to_delete' not in user_data[user_id]:
-                            user_data[user_id]['messages_to_delete'] = []
-                        user_data[user_id]['messages_to_delete'].append(sent_msg.message_id)
-                
-            elif call.data == 'clear_errors':
-                # Handle clear errors button
-                bot_status["errors"] = []
-                bot.send_message(
-                    call.message.chat.id,
-                    "✅ تم مسح سجل الأخطاء بنجاح!"
-                )
-                # Update status report
-                status_command(call.message)
-                
-            elif call.data == 'restart_bot':
-                # Handle restart bot button
-                bot.send_message(
-                    call.message.chat.id,
-                    "⏳ جاري إعادة تشغيل البوت... سيكون متاحاً خلال لحظات."
-                )
-                # Clear all user data and states
-                for u_id in list(user_data.keys()):
-                    bot.delete_state(u_id, call.message.chat.id)
-                    if u_id in user_data and 'file_path' in user_data[u_id]:
-                        try:
-                            os.remove(user_data[u_id]['file_path'])
-                        except:
-                            pass
-                user_data.clear()
-                
-                # Reset statistics
-                import datetime
-                bot_status["started_time"] = datetime.datetime.now()
-                bot_status["processed_files"] = 0
-                bot_status["successful_edits"] = 0
-                bot_status["failed_operations"] = 0
-                bot_status["active_users"] = set()
-                bot_status["errors"] = []
-                
-                # Send confirmation
-                bot.send_message(
+                    else:
+                        # Message doesn't have text content, send new message
+                        raise Exception("Message doesn't have text content to edit")
+                except Exception as inner_e:
+                    logger.error(f"Error editing message in fallback: {inner_e}")
+                    # Send new message as last resort
+                    sent_msg = bot.send_message(
+                        call.message.chat.id,
+                        f"📝 *تعديل الوسوم*\n\n{tags_text}\n\nاختر الوسم الذي تريد تعديله:",
+                        reply_markup=markup,
+                        parse_mode="Markdown"
+                    )
+                    
+                    # Keep track of the message ID for deletion later
+                    if 'messages_to_delete' not in user_data[user_id]:
+                        user_data[user_id]['messages_to_delete'] = []
+                    user_data[user_id]['messages_to_delete'].append(sent_msg.message_id)
+        else:
+            # No album art, just use text mode
+            try:
+                # Check if message has text content before trying to edit
+                if hasattr(call.message, 'text') and call.message.text is not None:
+                    bot.edit_message_text(
+                        text=f"📝 *تعديل الوسوم*\n\n{tags_text}\n\nاختر الوسم الذي تريد تعديله:",
+                        chat_id=call.message.chat.id,
+                        message_id=call.message.message_id,
+                        reply_markup=markup,
+                        parse_mode="Markdown"
+                    )
+                else:
+                    # Message doesn't have text content, send new message
+                    raise Exception("Message doesn't have text content to edit")
+            except Exception as e:
+                logger.error(f"Error editing message for back_to_tags: {e}")
+                # If editing fails, send a new message
+                sent_msg = bot.send_message(
                     call.message.chat.id,
-                    "✅ تم إعادة تشغيل البوت بنجاح!\n"
-                    "يمكنك الآن استخدام البوت بشكل طبيعي."
+                    f"📝 *تعديل الوسوم*\n\n{tags_text}\n\nاختر الوسم الذي تريد تعديله:",
+                    reply_markup=markup,
+                    parse_mode="Markdown"
                 )
                 
-        except Exception as e:
-            # Log detailed error information
-            error_data = log_error(
-                "CALLBACK_QUERY_ERROR", 
-                str(e), 
-                user_id=user_id, 
-                function_name="handle_callback_query",
-                extra_details={"callback_data": call.data}
-            )
-            
-            # Add error to bot status
-            if len(bot_status["errors"]) >= 10:  # Keep only the last 10 errors
-                bot_status["errors"].pop(0)
-            bot_status["errors"].append(error_data)
-            bot_status["failed_operations"] += 1
-            
-            # Send user friendly error message
-            bot.send_message(
-                call.message.chat.id, 
-                response_messages["invalid_input"] + f"\nنوع الخطأ: {type(e).__name__}"
-            )
-    
+                # Keep track of the message ID for deletion later
+                if 'messages_to_delete' not in user_data[user_id]:
+                    user_data[user_id]['messages_to_delete'] = []
+                user_data[user_id]['messages_to_delete'].append(sent_msg.message_id)
+
+    @callbacks.route("clear_errors")
+    def on_clear_errors(call, user_id):
+        # Handle clear errors button
+        bot_status["errors"] = []
+        bot.send_message(
+            call.message.chat.id,
+            "✅ تم مسح سجل الأخطاء بنجاح!"
+        )
+        # Update status report
+        status_command(call.message)
+
+    @callbacks.route("restart_bot")
+    def on_restart_bot(call, user_id):
+        # Handle restart bot button
+        bot.send_message(
+            call.message.chat.id,
+            "⏳ جاري إعادة تشغيل البوت... سيكون متاحاً خلال لحظات."
+        )
+        # Clear all user data and states
+        for u_id in list(user_data.keys()):
+            bot.delete_state(u_id, call.message.chat.id)
+            if u_id in user_data and 'file_path' in user_data[u_id]:
+                try:
+                    get_workspace_manager().discard(user_data[u_id]['file_path'])
+                except:
+                    pass
+        user_data.clear()
+        
+        # Reset statistics
+        import datetime
+        bot_status["started_time"] = datetime.datetime.now()
+        bot_status["processed_files"] = 0
+        bot_status["successful_edits"] = 0
+        bot_status["failed_operations"] = 0
+        bot_status["active_users"] = set()
+        bot_status["errors"] = []
+        
+        # Send confirmation
+        bot.send_message(
+            call.message.chat.id,
+            "✅ تم إعادة تشغيل البوت بنجاح!\n"
+            "يمكنك الآن استخدام البوت بشكل طبيعي."
+        )
+
     # Function to handle edit tags request
     def handle_edit_tags(message, user_id):
         """Handle edit tags request."""
@@ -2547,7 +2486,7 @@ lyrics:
             image_data, mime_type = extract_album_art(file_path)
             if image_data:
                 # Save album art to temporary file
-                album_art_path = f"{TEMP_DIR}/{user_id}_albumart.jpg"
+                album_art_path = os.path.join(os.path.dirname(file_path), "albumart.jpg")
                 with open(album_art_path, 'wb') as img_file:
                     img_file.write(image_data)
                 logger.info(f"Saving album art to: {album_art_path}")
@@ -2621,7 +2560,7 @@ lyrics:
             # Remove the temporary file if it exists
             if 'file_path' in user_data[user_id]:
                 try:
-                    os.remove(user_data[user_id]['file_path'])
+                    get_workspace_manager().discard(user_data[user_id]['file_path'])
                     logger.info(f"Removed temporary file: {user_data[user_id]['file_path']}")
                 except Exception as e:
                     logger.error(f"Error removing temporary file: {e}")
@@ -2835,12 +2774,21 @@ lyrics:
     
     # Function to save tags and send the modified file back
     def save_tags(message, bot, override_user_id=None):
+        """Queue saving the tags; the work runs in process_save_tags."""
+        enqueue_job(message.chat.id, process_save_tags, message, bot, override_user_id,
+                    progress=ProgressReporter(bot, message.chat.id))
+    
+    def process_save_tags(message, bot, override_user_id=None, progress=None):
         """Save the tags to the audio file.
         
+        The stages (saving, uploading, done or failed) are shown in a single
+        status message that is edited in place.
+        
         Args:
             message: Message object containing chat info
             bot: Telebot instance
             override_user_id: Optional user ID to use instead of extracting from message
+            progress: ProgressReporter for the status message
         """
         # Get user ID from message object
         # We handle different scenarios:
@@ -2868,20 +2816,23 @@ lyrics:
             user_id = chat_id
             logger.info(f"Falling back to chat_id={user_id}")
         
-        logger.info(f"In save_tags: chat_id = {chat_id}, resolved user_id = {user_id}")
+        logger.info(f"In process_save_tags: chat_id = {chat_id}, resolved user_id = {user_id}")
+        
+        if progress is None:
+            progress = ProgressReporter(bot, chat_id)
             
         logger.info(f"Starting save_tags function for user {user_id}")
         
         try:
             if user_id not in user_data:
                 logger.error(f"User {user_id} not found in user_data")
-                bot.send_message(message.chat.id, "حدث خطأ: البيانات غير متوفرة. الرجاء إعادة إرسال الملف الصوتي.")
+                progress.fail("حدث خطأ: البيانات غير متوفرة. الرجاء إعادة إرسال الملف الصوتي.")
                 bot.delete_state(user_id, message.chat.id)
                 return
                 
             if 'file_path' not in user_data[user_id]:
                 logger.error(f"file_path not found in user_data for user {user_id}")
-                bot.send_message(message.chat.id, "حدث خطأ: مسار الملف غير متوفر. الرجاء إعادة إرسال الملف الصوتي.")
+                progress.fail("حدث خطأ: مسار الملف غير متوفر. الرجاء إعادة إرسال الملف الصوتي.")
                 bot.delete_state(user_id, message.chat.id)
                 return
                 
@@ -2898,29 +2849,20 @@ lyrics:
                 logger.info(f"Using new_tags (from direct edits) for saving: {new_tags}")
             else:
                 logger.error(f"No tags found to save for user {user_id}")
-                bot.send_message(message.chat.id, "لم يتم العثور على وسوم للحفظ. الرجاء تعديل الوسوم أولاً.")
+                progress.fail("لم يتم العثور على وسوم للحفظ. الرجاء تعديل الوسوم أولاً.")
                 return
                 
             logger.info(f"File path: {file_path}, Tags to save: {new_tags}")
             original_file_name = user_data[user_id]['original_file_name']
             
-            bot.send_message(message.chat.id, "جاري حفظ الوسوم الجديدة...")
+            progress.stage("💾 جاري حفظ الوسوم الجديدة...")
             
-            # Create a copy of the file for modification
+            # The modified file is written next to the original; set_audio_tags
+            # streams the copy and tags it in place
             original_file_path = file_path
             file_ext = os.path.splitext(file_path)[1]
             modified_file_path = os.path.join(os.path.dirname(file_path), f"modified_{user_id}{file_ext}")
             
-            # Make a copy of the original file
-            try:
-                shutil.copy2(original_file_path, modified_file_path)
-                logger.info(f"Created a copy of the original file at: {modified_file_path}")
-            except Exception as e:
-                logger.error(f"Error creating copy of original file: {e}")
-                bot.send_message(message.chat.id, f"حدث خطأ أثناء إنشاء نسخة من الملف: {str(e)}")
-                bot.delete_state(user_id, message.chat.id)
-                return
-            
             # Save tags to the modified file
             logger.info(f"Attempting to save tags to file: {modified_file_path}")
             try:
@@ -2932,9 +2874,7 @@ lyrics:
                 logger.info(f"Current tags from file: {current_tags}")
                 
                 # دمج الوسوم الحالية مع الجديدة
-                merged_tags = {**current_tags}
-                for key, value in new_tags.items():
-                    merged_tags[key] = value
+                merged_tags = current_tags.overlay(new_tags)
                     
                 # تطبيق القواعد الذكية على الوسوم المدمجة
                 try:
@@ -2943,9 +2883,8 @@ lyrics:
                         if applied_rules:
                             merged_tags = modified_tags
                             logger.info(f"Applied smart rules to tags: {applied_rules}")
-                            # إشعار المستخدم بالقواعد المطبقة
-                            bot.send_message(
-                                message.chat.id,
+                            # إشعار المستخدم بالقواعد المطبقة في رسالة الحالة
+                            progress.note(
                                 f"✨ تم تطبيق القواعد الذكية التالية تلقائياً:\n• " + "\n• ".join(applied_rules)
                             )
                 except Exception as e:
@@ -2984,8 +2923,8 @@ lyrics:
                 
                 logger.info(f"Merged tags after special handling: {merged_tags}")
                 
-                # حفظ الوسوم المدمجة في الملف المعدل
-                set_audio_tags(modified_file_path, merged_tags)
+                # حفظ الوسوم المدمجة في نسخة معدلة من الملف الأصلي
+                set_audio_tags(file_path, merged_tags, output_path=modified_file_path)
                 
                 # التحقق من أن الوسوم تم حفظها بنجاح باستخراجها من الملف
                 saved_tags = get_audio_tags(modified_file_path)
@@ -2997,190 +2936,118 @@ lyrics:
                 
                 logger.info(f"Tags saved successfully to file: {modified_file_path}")
                 
-                bot.send_message(message.chat.id, "تم حفظ الوسوم بنجاح. جاري إرسال الملف المعدل...")
+                progress.stage("📤 تم حفظ الوسوم بنجاح. جاري رفع الملف المعدل...", 0)
                 
                 # Send the modified file back with optimized settings for Telegram
                 logger.info(f"Attempting to send modified file back to user {user_id}")
-                with open(modified_file_path, 'rb') as audio_file:
-                    logger.info(f"Modified file opened successfully: {modified_file_path}")
-                    # Send audio file with specific parameters to maximize Telegram thumbnail compatibility
-                    # First, check if we have an album art thumbnail we can use directly
-                    album_art_path = None
-                    try:
-                        # استخراج صورة الألبوم وتحسينها للعرض في تيليجرام
-                        # هذا يساعد تيليجرام على التعرف عليها بشكل أفضل ويحسن من العرض المصغر
-                        img_data = None
-                        mime = None
-                        
-                        # محاولة استخراج الصورة من الملف المعدل
-                        try:
-                            img_data, mime = extract_album_art(modified_file_path)
-                            if img_data:
-                                logger.info(f"Extracted album art from modified file, size: {len(img_data)} bytes")
-                            else:
-                                logger.info("No album art found in modified file")
-                                
-                                # إذا لم نتمكن من استخراج الصورة، نحاول استخدام الصورة من الوسوم الجديدة
-                                if 'picture' in new_tags and new_tags['picture']:
-                                    img_data = new_tags['picture']
-                                    logger.info(f"Using picture from new_tags, size: {len(img_data)} bytes")
-                            
-                            # إذا حصلنا على بيانات الصورة، نقوم بمعالجتها
-                            if img_data:
-                                # استخدام PIL لمعالجة الصورة
-                                from PIL import Image
-                                import io
-                                
-                                # تحويل الصورة إلى كائن Image
-                                img_io = io.BytesIO(img_data)
-                                img = Image.open(img_io)
-                                
-                                # حفظ الصورة الأصلية ذات الدقة العالية للملف النهائي
-                                album_art_high_res = os.path.join('temp_audio_files', f"{user_id}_high_res_albumart.jpg")
-                                img.save(album_art_high_res, format='JPEG', quality=95)
-                                logger.info(f"Saved high-quality album art to: {album_art_high_res}")
-                                
-                                # إنشاء نسخة مصغرة (90x90) لعرضها كصورة مصغرة في تيليجرام
-                                thumb_size = (90, 90)
-                                thumb_img = img.copy()
-                                thumb_img.thumbnail(thumb_size)
-                                
-                                # حفظ الصورة المصغرة
-                                album_art_path = os.path.join('temp_audio_files', f"{user_id}_thumbnail.jpg")
-                                thumb_img.save(album_art_path, format='JPEG', quality=95)
-                                logger.info(f"Saved thumbnail version to: {album_art_path}")
-                                
-                                # حفظ نسخة متوسطة ذات حجم مناسب لتيليجرام (320x320)
-                                medium_size = (320, 320)
-                                medium_img = img.copy()
-                                medium_img.thumbnail(medium_size)
-                                
-                                # حفظ النسخة المتوسطة كنسخة احتياطية
-                                medium_path = os.path.join('temp_audio_files', f"{user_id}_medium_albumart.jpg")
-                                medium_img.save(medium_path, format='JPEG', quality=95)
-                                logger.info(f"Saved medium-size album art to: {medium_path}")
-                        except Exception as e:
-                            logger.error(f"Error processing album art: {e}")
-                            
-                            # في حالة فشل معالجة الصورة، نستخدم الطريقة التقليدية
-                            if img_data:
-                                album_art_path = os.path.join('temp_audio_files', f"{user_id}_final_albumart.jpg")
-                                with open(album_art_path, 'wb') as img_file:
-                                    img_file.write(img_data)
-                                logger.info(f"Fallback: Saved album art directly to: {album_art_path}")
-                    except Exception as e:
-                        logger.error(f"Error preparing thumbnail: {e}")
-                    
-                    # الحد الأقصى للوصف في تيليجرام هو 1024 حرف - لذلك نختصر اسم الملف إذا كان طويلاً
-                    # Create a safe caption that won't exceed Telegram's limit
-                    short_filename = original_file_name
-                    if len(short_filename) > 30:  # تقصير اسم الملف إذا كان طويلاً
-                        short_filename = original_file_name[:27] + "..."
-                    safe_caption = f"ملف صوتي معدل: {short_filename}"
-                    
-                    # استخراج جميع الوسوم الحالية من الملف المعدل لضمان استخدام الوسوم النهائية بعد الدمج
-                    final_tags = get_audio_tags(modified_file_path)
-                    logger.info(f"Retrieved final tags for sending: {final_tags}")
+                # Send audio file with specific parameters to maximize Telegram thumbnail compatibility
+                # First, check if we have an album art thumbnail we can use directly
+                thumbnail = None
+                try:
+                    # الصورة المصغرة لتيليجرام من صورة الغلاف في الذاكرة دون ملفات وسيطة
+                    img_data, mime = extract_album_art(modified_file_path)
+                    if img_data:
+                        logger.info(f"Extracted album art from modified file, size: {len(img_data)} bytes")
+                    elif 'picture' in new_tags and new_tags['picture']:
+                        # إذا لم نتمكن من استخراج الصورة، نستخدم الصورة من الوسوم الجديدة
+                        img_data, mime = load_picture(new_tags['picture'])
+                        logger.info("No album art found in modified file, using picture from new_tags")
                     
-                    # تحديث معلومات performer و title للتأكد من ظهورها بشكل صحيح في تيليجرام
-                    performer = final_tags.get('artist', '')
-                    title = final_tags.get('title', '')
-                    album = final_tags.get('album', '')
-                        
-                    # إذا كانت فارغة، استخدم اسم الملف الأصلي
-                    if not performer:
-                        performer = "غير محدد"
-                    if not title:
-                        title = original_file_name
+                    if img_data:
+                        thumbnail = make_thumbnail(img_data)
+                except Exception as e:
+                    logger.error(f"Error preparing thumbnail: {e}")
+                
+                # الحد الأقصى للوصف في تيليجرام هو 1024 حرف - لذلك نختصر اسم الملف إذا كان طويلاً
+                # Create a safe caption that won't exceed Telegram's limit
+                short_filename = original_file_name
+                if len(short_filename) > 30:  # تقصير اسم الملف إذا كان طويلاً
+                    short_filename = original_file_name[:27] + "..."
+                safe_caption = f"ملف صوتي معدل: {short_filename}"
+                
+                # استخراج جميع الوسوم الحالية من الملف المعدل لضمان استخدام الوسوم النهائية بعد الدمج
+                final_tags = get_audio_tags(modified_file_path)
+                logger.info(f"Retrieved final tags for sending: {final_tags}")
+                
+                # تحديث معلومات performer و title للتأكد من ظهورها بشكل صحيح في تيليجرام
+                performer = final_tags.get('artist', '')
+                title = final_tags.get('title', '')
+                album = final_tags.get('album', '')
                     
-                    # إضافة معلومات الألبوم للوصف إذا كانت متوفرة
-                    if album and album != "غير محدد":
-                        safe_caption = f"ملف صوتي معدل: {short_filename}\nالألبوم: {album}"
+                # إذا كانت فارغة، استخدم اسم الملف الأصلي
+                if not performer:
+                    performer = "غير محدد"
+                if not title:
+                    title = original_file_name
+                
+                # إضافة معلومات الألبوم للوصف إذا كانت متوفرة
+                if album and album != "غير محدد":
+                    safe_caption = f"ملف صوتي معدل: {short_filename}\nالألبوم: {album}"
+                
+                logger.info(f"Sending final file with performer={performer}, title={title}")
+                
+                # استخدام الصورة المصغرة المحسنة إذا كانت متوفرة
+                if thumbnail:
+                    logger.info(f"Using optimized in-memory thumbnail for upload, {len(thumbnail)} bytes")
                     
-                    logger.info(f"Sending final file with performer={performer}, title={title}")
+                    try:
+                        # إرسال الملف الصوتي مع الصورة المصغرة المحسنة
+                        # (أو بمعرفه المحفوظ إذا أُرسل نفس الملف من قبل)
+                        sent_audio = send_audio_cached(
+                            bot,
+                            message.chat.id,
+                            modified_file_path,
+                            thumb=thumbnail,
+                            progress=progress.callback,
+                            caption=safe_caption,
+                            performer=performer,
+                            title=title
+                        )
+                        logger.info(f"File sent successfully with thumbnail")
+                    except Exception as e:
+                        logger.error(f"Error sending audio with custom thumbnail: {e}")
+                        # محاولة الإرسال بدون الصورة المصغرة المخصصة في حالة فشل الإرسال
+                        progress.note("⚠️ حدث خطأ أثناء إرفاق الصورة المصغرة، جاري إعادة المحاولة...")
+                        progress.update(0)
+                        send_audio_cached(
+                            bot,
+                            message.chat.id,
+                            modified_file_path,
+                            progress=progress.callback,
+                            caption=safe_caption,
+                            performer=performer,
+                            title=title
+                        )
+                else:
+                    # استخدام الصورة المدمجة في الملف (يستخرجها تيليجرام تلقائيًا)
+                    logger.info("No custom thumbnail available, letting Telegram extract thumbnail automatically")
                     
-                    # استخدام الصورة المصغرة المحسنة إذا كانت متوفرة
-                    if album_art_path and os.path.exists(album_art_path):
-                        logger.info(f"Using optimized thumbnail for upload: {album_art_path}")
-                        
-                        with open(album_art_path, 'rb') as thumb_file:
-                            try:
-                                # إرسال الملف الصوتي مع الصورة المصغرة المحسنة
-                                sent_audio = bot.send_audio(
-                                    message.chat.id,
-                                    audio_file,
-                                    caption=safe_caption,
-                                    performer=performer,
-                                    title=title,
-                                    thumb=thumb_file
-                                )
-                                logger.info(f"File sent successfully with thumbnail")
-                            except Exception as e:
-                                logger.error(f"Error sending audio with custom thumbnail: {e}")
-                                # محاولة الإرسال بدون الصورة المصغرة المخصصة في حالة فشل الإرسال
-                                bot.send_message(message.chat.id, "⚠️ حدث خطأ أثناء إرفاق الصورة المصغرة، جاري إعادة المحاولة...")
-                                bot.send_audio(
-                                    message.chat.id,
-                                    audio_file,
-                                    caption=safe_caption,
-                                    performer=performer,
-                                    title=title
-                                )
-                        
-                        # تنظيف الملفات المؤقتة للصور
-                        try:
-                            # حذف الصورة المصغرة
-                            os.remove(album_art_path)
-                            logger.info(f"Removed temporary thumbnail: {album_art_path}")
-                            
-                            # تحقق من وجود الملفات الأخرى وحذفها
-                            medium_path = os.path.join('temp_audio_files', f"{user_id}_medium_albumart.jpg")
-                            high_res_path = os.path.join('temp_audio_files', f"{user_id}_high_res_albumart.jpg")
-                            
-                            if os.path.exists(medium_path):
-                                os.remove(medium_path)
-                                logger.info(f"Removed medium resolution art: {medium_path}")
-                                
-                            if os.path.exists(high_res_path):
-                                os.remove(high_res_path)
-                                logger.info(f"Removed high resolution art: {high_res_path}")
-                        except Exception as e:
-                            logger.error(f"Error cleaning up temporary files: {e}")
-                    else:
-                        # استخدام الصورة المدمجة في الملف (يستخرجها تيليجرام تلقائيًا)
-                        logger.info("No custom thumbnail available, letting Telegram extract thumbnail automatically")
-                        
-                        try:
-                            bot.send_audio(
-                                message.chat.id,
-                                audio_file,
-                                caption=safe_caption,
-                                performer=performer,
-                                title=title
-                            )
-                        except Exception as e:
-                            logger.error(f"Error sending audio: {e}")
-                            # إبلاغ المستخدم بالخطأ
-                            bot.send_message(
-                                message.chat.id,
-                                f"⚠️ حدث خطأ أثناء إرسال الملف: {str(e)}"
-                            )
-                    logger.info(f"Modified file sent successfully to user {user_id}")
+                    try:
+                        send_audio_cached(
+                            bot,
+                            message.chat.id,
+                            modified_file_path,
+                            progress=progress.callback,
+                            caption=safe_caption,
+                            performer=performer,
+                            title=title
+                        )
+                    except Exception as e:
+                        logger.error(f"Error sending audio: {e}")
+                        # إبلاغ المستخدم بالخطأ
+                        progress.fail(f"⚠️ حدث خطأ أثناء إرسال الملف: {str(e)}")
+                logger.info(f"Modified file sent successfully to user {user_id}")
             except Exception as e:
                 logger.error(f"Error processing or sending modified file: {e}")
-                bot.send_message(message.chat.id, f"حدث خطأ أثناء معالجة أو إرسال الملف المعدل: {str(e)}")
+                progress.fail(f"حدث خطأ أثناء معالجة أو إرسال الملف المعدل: {str(e)}")
             
-            # Clean up both files
+            # Clean up both files (the whole workspace of this upload)
             try:
-                # Original temp file
-                if os.path.exists(original_file_path):
-                    os.remove(original_file_path)
-                    logger.info(f"Removed original temporary file: {original_file_path}")
-                
-                # Modified temp file
+                workspaces = get_workspace_manager()
+                workspaces.discard(original_file_path)
                 if os.path.exists(modified_file_path):
-                    os.remove(modified_file_path)
-                    logger.info(f"Removed modified temporary file: {modified_file_path}")
+                    workspaces.discard(modified_file_path)
+                logger.info(f"Removed temporary files of: {original_file_path}")
             except Exception as e:
                 logger.error(f"Error removing temporary files: {e}")
             
@@ -3209,13 +3076,13 @@ lyrics:
             user_data.pop(user_id, None)
             bot.delete_state(user_id, message.chat.id)
             
-            # Send final message
-            bot.send_message(message.chat.id, "✅ تم حفظ الوسوم وإرسال الملف بنجاح!\n\nيمكنك إرسال ملف صوتي آخر في أي وقت.")
+            # Final status (unless an error above already ended it)
+            if not progress.finished:
+                progress.done("✅ تم حفظ الوسوم وإرسال الملف بنجاح!\n\nيمكنك إرسال ملف صوتي آخر في أي وقت.")
             
         except Exception as e:
             logger.error(f"Error saving tags: {e}")
-            bot.send_message(
-                message.chat.id,
+            progress.fail(
                 f"حدث خطأ في حفظ الوسوم: {str(e)}.\n"
                 "الرجاء المحاولة مرة أخرى."
             )
@@ -3305,11 +3172,7 @@ lyrics:
                     user_data[user_id]['new_tags'] = {}
                     
                 # دمج الوسوم الحالية مع التعديلات التي قام بها المستخدم
-                preview_tags = {**current_tags}
-                
-                # تطبيق التعديلات التي قام بها المستخدم
-                for tag, value in user_data[user_id]['new_tags'].items():
-                    preview_tags[tag] = value
+                preview_tags = current_tags.overlay(user_data[user_id]['new_tags'])
                     
                 logger.info(f"Preview tags for UI update: {preview_tags}")
                 
@@ -4288,13 +4151,8 @@ lyrics:
             
         # استخراج الوسوم الحالية من الملف
         file_path = user_data[user_id]['file_path']
-        current_tags = get_audio_tags(file_path)
-        
-        # إذا تم تعديل بعض الوسوم، استخدم الوسوم المعدلة
-        if 'new_tags' in user_data[user_id] and user_data[user_id]['new_tags']:
-            # دمج الوسوم الحالية مع التعديلات
-            for tag, value in user_data[user_id]['new_tags'].items():
-                current_tags[tag] = value
+        # إذا تم تعديل بعض الوسوم، تُعرض فوق الوسوم الحالية دون نسخها
+        current_tags = get_audio_tags(file_path).overlay(user_data[user_id].get('new_tags'))
         
         # تعيين الحالة للانتظار لاسم القالب
         bot.set_state(user_id, BotStates.waiting_for_template_name, message.chat.id)
@@ -4398,12 +4256,12 @@ lyrics:
         logger.info(f"Displaying current tags for user {user_id}, showing edited: {show_edited}")
         
         try:
-            # استخراج الوسوم من الملف
-            current_tags = get_audio_tags(file_path)
-            
-            # إذا كان المطلوب هو عرض الوسوم المعدلة وكان هناك وسوم مؤقتة، استخدمها
+            # إذا كان المطلوب هو عرض الوسوم المعدلة وكان هناك وسوم مؤقتة، استخدمها دون قراءة الملف
             if show_edited and user_id in user_data and 'temp_tags' in user_data[user_id]:
                 current_tags = user_data[user_id]['temp_tags']
+            else:
+                # استخراج الوسوم من الملف
+                current_tags = get_audio_tags(file_path, header_only=True)
             
             # إعداد رسالة الوسوم
             tag_names_arabic = get_tag_field_names_arabic()
@@ -4412,14 +4270,15 @@ lyrics:
             # تحديد الوسوم المعدلة لإضافة إشارة لها
             edited_tags = set()
             if user_id in user_data and 'temp_tags' in user_data[user_id] and 'original_tags' in user_data[user_id]:
-                for tag, value in user_data[user_id]['temp_tags'].items():
+                # الوسوم المؤقتة طبقة فوق الوسوم الأصلية، التعديلات وحدها كافية للمقارنة
+                for tag, value in user_data[user_id]['temp_tags'].changes.items():
                     if (tag in user_data[user_id]['original_tags'] and 
                             value != user_data[user_id]['original_tags'].get(tag, '')):
                         edited_tags.add(tag)
             
             # إضافة كل وسم إلى الرسالة مع مراعاة عدم عرض كلمات الأغنية في القائمة لتجنب الرسائل الطويلة
-            for tag, value in current_tags.items():
-                if tag != 'lyrics' and value:  # تجنب عرض كلمات الأغنية هنا
+            for tag, value in current_tags.scalar_items():
+                if value:  # كلمات الأغنية وصورة الغلاف لا تُقرأ هنا
                     arabic_name = tag_names_arabic.get(tag, tag)
                     
                     # إضافة إشارة للوسوم المعدلة
@@ -4432,7 +4291,7 @@ lyrics:
                     tag_message += f"{edited_mark}{arabic_name}: {value}\n"
             
             # إضافة زر لعرض كلمات الأغنية إذا كانت موجودة
-            has_lyrics = current_tags.get('lyrics', '')
+            has_lyrics = current_tags.may_have_lyrics
             
             # إنشاء أزرار التحكم
             markup = types.InlineKeyboardMarkup(row_width=2)
@@ -4783,13 +4642,8 @@ lyrics:
             
         # استخراج الوسوم الحالية من الملف
         file_path = user_data[user_id]['file_path']
-        current_tags = get_audio_tags(file_path)
-        
-        # إذا تم تعديل بعض الوسوم، استخدم الوسوم المعدلة
-        if 'new_tags' in user_data[user_id] and user_data[user_id]['new_tags']:
-            # دمج الوسوم الحالية مع التعديلات
-            for tag, value in user_data[user_id]['new_tags'].items():
-                current_tags[tag] = value
+        # إذا تم تعديل بعض الوسوم، تُعرض فوق الوسوم الحالية دون نسخها
+        current_tags = get_audio_tags(file_path).overlay(user_data[user_id].get('new_tags'))
         
         # استخراج اسم الفنان من الوسوم
         artist_name = extract_artist_from_tags(current_tags)
@@ -5320,34 +5174,30 @@ lyrics:
         bot.set_state(user_id, BotStates.admin_panel, chat_id)
     
     # ===== نهاية وظائف لوحة الإدارة =====
-    
+
+
+def run_polling(bot):
+    """Run long polling on the synchronous bot, retrying once on failure."""
     # Configure retry and timeouts for better stability
     telebot.apihelper.READ_TIMEOUT = 30
     telebot.apihelper.CONNECT_TIMEOUT = 20
+    # One pooled HTTP session for API calls and file downloads
+    get_session()
     
     # Start the bot with improved error handling
     try:
         logger.info("Starting bot polling with error handling...")
-        # إزالة أي webhook موجود ومسح التحديثات المعلقة
+        # إزالة أي webhook موجود؛ التحديثات المعلقة تبقى وتُعالج (منشورات القناة
+        # المسجلة مسبقاً في سجل المهام لا تُعالج مرتين)
         bot.remove_webhook()
         logger.info("تم إزالة أي webhook موجود")
         
-        # مسح التحديثات المعلقة لحل مشكلة التضارب
-        try:
-            updates = bot.get_updates(timeout=1)
-            if updates:
-                last_update_id = updates[-1].update_id
-                bot.get_updates(offset=last_update_id + 1, timeout=1)
-                logger.info(f"تم مسح {len(updates)} تحديث معلق")
-        except:
-            pass
-        
         # بدء polling مع معالجة أفضل للأخطاء
         bot.infinity_polling(
             none_stop=True, 
             interval=2, 
             timeout=30,
-            allowed_updates=['message', 'channel_post', 'edited_channel_post']
+            allowed_updates=ALLOWED_UPDATES
         )
     except Exception as e:
         logger.error(f"Critical error in bot polling: {str(e)}")
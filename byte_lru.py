@@ -0,0 +1,98 @@
+"""
+ذاكرة تخزين مؤقت من نوع LRU محدودة بعدد البايتات
+تُستخدم لتخزين نتائج مكلفة (مثل الوسوم المقروءة من الملفات) مع إخراج الأقدم استخداماً
+عند تجاوز الحجم المسموح، وتحتفظ بعدادات الإصابة والإخفاق.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class ByteLRUCache:
+    """
+    ذاكرة LRU آمنة للاستخدام من عدة خيوط، حدها مجموع أحجام القيم بالبايت
+
+    Args:
+        max_bytes: الحد الأقصى لمجموع أحجام القيم المخزنة
+        sizeof: دالة تعيد الحجم التقريبي لقيمة بالبايت (الافتراضي len)
+    """
+
+    def __init__(self, max_bytes: int, sizeof: Callable[[Any], int] = len):
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """الحصول على قيمة وتحديثها كأحدث استخدام"""
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: Optional[int] = None) -> bool:
+        """
+        تخزين قيمة، مع إخراج الأقدم استخداماً حتى يعود الحجم ضمن الحد
+
+        Returns:
+            bool: False إذا كانت القيمة أكبر من سعة الذاكرة كلها ولم تُخزن
+        """
+        if size is None:
+            size = self._sizeof(value)
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if size > self.max_bytes:
+                return False
+            self._items[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+            return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """حذف قيمة من الذاكرة (يستخدم لإبطال النتائج القديمة)"""
+        with self._lock:
+            entry = self._items.pop(key, None)
+            if entry is None:
+                return default
+            self._bytes -= entry[1]
+            return entry[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def stats(self) -> Dict[str, Any]:
+        """إحصائيات الذاكرة: عدد العناصر والحجم والإصابات والإخفاقات"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._items),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+            }
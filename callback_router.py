@@ -0,0 +1,134 @@
+"""
+وحدة توجيه أزرار الاستجابة (callback_data) إلى معالجاتها
+كل معالج يُسجل بمزخرف: route للقيمة الكاملة (قاموس، بحث بخطوة واحدة) أو prefix للأزرار
+التي تحمل معاملاً بعد البادئة (شجرة بادئات، يفوز أطول تطابق). زمن البحث لا يزيد بعدد
+الأزرار المسجلة، وتُحفظ لكل مسار عدادات الاستدعاء والزمن والأخطاء.
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger('callback_router')
+
+# مفتاح المعالج داخل عقدة شجرة البادئات (لا يتعارض مع أي حرف)
+_HANDLER = None
+
+
+class CallbackRouter:
+    """
+    موجه أزرار بقيم كاملة وبادئات
+
+    Args:
+        name: اسم الموجه في الإحصائيات
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._exact = {}
+        self._trie = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        _routers[name] = self
+
+    def route(self, data: str) -> Callable:
+        """تسجيل معالج لقيمة callback_data كاملة"""
+        def decorator(handler: Callable) -> Callable:
+            if data in self._exact:
+                raise ValueError(f"الزر {data} مسجل مسبقاً في {self.name}")
+            self._exact[data] = (data, handler)
+            return handler
+        return decorator
+
+    def prefix(self, prefix: str) -> Callable:
+        """تسجيل معالج لكل قيمة تبدأ بالبادئة (مثل apply_template_<id>)"""
+        def decorator(handler: Callable) -> Callable:
+            node = self._trie
+            for char in prefix:
+                node = node.setdefault(char, {})
+            if _HANDLER in node:
+                raise ValueError(f"البادئة {prefix} مسجلة مسبقاً في {self.name}")
+            node[_HANDLER] = (prefix + '*', handler)
+            return handler
+        return decorator
+
+    def resolve(self, data: str) -> Tuple[Optional[str], Optional[Callable]]:
+        """
+        إيجاد معالج القيمة: التطابق الكامل أولاً ثم أطول بادئة مسجلة
+
+        Returns:
+            Tuple: اسم المسار والمعالج، أو (None, None) إن لم يوجد
+        """
+        found = self._exact.get(data)
+        if found is not None:
+            return found
+        found = (None, None)
+        node = self._trie
+        for char in data:
+            node = node.get(char)
+            if node is None:
+                break
+            if _HANDLER in node:
+                found = node[_HANDLER]
+        return found
+
+    def dispatch(self, data: str, *args, **kwargs) -> bool:
+        """
+        استدعاء معالج الزر مع تسجيل زمنه
+
+        Args:
+            data: قيمة callback_data
+            *args, **kwargs: تُمرر إلى المعالج كما هي
+
+        Returns:
+            bool: False إذا لم يكن للزر معالج مسجل
+        """
+        route, handler = self.resolve(data or '')
+        if handler is None:
+            return False
+
+        started = time.perf_counter()
+        failed = False
+        try:
+            handler(*args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._record(route, time.perf_counter() - started, failed)
+        return True
+
+    def _record(self, route: str, seconds: float, failed: bool) -> None:
+        with self._lock:
+            stats = self._stats.get(route)
+            if stats is None:
+                stats = self._stats[route] = {'calls': 0, 'errors': 0, 'seconds': 0.0, 'max_seconds': 0.0}
+            stats['calls'] += 1
+            stats['seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+            if failed:
+                stats['errors'] += 1
+
+    def __len__(self) -> int:
+        def count(node):
+            return (_HANDLER in node) + sum(count(child) for key, child in node.items() if key is not _HANDLER)
+        return len(self._exact) + count(self._trie)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """عدادات كل مسار: عدد الاستدعاءات والأخطاء ومتوسط الزمن وأقصاه"""
+        with self._lock:
+            result = {}
+            for route, stats in self._stats.items():
+                entry = dict(stats)
+                entry['avg_seconds'] = stats['seconds'] / stats['calls'] if stats['calls'] else 0.0
+                result[route] = entry
+            return result
+
+
+_routers = {}
+
+
+def get_callback_stats() -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """إحصائيات كل الموجهات حسب الاسم"""
+    return {name: router.stats() for name, router in list(_routers.items())}
@@ -0,0 +1,626 @@
+"""
+وحدة خط معالجة ملفات قناة المصدر
+كل منشور صوتي يمر بثلاث مراحل: تنزيل ← تعديل الوسوم ← رفع إلى القناة الهدف. لكل مرحلة
+طابورها وعدد عمالها وسياسة إعادة المحاولة الخاصة بها، فتُنزل ملفات الدفعة الواحدة (20-50
+ملفاً) بالتوازي بينما تُعالج وتُرفع الملفات التي سبقتها. امتلاء طابور مرحلة يوقف المرحلة
+التي قبلها (ضغط عكسي) بدلاً من تراكم الملفات على القرص، وتُسجل أزمنة كل مرحلة.
+الملفات تنتهي من التنزيل والوسوم بأي ترتيب، ثم يحجزها مخزن إعادة الترتيب حسب message_id في
+قناة المصدر ويمررها إلى ناشر واحد بنفس ترتيب المصدر؛ المنشور المتأخر أكثر من المهلة يُتخطى
+(ويُنشر عند جاهزيته) حتى لا يوقف ملف معطوب بقية الدفعة.
+كل انتقال بين المراحل يُسجل في job_journal، وعند التشغيل تُستأنف المنشورات غير المنتهية.
+الصوت المنشور من قبل (نفس file_unique_id أو نفس محتوى الملف الناتج) يُتخطى أو يُعاد إرساله
+بمعرفه المحفوظ في dedupe_index دون تنزيل، والمنشور المعدل يُعالج من جديد فقط إذا تغير ملفه.
+"""
+
+import os
+import time
+import heapq
+import logging
+import threading
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from config import Config
+from audio_format import EXTENSION_FILE_TYPES
+from auto_processor import process_audio_file, prepare_caption
+from dedupe_index import get_dedupe_index
+from downloader import download_to_temp
+from file_id_cache import send_audio_cached, file_digest
+from job_journal import get_job_journal, RECEIVED, DOWNLOADED, TAGGED, PUBLISHED, FAILED, SKIPPED
+from job_queue import JobQueue, QueueFullError
+from processing_profile import get_processing_profile
+from rate_limiter import bulk
+from workspace import get_workspace_manager
+
+logger = logging.getLogger('channel_pipeline')
+
+# امتدادات المستندات التي تُعامل كملفات صوتية حتى لو لم يكن نوعها audio/*
+AUDIO_DOCUMENT_EXTENSIONS = ('.mp3', '.wav', '.ogg', '.m4a', '.flac')
+
+# سياسات المنشور المكرر: تخطيه أو إعادة إرساله بالمعرف المحفوظ
+DEDUPE_SKIP = 'skip'
+DEDUPE_RESEND = 'resend'
+
+
+class DuplicatePost(Exception):
+    """المنشور مكرر لملف منشور من قبل ويُتخطى دون نشر"""
+
+
+def _retryable(error: Exception) -> bool:
+    """أخطاء الشبكة وأخطاء خادم تيليجرام (5xx) تستحق إعادة المحاولة، أما 4xx فلا"""
+    code = getattr(error, 'error_code', None)
+    return code is None or code >= 500
+
+
+class ChannelPost:
+    """منشور صوتي من قناة المصدر أثناء مروره بمراحل الخط"""
+
+    __slots__ = ('message', 'file_id', 'file_unique_id', 'file_name', 'workspace', 'path', 'output_path',
+                 'output_hash', 'cached_file_id', 'received_at', 'timings')
+
+    def __init__(self, message, file_id: str, file_name: str, file_unique_id: Optional[str] = None):
+        self.message = message
+        self.file_id = file_id
+        self.file_unique_id = file_unique_id
+        self.file_name = file_name
+        self.workspace = None
+        self.path = None
+        self.output_path = None
+        self.output_hash = None
+        self.cached_file_id = None
+        self.received_at = time.monotonic()
+        self.timings: Dict[str, float] = {}
+
+    @classmethod
+    def from_message(cls, message) -> Optional['ChannelPost']:
+        """إنشاء المنشور من رسالة القناة، أو None إن لم تكن ملفاً صوتياً"""
+        if message.content_type == 'audio':
+            return cls(message, message.audio.file_id,
+                       message.audio.file_name or f"audio_{message.audio.file_id}.mp3",
+                       message.audio.file_unique_id)
+        if message.content_type == 'document':
+            document = message.document
+            file_name = document.file_name or ''
+            if ((document.mime_type or '').startswith('audio/')
+                    or file_name.lower().endswith(AUDIO_DOCUMENT_EXTENSIONS)):
+                return cls(message, document.file_id, file_name or f"audio_{document.file_id}",
+                           document.file_unique_id)
+        return None
+
+    @classmethod
+    def from_journal(cls, entry: Dict[str, Any]) -> 'ChannelPost':
+        """إعادة بناء منشور غير منتهٍ من سجل المهام (دون رسالة تيليجرام)"""
+        received = entry['received']
+        message = SimpleNamespace(message_id=entry['message_id'], chat=SimpleNamespace(id=entry['chat_id']),
+                                  caption=received.get('caption'), content_type='audio')
+        post = cls(message, received['file_id'], received['file_name'], received.get('file_unique_id'))
+        post.cached_file_id = received.get('cached_file_id')
+        post.output_hash = received.get('output_hash')
+        return post
+
+    def journal_detail(self) -> Dict[str, Any]:
+        """بيانات سطر الاستلام في سجل المهام"""
+        detail = {'file_id': self.file_id, 'file_unique_id': self.file_unique_id,
+                  'file_name': self.file_name, 'caption': self.message.caption}
+        if self.cached_file_id:
+            detail.update(cached_file_id=self.cached_file_id, output_hash=self.output_hash)
+        return detail
+
+    def journal(self, state: str, **detail: Any) -> None:
+        get_job_journal().record(self.message.chat.id, self.message.message_id, state, **detail)
+
+    def release(self) -> None:
+        if self.workspace is not None:
+            self.workspace.release()
+            self.workspace = None
+
+
+class Stage:
+    """
+    مرحلة من الخط: طابور محدود وعمال وإعادة محاولة بتأخير متزايد
+
+    Args:
+        name: اسم المرحلة
+        func: دالة المرحلة، تستقبل ChannelPost وترفع استثناء عند الفشل
+        workers: عدد العمال
+        max_size: الحد الأقصى للمنشورات المنتظرة في المرحلة
+        retries: عدد مرات إعادة المحاولة للأخطاء القابلة لذلك
+        retry_delay: التأخير قبل أول إعادة محاولة (يتضاعف بعدها)
+    """
+
+    def __init__(self, name: str, func: Callable[[ChannelPost], None], workers: int, max_size: int,
+                 retries: int = 0, retry_delay: float = 2.0):
+        self.name = name
+        self.func = func
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.next: Optional['Stage'] = None
+        self.on_done: Optional[Callable[[ChannelPost, bool], None]] = None
+        self.on_skip: Optional[Callable[[ChannelPost, str], None]] = None
+        self.queue = JobQueue(workers, max_size, name=f"channel-{name}")
+        self._lock = threading.Lock()
+        self._stats = {'processed': 0, 'failed': 0, 'retries': 0, 'seconds': 0.0, 'max_seconds': 0.0}
+
+    def submit(self, post: ChannelPost, block: bool = False) -> None:
+        self.queue.submit(self._run, post, job_name=f"{self.name}:{post.message.message_id}", block=block)
+
+    def _run(self, post: ChannelPost) -> None:
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                self.func(post)
+                break
+            except DuplicatePost as e:
+                self._record(time.perf_counter() - started)
+                self.on_skip(post, str(e))
+                return
+            except Exception as e:
+                if attempt >= self.retries or not _retryable(e):
+                    self._record(time.perf_counter() - started, failed=True)
+                    logger.error(f"فشلت مرحلة {self.name} للمنشور {post.message.message_id}: {e}")
+                    self.on_done(post, False)
+                    return
+                attempt += 1
+                delay = self.retry_delay * 2 ** (attempt - 1)
+                with self._lock:
+                    self._stats['retries'] += 1
+                logger.warning(f"خطأ في مرحلة {self.name} للمنشور {post.message.message_id}: {e}، "
+                               f"إعادة المحاولة {attempt}/{self.retries} بعد {delay:.0f} ث")
+                time.sleep(delay)
+
+        seconds = time.perf_counter() - started
+        post.timings[self.name] = seconds
+        self._record(seconds)
+        if self.next is None:
+            self.on_done(post, True)
+            return
+        try:
+            # الانتظار حتى يتوفر مكان في المرحلة التالية (ضغط عكسي على هذه المرحلة)
+            self.next.submit(post, block=True)
+        except Exception as e:
+            logger.error(f"تعذر تمرير المنشور {post.message.message_id} إلى مرحلة {self.next.name}: {e}")
+            self.on_done(post, False)
+
+    def _record(self, seconds: float, failed: bool = False) -> None:
+        with self._lock:
+            self._stats['failed' if failed else 'processed'] += 1
+            self._stats['seconds'] += seconds
+            self._stats['max_seconds'] = max(self._stats['max_seconds'], seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        done = stats['processed'] + stats['failed']
+        stats['avg_seconds'] = stats['seconds'] / done if done else 0.0
+        queue_stats = self.queue.stats()
+        stats.update({'depth': queue_stats['depth'], 'busy': queue_stats['busy'],
+                      'workers': queue_stats['workers'], 'avg_wait': queue_stats['avg_wait']})
+        return stats
+
+
+class ReorderBuffer:
+    """
+    مخزن إعادة الترتيب بين الوسوم والنشر
+
+    يُسجل كل منشور عند استلامه (expect)، ويُمرر إلى release بترتيب message_id عندما يصبح
+    جاهزاً (submit) أو يُحذف من الترتيب عند فشله (discard). خيط واحد يستدعي release، فلا يسبق
+    منشور منشوراً قبله إلا إذا تجاوز الأقدم المهلة وهو في مقدمة الترتيب.
+
+    عدد المنشورات الجاهزة المحجوزة محدود بـ max_size: مرحلة الوسوم تنتظر حتى يتوفر مكان
+    (ضغط عكسي)، إلا منشور مقدمة الترتيب الذي يُقبل دائماً حتى لا يتوقف النشر.
+
+    Args:
+        release: دالة تمرير المنشور الجاهز (إلى مرحلة النشر)
+        timeout: أقصى انتظار لمنشور في مقدمة الترتيب قبل تخطيه (بالثواني)
+        max_size: الحد الأقصى للمنشورات الجاهزة المنتظرة لدورها
+    """
+
+    name = 'reorder'
+
+    def __init__(self, release: Callable[[ChannelPost], None], timeout: float, max_size: int):
+        self._release = release
+        self.timeout = timeout
+        self.max_size = max_size
+        self._held = 0
+        self._cond = threading.Condition()
+        self._order: List[int] = []
+        self._expected = set()
+        self._ready: Dict[int, Optional[ChannelPost]] = {}
+        self._skipped = set()
+        self._late: List[ChannelPost] = []
+        self._head_since = None
+        self._thread = None
+        self._stats = {'released': 0, 'skipped': 0, 'late': 0, 'max_held': 0}
+
+    def expect(self, message_id: int) -> None:
+        """تسجيل منشور جديد في ترتيب النشر"""
+        with self._cond:
+            heapq.heappush(self._order, message_id)
+            self._expected.add(message_id)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._publisher, name='channel-publisher', daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def submit(self, post: ChannelPost, block: bool = True) -> None:
+        """
+        منشور جاهز للنشر (بعد مرحلة الوسوم)
+
+        Raises:
+            QueueFullError: إذا كان المخزن ممتلئاً و block=False
+        """
+        message_id = post.message.message_id
+        with self._cond:
+            while (message_id in self._expected and self._held >= self.max_size
+                   and message_id != self._order[0]):
+                if not block:
+                    raise QueueFullError(f"مخزن إعادة الترتيب ممتلئ ({self.max_size} منشور)")
+                self._cond.wait()
+            if message_id in self._expected:
+                self._ready[message_id] = post
+                self._held += 1
+                self._stats['max_held'] = max(self._stats['max_held'], self._held)
+            else:
+                # تم تخطيه بعد انتهاء المهلة: يُنشر الآن خارج الترتيب
+                self._skipped.discard(message_id)
+                self._late.append(post)
+                self._stats['late'] += 1
+            self._cond.notify_all()
+
+    def discard(self, message_id: int) -> None:
+        """إزالة منشور فشل قبل النشر من الترتيب"""
+        with self._cond:
+            if message_id in self._expected:
+                self._ready[message_id] = None
+                self._cond.notify_all()
+            else:
+                self._skipped.discard(message_id)
+
+    def _next(self) -> ChannelPost:
+        """انتظار المنشور التالي حسب الترتيب (يُستدعى والقفل محجوز)"""
+        while True:
+            now = time.monotonic()
+            if self._late:
+                return self._late.pop(0)
+            if not self._order:
+                self._head_since = None
+                self._cond.wait()
+                continue
+            head = self._order[0]
+            if head in self._ready:
+                heapq.heappop(self._order)
+                self._expected.discard(head)
+                self._head_since = now
+                post = self._ready.pop(head)
+                # مقدمة جديدة أو مكان جديد لمرحلة الوسوم المنتظرة
+                self._cond.notify_all()
+                if post is not None:
+                    self._held -= 1
+                    return post
+                continue
+            if self._head_since is None:
+                self._head_since = now
+            remaining = self._head_since + self.timeout - now
+            if remaining <= 0:
+                heapq.heappop(self._order)
+                self._expected.discard(head)
+                self._skipped.add(head)
+                self._stats['skipped'] += 1
+                self._head_since = now
+                self._cond.notify_all()
+                logger.warning(f"تم تخطي المنشور {head} بعد {self.timeout:.0f} ث من الانتظار، سيُنشر عند جاهزيته")
+                continue
+            self._cond.wait(remaining)
+
+    def _publisher(self) -> None:
+        while True:
+            with self._cond:
+                post = self._next()
+                self._stats['released'] += 1
+            try:
+                self._release(post)
+            except Exception as e:
+                logger.error(f"خطأ في تمرير المنشور {post.message.message_id} للنشر: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self._stats)
+            stats['waiting'] = len(self._order)
+            stats['held'] = self._held
+            return stats
+
+
+class ChannelPipeline:
+    """
+    خط التنزيل ← الوسوم ← الرفع لمنشورات قناة المصدر
+
+    Args:
+        bot: كائن البوت (يُستخدم للرفع بأولوية الإرسال الجماعي)
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        size = Config.CHANNEL_QUEUE_SIZE
+        self.download = Stage('download', self._download, Config.CHANNEL_DOWNLOAD_WORKERS, size,
+                              retries=Config.CHANNEL_RETRIES)
+        self.tag = Stage('tag', self._tag, Config.CHANNEL_TAG_WORKERS, size)
+        # ناشر واحد حتى تظهر الملفات في القناة الهدف بترتيب قناة المصدر
+        self.upload = Stage('upload', self._upload, 1, size, retries=Config.CHANNEL_RETRIES)
+        self.reorder = ReorderBuffer(lambda post: self.upload.submit(post, block=True),
+                                     Config.CHANNEL_REORDER_TIMEOUT, size)
+        self.stages = (self.download, self.tag, self.upload)
+        self.download.next = self.tag
+        self.tag.next = self.reorder
+        for stage in self.stages:
+            stage.on_done = self._finish
+            stage.on_skip = self._skip
+        self._lock = threading.Lock()
+        self._stats = {'received': 0, 'resumed': 0, 'rejected': 0, 'published': 0, 'failed': 0, 'seconds': 0.0,
+                       'duplicates_skipped': 0, 'duplicates_resent': 0, 'edits_reprocessed': 0, 'edits_ignored': 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def submit(self, message, edited: bool = False) -> bool:
+        """
+        إضافة منشور من قناة المصدر إلى الخط دون انتظار
+
+        Args:
+            message: رسالة القناة
+            edited: المنشور معدل (edited_channel_post)، ويُعالج فقط إذا تغير ملفه الصوتي
+
+        Returns:
+            bool: False إذا لم يكن المنشور ملفاً صوتياً أو كان مسجلاً أو مكرراً أو كان طابور التنزيل ممتلئاً
+        """
+        post = ChannelPost.from_message(message)
+        if post is None:
+            logger.info(f"تم تجاهل منشور غير صوتي: {message.content_type}")
+            return False
+
+        duplicate = get_dedupe_index().by_unique_id(post.file_unique_id)
+        if duplicate is not None and Config.DEDUPE_MODE == DEDUPE_RESEND:
+            post.cached_file_id = duplicate['file_id']
+            post.output_hash = duplicate['output_hash']
+
+        if edited:
+            if not self._reopen(post):
+                return False
+        # المنشور المسجل من قبل (تحديث مكرر أو مستأنف) لا يُعالج مرة ثانية
+        elif not get_job_journal().begin(message.chat.id, message.message_id, post.journal_detail()):
+            logger.info(f"المنشور {message.message_id} مسجل مسبقاً، تم تجاهله")
+            return False
+
+        if duplicate is not None and post.cached_file_id is None:
+            post.journal(SKIPPED, duplicate_of=duplicate['source_message_id'])
+            self._count('duplicates_skipped')
+            logger.info(f"المنشور {message.message_id} مكرر للمنشور {duplicate['source_message_id']}، تم تخطيه")
+            return False
+
+        self.reorder.expect(message.message_id)
+        try:
+            if post.cached_file_id:
+                # الصوت نفسه نُشر من قبل: يُعاد إرساله بمعرفه دون تنزيل ولا وسوم
+                self.reorder.submit(post, block=False)
+            else:
+                self.download.submit(post)
+        except QueueFullError as e:
+            self.reorder.discard(message.message_id)
+            post.journal(FAILED, error=str(e))
+            with self._lock:
+                self._stats['rejected'] += 1
+            logger.error(f"تم رفض ملف القناة {message.message_id}: {e}")
+            return False
+        if post.cached_file_id:
+            with self._lock:
+                self._stats['received'] += 1
+                self._stats['duplicates_resent'] += 1
+            logger.info(f"♻️ ملف القناة {message.message_id} مكرر للمنشور {duplicate['source_message_id']}، "
+                        f"سيُعاد إرساله بمعرفه")
+            return True
+        with self._lock:
+            self._stats['received'] += 1
+        logger.info(f"📥 ملف القناة {message.message_id} في طابور التنزيل: {post.file_name}")
+        return True
+
+    def _reopen(self, post: ChannelPost) -> bool:
+        """بدء مهمة جديدة لمنشور معدل إذا تغير ملفه الصوتي عن الملف المسجل عند استلامه"""
+        message = post.message
+        journal = get_job_journal()
+        previous = journal.received(message.chat.id, message.message_id)
+        # تعديل النص فقط، أو منشور لم يُسجل (أو حُذف سجله بعد مدة الحفظ)، لا يعيد المعالجة
+        if previous is None or previous.get('file_unique_id') in (None, post.file_unique_id):
+            self._count('edits_ignored')
+            logger.info(f"تعديل المنشور {message.message_id} لم يغير ملفه الصوتي، تم تجاهله")
+            return False
+        if not journal.reopen(message.chat.id, message.message_id, post.journal_detail()):
+            self._count('edits_ignored')
+            logger.warning(f"المنشور المعدل {message.message_id} ما زال قيد المعالجة، تم تجاهل التعديل")
+            return False
+        self._count('edits_reprocessed')
+        logger.info(f"تغير الملف الصوتي في المنشور المعدل {message.message_id}، ستُعاد معالجته")
+        return True
+
+    def _download(self, post: ChannelPost) -> None:
+        file_info = self.bot.get_file(post.file_id)
+        if not file_info.file_path:
+            raise ValueError("لم يتم العثور على مسار الملف")
+        if post.workspace is None:
+            post.workspace = get_workspace_manager().create('channel')
+        # الامتداد من محتوى الملف وليس من اسمه حتى يُقرأ بالمحلل الصحيح
+        file_ext = os.path.splitext(post.file_name)[1].lower()
+        if file_ext not in EXTENSION_FILE_TYPES:
+            file_ext = '.mp3'
+        download = download_to_temp(self.bot, file_info.file_path, post.workspace.path, fallback_ext=file_ext)
+        post.path = download.path
+        post.workspace.account()
+        post.journal(DOWNLOADED, path=post.path)
+
+    def _tag(self, post: ChannelPost) -> None:
+        output_path = process_audio_file(post.path, get_processing_profile(), post.message.caption)
+        if not output_path:
+            raise ValueError("فشل تطبيق القالب على الملف")
+        post.output_path = output_path
+        post.output_hash = file_digest(output_path)
+        if Config.DEDUPE_MODE == DEDUPE_SKIP:
+            duplicate = get_dedupe_index().by_output(post.output_hash)
+            if duplicate is not None:
+                raise DuplicatePost(f"نفس محتوى المنشور {duplicate['source_message_id']}")
+        post.journal(TAGGED, path=output_path, output_hash=post.output_hash)
+
+    def _upload(self, post: ChannelPost) -> None:
+        target_chat = Config.TARGET_CHANNEL or post.message.chat.id
+        caption = f"تم معالجة الملف تلقائياً ✅\n{prepare_caption(post.message.caption) or ''}"
+        sent = self._resend(post, target_chat, caption) if post.cached_file_id else None
+        if sent is None:
+            if post.output_path is None:
+                # المعرف المحفوظ رُفض: يُنزل الملف ويُعالج هنا قبل رفعه
+                self._download(post)
+                self._tag(post)
+            # الملف الناتج المطابق لملف مرسل من قبل (إعادة نشر أو إعادة محاولة) يُرسل بمعرفه دون رفع
+            sent = send_audio_cached(
+                bulk(self.bot),
+                target_chat,
+                post.output_path,
+                caption=caption,
+                disable_notification=True
+            )
+        media = getattr(sent, 'audio', None) or getattr(sent, 'document', None)
+        if media is not None:
+            get_dedupe_index().put(post.file_unique_id, post.output_hash, media.file_id,
+                                   post.message.chat.id, post.message.message_id, getattr(sent, 'message_id', None))
+        post.journal(PUBLISHED, target=str(target_chat), sent_message_id=getattr(sent, 'message_id', None))
+        logger.info(f"📤 تم إرسال ملف القناة {post.message.message_id} إلى: {target_chat}")
+
+    def _resend(self, post: ChannelPost, target_chat, caption: str):
+        """إرسال الملف المنشور من قبل بمعرفه المحفوظ، أو None إذا رفض تيليجرام المعرف"""
+        try:
+            return bulk(self.bot).send_audio(target_chat, post.cached_file_id, caption=caption,
+                                             disable_notification=True)
+        except Exception as e:
+            if not getattr(e, 'error_code', None) or _retryable(e):
+                raise
+            logger.warning(f"المعرف المحفوظ للمنشور {post.message.message_id} لم يعد صالحاً، "
+                           f"سيتم تنزيل الملف ومعالجته: {e}")
+            get_dedupe_index().forget(post.file_unique_id)
+            post.cached_file_id = None
+            return None
+
+    def _skip(self, post: ChannelPost, reason: str) -> None:
+        self.reorder.discard(post.message.message_id)
+        post.journal(SKIPPED, reason=reason)
+        post.release()
+        self._count('duplicates_skipped')
+        logger.info(f"تم تخطي ملف القناة {post.message.message_id} المكرر ({reason})")
+
+    def _finish(self, post: ChannelPost, published: bool) -> None:
+        if not published:
+            self.reorder.discard(post.message.message_id)
+            post.journal(FAILED)
+        post.release()
+        seconds = time.monotonic() - post.received_at
+        with self._lock:
+            self._stats['published' if published else 'failed'] += 1
+            if published:
+                self._stats['seconds'] += seconds
+        timings = '، '.join(f"{name} {value:.1f} ث" for name, value in post.timings.items())
+        logger.info(f"انتهت معالجة ملف القناة {post.message.message_id} في {seconds:.1f} ث ({timings})")
+
+    def resume(self) -> int:
+        """
+        استئناف المنشورات غير المنتهية في سجل المهام من آخر مرحلة مكتملة
+
+        المنشور الذي وصل إلى الوسوم أو التنزيل وما زال ملفه موجوداً يكمل من المرحلة التالية،
+        والمنشور المكرر الذي يُعاد إرساله بمعرفه ينتقل إلى النشر مباشرة، وغيره يُنزل من جديد
+        (file_id يبقى صالحاً). النشر يُسجل بعد نجاحه فقط، فالمنشور الذي
+        توقف أثناء الرفع نفسه يُرفع مرة أخرى.
+
+        Returns:
+            int: عدد المنشورات المستأنفة
+        """
+        entries = get_job_journal().unfinished()
+        workspaces = get_workspace_manager()
+        for entry in entries:
+            post = ChannelPost.from_journal(entry)
+            path = entry['detail'].get('path')
+            self.reorder.expect(post.message.message_id)
+            if entry['state'] in (DOWNLOADED, TAGGED) and path and os.path.isfile(path):
+                workspace = workspaces.workspace_of(path)
+                if workspace is not None:
+                    post.workspace = workspaces.adopt(workspace)
+                if entry['state'] == TAGGED:
+                    post.output_path = path
+                    post.output_hash = entry['detail'].get('output_hash')
+                    self.reorder.submit(post)
+                else:
+                    post.path = path
+                    self.tag.submit(post, block=True)
+            elif entry['state'] == RECEIVED and post.cached_file_id:
+                self.reorder.submit(post)
+            else:
+                self.download.submit(post, block=True)
+            logger.info(f"استئناف المنشور {post.message.message_id} من حالة {entry['state']}")
+        with self._lock:
+            self._stats['resumed'] += len(entries)
+        return len(entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['avg_seconds'] = stats['seconds'] / stats['published'] if stats['published'] else 0.0
+        stats['stages'] = {stage.name: stage.stats() for stage in self.stages}
+        stats['reorder'] = self.reorder.stats()
+        return stats
+
+
+_pipeline = None
+
+
+def setup_channel_pipeline(bot) -> Optional[ChannelPipeline]:
+    """
+    تسجيل معالج منشورات قناة المصدر الذي يضيفها إلى الخط
+
+    Args:
+        bot: كائن البوت
+
+    Returns:
+        ChannelPipeline: الخط، أو None إذا كانت المعالجة التلقائية غير مفعلة
+    """
+    global _pipeline
+    if not Config.AUTO_PROCESSING_ENABLED:
+        logger.info("المعالجة التلقائية غير مفعلة")
+        return None
+    if not Config.SOURCE_CHANNEL:
+        logger.warning("لم يتم تحديد قناة المصدر للمعالجة التلقائية")
+        return None
+
+    pipeline = _pipeline = ChannelPipeline(bot)
+
+    journal = get_job_journal()
+    pruned = journal.prune(Config.JOB_JOURNAL_RETENTION)
+    if pruned:
+        logger.info(f"تم حذف {pruned} سطراً قديماً من سجل مهام القناة")
+    get_dedupe_index().prune()
+    # الاستئناف في الخلفية حتى لا ينتظر التسجيل امتلاء طوابير المراحل
+    threading.Thread(target=pipeline.resume, name='channel-resume', daemon=True).start()
+
+    @bot.channel_post_handler(content_types=['audio', 'document'],
+                              func=lambda message: str(message.chat.id) == str(Config.SOURCE_CHANNEL))
+    def handle_channel_audio(message):
+        """إضافة ملف قناة المصدر إلى خط المعالجة والعودة فوراً"""
+        pipeline.submit(message)
+
+    @bot.edited_channel_post_handler(content_types=['audio', 'document'],
+                                     func=lambda message: str(message.chat.id) == str(Config.SOURCE_CHANNEL))
+    def handle_edited_channel_audio(message):
+        """إعادة معالجة منشور معدل في قناة المصدر إذا تغير ملفه الصوتي"""
+        pipeline.submit(message, edited=True)
+
+    logger.info(f"تم تفعيل المعالجة التلقائية للقناة: {Config.SOURCE_CHANNEL}")
+    return pipeline
+
+
+def get_pipeline_stats() -> Optional[Dict[str, Any]]:
+    """إحصائيات خط القناة: عدد الملفات وأزمنة كل مرحلة، أو None إن لم يكن مفعلاً"""
+    return _pipeline.stats() if _pipeline is not None else None
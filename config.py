@@ -93,6 +93,75 @@ class Config:
     TAG_FOOTER_ENABLED = os.getenv('TAG_FOOTER_ENABLED', 'false').lower() == 'true'
     TAG_FOOTER_TEXT = os.getenv('TAG_FOOTER_TEXT', '')
 
+    # الحد الأقصى لذاكرة الوسوم المقروءة (ميجابايت)
+    TAG_CACHE_MAX_MB = int(os.getenv('TAG_CACHE_MAX_MB', '32'))
+
+    # الحد الأقصى لذاكرة صور الغلاف المجهزة (ميجابايت)
+    COVER_CACHE_MAX_MB = int(os.getenv('COVER_CACHE_MAX_MB', '8'))
+
+    # ملف حفظ معرفات الملفات المرسلة لإعادة استخدامها دون رفع
+    FILE_ID_CACHE_PATH = os.getenv('FILE_ID_CACHE_PATH', os.path.join('instance', 'file_id_cache.sqlite'))
+
+    # جلسات المستخدمين: الخلفية (memory أو sqlite أو redis) ومدة الصلاحية وحدود الذاكرة
+    SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'sqlite')
+    SESSION_DB_PATH = os.getenv('SESSION_DB_PATH', os.path.join('instance', 'sessions.sqlite'))
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    SESSION_TTL = int(os.getenv('SESSION_TTL', str(6 * 3600)))
+    SESSION_LOCAL_TTL = int(os.getenv('SESSION_LOCAL_TTL', '300'))
+    SESSION_MAX_ENTRIES = int(os.getenv('SESSION_MAX_ENTRIES', '1000'))
+    SESSION_MAX_MB = int(os.getenv('SESSION_MAX_MB', '64'))
+
+    # مساحات عمل المهام: المجلد (أو tmpfs في /dev/shm) وأقصى عمر وحجم كلي قبل الحذف
+    WORKSPACE_DIR = os.getenv('WORKSPACE_DIR', '')
+    WORKSPACE_TMPFS = os.getenv('WORKSPACE_TMPFS', 'false').lower() == 'true'
+    WORKSPACE_MAX_AGE = int(os.getenv('WORKSPACE_MAX_AGE', str(SESSION_TTL + 3600)))
+    WORKSPACE_MAX_MB = int(os.getenv('WORKSPACE_MAX_MB', '2048'))
+
+    # أقل فاصل (بالثواني) بين تعديلين لنسبة التقدم في رسالة حالة المهمة
+    PROGRESS_EDIT_INTERVAL = float(os.getenv('PROGRESS_EDIT_INTERVAL', '2'))
+
+    # تحديد معدل الإرسال: الحد العام (رسالة/ثانية) وحد المحادثة الخاصة (رسالة/ثانية)
+    # وحد المجموعة أو القناة (رسالة/دقيقة)، وإعادة المحاولة عند رد 429
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMIT_GLOBAL = float(os.getenv('RATE_LIMIT_GLOBAL', '30'))
+    RATE_LIMIT_PER_CHAT = float(os.getenv('RATE_LIMIT_PER_CHAT', '1'))
+    RATE_LIMIT_PER_GROUP = float(os.getenv('RATE_LIMIT_PER_GROUP', '20'))
+    RATE_LIMIT_RETRIES = int(os.getenv('RATE_LIMIT_RETRIES', '3'))
+    RATE_LIMIT_MAX_WAIT = float(os.getenv('RATE_LIMIT_MAX_WAIT', '60'))
+
+    # طابور المعالجة: عدد العمال والحد الأقصى للمهام المنتظرة
+    PROCESSING_WORKERS = int(os.getenv('PROCESSING_WORKERS', '4'))
+    PROCESSING_QUEUE_SIZE = int(os.getenv('PROCESSING_QUEUE_SIZE', '100'))
+
+    # خط معالجة قناة المصدر: عدد العمال لكل مرحلة وحجم طابورها وعدد مرات إعادة المحاولة
+    # (النشر بناشر واحد بترتيب المصدر، والمهلة قبل تخطي منشور متأخر في مقدمة الترتيب)
+    CHANNEL_DOWNLOAD_WORKERS = int(os.getenv('CHANNEL_DOWNLOAD_WORKERS', '4'))
+    CHANNEL_TAG_WORKERS = int(os.getenv('CHANNEL_TAG_WORKERS', '2'))
+    CHANNEL_QUEUE_SIZE = int(os.getenv('CHANNEL_QUEUE_SIZE', '100'))
+    CHANNEL_RETRIES = int(os.getenv('CHANNEL_RETRIES', '3'))
+    CHANNEL_REORDER_TIMEOUT = float(os.getenv('CHANNEL_REORDER_TIMEOUT', '120'))
+
+    # سجل مهام القناة (SQLite) لاستئناف المنشورات بعد إعادة التشغيل، ومدة حفظ المهام المنتهية
+    JOB_JOURNAL_PATH = os.getenv('JOB_JOURNAL_PATH', os.path.join('instance', 'channel_jobs.sqlite'))
+    JOB_JOURNAL_RETENTION = int(os.getenv('JOB_JOURNAL_RETENTION', str(7 * 24 * 3600)))
+
+    # فهرس المنشورات المكررة في قناة المصدر (SQLite)، ومدة الاحتفاظ، وسياسة المكرر: skip أو resend
+    DEDUPE_DB_PATH = os.getenv('DEDUPE_DB_PATH', os.path.join('instance', 'channel_dedupe.sqlite'))
+    DEDUPE_RETENTION = int(os.getenv('DEDUPE_RETENTION', str(30 * 24 * 3600)))
+    DEDUPE_MODE = os.getenv('DEDUPE_MODE', 'resend').lower()
+
+    # التشغيل على asyncio (AsyncTeleBot) وعدد خيوط تنفيذ المعالجات فيه
+    ASYNC_BOT = os.getenv('ASYNC_BOT', 'false').lower() == 'true'
+    ASYNC_HANDLER_THREADS = int(os.getenv('ASYNC_HANDLER_THREADS', '8'))
+
+    # استقبال التحديثات عبر Webhook على تطبيق Flask بدلاً من polling
+    WEBHOOK_MODE = os.getenv('WEBHOOK_MODE', 'false').lower() == 'true'
+    WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')  # العنوان العام للخادم، مثل https://example.com
+    WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram/webhook')
+    WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+    WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', '4'))
+    PORT = int(os.getenv('PORT', '8080'))
+
     # المجلدات
     TEMP_DIR = os.getenv('TEMP_DIR', 'temp_audio_files')
     TEMPLATES_DIR = os.getenv('TEMPLATES_DIR', 'templates')
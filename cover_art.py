@@ -0,0 +1,187 @@
+"""
+وحدة تجهيز صورة الغلاف قبل كتابتها في الملفات الصوتية
+تفك ترميز الصورة مرة واحدة (مع التصغير أثناء فك ترميز JPEG) وترمزها مرة واحدة بصيغة JPEG،
+وتحفظ النتيجة مؤقتاً حسب بصمة الصورة الأصلية حتى لا يعاد ترميز نفس الغلاف لكل ملف.
+تنشئ أيضاً الصورة المصغرة المرسلة مع الملف في الذاكرة دون المرور بالقرص.
+"""
+
+import os
+import hashlib
+import logging
+from io import BytesIO
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from byte_lru import ByteLRUCache
+from config import Config
+
+logger = logging.getLogger('cover_art')
+
+# المقاس القياسي لصورة الغلاف (الضلع الأطول بالبكسل) كما تستخدمه برامج تحرير الوسوم
+COVER_ART_SIZE = 300
+
+# جودة ترميز JPEG لصورة الغلاف
+COVER_ART_QUALITY = 80
+
+# حدود الصورة المصغرة التي يقبلها تيليجرام مع send_audio
+THUMBNAIL_MAX_SIZE = 320
+THUMBNAIL_MAX_BYTES = 200 * 1024
+
+# نوع الصورة حسب امتداد الملف
+IMAGE_MIME_TYPES = {
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+}
+
+
+class CoverArt(NamedTuple):
+    """صورة غلاف جاهزة للكتابة، نفس البايتات تُستخدم لكل إطار أو صيغة"""
+    data: bytes
+    mime: str
+    optimized: bool
+
+
+# أغلفة مجهزة (CoverArt) وصور مصغرة (bytes) حسب بصمة الصورة الأصلية
+_cover_cache = ByteLRUCache(Config.COVER_CACHE_MAX_MB * 1024 * 1024,
+                            sizeof=lambda value: len(getattr(value, 'data', value)))
+
+
+def load_picture(picture: Any) -> Tuple[Optional[bytes], str]:
+    """
+    قراءة بايتات الصورة من مسار ملف أو استخدامها مباشرة إن كانت بايتات
+
+    Args:
+        picture: مسار ملف الصورة أو بياناتها
+
+    Returns:
+        Tuple[Optional[bytes], str]: بيانات الصورة ونوعها (من الامتداد، والافتراضي JPEG)
+    """
+    if isinstance(picture, str) and os.path.isfile(picture):
+        with open(picture, 'rb') as pic_file:
+            data = pic_file.read()
+        ext = os.path.splitext(picture)[1].lower()
+        logger.info(f"تمت قراءة {len(data)} بايت من ملف الصورة {picture}")
+        return data, IMAGE_MIME_TYPES.get(ext, 'image/jpeg')
+    return picture or None, 'image/jpeg'
+
+
+def _encode_cover(data: bytes, size: int) -> Optional[bytes]:
+    """فك ترميز الصورة وتغيير مقاسها وترميزها بصيغة JPEG مرة واحدة"""
+    from PIL import Image
+
+    img = Image.open(BytesIO(data))
+    original_size = img.size
+    width, height = original_size
+
+    # الحفاظ على نسبة الأبعاد مع جعل الضلع الأطول بالمقاس القياسي
+    if width > height:
+        new_size = (size, max(1, int(height * size / width)))
+    else:
+        new_size = (max(1, int(width * size / height)), size)
+
+    # في JPEG يتم التصغير أثناء فك الترميز (بمضاعفات 1/2، 1/4، 1/8) بدلاً من فك الصورة كاملة
+    if img.format == 'JPEG':
+        img.draft('RGB', new_size)
+
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    img = img.resize(new_size, Image.Resampling.LANCZOS)
+
+    buffer = BytesIO()
+    img.save(buffer, format='JPEG', quality=COVER_ART_QUALITY, optimize=True)
+    logger.info(f"تم تحويل صورة الغلاف من {original_size} إلى {img.size}، الحجم {buffer.tell()} بايت")
+    return buffer.getvalue()
+
+
+def prepare_cover(data: bytes, size: int = COVER_ART_SIZE) -> CoverArt:
+    """
+    تجهيز صورة الغلاف بالمقاس القياسي وصيغة JPEG مع حفظ النتيجة حسب بصمة الصورة
+
+    عند تعذر المعالجة (عدم توفر PIL أو صورة تالفة) تُعاد الصورة الأصلية كما هي.
+
+    Args:
+        data: بايتات الصورة الأصلية
+        size: مقاس الضلع الأطول بالبكسل
+
+    Returns:
+        CoverArt: البيانات الجاهزة ونوعها وهل تمت معالجتها
+    """
+    cache_key = (hashlib.sha256(data).digest(), size)
+    cover = _cover_cache.get(cache_key)
+    if cover is not None:
+        return cover
+
+    try:
+        cover = CoverArt(_encode_cover(data, size), 'image/jpeg', True)
+    except ImportError:
+        logger.warning("مكتبة PIL غير متوفرة، سيتم استخدام الصورة الأصلية")
+        return CoverArt(data, 'image/jpeg', False)
+    except Exception as e:
+        logger.error(f"خطأ في تجهيز صورة الغلاف: {e}")
+        return CoverArt(data, 'image/jpeg', False)
+
+    _cover_cache.put(cache_key, cover)
+    if size <= THUMBNAIL_MAX_SIZE and len(cover.data) <= THUMBNAIL_MAX_BYTES:
+        # الغلاف المجهز يصلح كصورة مصغرة كما هو، فلا حاجة لفكه مرة أخرى عند الإرسال
+        _cover_cache.put((hashlib.sha256(cover.data).digest(), 'thumb'), cover.data)
+    return cover
+
+
+def _encode_thumbnail(data: bytes) -> bytes:
+    """تصغير الصورة إلى حدود تيليجرام، مع خفض الجودة حتى يصبح الحجم ضمن الحد"""
+    from PIL import Image
+
+    img = Image.open(BytesIO(data))
+    bounds = (THUMBNAIL_MAX_SIZE, THUMBNAIL_MAX_SIZE)
+    if (img.format == 'JPEG' and max(img.size) <= THUMBNAIL_MAX_SIZE
+            and len(data) <= THUMBNAIL_MAX_BYTES):
+        # صورة JPEG ضمن الحدود أصلاً (قراءة الترويسة فقط دون فك الترميز)
+        return data
+
+    if img.format == 'JPEG':
+        img.draft('RGB', bounds)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    img.thumbnail(bounds, Image.Resampling.LANCZOS)
+
+    for quality in (90, 80, 70, 60, 50):
+        buffer = BytesIO()
+        img.save(buffer, format='JPEG', quality=quality, optimize=True)
+        if buffer.tell() <= THUMBNAIL_MAX_BYTES:
+            break
+    return buffer.getvalue()
+
+
+def make_thumbnail(data: bytes) -> Optional[bytes]:
+    """
+    إنشاء الصورة المصغرة لإرسالها مع send_audio في الذاكرة (≤320 بكسل و≤200 كيلوبايت)
+
+    النتيجة محفوظة حسب بصمة الصورة، وغلاف أعدته prepare_cover يُعاد كما هو.
+
+    Args:
+        data: بايتات صورة الغلاف
+
+    Returns:
+        Optional[bytes]: بايتات JPEG أو None إذا تعذرت المعالجة
+    """
+    cache_key = (hashlib.sha256(data).digest(), 'thumb')
+    thumbnail = _cover_cache.get(cache_key)
+    if thumbnail is not None:
+        return thumbnail
+
+    try:
+        thumbnail = _encode_thumbnail(data)
+    except ImportError:
+        logger.warning("مكتبة PIL غير متوفرة، لن يتم إنشاء صورة مصغرة")
+        return None
+    except Exception as e:
+        logger.error(f"خطأ في إنشاء الصورة المصغرة: {e}")
+        return None
+
+    _cover_cache.put(cache_key, thumbnail)
+    return thumbnail
+
+
+def get_cover_cache_stats() -> Dict[str, Any]:
+    """إحصائيات ذاكرة صور الغلاف المجهزة"""
+    return _cover_cache.stats()
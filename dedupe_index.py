@@ -0,0 +1,135 @@
+"""
+وحدة فهرس الملفات المكررة في قناة المصدر
+يربط file_unique_id للملف الأصلي وبصمة محتوى الملف الناتج بمعرف الملف المنشور (file_id)
+في القناة الهدف، فإعادة نشر نفس الصوت في قناة المصدر لا تُنزل ولا تُعالج من جديد: إما تُتخطى
+أو يُعاد إرسالها بالمعرف المحفوظ. الفهرس محفوظ في SQLite ومحدود بمدة احتفاظ قابلة للضبط.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from config import Config
+
+logger = logging.getLogger('dedupe_index')
+
+# عدد الإضافات بين كل عمليتي حذف للسطور المنتهية
+PRUNE_EVERY = 100
+
+
+class DedupeIndex:
+    """
+    فهرس دائم للملفات المنشورة من قناة المصدر
+
+    Args:
+        db_path: مسار ملف SQLite
+        retention: مدة الاحتفاظ بالسطر بالثواني (الأقدم لا يُعتبر مكرراً ويُحذف)
+    """
+
+    def __init__(self, db_path: str, retention: int):
+        self.db_path = db_path
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._conn = None
+        self._puts = 0
+        self._stats = {'unique_hits': 0, 'output_hits': 0, 'misses': 0}
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS channel_media ("
+                "file_unique_id TEXT PRIMARY KEY, output_hash TEXT, file_id TEXT NOT NULL, "
+                "source_chat TEXT, source_message_id INTEGER, target_message_id INTEGER, seen_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS channel_media_output ON channel_media (output_hash)")
+        return self._conn
+
+    def _lookup(self, where: str, params: tuple) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            conn = self._connection()
+            conn.row_factory = sqlite3.Row
+            row = conn.execute(
+                f"SELECT * FROM channel_media WHERE {where} AND seen_at > ? ORDER BY seen_at DESC LIMIT 1",
+                params + (time.time() - self.retention,)
+            ).fetchone()
+            conn.row_factory = None
+            return dict(row) if row is not None else None
+
+    def by_unique_id(self, file_unique_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """الملف المنشور لنفس الصوت الأصلي خلال مدة الاحتفاظ"""
+        found = self._lookup("file_unique_id = ?", (file_unique_id,)) if file_unique_id else None
+        with self._lock:
+            self._stats['unique_hits' if found else 'misses'] += 1
+        return found
+
+    def by_output(self, output_hash: str) -> Optional[Dict[str, Any]]:
+        """الملف المنشور بنفس محتوى الملف الناتج خلال مدة الاحتفاظ"""
+        found = self._lookup("output_hash = ?", (output_hash,))
+        if found:
+            with self._lock:
+                self._stats['output_hits'] += 1
+        return found
+
+    def put(self, file_unique_id: Optional[str], output_hash: Optional[str], file_id: str,
+            source_chat: Any, source_message_id: int, target_message_id: Optional[int]) -> None:
+        if not file_unique_id:
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO channel_media (file_unique_id, output_hash, file_id, source_chat, "
+                "source_message_id, target_message_id, seen_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (file_unique_id, output_hash, file_id, str(source_chat), source_message_id,
+                 target_message_id, time.time())
+            )
+            conn.commit()
+            self._puts += 1
+            prune = self._puts % PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+
+    def forget(self, file_unique_id: str) -> None:
+        """حذف سطر لم يعد معرف ملفه صالحاً لدى تيليجرام"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM channel_media WHERE file_unique_id = ?", (file_unique_id,))
+            conn.commit()
+
+    def prune(self) -> int:
+        """حذف السطور الأقدم من مدة الاحتفاظ"""
+        with self._lock:
+            conn = self._connection()
+            deleted = conn.execute("DELETE FROM channel_media WHERE seen_at <= ?",
+                                   (time.time() - self.retention,)).rowcount
+            conn.commit()
+        if deleted:
+            logger.info(f"تم حذف {deleted} سطراً منتهي الاحتفاظ من فهرس المكررات")
+        return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._connection().execute("SELECT COUNT(*) FROM channel_media").fetchone()[0]
+            stats = dict(self._stats)
+        stats['entries'] = entries
+        return stats
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_dedupe_index() -> DedupeIndex:
+    """فهرس المكررات المشترك حسب إعدادات Config"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = DedupeIndex(Config.DEDUPE_DB_PATH, Config.DEDUPE_RETENTION)
+        return _index
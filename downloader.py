@@ -0,0 +1,228 @@
+"""
+وحدة تنزيل الملفات من خوادم تيليجرام مباشرة إلى القرص
+تقرأ الملف على أجزاء بحجم ثابت وتكتبها فوراً، فلا يتجاوز استهلاك الذاكرة حجم جزء واحد
+مهما كان حجم الملف، وتحسب بصمة SHA-256 للمحتوى أثناء التنزيل.
+تستخدم جلسة HTTP واحدة بمجمع اتصالات مشترك مع عميل Bot API في telebot
+(جلسة requests مع TeleBot، وجلسة aiohttp مع AsyncTeleBot).
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from telebot import apihelper
+
+from audio_format import SNIFF_BYTES, sniff_bytes, extension_for_type
+
+logger = logging.getLogger('downloader')
+
+# حجم الجزء المقروء من الشبكة والمكتوب إلى القرص في كل مرة
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+
+# عدد الاتصالات المحتفظ بها في مجمع الجلسة المشتركة
+HTTP_POOL_SIZE = 16
+
+_session_lock = threading.Lock()
+
+# إحصائيات التنزيلات منذ بدء التشغيل
+_download_stats = {'downloads': 0, 'failures': 0, 'bytes': 0, 'seconds': 0.0}
+_stats_lock = threading.Lock()
+
+
+class DownloadResult(NamedTuple):
+    """نتيجة تنزيل ملف إلى القرص"""
+    path: str
+    size: int
+    sha256: str
+    seconds: float
+    file_type: Optional[str]
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.size / self.seconds if self.seconds > 0 else 0.0
+
+
+def get_session() -> requests.Session:
+    """
+    الحصول على جلسة HTTP المشتركة مع telebot
+
+    يتم تعيين الجلسة في apihelper.session حتى تستخدم طلبات Bot API والتنزيلات
+    نفس مجمع الاتصالات (Keep-Alive) بدلاً من فتح اتصال جديد لكل طلب.
+    """
+    with _session_lock:
+        if apihelper.session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            apihelper.session = session
+        return apihelper.session
+
+
+def file_url(token: str, remote_path: str, helper=apihelper) -> str:
+    """رابط تنزيل الملف بنفس قواعد telebot (بما فيها خادم Bot API المحلي)"""
+    if helper.FILE_URL is None:
+        return f"https://api.telegram.org/file/bot{token}/{remote_path}"
+    return helper.FILE_URL.format(token, remote_path)
+
+
+class _ChunkWriter:
+    """كتابة الأجزاء إلى الملف مع تحديث البصمة والاحتفاظ ببداية الملف لتحديد نوعه"""
+
+    def __init__(self, out):
+        self.out = out
+        self.hasher = hashlib.sha256()
+        self.head = b''
+        self.size = 0
+
+    def write(self, chunk: bytes) -> None:
+        if len(self.head) < SNIFF_BYTES:
+            self.head += chunk[:SNIFF_BYTES - len(self.head)]
+        self.hasher.update(chunk)
+        self.out.write(chunk)
+        self.size += len(chunk)
+
+
+# دالة التقدم: تُستدعى بعد كل جزء بـ (البايتات المنزلة، الحجم الكلي أو None إن لم يكن معروفاً)
+ProgressCallback = Callable[[int, Optional[int]], None]
+
+
+def _stream_requests(token: str, remote_path: str, dest_path: str, chunk_size: int,
+                     progress: Optional[ProgressCallback] = None) -> _ChunkWriter:
+    with get_session().get(file_url(token, remote_path), stream=True, proxies=apihelper.proxy,
+                           timeout=(apihelper.CONNECT_TIMEOUT, apihelper.READ_TIMEOUT)) as response:
+        if response.status_code != 200:
+            raise apihelper.ApiHTTPException('Download file', response)
+        total = int(response.headers.get('Content-Length') or 0) or None
+        with open(dest_path, 'wb') as out:
+            writer = _ChunkWriter(out)
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    writer.write(chunk)
+                    if progress is not None:
+                        progress(writer.size, total)
+    return writer
+
+
+async def _stream_aiohttp(token: str, remote_path: str, dest_path: str, chunk_size: int,
+                          progress: Optional[ProgressCallback] = None) -> _ChunkWriter:
+    """
+    التنزيل عبر جلسة aiohttp المشتركة مع AsyncTeleBot
+
+    دالة التقدم قد تستدعي Bot API عبر الجسر المتزامن، لذلك تُنفذ في خيط خارج حلقة الأحداث،
+    ولا يُجدول استدعاء جديد قبل انتهاء السابق.
+    """
+    from telebot import asyncio_helper
+
+    loop = asyncio.get_running_loop()
+    pending = None
+    session = await asyncio_helper.session_manager.get_session()
+    async with session.get(file_url(token, remote_path, asyncio_helper), proxy=asyncio_helper.proxy) as response:
+        if response.status != 200:
+            raise asyncio_helper.ApiHTTPException('Download file', response)
+        total = response.content_length
+        with open(dest_path, 'wb') as out:
+            writer = _ChunkWriter(out)
+            async for chunk in response.content.iter_chunked(chunk_size):
+                writer.write(chunk)
+                if progress is not None and (pending is None or pending.done()):
+                    pending = loop.run_in_executor(None, progress, writer.size, total)
+    if pending is not None:
+        await pending
+    return writer
+
+
+def _record(size: int, seconds: float, failed: bool = False) -> None:
+    with _stats_lock:
+        if failed:
+            _download_stats['failures'] += 1
+            return
+        _download_stats['downloads'] += 1
+        _download_stats['bytes'] += size
+        _download_stats['seconds'] += seconds
+
+
+def download_to_file(bot, remote_path: str, dest_path: str,
+                     chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+                     progress: Optional[ProgressCallback] = None) -> DownloadResult:
+    """
+    تنزيل ملف من تيليجرام وكتابته مباشرة في dest_path على أجزاء
+
+    في حال الفشل يتم حذف الملف الجزئي ثم إعادة رفع الاستثناء.
+
+    مع البوت غير المتزامن (SyncBotBridge) يتم التنزيل عبر جلسة aiohttp الخاصة بـ AsyncTeleBot.
+
+    Args:
+        bot: كائن البوت (يستخدم رمزه لبناء الرابط)
+        remote_path: مسار الملف كما يعيده get_file
+        dest_path: مسار الملف المحلي
+        chunk_size: حجم الجزء بالبايت
+        progress: دالة تقدم تُستدعى بعد كل جزء (اختياري)
+
+    Returns:
+        DownloadResult: المسار والحجم والبصمة والمدة ونوع الملف المكتشف من بدايته
+    """
+    started = time.perf_counter()
+    try:
+        if getattr(bot, 'is_async_bridge', False):
+            # البوت غير المتزامن: التنزيل على حلقة الأحداث بجلسة aiohttp المشتركة
+            writer = bot.run(_stream_aiohttp(bot.token, remote_path, dest_path, chunk_size, progress))
+        else:
+            writer = _stream_requests(bot.token, remote_path, dest_path, chunk_size, progress)
+    except Exception:
+        _record(0, 0.0, failed=True)
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        raise
+
+    seconds = time.perf_counter() - started
+    _record(writer.size, seconds)
+    result = DownloadResult(dest_path, writer.size, writer.hasher.hexdigest(), seconds, sniff_bytes(writer.head))
+    logger.info(f"تم تنزيل {writer.size} بايت في {seconds:.2f} ث "
+                f"({result.bytes_per_second / (1024 * 1024):.2f} ميجابايت/ث) إلى {dest_path}")
+    return result
+
+
+def download_to_temp(bot, remote_path: str, temp_dir: str,
+                     fallback_ext: str = '.mp3',
+                     progress: Optional[ProgressCallback] = None) -> DownloadResult:
+    """
+    تنزيل ملف إلى ملف مؤقت جديد في temp_dir بامتداد مأخوذ من محتواه
+
+    يتم التنزيل إلى ملف باسم مؤقت ثم إعادة تسميته بالامتداد المناسب للنوع المكتشف
+    من أول بايتات الملف، أو fallback_ext إذا لم يتم التعرف عليه.
+
+    Args:
+        bot: كائن البوت
+        remote_path: مسار الملف كما يعيده get_file
+        temp_dir: مجلد الملفات المؤقتة
+        fallback_ext: الامتداد المستخدم عند تعذر التعرف على النوع
+        progress: دالة تقدم تُستدعى بعد كل جزء (اختياري)
+
+    Returns:
+        DownloadResult: نتيجة التنزيل بالمسار النهائي
+    """
+    os.makedirs(temp_dir, exist_ok=True)
+    fd, part_path = tempfile.mkstemp(suffix='.part', dir=temp_dir)
+    os.close(fd)
+    result = download_to_file(bot, remote_path, part_path, progress=progress)
+
+    ext = extension_for_type(result.file_type) if result.file_type else fallback_ext
+    final_path = part_path[:-len('.part')] + ext
+    os.replace(part_path, final_path)
+    return result._replace(path=final_path)
+
+
+def get_download_stats() -> Dict[str, Any]:
+    """إحصائيات التنزيل: العدد والحجم الكلي ومتوسط السرعة"""
+    with _stats_lock:
+        stats = dict(_download_stats)
+    stats['bytes_per_second'] = stats['bytes'] / stats['seconds'] if stats['seconds'] else 0.0
+    return stats
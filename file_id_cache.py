@@ -0,0 +1,173 @@
+"""
+وحدة إعادة استخدام معرفات ملفات تيليجرام (file_id) للملفات المرسلة
+تربط بصمة محتوى الملف الناتج (مع الصورة المصغرة والعنوان والفنان) بمعرف الملف الذي
+أعاده تيليجرام عند أول رفع، فيُرسل الملف نفسه لاحقاً بالمعرف دون رفع أي بايت.
+المعرفات محفوظة في ملف SQLite محلي حتى تبقى بعد إعادة التشغيل.
+"""
+
+import io
+import os
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from config import Config
+from progress import ProgressFile
+
+logger = logging.getLogger('file_id_cache')
+
+# حجم الجزء المقروء عند حساب بصمة الملف
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(file_path: str) -> str:
+    """بصمة SHA-256 لمحتوى الملف بقراءته على أجزاء"""
+    hasher = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class FileIdCache:
+    """
+    جدول دائم من مفتاح المحتوى إلى file_id مع عدادات الإصابة
+
+    Args:
+        db_path: مسار ملف SQLite
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.bytes_saved = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS file_ids ("
+                "key TEXT PRIMARY KEY, file_id TEXT NOT NULL, size INTEGER, "
+                "created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+            )
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection().execute("SELECT file_id FROM file_ids WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, file_id: str, size: int = 0) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("INSERT OR REPLACE INTO file_ids (key, file_id, size) VALUES (?, ?, ?)",
+                         (key, file_id, size))
+            conn.commit()
+
+    def record_reuse(self, size: int) -> None:
+        """تسجيل إرسال بمعرف محفوظ وحجم الرفع الذي تم توفيره"""
+        with self._lock:
+            self.bytes_saved += size
+
+    def forget(self, key: str) -> None:
+        """حذف معرف لم يعد صالحاً لدى تيليجرام"""
+        with self._lock:
+            self.stale += 1
+            conn = self._connection()
+            conn.execute("DELETE FROM file_ids WHERE key = ?", (key,))
+            conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._connection().execute("SELECT COUNT(*) FROM file_ids").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                'entries': entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'bytes_saved': self.bytes_saved,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+_file_id_cache = FileIdCache(Config.FILE_ID_CACHE_PATH)
+
+
+def _sent_file_id(message) -> Optional[str]:
+    media = getattr(message, 'audio', None) or getattr(message, 'document', None)
+    return getattr(media, 'file_id', None)
+
+
+def send_audio_cached(bot, chat_id, audio_path: str, thumb: Optional[bytes] = None,
+                      progress: Optional[Callable[[int, Optional[int]], None]] = None, **kwargs):
+    """
+    إرسال ملف صوتي بمعرفه المحفوظ إن كان قد أُرسل من قبل، وإلا رفعه وحفظ معرفه
+
+    المفتاح يشمل بصمة الملف والصورة المصغرة والعنوان والفنان، لأن تيليجرام لا يغير
+    هذه البيانات عند الإرسال بمعرف موجود. إذا رفض تيليجرام المعرف المحفوظ يُحذف ويُرفع الملف.
+
+    Args:
+        bot: كائن البوت
+        chat_id: المحادثة أو القناة المرسل إليها
+        audio_path: مسار الملف الصوتي
+        thumb: بايتات الصورة المصغرة JPEG (اختياري)
+        progress: دالة تقدم الرفع بـ (المقروء، الحجم الكلي)، لا تُستدعى عند الإرسال بالمعرف (اختياري)
+        **kwargs: بقية معاملات send_audio (caption، performer، title...)
+
+    Returns:
+        Message: الرسالة المرسلة
+    """
+    key_parts = [file_digest(audio_path)]
+    key_parts.append(hashlib.sha256(thumb).hexdigest() if thumb else '')
+    key_parts.append(str(kwargs.get('performer') or ''))
+    key_parts.append(str(kwargs.get('title') or ''))
+    key = hashlib.sha256('\0'.join(key_parts).encode('utf-8')).hexdigest()
+    size = os.path.getsize(audio_path)
+
+    file_id = _file_id_cache.get(key)
+    if file_id:
+        try:
+            sent = bot.send_audio(chat_id, file_id, **kwargs)
+            _file_id_cache.record_reuse(size)
+            logger.info(f"تم إرسال الملف بمعرف محفوظ دون رفع ({size} بايت): {audio_path}")
+            return sent
+        except Exception as e:
+            # أخطاء تيليجرام (من TeleBot أو AsyncTeleBot) تحمل error_code، غيرها يُعاد رفعه
+            if getattr(e, 'error_code', None) is None:
+                raise
+            logger.warning(f"المعرف المحفوظ لم يعد صالحاً، سيتم رفع الملف: {e}")
+            _file_id_cache.forget(key)
+
+    with open(audio_path, 'rb') as audio_file:
+        if progress is not None:
+            audio_file = ProgressFile(audio_file, size, progress)
+        if thumb:
+            thumb_file = io.BytesIO(thumb)
+            thumb_file.name = 'thumb.jpg'
+            sent = bot.send_audio(chat_id, audio_file, thumb=thumb_file, **kwargs)
+        else:
+            sent = bot.send_audio(chat_id, audio_file, **kwargs)
+
+    new_file_id = _sent_file_id(sent)
+    if new_file_id:
+        _file_id_cache.put(key, new_file_id, size)
+    return sent
+
+
+def get_file_id_cache_stats() -> Dict[str, Any]:
+    """إحصائيات إعادة استخدام المعرفات: العدد والإصابات والبايتات التي لم تُرفع"""
+    return _file_id_cache.stats()
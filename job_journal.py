@@ -0,0 +1,185 @@
+"""
+وحدة سجل مهام قناة المصدر (journal) الدائم
+كل انتقال لمنشور بين مراحل الخط (استلام، تنزيل، وسوم، نشر، فشل، تخطي مكرر) يُسجل سطراً في
+جدول SQLite بوضع WAL قبل الانتقال للمرحلة التالية. عند إعادة التشغيل تُستأنف المنشورات التي
+لم تصل إلى النشر أو الفشل من آخر مرحلة مسجلة، والمنشور المسجل مسبقاً (تحديث أعاد تيليجرام
+إرساله) لا يُعالج مرة ثانية، فلا يُنشر الملف نفسه مرتين.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from config import Config
+
+logger = logging.getLogger('job_journal')
+
+RECEIVED = 'received'
+DOWNLOADED = 'downloaded'
+TAGGED = 'tagged'
+PUBLISHED = 'published'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+
+# الحالات التي تنتهي عندها المهمة ولا تُستأنف
+FINAL_STATES = (PUBLISHED, FAILED, SKIPPED)
+
+# آخر سطر لكل مهمة حسب وقت تسجيله (السطر المحدَّث بعد الاستئناف يحتفظ بمعرفه القديم)
+_LATEST_ROWS = (
+    "(SELECT * FROM (SELECT *, ROW_NUMBER() OVER (PARTITION BY chat_id, message_id "
+    "ORDER BY recorded_at DESC, id DESC) AS position FROM journal) WHERE position = 1)"
+)
+
+
+class JobJournal:
+    """
+    سجل حالات مهام القناة: سطر لكل حالة في كل مهمة، والحالة المكررة تحدث سطرها
+
+    كل مهمة معرفها (chat_id, message_id)، وحالتها الحالية هي آخر سطر مسجل لها.
+    سطر الاستلام يحمل بيانات المنشور اللازمة لاستئنافه دون رسالة تيليجرام.
+
+    Args:
+        db_path: مسار ملف SQLite
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS journal ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, chat_id TEXT NOT NULL, message_id INTEGER NOT NULL, "
+                "state TEXT NOT NULL, detail TEXT, recorded_at REAL NOT NULL)"
+            )
+            # سطر واحد لكل حالة في كل مهمة (إعادة المحاولة بعد الاستئناف تحدث السطر ولا تكرره)
+            self._conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS journal_job_state ON journal (chat_id, message_id, state)"
+            )
+        return self._conn
+
+    def _insert(self, chat_id: Any, message_id: int, state: str, detail: Optional[Dict[str, Any]],
+                replace: bool = False) -> bool:
+        # الحالة المكررة (تنزيل أو وسوم من جديد بعد الاستئناف) تحدث بياناتها، أما الاستلام فلا
+        conflict = ("DO UPDATE SET detail = excluded.detail, recorded_at = excluded.recorded_at"
+                    if replace else "DO NOTHING")
+        with self._lock:
+            conn = self._connection()
+            inserted = conn.execute(
+                "INSERT INTO journal (chat_id, message_id, state, detail, recorded_at) VALUES (?, ?, ?, ?, ?) "
+                f"ON CONFLICT (chat_id, message_id, state) {conflict}",
+                (str(chat_id), message_id, state, json.dumps(detail or {}, ensure_ascii=False), time.time())
+            ).rowcount
+            conn.commit()
+            return inserted > 0
+
+    def begin(self, chat_id: Any, message_id: int, detail: Dict[str, Any]) -> bool:
+        """
+        تسجيل استلام منشور
+
+        Returns:
+            bool: False إذا كان المنشور مسجلاً من قبل (لا يُعالج مرة أخرى)
+        """
+        return self._insert(chat_id, message_id, RECEIVED, detail)
+
+    def received(self, chat_id: Any, message_id: int) -> Optional[Dict[str, Any]]:
+        """بيانات استلام المنشور، أو None إن لم يكن مسجلاً"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT detail FROM journal WHERE chat_id = ? AND message_id = ? AND state = ?",
+                (str(chat_id), message_id, RECEIVED)
+            ).fetchone()
+        return json.loads(row[0] or '{}') if row is not None else None
+
+    def reopen(self, chat_id: Any, message_id: int, detail: Dict[str, Any]) -> bool:
+        """
+        بدء مهمة جديدة لمنشور منتهٍ (منشور معدل تغير ملفه) بدلاً من سطوره السابقة
+
+        Returns:
+            bool: False إذا كانت مهمة المنشور ما زالت قيد المعالجة
+        """
+        placeholders = ', '.join('?' for _ in FINAL_STATES)
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                unfinished = conn.execute(
+                    f"SELECT state FROM {_LATEST_ROWS} WHERE chat_id = ? AND message_id = ? "
+                    f"AND state NOT IN ({placeholders})",
+                    (str(chat_id), message_id) + FINAL_STATES
+                ).fetchone()
+                if unfinished is not None:
+                    return False
+                conn.execute("DELETE FROM journal WHERE chat_id = ? AND message_id = ?", (str(chat_id), message_id))
+                conn.execute(
+                    "INSERT INTO journal (chat_id, message_id, state, detail, recorded_at) VALUES (?, ?, ?, ?, ?)",
+                    (str(chat_id), message_id, RECEIVED, json.dumps(detail, ensure_ascii=False), time.time())
+                )
+            return True
+
+    def record(self, chat_id: Any, message_id: int, state: str, **detail: Any) -> None:
+        """تسجيل انتقال المهمة إلى حالة جديدة"""
+        try:
+            self._insert(chat_id, message_id, state, detail, replace=True)
+        except sqlite3.Error as e:
+            logger.error(f"خطأ في تسجيل حالة {state} للمنشور {message_id}: {e}")
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        """المهام التي لم تصل إلى حالة نهائية، بترتيب message_id، مع بيانات الاستلام وآخر حالة"""
+        placeholders = ', '.join('?' for _ in FINAL_STATES)
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT last.chat_id, last.message_id, last.state, last.detail, received.detail "
+                f"FROM {_LATEST_ROWS} AS last "
+                "JOIN journal AS received ON received.chat_id = last.chat_id "
+                "AND received.message_id = last.message_id AND received.state = ? "
+                f"WHERE last.state NOT IN ({placeholders}) ORDER BY last.message_id",
+                (RECEIVED,) + FINAL_STATES
+            ).fetchall()
+        return [{'chat_id': chat_id, 'message_id': message_id, 'state': state,
+                 'detail': json.loads(detail or '{}'), 'received': json.loads(received or '{}')}
+                for chat_id, message_id, state, detail, received in rows]
+
+    def prune(self, max_age: float) -> int:
+        """حذف سطور المهام المنتهية الأقدم من max_age ثانية"""
+        placeholders = ', '.join('?' for _ in FINAL_STATES)
+        with self._lock:
+            conn = self._connection()
+            deleted = conn.execute(
+                "DELETE FROM journal WHERE (chat_id, message_id) IN ("
+                f"SELECT chat_id, message_id FROM journal WHERE state IN ({placeholders}) AND recorded_at < ?)",
+                FINAL_STATES + (time.time() - max_age,)
+            ).rowcount
+            conn.commit()
+        return deleted
+
+    def stats(self) -> Dict[str, int]:
+        """عدد المهام حسب حالتها الحالية"""
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT state, COUNT(*) FROM {_LATEST_ROWS} GROUP BY state"
+            ).fetchall()
+        return dict(rows)
+
+
+_journal = None
+_journal_lock = threading.Lock()
+
+
+def get_job_journal() -> JobJournal:
+    """سجل مهام القناة المشترك حسب إعدادات Config"""
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = JobJournal(Config.JOB_JOURNAL_PATH)
+        return _journal
@@ -0,0 +1,176 @@
+"""
+وحدة طابور المعالجة ومجموعة العمال
+المعالجات في telebot تضيف المهمة إلى طابور محدود الحجم وتعود فوراً، ويتولى عدد ثابت
+من العمال تنفيذ التنزيل والقراءة والكتابة والرفع بعيداً عن خيوط معالجة التحديثات.
+عند امتلاء الطابور يتم رفض المهمة (ضغط عكسي) بدلاً من تراكمها في الذاكرة.
+"""
+
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+from config import Config
+
+logger = logging.getLogger('job_queue')
+
+# عدد أزمنة الانتظار المحتفظ بها لحساب المتوسط والنسب المئوية
+WAIT_SAMPLES = 1000
+
+
+class QueueFullError(Exception):
+    """يُرفع عند محاولة إضافة مهمة إلى طابور ممتلئ"""
+
+
+class Job:
+    """مهمة في الطابور مع موقعها عند الإضافة ونتيجتها بعد التنفيذ"""
+
+    __slots__ = ('func', 'args', 'kwargs', 'name', 'position', 'enqueued_at',
+                 'started_at', 'result', 'error', '_done')
+
+    def __init__(self, func: Callable, args: tuple, kwargs: dict, name: Optional[str] = None):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.name = name or getattr(func, '__name__', 'job')
+        self.position = 0
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+        self.result = None
+        self.error = None
+        self._done = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """انتظار انتهاء المهمة، يعيد False عند انتهاء المهلة"""
+        return self._done.wait(timeout)
+
+
+class JobQueue:
+    """
+    طابور مهام محدود الحجم مع مجموعة عمال ثابتة
+
+    Args:
+        workers: عدد خيوط العمال
+        max_size: الحد الأقصى لعدد المهام المنتظرة (غير المبدوءة)
+        name: اسم الطابور (يستخدم في أسماء الخيوط والسجلات)
+    """
+
+    def __init__(self, workers: int, max_size: int, name: str = 'processing'):
+        self.workers = max(1, workers)
+        self.max_size = max(1, max_size)
+        self.name = name
+        self._queue = queue.Queue(maxsize=self.max_size)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pending = 0
+        self._busy = 0
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self._stats = {'submitted': 0, 'processed': 0, 'failed': 0, 'rejected': 0, 'max_depth': 0}
+
+    def _start_workers(self) -> None:
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"{self.name}-worker-{index + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"تم تشغيل {self.workers} عامل لطابور {self.name} (الحد الأقصى {self.max_size} مهمة)")
+
+    def submit(self, func: Callable, *args: Any, job_name: Optional[str] = None,
+               block: bool = False, **kwargs: Any) -> Job:
+        """
+        إضافة مهمة إلى الطابور دون انتظار
+
+        مع block=True ينتظر المستدعي حتى يتوفر مكان في الطابور بدلاً من رفض المهمة
+        (للمراحل المتتالية التي تمرر عملها إلى طابور آخر).
+
+        Returns:
+            Job: المهمة، وموقعها position يساوي 0 إذا كان هناك عامل متاح وإلا ترتيبها في الانتظار
+
+        Raises:
+            QueueFullError: إذا كان الطابور ممتلئاً
+        """
+        job = Job(func, args, kwargs, job_name)
+        with self._lock:
+            if not self._threads:
+                self._start_workers()
+            self._pending += 1
+            # المهام المنتظرة أمام هذه المهمة بعد أن يأخذ كل عامل متاح مهمة
+            job.position = max(0, self._pending + self._busy - self.workers)
+        try:
+            # خارج القفل حتى لا يمنع الانتظار العمال من أخذ المهام
+            self._queue.put(job, block=block)
+        except queue.Full:
+            with self._lock:
+                self._pending -= 1
+                self._stats['rejected'] += 1
+            raise QueueFullError(f"طابور {self.name} ممتلئ ({self.max_size} مهمة)")
+        with self._lock:
+            self._stats['submitted'] += 1
+            self._stats['max_depth'] = max(self._stats['max_depth'], self._pending)
+        return job
+
+    def _worker(self) -> None:
+        while True:
+            job = self._queue.get()
+            job.started_at = time.monotonic()
+            with self._lock:
+                self._pending -= 1
+                self._busy += 1
+                self._waits.append(job.started_at - job.enqueued_at)
+            try:
+                job.result = job.func(*job.args, **job.kwargs)
+                failed = False
+            except Exception as e:
+                job.error = e
+                failed = True
+                logger.error(f"خطأ في تنفيذ المهمة {job.name}: {e}")
+            finally:
+                with self._lock:
+                    self._busy -= 1
+                    self._stats['failed' if failed else 'processed'] += 1
+                job._done.set()
+                self._queue.task_done()
+
+    @property
+    def depth(self) -> int:
+        """عدد المهام المنتظرة التي لم يبدأ تنفيذها"""
+        return self._pending
+
+    def stats(self) -> Dict[str, Any]:
+        """إحصائيات الطابور: العمق والعمال المشغولون وأزمنة الانتظار"""
+        with self._lock:
+            waits = sorted(self._waits)
+            stats = dict(self._stats)
+            stats.update({
+                'depth': self._pending,
+                'busy': self._busy,
+                'workers': self.workers,
+                'max_size': self.max_size,
+            })
+        stats['avg_wait'] = sum(waits) / len(waits) if waits else 0.0
+        stats['p95_wait'] = waits[int(len(waits) * 0.95)] if waits else 0.0
+        stats['max_wait'] = waits[-1] if waits else 0.0
+        return stats
+
+
+_processing_queue = None
+_processing_queue_lock = threading.Lock()
+
+
+def get_processing_queue() -> JobQueue:
+    """طابور معالجة الملفات الصوتية المشترك (يُنشأ عند أول استخدام)"""
+    global _processing_queue
+    with _processing_queue_lock:
+        if _processing_queue is None:
+            _processing_queue = JobQueue(Config.PROCESSING_WORKERS, Config.PROCESSING_QUEUE_SIZE)
+        return _processing_queue
+
+
+def get_queue_stats() -> Dict[str, Any]:
+    """إحصائيات طابور المعالجة المشترك"""
+    return get_processing_queue().stats()
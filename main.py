@@ -46,12 +46,15 @@ bot_thread = None
 
 def run_bot():
     try:
-        from bot import start_bot
+        from bot import start_bot, start_bot_async
         global bot_is_running
         bot_is_running = True
         logger = logging.getLogger('main')
         logger.info("بدء تشغيل البوت في خيط منفصل")
-        start_bot()
+        if Config.ASYNC_BOT:
+            start_bot_async()
+        else:
+            start_bot()
     except Exception as e:
         bot_is_running = False
         log_error(e, "تشغيل البوت في خيط منفصل")
@@ -60,9 +63,25 @@ def run_bot():
 logger = init_all_loggers()
 setup_exception_handler()
 
+# وضع Webhook: gunicorn يستورد main:app فيتم تسجيل مسار التحديثات عند الاستيراد
+if Config.WEBHOOK_MODE and __name__ == 'main':
+    try:
+        from bot import start_bot_webhook
+        start_bot_webhook(app)
+    except Exception as e:
+        log_error(e, "تفعيل Webhook")
+
 if __name__ == '__main__':
     try:
-        from bot import start_bot
-        start_bot()
+        if Config.WEBHOOK_MODE:
+            # نفس وحدة main التي تستوردها بقية الوحدات، حتى يكون للبوت تطبيق واحد
+            from main import app as webhook_app
+            webhook_app.run(host='0.0.0.0', port=Config.PORT)
+        else:
+            from bot import start_bot, start_bot_async
+            if Config.ASYNC_BOT:
+                start_bot_async()
+            else:
+                start_bot()
     except Exception as e:
         log_error(e, "تشغيل البوت المباشر")
\ No newline at end of file
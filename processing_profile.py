@@ -0,0 +1,198 @@
+"""
+وحدة ملف المعالجة التلقائية المجمّع لقناة المصدر
+قالب الوسوم (DEFAULT_*) وإعدادات المشرف (الوسوم المفعلة، استبدالات الوسوم، القوالب الذكية
+حسب الفنان) تُجمع مرة واحدة في ملف ثابت لا يتغير: الاستبدالات في تعبير منتظم واحد، والقوالب
+الذكية في فهرس من اسم الفنان الموحّد إلى وسوم القالب. كل منشور يقرأ الملف الحالي فقط، ويُعاد
+بناؤه عند تغيير أحد هذه الإعدادات من لوحة المشرف.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+import unicodedata
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Mapping, NamedTuple, Optional, Pattern
+
+import admin_panel
+from template_handler import get_template
+
+logger = logging.getLogger('processing_profile')
+
+# حقول قالب الوسوم ومتغيرات البيئة الخاصة بها
+TEMPLATE_FIELDS = {
+    'title': 'DEFAULT_TITLE',
+    'artist': 'DEFAULT_ARTIST',
+    'album': 'DEFAULT_ALBUM',
+    'album_artist': 'DEFAULT_ALBUM_ARTIST',
+    'year': 'DEFAULT_YEAR',
+    'genre': 'DEFAULT_GENRE',
+    'composer': 'DEFAULT_COMPOSER',
+    'comment': 'DEFAULT_COMMENT',
+    'track': 'DEFAULT_TRACK',
+    'lyrics': 'DEFAULT_LYRICS',
+}
+
+# الوسوم المفعلة للاستبدال إذا لم يغيرها المشرف (كما في لوحة الوسوم المفعلة)
+DEFAULT_ENABLED_TAGS = ('artist', 'album_artist', 'album', 'genre', 'year', 'composer', 'comment', 'title', 'lyrics')
+
+# إعدادات المشرف التي يُبنى منها الملف، وتغيير أي منها يعيد بناءه
+PROFILE_SETTINGS = (
+    'auto_processing.tag_replacements',
+    'auto_processing.replacements_enabled',
+    'auto_processing.enabled_tags',
+    'auto_processing.smart_templates',
+    'auto_processing.smart_templates_enabled',
+)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_artist(name: str) -> str:
+    """توحيد اسم الفنان للمقارنة: NFKC وحالة الأحرف والمسافات"""
+    return _WHITESPACE_RE.sub(' ', unicodedata.normalize('NFKC', name)).strip().casefold()
+
+
+def _template_values(template: Dict[str, Any]) -> Dict[str, str]:
+    """وسوم القالب النصية غير الفارغة (القوالب القديمة تخزنها في مفتاح 'tags')"""
+    tags = template.get('tags', template)
+    return {tag: value for tag, value in tags.items()
+            if tag != 'album_art' and isinstance(value, str) and value}
+
+
+class ProcessingProfile(NamedTuple):
+    """ملف المعالجة المجمّع، ثابت بعد بنائه"""
+
+    version: int
+    template: Mapping[str, str]
+    enabled_tags: FrozenSet[str]
+    smart_templates: Mapping[str, Mapping[str, str]]
+    replacements: Mapping[str, str]
+    pattern: Optional[Pattern]
+
+    def replace(self, text: str) -> str:
+        """تطبيق كل الاستبدالات على النص في مرور واحد"""
+        if self.pattern is None or not text:
+            return text
+        return self.pattern.sub(lambda match: self.replacements[match.group(0)], text)
+
+    def tags_for(self, current_tags: Dict[str, Any]) -> Dict[str, str]:
+        """
+        الوسوم المطلوب كتابتها في ملف حسب وسومه الحالية
+
+        القالب أولاً، ثم القالب الذكي لفنان الملف، ثم الاستبدالات على الوسوم المفعلة.
+
+        Args:
+            current_tags: وسوم الملف الحالية
+
+        Returns:
+            Dict[str, str]: الوسوم الجديدة (غير الفارغة فقط)
+        """
+        changes = dict(self.template)
+        artist = current_tags.get('artist')
+        if self.smart_templates and isinstance(artist, str) and artist:
+            smart = self.smart_templates.get(normalize_artist(artist))
+            if smart:
+                changes.update(smart)
+        if self.pattern is not None:
+            for tag in self.enabled_tags:
+                value = changes.get(tag) or current_tags.get(tag)
+                if isinstance(value, str) and value:
+                    replaced = self.replace(value)
+                    if replaced != value:
+                        changes[tag] = replaced
+        return changes
+
+
+def build_profile(version: int = 0) -> ProcessingProfile:
+    """بناء الملف من متغيرات البيئة وإعدادات المشرف الحالية"""
+    template = {tag: os.getenv(env, '') for tag, env in TEMPLATE_FIELDS.items()}
+    template = {tag: value for tag, value in template.items() if value}
+
+    enabled = admin_panel.get_setting('auto_processing.enabled_tags', None)
+    if isinstance(enabled, dict):
+        enabled_tags = frozenset(tag for tag, on in enabled.items() if on)
+    else:
+        enabled_tags = frozenset(DEFAULT_ENABLED_TAGS)
+
+    replacements = {}
+    pattern = None
+    if admin_panel.get_setting('auto_processing.replacements_enabled', True):
+        replacements = {str(old): str(new) for old, new in
+                        (admin_panel.get_setting('auto_processing.tag_replacements', {}) or {}).items() if old}
+        if replacements:
+            # الأطول أولاً حتى لا يسبق استبدال قصير استبدالاً يحتويه
+            pattern = re.compile('|'.join(re.escape(old) for old in sorted(replacements, key=len, reverse=True)))
+
+    smart_templates = {}
+    if admin_panel.get_setting('auto_processing.smart_templates_enabled', True):
+        for artist, template_id in (admin_panel.get_setting('auto_processing.smart_templates', {}) or {}).items():
+            values = _template_values(get_template(template_id) or {})
+            if not values:
+                logger.warning(f"القالب {template_id} للفنان {artist} غير موجود أو فارغ، تم تجاهله")
+                continue
+            smart_templates[normalize_artist(artist)] = MappingProxyType(values)
+
+    return ProcessingProfile(
+        version=version,
+        template=MappingProxyType(template),
+        enabled_tags=enabled_tags,
+        smart_templates=MappingProxyType(smart_templates),
+        replacements=MappingProxyType(replacements),
+        pattern=pattern,
+    )
+
+
+_profile: Optional[ProcessingProfile] = None
+_profile_lock = threading.Lock()
+_profile_stats = {'builds': 0, 'invalidations': 0, 'build_seconds': 0.0}
+
+
+def get_processing_profile() -> ProcessingProfile:
+    """الملف الحالي، ويُبنى عند أول استخدام بعد تغيير الإعدادات"""
+    profile = _profile
+    if profile is not None:
+        return profile
+    return _rebuild()
+
+
+def _rebuild() -> ProcessingProfile:
+    global _profile
+    with _profile_lock:
+        if _profile is None:
+            started = time.perf_counter()
+            _profile = build_profile(_profile_stats['builds'] + 1)
+            _profile_stats['builds'] += 1
+            _profile_stats['build_seconds'] = time.perf_counter() - started
+            logger.info(f"تم بناء ملف المعالجة الإصدار {_profile.version}: "
+                        f"{len(_profile.smart_templates)} قالباً ذكياً، {len(_profile.replacements)} استبدالاً")
+        return _profile
+
+
+def invalidate_processing_profile(setting_path: Optional[str] = None) -> None:
+    """
+    إعادة بناء الملف عند الاستخدام التالي إذا كان الإعداد المتغير من إعداداته
+
+    Args:
+        setting_path: مسار الإعداد المتغير (None عند تغيير كل الإعدادات، كالتحميل أو الاستيراد)
+    """
+    global _profile
+    if setting_path is not None and not any(
+            setting_path == key or setting_path.startswith(key + '.') or key.startswith(setting_path + '.')
+            for key in PROFILE_SETTINGS):
+        return
+    with _profile_lock:
+        if _profile is not None:
+            _profile = None
+            _profile_stats['invalidations'] += 1
+
+
+def get_processing_profile_stats() -> Dict[str, Any]:
+    """إحصائيات ملف المعالجة: إصداره وعدد القوالب الذكية والاستبدالات ومرات البناء"""
+    profile = get_processing_profile()
+    with _profile_lock:
+        stats = dict(_profile_stats)
+    stats.update(version=profile.version, smart_templates=len(profile.smart_templates),
+                 replacements=len(profile.replacements), enabled_tags=len(profile.enabled_tags))
+    return stats
@@ -0,0 +1,197 @@
+"""
+وحدة رسالة التقدم الواحدة لكل مهمة
+بدلاً من إرسال رسالة جديدة عند كل مرحلة (التنزيل، الحفظ، الرفع، الانتهاء) تُنشأ رسالة حالة
+واحدة وتُعدل في مكانها بـ edit_message_text. تحديثات النسبة المئوية محدودة بفاصل زمني
+أدنى بين تعديلين، أما تغيير المرحلة والنتيجة النهائية فتُطبق فوراً.
+"""
+
+import io
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from config import Config
+
+logger = logging.getLogger('progress')
+
+# طول شريط التقدم بالأحرف
+BAR_LENGTH = 10
+
+_progress_stats = {'messages': 0, 'edits': 0, 'throttled': 0, 'failed_edits': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        _progress_stats[key] += 1
+
+
+def _is_not_modified(error: Exception) -> bool:
+    return 'message is not modified' in str(error)
+
+
+def progress_bar(percent: int) -> str:
+    filled = max(0, min(BAR_LENGTH, round(percent * BAR_LENGTH / 100)))
+    return '▰' * filled + '▱' * (BAR_LENGTH - filled)
+
+
+class ProgressReporter:
+    """
+    رسالة حالة واحدة لمهمة تُعدل مع تقدمها
+
+    تُرسل الرسالة عند أول تحديث فقط، فالمهمة التي تنتهي برسالة خطأ مبكرة لا تترك رسالة حالة فارغة.
+
+    Args:
+        bot: كائن البوت
+        chat_id: المحادثة التي تظهر فيها الرسالة
+        min_interval: أقل فاصل بين تعديلين للنسبة المئوية (بالثواني)
+    """
+
+    def __init__(self, bot, chat_id, min_interval: Optional[float] = None):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.min_interval = Config.PROGRESS_EDIT_INTERVAL if min_interval is None else min_interval
+        self.message_id = None
+        self.stage_text = ''
+        self.percent = None
+        self.notes: List[str] = []
+        self.finished = False
+        self._last_edit = 0.0
+        self._rendered = None
+        self._lock = threading.Lock()
+
+    def stage(self, text: str, percent: Optional[int] = None) -> None:
+        """بدء مرحلة جديدة (يُعرض فوراً)"""
+        with self._lock:
+            self.stage_text = text
+            self.percent = percent
+            self._render(force=True)
+
+    def waiting(self, text: str) -> None:
+        """عرض حالة الانتظار في الطابور، ما لم تكن المهمة قد بدأت بالفعل"""
+        with self._lock:
+            if not self.stage_text:
+                self.stage_text = text
+                self._render(force=True)
+
+    def update(self, percent: float) -> None:
+        """تحديث النسبة المئوية للمرحلة الحالية (يُعرض إذا مضى الفاصل الأدنى منذ آخر تعديل)"""
+        with self._lock:
+            percent = max(0, min(100, int(percent)))
+            if percent == self.percent:
+                return
+            self.percent = percent
+            self._render(force=False)
+
+    def callback(self, done: int, total: Optional[int]) -> None:
+        """دالة تقدم بالبايتات للتنزيل والرفع (total قد يكون غير معروف)"""
+        if total:
+            self.update(done * 100 / total)
+
+    def note(self, text: str) -> None:
+        """إضافة سطر ملاحظة أو تحذير تحت المرحلة الحالية"""
+        with self._lock:
+            self.notes.append(text)
+            self._render(force=True)
+
+    def done(self, text: str) -> None:
+        """النتيجة النهائية للمهمة"""
+        with self._lock:
+            self.stage_text = text
+            self.percent = None
+            self.finished = True
+            self._render(force=True)
+
+    fail = done
+
+    def _text(self) -> str:
+        text = self.stage_text
+        if self.percent is not None:
+            text += f"\n{progress_bar(self.percent)} {self.percent}%"
+        if self.notes:
+            text += "\n\n" + "\n".join(self.notes)
+        return text
+
+    def _render(self, force: bool) -> None:
+        text = self._text()
+        if text == self._rendered:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_edit < self.min_interval:
+            _count('throttled')
+            return
+
+        if self.message_id is None:
+            try:
+                sent = self.bot.send_message(self.chat_id, text)
+                self.message_id = sent.message_id
+                _count('messages')
+            except Exception as e:
+                logger.error(f"خطأ في إرسال رسالة التقدم: {e}")
+                return
+        else:
+            try:
+                self.bot.edit_message_text(text, self.chat_id, self.message_id)
+                _count('edits')
+            except Exception as e:
+                if not _is_not_modified(e):
+                    _count('failed_edits')
+                    logger.warning(f"تعذر تعديل رسالة التقدم {self.message_id}: {e}")
+                    # الرسالة حُذفت غالباً: النتيجة النهائية تُرسل في رسالة جديدة
+                    if self.finished:
+                        self.message_id = None
+                        self._render(force=True)
+                    return
+        self._rendered = text
+        self._last_edit = now
+
+
+class ProgressFile(io.RawIOBase):
+    """
+    ملف مفتوح للقراءة يبلغ عن عدد البايتات المقروءة، لحساب نسبة الرفع
+
+    مكتبة requests تقرأ الملف دفعة واحدة قبل إرساله، فتقفز النسبة إلى 100% عند بدء الرفع؛
+    أما aiohttp (مع AsyncTeleBot) فتقرؤه على أجزاء أثناء الإرسال.
+
+    Args:
+        file: الملف المفتوح (لا يُغلق عند إغلاق هذا الكائن)
+        total: حجم الملف بالبايت
+        callback: دالة تُستدعى بـ (المقروء، الحجم الكلي)
+    """
+
+    def __init__(self, file, total: int, callback: Callable[[int, Optional[int]], None]):
+        super().__init__()
+        self._file = file
+        self.total = total
+        self.done = 0
+        self.callback = callback
+
+    @property
+    def name(self) -> str:
+        return getattr(self._file, 'name', 'audio')
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._file.read(size)
+        self.done += len(chunk)
+        self.callback(self.done, self.total)
+        return chunk
+
+    def seekable(self) -> bool:
+        return self._file.seekable()
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        self.done = self._file.seek(offset, whence)
+        return self.done
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+
+def get_progress_stats() -> Dict[str, Any]:
+    """إحصائيات رسائل التقدم: الرسائل المرسلة والتعديلات والتحديثات المؤجلة"""
+    with _stats_lock:
+        return dict(_progress_stats)
@@ -0,0 +1,334 @@
+"""
+وحدة تحديد معدل طلبات Bot API
+كل طلب إرسال أو تعديل يمر بدلوين من الرموز (token bucket): دلو عام لحد تيليجرام الكلي
+(حوالي 30 رسالة في الثانية) ودلو لكل محادثة (رسالة في الثانية للمحادثات الخاصة و20 في
+الدقيقة للمجموعات والقنوات). عند رد 429 يُقرأ retry_after وتُوقف المحادثة تلك المدة ثم يُعاد
+الطلب مع تأخير عشوائي صغير. الرسائل التفاعلية لها الأولوية: الإرسال الجماعي (البث ونشر
+القنوات) يترك جزءاً من الدلو العام لها وينتظر ما دامت هناك رسالة تفاعلية تنتظر.
+"""
+
+import re
+import time
+import random
+import inspect
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from config import Config
+
+logger = logging.getLogger('rate_limiter')
+
+INTERACTIVE = 'interactive'
+BULK = 'bulk'
+
+# دوال Bot API التي تُحسب ضمن حدود الإرسال
+LIMITED_PREFIXES = ('send_', 'edit_message_', 'forward_message', 'copy_message', 'reply_to')
+
+# الرصيد الأقصى لدلو المحادثة (عدد الرسائل المسموح بها دفعة واحدة)
+CHAT_BURST = 3
+
+# نسبة الدلو العام المحجوزة للرسائل التفاعلية
+BULK_RESERVE = 0.2
+
+# عدد دلاء المحادثات الذي يبدأ بعده حذف الدلاء الممتلئة (الخاملة)
+MAX_CHAT_BUCKETS = 10000
+
+# أقصى تأخير عشوائي يضاف إلى retry_after (بالثواني)
+RETRY_JITTER = 1.0
+
+_RETRY_AFTER_RE = re.compile(r'retry after (\d+)', re.IGNORECASE)
+
+
+class TokenBucket:
+    """
+    دلو رموز: يمتلئ بمعدل ثابت حتى سعته، وكل رسالة تأخذ رمزاً واحداً
+
+    Args:
+        rate: عدد الرموز المضافة في الثانية
+        capacity: السعة القصوى للدلو
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, now: float, reserve: float = 0.0) -> float:
+        """الثواني المتبقية حتى يتوفر رمز مع إبقاء reserve في الدلو"""
+        self._refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        missing = reserve + 1 - self.tokens
+        if missing > 0:
+            wait = max(wait, missing / self.rate)
+        return wait
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    def block(self, now: float, seconds: float) -> None:
+        """إيقاف الدلو (بعد رد 429) مع رمز واحد فقط عند انتهاء الإيقاف"""
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.tokens = 1.0
+        self.updated = max(self.updated, self.blocked_until)
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.blocked_until
+
+
+def _is_group(chat_id: Any) -> bool:
+    """المجموعات والقنوات معرفاتها سالبة أو بصيغة @username"""
+    if isinstance(chat_id, str):
+        return not chat_id.lstrip('-').isdigit() or chat_id.startswith('-')
+    return chat_id < 0
+
+
+class RateLimiter:
+    """
+    الدلو العام ودلاء المحادثات مع أولوية الرسائل التفاعلية
+
+    Args:
+        global_rate: الرسائل في الثانية لكل البوت
+        chat_rate: الرسائل في الثانية للمحادثة الخاصة
+        group_rate: الرسائل في الدقيقة للمجموعة أو القناة
+    """
+
+    def __init__(self, global_rate: float, chat_rate: float, group_rate: float):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate / 60.0
+        self._chats: Dict[Any, TokenBucket] = {}
+        self._cond = threading.Condition()
+        self._interactive_waiting = 0
+        self._stats = {
+            INTERACTIVE: {'requests': 0, 'delayed': 0, 'wait_seconds': 0.0},
+            BULK: {'requests': 0, 'delayed': 0, 'wait_seconds': 0.0},
+            'flood_waits': 0, 'retries': 0, 'gave_up': 0,
+        }
+
+    def _chat_bucket(self, chat_id: Any, now: float) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_CHAT_BUCKETS:
+                for key in [key for key, idle in self._chats.items() if idle.is_full(now)]:
+                    del self._chats[key]
+            rate = self.group_rate if _is_group(chat_id) else self.chat_rate
+            bucket = self._chats[chat_id] = TokenBucket(rate, CHAT_BURST)
+        return bucket
+
+    def acquire(self, chat_id: Any, priority: str = INTERACTIVE) -> float:
+        """
+        انتظار رمز من الدلو العام ومن دلو المحادثة
+
+        Args:
+            chat_id: المحادثة المرسل إليها (None للطلبات غير المرتبطة بمحادثة)
+            priority: INTERACTIVE أو BULK
+
+        Returns:
+            float: مدة الانتظار بالثواني
+        """
+        started = time.monotonic()
+        bulk = priority == BULK
+        reserve = self.global_bucket.capacity * BULK_RESERVE if bulk else 0.0
+        with self._cond:
+            if not bulk:
+                self._interactive_waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self.global_bucket.delay(now, reserve)
+                    chat = self._chat_bucket(chat_id, now) if chat_id is not None else None
+                    if chat is not None:
+                        wait = max(wait, chat.delay(now))
+                    if bulk and self._interactive_waiting:
+                        # الإرسال الجماعي ينتظر حتى تأخذ الرسائل التفاعلية رموزها
+                        wait = max(wait, 1.0 / self.global_bucket.rate)
+                    if wait <= 0:
+                        self.global_bucket.take()
+                        if chat is not None:
+                            chat.take()
+                        break
+                    self._cond.wait(wait)
+            finally:
+                if not bulk:
+                    self._interactive_waiting -= 1
+                self._cond.notify_all()
+
+            waited = time.monotonic() - started
+            stats = self._stats[priority]
+            stats['requests'] += 1
+            if waited > 0.001:
+                stats['delayed'] += 1
+                stats['wait_seconds'] += waited
+        return waited
+
+    def flood_wait(self, chat_id: Any, retry_after: float) -> None:
+        """تسجيل رد 429: إيقاف دلو المحادثة (أو الدلو العام إن لم تكن هناك محادثة) مدة retry_after"""
+        with self._cond:
+            now = time.monotonic()
+            bucket = self._chat_bucket(chat_id, now) if chat_id is not None else self.global_bucket
+            # الإيقاف لا يتجاوز أقصى انتظار حتى لا تبقى المهام معلقة لمدد طويلة
+            bucket.block(now, min(retry_after, Config.RATE_LIMIT_MAX_WAIT))
+            self._stats['flood_waits'] += 1
+            self._cond.notify_all()
+
+    def count(self, key: str) -> None:
+        with self._cond:
+            self._stats[key] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = {key: dict(value) if isinstance(value, dict) else value for key, value in self._stats.items()}
+            stats['chats'] = len(self._chats)
+            return stats
+
+
+def retry_after_of(error: Exception) -> Optional[float]:
+    """مدة retry_after من خطأ 429 لـ TeleBot أو AsyncTeleBot، أو None إن لم يكن الخطأ 429"""
+    if getattr(error, 'error_code', None) != 429:
+        return None
+    result = getattr(error, 'result_json', None) or {}
+    retry_after = (result.get('parameters') or {}).get('retry_after')
+    if retry_after is None:
+        match = _RETRY_AFTER_RE.search(str(getattr(error, 'description', '') or error))
+        retry_after = int(match.group(1)) if match else 1
+    return float(retry_after)
+
+
+def _upload_positions(args, kwargs) -> list:
+    """الملفات المفتوحة بين المعاملات وموضع القراءة فيها (None إن لم يمكن إرجاعها)"""
+    positions = []
+    for value in list(args) + list(kwargs.values()):
+        if hasattr(value, 'read'):
+            seekable = getattr(value, 'seekable', None)
+            positions.append((value, value.tell() if seekable is not None and seekable() else None))
+    return positions
+
+
+class RateLimitedBot:
+    """
+    غلاف حول كائن البوت (TeleBot أو SyncBotBridge) يمرر دوال الإرسال عبر RateLimiter
+
+    بقية الدوال والمزخرفات تمر كما هي. الخاصية bulk تعيد غلافاً بنفس المحدد بأولوية BULK.
+
+    Args:
+        bot: كائن البوت
+        limiter: محدد المعدل المشترك
+        priority: أولوية الطلبات المرسلة عبر هذا الغلاف
+    """
+
+    is_rate_limited = True
+
+    def __init__(self, bot, limiter: RateLimiter, priority: str = INTERACTIVE):
+        self._bot = bot
+        self._limiter = limiter
+        self._priority = priority
+        self._wrapped: Dict[str, Callable] = {}
+
+    @property
+    def bulk(self) -> 'RateLimitedBot':
+        return RateLimitedBot(self._bot, self._limiter, BULK)
+
+    @property
+    def unwrapped(self):
+        return self._bot
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._bot, name)
+        if not name.startswith(LIMITED_PREFIXES) or not callable(attr):
+            return attr
+        call = self._wrapped.get(name)
+        if call is None:
+            call = self._wrapped[name] = self._limited(name, attr)
+        return call
+
+    def _limited(self, name: str, method: Callable) -> Callable:
+        limiter = self._limiter
+        priority = self._priority
+        try:
+            signature = inspect.signature(method)
+        except (TypeError, ValueError):
+            signature = None
+
+        def chat_of(args, kwargs):
+            if name == 'reply_to':
+                message = args[0] if args else kwargs.get('message')
+                return getattr(getattr(message, 'chat', None), 'id', None)
+            if signature is None:
+                return kwargs.get('chat_id')
+            try:
+                return signature.bind_partial(*args, **kwargs).arguments.get('chat_id')
+            except TypeError:
+                return kwargs.get('chat_id')
+
+        def call(*args, **kwargs):
+            chat_id = chat_of(args, kwargs)
+            # الطلب الأول يقرأ الملفات المرفوعة، فتُعاد إلى موضعها قبل كل إعادة محاولة
+            uploads = _upload_positions(args, kwargs)
+            retries = 0
+            while True:
+                limiter.acquire(chat_id, priority)
+                try:
+                    return method(*args, **kwargs)
+                except Exception as e:
+                    retry_after = retry_after_of(e)
+                    if retry_after is None:
+                        raise
+                    limiter.flood_wait(chat_id, retry_after)
+                    if (retries >= Config.RATE_LIMIT_RETRIES or retry_after > Config.RATE_LIMIT_MAX_WAIT
+                            or any(position is None for _, position in uploads)):
+                        limiter.count('gave_up')
+                        logger.error(f"تجاوز حد تيليجرام في {name} للمحادثة {chat_id} "
+                                     f"(retry_after={retry_after:.0f} ث)، تم إيقاف المحاولة")
+                        raise
+                    retries += 1
+                    limiter.count('retries')
+                    delay = retry_after + random.uniform(0, RETRY_JITTER)
+                    logger.warning(f"تجاوز حد تيليجرام في {name} للمحادثة {chat_id}، "
+                                   f"إعادة المحاولة {retries} بعد {delay:.1f} ث")
+                    time.sleep(delay)
+                    for upload, position in uploads:
+                        upload.seek(position)
+
+        call.__name__ = name
+        call.__doc__ = method.__doc__
+        return call
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """محدد المعدل المشترك حسب إعدادات Config"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(Config.RATE_LIMIT_GLOBAL, Config.RATE_LIMIT_PER_CHAT,
+                                   Config.RATE_LIMIT_PER_GROUP)
+        return _limiter
+
+
+def rate_limited(bot):
+    """تغليف البوت بمحدد المعدل المشترك (يعيد البوت كما هو إن كان مغلفاً أو كان التحديد معطلاً)"""
+    if not Config.RATE_LIMIT_ENABLED or getattr(bot, 'is_rate_limited', False):
+        return bot
+    return RateLimitedBot(bot, get_rate_limiter())
+
+
+def bulk(bot):
+    """نسخة البوت ذات أولوية الإرسال الجماعي (أو البوت نفسه إن لم يكن مغلفاً)"""
+    return bot.bulk if getattr(bot, 'is_rate_limited', False) else bot
+
+
+def get_rate_limit_stats() -> Dict[str, Any]:
+    """إحصائيات تحديد المعدل: الطلبات المؤجلة ومدة الانتظار وردود 429"""
+    return get_rate_limiter().stats()
@@ -0,0 +1,492 @@
+"""
+وحدة تخزين جلسات المستخدمين (بيانات التعديل وحالات المحادثة)
+الجلسات النشطة محفوظة في الذاكرة بترتيب LRU محدود بعدد الجلسات وحجمها، وكل جلسة لم تُستخدم
+خلال مدة الصلاحية تُحذف مع ملفاتها المؤقتة. يمكن حفظ الجلسات في SQLite أو Redis حتى تبقى بعد
+إعادة التشغيل وتتشارك فيها عدة عمليات للبوت؛ الواجهة المطلوبة من الخلفية هي جزء من أوامر Redis
+(get/set/delete/scan_iter) وينفذها SQLiteBackend محلياً.
+"""
+
+import os
+import json
+import time
+import atexit
+import base64
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import Config
+from workspace import get_workspace_manager
+
+logger = logging.getLogger('session_store')
+
+# الفاصل بين دورات حفظ الجلسات المعدلة وحذف المنتهية (بالثواني)
+SWEEP_INTERVAL = 30
+
+
+class SQLiteBackend:
+    """
+    خلفية حفظ في ملف SQLite بنفس واجهة Redis المستخدمة (get/set/delete/scan_iter)
+
+    يعمل الملف بوضع WAL حتى يمكن لعدة عمليات على نفس الجهاز القراءة والكتابة معاً.
+
+    Args:
+        db_path: مسار ملف SQLite
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT value FROM sessions WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())).fetchone()
+            return row[0] if row else None
+
+    def set(self, key: str, value: str, ex: Optional[int] = None) -> bool:
+        expires_at = time.time() + ex if ex else None
+        with self._lock:
+            conn = self._connection()
+            conn.execute("INSERT OR REPLACE INTO sessions (key, value, expires_at) VALUES (?, ?, ?)",
+                         (key, value, expires_at))
+            conn.commit()
+        return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            conn = self._connection()
+            deleted = conn.executemany("DELETE FROM sessions WHERE key = ?", [(key,) for key in keys]).rowcount
+            conn.commit()
+        return deleted
+
+    def scan_iter(self, match: str = '*') -> Iterator[str]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT key FROM sessions WHERE key GLOB ? AND (expires_at IS NULL OR expires_at > ?)",
+                (match, time.time())).fetchall()
+        for row in rows:
+            yield row[0]
+
+    def purge_expired(self, match: str = '*') -> List[Tuple[str, str]]:
+        """حذف الجلسات المنتهية وإعادتها حتى تُحذف ملفاتها المؤقتة"""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute("SELECT key, value FROM sessions WHERE key GLOB ? AND expires_at <= ?",
+                                (match, now)).fetchall()
+            if rows:
+                conn.executemany("DELETE FROM sessions WHERE key = ?", [(key,) for key, _ in rows])
+                conn.commit()
+        return rows
+
+
+def create_backend(name: str):
+    """
+    إنشاء خلفية الحفظ حسب الاسم: memory (بدون حفظ)، sqlite، أو redis
+
+    مكتبة redis اختيارية؛ إذا لم تكن مثبتة يتم استخدام SQLite بدلاً منها.
+    """
+    name = (name or 'memory').lower()
+    if name == 'redis':
+        try:
+            import redis
+            return redis.Redis.from_url(Config.REDIS_URL)
+        except ImportError:
+            logger.warning("مكتبة redis غير مثبتة، سيتم حفظ الجلسات في SQLite")
+            name = 'sqlite'
+    if name == 'sqlite':
+        return SQLiteBackend(Config.SESSION_DB_PATH)
+    return None
+
+
+def _text(value) -> Optional[str]:
+    """Redis يعيد bytes، وSQLite يعيد نصاً"""
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return value
+
+
+def _encode(value: Any) -> Any:
+    """تحويل قيمة من الجلسة إلى صيغة JSON (البايتات والمجموعات والوسوم بعلامات خاصة)"""
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        return {'__bytes__': base64.b64encode(value).decode('ascii')}
+    if isinstance(value, (set, frozenset)):
+        return {'__set__': [_encode(item) for item in value]}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    if hasattr(value, 'scalar_items'):
+        # TagView أو TagOverlay: تُحفظ الحقول والتعديلات، وتُقرأ الوسوم من الملف عند الاستعادة
+        base = getattr(value, 'base', value)
+        return {'__tags__': {
+            'file_type': base.file_type,
+            'fields': dict(base.scalar_items()),
+            'overlay': hasattr(value, 'changes'),
+            'changes': _encode(dict(getattr(value, 'changes', {}))),
+        }}
+    if isinstance(value, dict):
+        if all(isinstance(key, str) and not key.startswith('__') for key in value):
+            return {key: _encode(item) for key, item in value.items()}
+        return {'__items__': [[_encode(key), _encode(item)] for key, item in value.items()]}
+    raise TypeError(f"نوع غير قابل للحفظ: {type(value).__name__}")
+
+
+def _restore_tags(data: Dict[str, Any], file_path: Optional[str]):
+    from tag_handler import TagView, TagOverlay, get_audio_tags
+
+    base = None
+    if file_path and os.path.isfile(file_path):
+        try:
+            base = get_audio_tags(file_path)
+        except Exception as e:
+            logger.warning(f"تعذرت قراءة وسوم الملف عند استعادة الجلسة: {e}")
+    if base is None:
+        base = TagView(None, data.get('file_type'), data.get('fields') or {})
+    if not data.get('overlay'):
+        return base
+    return TagOverlay(base, _decode(data.get('changes'), file_path))
+
+
+def _decode(value: Any, file_path: Optional[str] = None) -> Any:
+    if isinstance(value, list):
+        return [_decode(item, file_path) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if '__bytes__' in value:
+        return base64.b64decode(value['__bytes__'])
+    if '__set__' in value:
+        return {_decode(item, file_path) for item in value['__set__']}
+    if '__tags__' in value:
+        return _restore_tags(value['__tags__'], file_path)
+    if '__items__' in value:
+        return {_decode(key, file_path): _decode(item, file_path) for key, item in value['__items__']}
+    return {key: _decode(item, file_path) for key, item in value.items()}
+
+
+def _estimate_size(value: Any) -> int:
+    """الحجم التقريبي لبيانات الجلسة (النصوص والبايتات هي ما يستهلك الذاكرة فعلياً)"""
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_estimate_size(key) + _estimate_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sum(_estimate_size(item) for item in value)
+    if hasattr(value, 'scalar_items'):
+        return sum(len(str(item)) for _, item in value.scalar_items())
+    return 16
+
+
+def _temp_files(value: Any, temp_roots: Tuple[str, ...]) -> Iterator[str]:
+    """مسارات الملفات الموجودة داخل مجلدات الملفات المؤقتة والمذكورة في الجلسة"""
+    if isinstance(value, str):
+        if len(value) < 4096 and '\n' not in value:
+            path = os.path.abspath(value)
+            if path.startswith(tuple(root + os.sep for root in temp_roots)) and os.path.isfile(path):
+                yield path
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _temp_files(item, temp_roots)
+    elif isinstance(value, (list, tuple, set)):
+        for item in value:
+            yield from _temp_files(item, temp_roots)
+
+
+class _Entry:
+    __slots__ = ('value', 'accessed', 'size')
+
+    def __init__(self, value: Any, accessed: float):
+        self.value = value
+        self.accessed = accessed
+        self.size = _estimate_size(value)
+
+
+class SessionStore(MutableMapping):
+    """
+    قاموس جلسات حسب معرف المستخدم، بديل مباشر لـ user_data و user_states
+
+    القيم تُعدل في مكانها كما في القاموس العادي؛ كل جلسة تُقرأ تُعتبر معدلة وتُحفظ في الخلفية
+    في دورة التنظيف التالية. الجلسة التي تتجاوز مدة الصلاحية دون استخدام تُحذف مع ملفاتها
+    المؤقتة، وعند تجاوز حد الذاكرة تُخرج الأقدم استخداماً (تُحفظ أولاً إن وُجدت خلفية).
+
+    Args:
+        namespace: بادئة مفاتيح الجلسات في الخلفية
+        backend: خلفية الحفظ (None للذاكرة فقط)
+        ttl: مدة صلاحية الجلسة منذ آخر استخدام بالثواني
+        max_entries: الحد الأقصى لعدد الجلسات في الذاكرة
+        max_bytes: الحد الأقصى التقريبي لحجم الجلسات في الذاكرة
+        local_ttl: مدة بقاء جلسة غير مستخدمة في ذاكرة هذه العملية قبل الاكتفاء بنسختها
+            في الخلفية (حتى تقرأ العمليات الأخرى أحدث نسخة)
+        temp_dir: مجلد الملفات المؤقتة التي تُحذف مع الجلسة (إضافة إلى مساحات العمل)
+    """
+
+    def __init__(self, namespace: str, backend=None, ttl: int = None, max_entries: int = None,
+                 max_bytes: int = None, local_ttl: int = None, temp_dir: str = None):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl = ttl or Config.SESSION_TTL
+        self.max_entries = max_entries or Config.SESSION_MAX_ENTRIES
+        self.max_bytes = max_bytes or Config.SESSION_MAX_MB * 1024 * 1024
+        self.local_ttl = Config.SESSION_LOCAL_TTL if local_ttl is None else local_ttl
+        self.temp_roots = (os.path.abspath(temp_dir or Config.TEMP_DIR), get_workspace_manager().root)
+        self._sessions = OrderedDict()
+        self._dirty = set()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._sweeper = None
+        self._stats = {'loaded': 0, 'saved': 0, 'expired': 0, 'evicted': 0, 'files_removed': 0, 'errors': 0}
+        if backend is not None:
+            atexit.register(self.flush)
+
+    # مفاتيح الخلفية: البادئة ثم معرف المستخدم بصيغة JSON حتى يعود بنفس نوعه
+    def _backend_key(self, key: Any) -> str:
+        return f"{self.namespace}:{json.dumps(key)}"
+
+    def _start_sweeper(self) -> None:
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(target=self._sweep_loop, name=f"sessions-{self.namespace}",
+                                             daemon=True)
+            self._sweeper.start()
+
+    def _sweep_loop(self) -> None:
+        while True:
+            time.sleep(SWEEP_INTERVAL)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"خطأ في تنظيف الجلسات ({self.namespace}): {e}")
+
+    def _load(self, key: Any) -> Optional[_Entry]:
+        if self.backend is None:
+            return None
+        try:
+            payload = _text(self.backend.get(self._backend_key(key)))
+        except Exception as e:
+            self._stats['errors'] += 1
+            logger.error(f"خطأ في قراءة الجلسة {key} من الخلفية: {e}")
+            return None
+        if payload is None:
+            return None
+        try:
+            raw = json.loads(payload)
+            file_path = raw.get('file_path') if isinstance(raw, dict) else None
+            value = _decode(raw, file_path)
+        except Exception as e:
+            # سجل تالف أو بصيغة قديمة يُعامل كجلسة غير موجودة بدلاً من إيقاف المعالج
+            self._stats['errors'] += 1
+            logger.error(f"تعذرت استعادة الجلسة {key} من الخلفية، سيتم تجاهلها: {e}")
+            return None
+        entry = _Entry(value, time.time())
+        self._sessions[key] = entry
+        self._bytes += entry.size
+        self._stats['loaded'] += 1
+        logger.info(f"تمت استعادة الجلسة {key} ({self.namespace}) من الخلفية")
+        return entry
+
+    def _persist(self, key: Any, entry: _Entry) -> None:
+        value = entry.value
+        if isinstance(value, dict):
+            encoded = {}
+            for name, item in value.items():
+                try:
+                    encoded[name] = _encode(item)
+                except TypeError as e:
+                    # تبقى القيمة في الذاكرة فقط
+                    logger.debug(f"لن يتم حفظ {name} في الجلسة {key}: {e}")
+            payload = {'__items__': [[k, v] for k, v in encoded.items()]} if any(
+                not isinstance(k, str) or k.startswith('__') for k in encoded) else encoded
+        else:
+            payload = _encode(value)
+        try:
+            self.backend.set(self._backend_key(key), json.dumps(payload, ensure_ascii=False), ex=self.ttl)
+            self._stats['saved'] += 1
+        except Exception as e:
+            self._stats['errors'] += 1
+            logger.error(f"خطأ في حفظ الجلسة {key} في الخلفية: {e}")
+
+    def _remove_files(self, value: Any) -> None:
+        for path in set(_temp_files(value, self.temp_roots)):
+            try:
+                # الملف داخل مساحة عمل يُحذف مع مجلدها
+                get_workspace_manager().discard(path)
+                self._stats['files_removed'] += 1
+                logger.info(f"تم حذف ملف مؤقت لجلسة منتهية: {path}")
+            except OSError as e:
+                logger.error(f"خطأ في حذف الملف المؤقت {path}: {e}")
+
+    def _drop(self, key: Any) -> _Entry:
+        entry = self._sessions.pop(key)
+        self._dirty.discard(key)
+        self._bytes -= entry.size
+        return entry
+
+    def _enforce_limits(self) -> None:
+        while len(self._sessions) > 1 and (len(self._sessions) > self.max_entries or self._bytes > self.max_bytes):
+            key = next(iter(self._sessions))
+            entry = self._drop(key)
+            if self.backend is not None:
+                # الجلسة ما زالت صالحة، تبقى في الخلفية فقط
+                self._persist(key, entry)
+            else:
+                self._remove_files(entry.value)
+            self._stats['evicted'] += 1
+
+    def __getitem__(self, key: Any) -> Any:
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is None:
+                entry = self._load(key)
+                if entry is None:
+                    raise KeyError(key)
+            else:
+                self._sessions.move_to_end(key)
+            entry.accessed = time.time()
+            self._dirty.add(key)
+            return entry.value
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        with self._lock:
+            if key in self._sessions:
+                self._drop(key)
+            entry = _Entry(value, time.time())
+            self._sessions[key] = entry
+            self._bytes += entry.size
+            self._dirty.add(key)
+            self._enforce_limits()
+        self._start_sweeper()
+
+    def __delitem__(self, key: Any) -> None:
+        with self._lock:
+            found = key in self._sessions
+            if found:
+                self._drop(key)
+            if self.backend is not None:
+                try:
+                    found = bool(self.backend.delete(self._backend_key(key))) or found
+                except Exception as e:
+                    logger.error(f"خطأ في حذف الجلسة {key} من الخلفية: {e}")
+            if not found:
+                raise KeyError(key)
+
+    def __contains__(self, key: Any) -> bool:
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+
+    def __iter__(self) -> Iterator[Any]:
+        with self._lock:
+            keys = list(self._sessions)
+        if self.backend is not None:
+            seen = set(keys)
+            prefix = f"{self.namespace}:"
+            try:
+                for backend_key in self.backend.scan_iter(match=f"{prefix}*"):
+                    key = json.loads(_text(backend_key)[len(prefix):])
+                    if key not in seen:
+                        keys.append(key)
+            except Exception as e:
+                logger.error(f"خطأ في قراءة مفاتيح الجلسات من الخلفية: {e}")
+        return iter(keys)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def flush(self) -> None:
+        """حفظ الجلسات المعدلة في الخلفية"""
+        with self._lock:
+            for key in list(self._dirty):
+                entry = self._sessions.get(key)
+                if entry is None:
+                    continue
+                # تحديث الحجم بعد التعديلات التي تمت في مكانها
+                self._bytes += _estimate_size(entry.value) - entry.size
+                entry.size = _estimate_size(entry.value)
+                if self.backend is not None:
+                    self._persist(key, entry)
+            self._dirty.clear()
+
+    def sweep(self) -> None:
+        """حذف الجلسات المنتهية مع ملفاتها، وحفظ المعدلة، وإخراج ما يتجاوز حدود الذاكرة"""
+        now = time.time()
+        with self._lock:
+            for key in [key for key, entry in self._sessions.items() if now - entry.accessed > self.ttl]:
+                entry = self._drop(key)
+                self._remove_files(entry.value)
+                if self.backend is not None:
+                    try:
+                        self.backend.delete(self._backend_key(key))
+                    except Exception as e:
+                        logger.error(f"خطأ في حذف الجلسة {key} من الخلفية: {e}")
+                self._stats['expired'] += 1
+                logger.info(f"انتهت صلاحية الجلسة {key} ({self.namespace})")
+
+            self.flush()
+
+            if self.backend is not None:
+                # الجلسات غير المستخدمة محفوظة الآن، تُقرأ من الخلفية عند الحاجة
+                for key in [key for key, entry in self._sessions.items() if now - entry.accessed > self.local_ttl]:
+                    self._drop(key)
+            self._enforce_limits()
+
+        # الجلسات التي انتهت في الخلفية دون أن تكون في الذاكرة
+        purge_expired = getattr(self.backend, 'purge_expired', None)
+        if purge_expired is not None:
+            for _, payload in purge_expired(f"{self.namespace}:*"):
+                self._remove_files(json.loads(payload))
+                self._stats['expired'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'entries': len(self._sessions),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'backend': type(self.backend).__name__ if self.backend is not None else 'memory',
+            })
+            return stats
+
+
+_backend = None
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_session_store(namespace: str) -> SessionStore:
+    """الحصول على مخزن الجلسات المشترك لاسم معين (الخلفية حسب Config.SESSION_BACKEND)"""
+    global _backend
+    with _stores_lock:
+        if namespace not in _stores:
+            if _backend is None:
+                _backend = create_backend(Config.SESSION_BACKEND)
+            _stores[namespace] = SessionStore(namespace, _backend)
+        return _stores[namespace]
+
+
+def get_session_stats() -> Dict[str, Dict[str, Any]]:
+    """إحصائيات كل مخازن الجلسات"""
+    with _stores_lock:
+        stores = dict(_stores)
+    return {namespace: store.stats() for namespace, store in stores.items()}
@@ -0,0 +1,381 @@
+"""
+سجل حقول الوسوم لكل صيغة صوتية
+يربط أسماء الحقول المنطقية (title، artist، disc_number...) بمفاتيح كل صيغة ودوال التحويل،
+ويُترجم مرة واحدة عند الاستيراد إلى جداول بحث للقراءة والكتابة.
+
+إضافة حقل جديد تتطلب سطراً واحداً في FIELDS (ودالة تحويل فقط إذا لم تكن القيمة نصاً بسيطاً).
+"""
+
+import logging
+
+from mutagen.id3 import Frames, COMM, USLT
+
+logger = logging.getLogger('tag_fields')
+
+# عائلة الوسوم المستخدمة لكل نوع ملف
+FILE_TYPE_FAMILIES = {
+    'mp3': 'id3',
+    'wav': 'id3',
+    'aiff': 'id3',
+    'flac': 'vorbis',
+    'ogg': 'vorbis',
+    'opus': 'vorbis',
+    'mp4': 'mp4',
+    'asf': 'asf',
+}
+
+FAMILIES = ('id3', 'vorbis', 'mp4', 'asf')
+
+# الحقل المنطقي ثم مفتاحه في كل عائلة (None = غير مدعوم في هذه العائلة)
+FIELDS = (
+    # field              id3     vorbis            mp4         asf
+    ('title',            'TIT2', 'title',          '\xa9nam',  'Title'),
+    ('artist',           'TPE1', 'artist',         '\xa9ART',  'Author'),
+    ('album_artist',     'TPE2', 'albumartist',    'aART',     'WM/AlbumArtist'),
+    ('album',            'TALB', 'album',          '\xa9alb',  'WM/AlbumTitle'),
+    ('year',             'TDRC', 'date',           '\xa9day',  'WM/Year'),
+    ('date',             'TDAT', 'date',           '\xa9day',  None),
+    ('genre',            'TCON', 'genre',          '\xa9gen',  'WM/Genre'),
+    ('composer',         'TCOM', 'composer',       '\xa9wrt',  'WM/Composer'),
+    ('conductor',        'TPE3', 'conductor',      '\xa9con',  None),
+    ('arranger',         'TPE4', 'arranger',       'arrn',     None),
+    ('comment',          'COMM', 'comment',        '\xa9cmt',  'Description'),
+    ('track',            'TRCK', 'tracknumber',    'trkn',     'WM/TrackNumber'),
+    ('disc_number',      'TPOS', 'discnumber',     'disk',     None),
+    ('disc_total',       'TPOS', 'disctotal',      'disk',     None),
+    ('bpm',              'TBPM', 'bpm',            'tmpo',     None),
+    ('compilation',      'TCMP', 'compilation',    'cpil',     None),
+    ('copyright',        'TCOP', 'copyright',      'cprt',     None),
+    ('encoded_by',       'TENC', 'encodedby',      '\xa9too',  None),
+    ('publisher',        'TPUB', 'publisher',      '\xa9pub',  None),
+    ('isrc',             'TSRC', 'isrc',           '\xa9isr',  None),
+    ('language',         'TLAN', 'language',       '\xa9lan',  None),
+    ('length',           'TLEN', None,             None,       None),
+    ('media_type',       'TMED', 'media',          '\xa9med',  None),
+    ('mood',             'TMOO', 'mood',           '\xa9moo',  None),
+    ('original_album',   'TOAL', 'originalalbum',  '\xa9oal',  None),
+    ('original_artist',  'TOPE', 'originalartist', '\xa9ope',  None),
+    ('subtitle',         'TIT3', 'subtitle',       '\xa9st3',  None),
+    ('website',          'WCOM', 'website',        '\xa9url',  None),
+    ('lyrics',           'USLT', 'lyrics',         '\xa9lyr',  'WM/Lyrics'),
+)
+
+# مفاتيح إضافية تُقرأ إلى حقل موجود دون أن تُكتب
+READ_ALIASES = (
+    # family  key     field
+    ('id3',   'TSST', 'subtitle'),
+    ('id3',   'WCOP', 'website'),
+    ('id3',   'WOAF', 'website'),
+    ('id3',   'WOAR', 'website'),
+    ('id3',   'WOAS', 'website'),
+    ('id3',   'WORS', 'website'),
+    ('id3',   'WPAY', 'website'),
+    ('id3',   'WPUB', 'website'),
+    ('id3',   'WXXX', 'website'),
+)
+
+
+# ---------------------------------------------------------------------------
+# دوال القراءة: reader(tags, field, value) تضيف القيمة إلى قاموس الوسوم الناتج
+# ---------------------------------------------------------------------------
+
+def _read_text(tags, field, value):
+    tags[field] = str(value)
+
+
+def _read_first_text(tags, field, value):
+    # بعض الإطارات قد تتكرر (COMM وإطارات الروابط)، الأول هو المعتمد
+    if field not in tags:
+        tags[field] = str(value)
+
+
+def _read_first_item(tags, field, value):
+    if field not in tags:
+        tags[field] = value[0]
+
+
+def _read_first_item_text(tags, field, value):
+    if field not in tags:
+        tags[field] = str(value[0])
+
+
+def _read_vorbis(tags, field, value):
+    # كل زوج في تعليقات Vorbis يحمل قيمة واحدة، والقيمة الأولى هي المعتمدة
+    if field not in tags:
+        tags[field] = value
+
+
+def _read_id3_disc(tags, field, value):
+    disc_info = str(value)
+    if '/' in disc_info:
+        disc_num, disc_total = disc_info.split('/', 1)
+        tags['disc_number'] = disc_num
+        tags['disc_total'] = disc_total
+    else:
+        tags['disc_number'] = disc_info
+
+
+def _read_id3_subtitle(tags, field, value):
+    # TIT3 يأتي أولاً ثم TSST مهما كان ترتيب الإطارات في الملف
+    text = str(value)
+    if field not in tags:
+        tags[field] = text
+    elif value.FrameID == 'TIT3':
+        tags[field] = text + ' - ' + tags[field]
+    else:
+        tags[field] += ' - ' + text
+
+
+def _read_mp4_track(tags, field, value):
+    track_number, total_tracks = value[0]
+    if total_tracks > 0:
+        tags[field] = f"{track_number}/{total_tracks}"
+    else:
+        tags[field] = str(track_number)
+
+
+def _read_mp4_disc(tags, field, value):
+    disc_number, total_discs = value[0]
+    tags['disc_number'] = str(disc_number)
+    if total_discs > 0:
+        tags['disc_total'] = str(total_discs)
+
+
+def _read_mp4_bpm(tags, field, value):
+    tags[field] = str(value[0])
+
+
+def _read_mp4_flag(tags, field, value):
+    tags[field] = "1" if value else "0"
+
+
+# ---------------------------------------------------------------------------
+# دوال الكتابة: writer(audio, key, value, new_tags)
+# new_tags هو قاموس القيم الكامل لتتمكن الحقول المركبة (رقم القرص) من قراءة شريكها
+# ---------------------------------------------------------------------------
+
+def _write_id3_text(audio, key, value, new_tags):
+    audio.setall(key, [Frames[key](encoding=3, text=value)])
+
+
+def _write_id3_url(audio, key, value, new_tags):
+    audio.setall(key, [Frames[key](url=value)])
+
+
+def _write_id3_comment(audio, key, value, new_tags):
+    audio.setall(key, [COMM(encoding=3, lang='eng', desc='', text=value)])
+
+
+def _write_id3_disc(audio, key, value, new_tags):
+    if 'disc_number' not in new_tags:
+        return
+    disc_text = new_tags['disc_number']
+    if 'disc_total' in new_tags:
+        disc_text = f"{disc_text}/{new_tags['disc_total']}"
+    audio.setall(key, [Frames[key](encoding=3, text=disc_text)])
+
+
+def _write_id3_lyrics(audio, key, value, new_tags):
+    if not value:
+        return
+    # الكلمات بترميز UTF-8 مرتين: وصف فارغ للتوافق العام ونسخة عربية لبعض المشغلات
+    audio.setall(key, [
+        USLT(encoding=3, lang='eng', desc='', text=value),
+        USLT(encoding=3, lang='ara', desc='Arabic', text=value),
+    ])
+
+
+def _write_list(audio, key, value, new_tags):
+    audio[key] = [value]
+
+
+def _parse_number_pair(value, total=0):
+    """تحويل نص مثل '3/12' إلى (3, 12)"""
+    value = str(value)
+    number = int(value.split('/')[0])
+    if '/' in value:
+        try:
+            total = int(value.split('/')[1])
+        except (ValueError, IndexError):
+            pass
+    return number, total
+
+
+def _write_mp4_track(audio, key, value, new_tags):
+    try:
+        audio[key] = [_parse_number_pair(value)]
+    except ValueError:
+        logger.warning(f"Invalid track number format: {value}, skipping")
+
+
+def _write_mp4_disc(audio, key, value, new_tags):
+    if 'disc_number' not in new_tags:
+        return
+    disc_value = new_tags['disc_number']
+    total_discs = 0
+    if 'disc_total' in new_tags and '/' not in str(disc_value):
+        try:
+            total_discs = int(new_tags['disc_total'])
+        except ValueError:
+            pass
+    try:
+        audio[key] = [_parse_number_pair(disc_value, total_discs)]
+    except ValueError:
+        logger.warning(f"Invalid disc number format: {disc_value}, skipping")
+
+
+def _write_mp4_bpm(audio, key, value, new_tags):
+    try:
+        audio[key] = [int(float(value))]
+    except ValueError:
+        logger.warning(f"Invalid BPM format: {value}, skipping")
+
+
+def _write_mp4_flag(audio, key, value, new_tags):
+    text = str(value).lower()
+    if text in ('yes', 'true', '1'):
+        audio[key] = True
+    elif text in ('no', 'false', '0'):
+        audio[key] = False
+    else:
+        try:
+            audio[key] = bool(int(text))
+        except ValueError:
+            logger.warning(f"Invalid compilation flag format: {value}, skipping")
+
+
+# القارئ والكاتب الافتراضيان لكل عائلة
+DEFAULT_CONVERTERS = {
+    'id3': (_read_text, _write_id3_text),
+    'vorbis': (_read_vorbis, _write_list),
+    'mp4': (_read_first_item, _write_list),
+    'asf': (_read_first_item_text, _write_list),
+}
+
+# محولات خاصة لكل (عائلة، حقل)؛ None للقارئ يعني أن الحقل يُقرأ عبر حقل آخر
+CONVERTERS = {
+    ('id3', 'comment'): (_read_first_text, _write_id3_comment),
+    ('id3', 'website'): (_read_first_text, _write_id3_url),
+    ('id3', 'disc_number'): (_read_id3_disc, _write_id3_disc),
+    ('id3', 'disc_total'): (None, _write_id3_disc),
+    ('id3', 'subtitle'): (_read_id3_subtitle, _write_id3_text),
+    ('id3', 'lyrics'): (_read_first_text, _write_id3_lyrics),
+    ('mp4', 'track'): (_read_mp4_track, _write_mp4_track),
+    ('mp4', 'disc_number'): (_read_mp4_disc, _write_mp4_disc),
+    ('mp4', 'disc_total'): (None, _write_mp4_disc),
+    ('mp4', 'bpm'): (_read_mp4_bpm, _write_mp4_bpm),
+    ('mp4', 'compilation'): (_read_mp4_flag, _write_mp4_flag),
+}
+
+
+def _compile_tables():
+    """
+    ترجمة FIELDS إلى جداول بحث لكل عائلة
+
+    Returns:
+        tuple: (read_tables, write_tables)
+            read_tables[family][key] = ((field, reader), ...)
+            write_tables[family][field] = (key, writer)
+    """
+    read_tables = {family: {} for family in FAMILIES}
+    write_tables = {family: {} for family in FAMILIES}
+
+    for row in FIELDS:
+        field = row[0]
+        for family, key in zip(FAMILIES, row[1:]):
+            if key is None:
+                continue
+            reader, writer = CONVERTERS.get((family, field), DEFAULT_CONVERTERS[family])
+            if reader is not None:
+                read_tables[family][key] = read_tables[family].get(key, ()) + ((field, reader),)
+            write_tables[family][field] = (key, writer)
+
+    for family, key, field in READ_ALIASES:
+        reader = CONVERTERS.get((family, field), DEFAULT_CONVERTERS[family])[0]
+        read_tables[family][key] = read_tables[family].get(key, ()) + ((field, reader),)
+
+    return read_tables, write_tables
+
+
+READ_TABLES, WRITE_TABLES = _compile_tables()
+
+
+def _iter_id3(tags):
+    # مفاتيح ID3 تتضمن الوصف واللغة (COMM::eng)، أول أربعة أحرف هي معرف الإطار
+    for key, frame in tags.items():
+        yield key[:4], frame
+
+
+def _iter_vorbis(tags):
+    # تعليقات Vorbis قائمة أزواج (مفتاح، قيمة) والمفاتيح غير حساسة لحالة الأحرف
+    for key, value in tags:
+        yield key.lower(), value
+
+
+def _iter_items(tags):
+    return tags.items()
+
+
+TAG_ITERATORS = {
+    'id3': _iter_id3,
+    'vorbis': _iter_vorbis,
+    'mp4': _iter_items,
+    'asf': _iter_items,
+}
+
+
+def read_fields(tags, family, exclude=(), only=None):
+    """
+    قراءة الحقول المنطقية من كائن وسوم mutagen في مرور واحد على الإطارات الموجودة
+
+    Args:
+        tags: كائن الوسوم (audio.tags)
+        family: عائلة الوسوم ('id3' أو 'vorbis' أو 'mp4' أو 'asf')
+        exclude: حقول لا يتم فك ترميزها (مثل lyrics)
+        only: إن حُدد، تُقرأ هذه الحقول فقط
+
+    Returns:
+        dict: أسماء الحقول وقيمها
+    """
+    table = READ_TABLES[family]
+    result = {}
+    for key, value in TAG_ITERATORS[family](tags):
+        for field, reader in table.get(key, ()):
+            if field in exclude or (only is not None and field not in only):
+                continue
+            try:
+                reader(result, field, value)
+            except Exception as e:
+                logger.warning(f"تعذرت قراءة الحقل {field} من {key}: {e}")
+    return result
+
+
+def write_fields(audio, family, new_tags, values=None):
+    """
+    كتابة الحقول المنطقية في كائن الوسوم في مرور واحد على الحقول المعطاة
+
+    الحقول غير المعروفة للعائلة (مثل picture وhas_album_art) يتم تجاهلها.
+
+    Args:
+        audio: كائن الوسوم (ID3) أو الملف (FLAC/MP4/ASF...) الذي يقبل الإسناد بالمفاتيح
+        family: عائلة الوسوم
+        new_tags: قاموس أسماء الحقول وقيمها المطلوب كتابتها
+        values: القيم الكاملة بعد الدمج، تستخدمها الحقول المركبة لقراءة شريكها
+            (مثل عدد الأقراص عند تغيير رقم القرص فقط). الافتراضي new_tags
+
+    Returns:
+        list: أسماء الحقول التي تمت كتابتها
+    """
+    if values is None:
+        values = new_tags
+    table = WRITE_TABLES[family]
+    written = []
+    for field, value in new_tags.items():
+        entry = table.get(field)
+        if entry is None:
+            continue
+        key, writer = entry
+        logger.debug(f"Setting {family} {key!r} for {field}")
+        writer(audio, key, value, values)
+        written.append(field)
+    return written
@@ -1,8 +1,14 @@
 # هذا الملف يحتوي على وظائف وهمية بديلة لتجنب أخطاء الاستيراد
 # تم تعطيل ميزة القوالب
 
+def _templates_changed():
+    """القوالب الذكية في ملف المعالجة التلقائية تُقرأ من القوالب، فيُعاد بناؤه عند تغييرها"""
+    from processing_profile import invalidate_processing_profile
+    invalidate_processing_profile()
+
 def save_template(*args, **kwargs):
     """وظيفة وهمية لحفظ القالب"""
+    _templates_changed()
     return False
 
 def get_template(*args, **kwargs):
@@ -15,6 +21,7 @@ def list_templates(*args, **kwargs):
 
 def delete_template(*args, **kwargs):
     """وظيفة وهمية لحذف القالب"""
+    _templates_changed()
     return False
 
 def extract_artist_from_tags(*args, **kwargs):
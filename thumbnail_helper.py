@@ -1,15 +1,15 @@
 import logging
-import os
 from mutagen.id3 import ID3
 from mutagen.flac import FLAC
 from mutagen.mp4 import MP4
 from mutagen._file import File
+from audio_format import detect_file_type
 
 logger = logging.getLogger(__name__)
 
 def get_file_type(file_path):
     """
-    تحديد نوع الملف الصوتي
+    تحديد نوع الملف الصوتي من محتواه (مع الرجوع إلى الامتداد عند الفشل)
     
     Args:
         file_path: مسار الملف الصوتي
@@ -17,15 +17,13 @@ def get_file_type(file_path):
     Returns:
         str: نوع الملف ('mp3', 'flac', 'm4a', 'ogg', 'unknown')
     """
-    _, ext = os.path.splitext(file_path.lower())
+    file_type = detect_file_type(file_path, default=None)
     
-    if ext == '.mp3':
-        return 'mp3'
-    elif ext == '.flac':
-        return 'flac'
-    elif ext in ['.m4a', '.mp4', '.aac']:
+    if file_type in ('mp3', 'flac'):
+        return file_type
+    elif file_type == 'mp4':
         return 'm4a'
-    elif ext in ['.ogg', '.oga', '.opus']:
+    elif file_type in ('ogg', 'opus'):
         return 'ogg'
     else:
         return 'unknown'
@@ -0,0 +1,124 @@
+"""
+وحدة استقبال التحديثات عبر Webhook على تطبيق Flask الموجود
+يستقبل تيليجرام التحديثات على مسار في التطبيق (يعمل تحت gunicorn)، ويتم تجاهل التحديثات
+المكررة حسب update_id (تيليجرام يعيد الإرسال عند التأخر أو الفشل)، ثم تُضاف كل تحديثة
+إلى طابور مهام وتُعاد الاستجابة فوراً دون انتظار المعالجة.
+"""
+
+import hmac
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict
+
+import flask
+from telebot import types
+
+from config import Config
+from job_queue import JobQueue, QueueFullError
+
+logger = logging.getLogger('webhook')
+
+# عدد معرفات التحديثات الأخيرة المحفوظة لاكتشاف التكرار
+DEDUP_WINDOW = 10000
+
+
+class UpdateDeduplicator:
+    """
+    تذكر آخر معرفات التحديثات المستلمة لتجاهل ما يعيد تيليجرام إرساله
+
+    Args:
+        max_size: عدد المعرفات المحفوظة (الأقدم يُنسى أولاً)
+    """
+
+    def __init__(self, max_size: int = DEDUP_WINDOW):
+        self.max_size = max_size
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check_and_add(self, update_id: int) -> bool:
+        """إضافة المعرف، ويعيد False إذا كان قد استُلم من قبل"""
+        with self._lock:
+            if update_id in self._seen:
+                return False
+            self._seen[update_id] = None
+            if len(self._seen) > self.max_size:
+                self._seen.popitem(last=False)
+            return True
+
+    def forget(self, update_id: int) -> None:
+        """نسيان معرف لم تتم معالجته حتى يُقبل عند إعادة إرساله"""
+        with self._lock:
+            self._seen.pop(update_id, None)
+
+
+_webhook_stats = {'received': 0, 'duplicates': 0, 'rejected': 0, 'invalid': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _webhook_stats[name] += 1
+
+
+def mount_webhook(app: flask.Flask, bot, path: str = None, secret: str = None,
+                  update_queue: JobQueue = None) -> JobQueue:
+    """
+    إضافة مسار استقبال التحديثات إلى تطبيق Flask
+
+    Args:
+        app: تطبيق Flask
+        bot: كائن TeleBot (يُفضل threaded=False حتى تعمل المعالجات داخل عمال الطابور)
+        path: مسار الاستقبال (الافتراضي Config.WEBHOOK_PATH)
+        secret: قيمة ترويسة X-Telegram-Bot-Api-Secret-Token المتوقعة (الافتراضي Config.WEBHOOK_SECRET)
+        update_queue: طابور التحديثات (يُنشأ طابور جديد إن لم يُحدد)
+
+    Returns:
+        JobQueue: طابور التحديثات المستخدم
+    """
+    path = path or Config.WEBHOOK_PATH
+    secret = Config.WEBHOOK_SECRET if secret is None else secret
+    if update_queue is None:
+        # طابور منفصل عن طابور الملفات حتى لا تنتظر الأزرار والأوامر خلف التنزيلات
+        update_queue = JobQueue(Config.WEBHOOK_WORKERS, Config.PROCESSING_QUEUE_SIZE, name='updates')
+    deduplicator = UpdateDeduplicator()
+
+    def receive_update():
+        if secret and not hmac.compare_digest(
+                flask.request.headers.get('X-Telegram-Bot-Api-Secret-Token', ''), secret):
+            _count('invalid')
+            return '', 403
+
+        payload = flask.request.get_json(silent=True)
+        if not payload or 'update_id' not in payload:
+            _count('invalid')
+            return '', 400
+
+        update_id = payload['update_id']
+        if not deduplicator.check_and_add(update_id):
+            _count('duplicates')
+            logger.info(f"تم تجاهل تحديث مكرر: {update_id}")
+            return '', 200
+
+        update = types.Update.de_json(payload)
+        try:
+            update_queue.submit(bot.process_new_updates, [update], job_name=f"update-{update_id}")
+        except QueueFullError as e:
+            # تيليجرام يعيد الإرسال لاحقاً عند فشل الاستجابة
+            deduplicator.forget(update_id)
+            _count('rejected')
+            logger.warning(f"تم رفض التحديث {update_id}: {e}")
+            return '', 503
+
+        _count('received')
+        return '', 200
+
+    app.add_url_rule(path, endpoint='telegram_webhook', view_func=receive_update, methods=['POST'])
+    logger.info(f"تم تفعيل استقبال التحديثات على المسار: {path}")
+    return update_queue
+
+
+def get_webhook_stats() -> Dict[str, Any]:
+    """إحصائيات التحديثات المستلمة والمكررة والمرفوضة"""
+    with _stats_lock:
+        return dict(_webhook_stats)
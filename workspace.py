@@ -0,0 +1,252 @@
+"""
+وحدة مساحات العمل المؤقتة للمهام
+كل مهمة (ملف مستخدم أو منشور قناة) تحصل على مجلد خاص بها داخل مجلد مساحات العمل، فلا تتداخل
+ملفات مهمتين متزامنتين لنفس المستخدم. المجلد يُحذف بالكامل عند الخروج من سياق with مهما كان
+سبب الخروج، أو عند انتهاء الجلسة التي تملكه. عامل تنظيف في الخلفية يحذف المجلدات القديمة
+ويبقي الحجم الكلي ضمن الحد، مع حساب الحجم لكل مجلد عند تغيره بدلاً من مسح القرص كاملاً.
+مجلدات جلسات المستخدمين لا تُحذف لتجاوز الحجم لأن الجلسة ما زالت تشير إلى ملفها، وتُحذف
+فقط بعد WORKSPACE_MAX_AGE (أطول من مدة الجلسة) إن لم تحذفها الجلسة نفسها.
+"""
+
+import os
+import time
+import shutil
+import logging
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+from config import Config
+from utils import sanitize_filename
+
+logger = logging.getLogger('workspace')
+
+# الفاصل بين دورات عامل التنظيف (بالثواني)
+REAPER_INTERVAL = 60
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+def default_root() -> str:
+    """مجلد مساحات العمل: WORKSPACE_DIR، أو /dev/shm عند تفعيل WORKSPACE_TMPFS، أو داخل TEMP_DIR"""
+    if Config.WORKSPACE_DIR:
+        return Config.WORKSPACE_DIR
+    if Config.WORKSPACE_TMPFS and os.path.isdir('/dev/shm'):
+        return os.path.join('/dev/shm', 'audio_tag_bot')
+    return os.path.join(Config.TEMP_DIR, 'jobs')
+
+
+class Workspace:
+    """
+    مجلد مهمة واحدة، يُستخدم كسياق with
+
+    عند الخروج من السياق يُحذف المجلد، إلا إذا استدعيت keep() لأن الملف سيبقى مع جلسة المستخدم
+    (يُحذف حينها مع الجلسة أو بواسطة عامل التنظيف).
+    """
+
+    def __init__(self, manager: 'WorkspaceManager', path: str):
+        self.manager = manager
+        self.path = path
+        self.kept = False
+
+    def file(self, name: str) -> str:
+        """مسار ملف داخل مساحة العمل باسم آمن"""
+        return os.path.join(self.path, sanitize_filename(os.path.basename(name)) or 'file')
+
+    def account(self) -> None:
+        """تحديث حجم مساحة العمل بعد كتابة ملفات فيها"""
+        self.manager.account(self.path)
+
+    def keep(self) -> 'Workspace':
+        self.kept = True
+        return self
+
+    def release(self) -> None:
+        self.manager.release(self.path)
+
+    def __enter__(self) -> 'Workspace':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self.kept:
+            self.manager.account(self.path, active=False, kept=True)
+        else:
+            self.release()
+
+
+class WorkspaceManager:
+    """
+    إنشاء مساحات العمل وحذفها ومراقبة حجمها
+
+    Args:
+        root: المجلد الذي تُنشأ فيه مساحات العمل
+        max_age: عمر مساحة العمل (منذ آخر تعديل) الذي تُحذف بعده بالثواني
+        max_bytes: الحد الأقصى لمجموع أحجام مساحات العمل
+    """
+
+    def __init__(self, root: str, max_age: int, max_bytes: int):
+        self.root = os.path.abspath(root)
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        # المسار -> [الحجم، آخر تعديل، قيد الاستخدام، مملوك لجلسة]
+        self._entries = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._reaper = None
+        self._scanned = False
+        self._stats = {'created': 0, 'released': 0, 'reaped': 0, 'reaped_bytes': 0}
+
+    def create(self, prefix: str = 'job') -> Workspace:
+        """إنشاء مجلد جديد لمهمة"""
+        os.makedirs(self.root, exist_ok=True)
+        path = tempfile.mkdtemp(prefix=f"{sanitize_filename(prefix)}-", dir=self.root)
+        with self._lock:
+            self._entries[path] = [0, time.time(), True, False]
+            self._stats['created'] += 1
+        self._start_reaper()
+        return Workspace(self, path)
+
+    def adopt(self, path: str) -> Workspace:
+        """تسجيل مجلد موجود من تشغيل سابق كمساحة عمل نشطة (عند استئناف مهمة)"""
+        size = _dir_size(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                self._entries[path] = [size, time.time(), True, False]
+                self._bytes += size
+            else:
+                entry[2] = True
+        self._start_reaper()
+        return Workspace(self, path)
+
+    def account(self, path: str, active: Optional[bool] = None, kept: Optional[bool] = None) -> None:
+        """إعادة حساب حجم مساحة عمل واحدة (وتحديث حالتها إن أُعطيت)"""
+        size = _dir_size(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return
+            self._bytes += size - entry[0]
+            entry[0] = size
+            entry[1] = time.time()
+            if active is not None:
+                entry[2] = active
+            if kept is not None:
+                entry[3] = kept
+
+    def workspace_of(self, file_path: str) -> Optional[str]:
+        """مجلد مساحة العمل الذي يحتوي الملف، أو None إن لم يكن داخل مساحة عمل"""
+        path = os.path.abspath(file_path)
+        if not path.startswith(self.root + os.sep):
+            return None
+        top = path[len(self.root) + 1:].split(os.sep, 1)[0]
+        return os.path.join(self.root, top) if top else None
+
+    def release(self, path: str) -> None:
+        """حذف مساحة العمل بكل ملفاتها"""
+        shutil.rmtree(path, ignore_errors=True)
+        with self._lock:
+            entry = self._entries.pop(path, None)
+            if entry is not None:
+                self._bytes -= entry[0]
+            self._stats['released'] += 1
+        logger.debug(f"تم حذف مساحة العمل: {path}")
+
+    def discard(self, file_path: str) -> None:
+        """حذف ملف مهمة: مساحة العمل كاملة إن كان داخل واحدة، وإلا الملف وحده"""
+        workspace = self.workspace_of(file_path)
+        if workspace is not None:
+            self.release(workspace)
+        elif os.path.isfile(file_path):
+            os.remove(file_path)
+
+    def _start_reaper(self) -> None:
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap_loop, name='workspace-reaper', daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self) -> None:
+        while True:
+            try:
+                self.reap()
+            except Exception as e:
+                logger.error(f"خطأ في تنظيف مساحات العمل: {e}")
+            time.sleep(REAPER_INTERVAL)
+
+    def _scan_existing(self) -> None:
+        """تسجيل المجلدات الموجودة من تشغيل سابق (مرة واحدة فقط)"""
+        if not os.path.isdir(self.root):
+            return
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if not os.path.isdir(path):
+                continue
+            size = _dir_size(path)
+            with self._lock:
+                if path not in self._entries:
+                    # قد تكون لجلسة محفوظة في الخلفية، فتُعامل كمملوكة لجلسة
+                    self._entries[path] = [size, os.path.getmtime(path), False, True]
+                    self._bytes += size
+
+    def reap(self) -> None:
+        """حذف مساحات العمل القديمة، ثم الأقدم (من غير مجلدات الجلسات) حتى يعود الحجم الكلي ضمن الحد"""
+        if not self._scanned:
+            self._scan_existing()
+            self._scanned = True
+
+        now = time.time()
+        with self._lock:
+            idle = sorted(((entry[1], path, entry[0], entry[3]) for path, entry in self._entries.items()
+                           if not entry[2]))
+            total = self._bytes
+        victims = []
+        for touched, path, size, kept in idle:
+            if now - touched > self.max_age or (total > self.max_bytes and not kept):
+                victims.append((path, size))
+                total -= size
+        for path, size in victims:
+            self.release(path)
+            with self._lock:
+                self._stats['reaped'] += 1
+                self._stats['reaped_bytes'] += size
+            logger.info(f"تم حذف مساحة عمل قديمة ({size} بايت): {path}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'root': self.root,
+                'workspaces': len(self._entries),
+                'active': sum(1 for entry in self._entries.values() if entry[2]),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            })
+            return stats
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_workspace_manager() -> WorkspaceManager:
+    """مدير مساحات العمل المشترك حسب إعدادات Config"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = WorkspaceManager(default_root(), Config.WORKSPACE_MAX_AGE,
+                                        Config.WORKSPACE_MAX_MB * 1024 * 1024)
+        return _manager
+
+
+def get_workspace_stats() -> Dict[str, Any]:
+    """إحصائيات مساحات العمل: العدد والحجم وما تم حذفه"""
+    return get_workspace_manager().stats()